@@ -10,5 +10,7 @@ class S3CollectorSettings(SettingsModel):
 	tenant_id: int
 	consume_prefix: str
 	dead_prefix: str
-	max_keys: int = 10
+	max_keys: int = 1000
+	download_workers: int = 8
+	process_workers: int = 8
 	clean_task_interval: int = 3600
@@ -1,13 +1,12 @@
 import asyncio
-from enum import Enum
+from concurrent.futures import Future, ThreadPoolExecutor
 from logging import getLogger
 from threading import Thread
 from time import sleep
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Set, Tuple
 
 from watchmen_collector_kernel.common import S3CollectorSettings
-from watchmen_collector_kernel.lock import get_oss_collector_lock_service, get_unique_key_distributed_lock, \
-	DistributedLock
+from watchmen_collector_kernel.lock import get_oss_collector_lock_service, try_lock_all_nowait
 from watchmen_collector_kernel.model import OSSCollectorCompetitiveLock
 from watchmen_data_kernel.storage import TopicTrigger
 from watchmen_meta.common import ask_snowflake_generator
@@ -16,6 +15,7 @@ from watchmen_storage_s3 import SimpleStorageService, ObjectContent
 
 from watchmen_model.pipeline_kernel import PipelineTriggerData
 from watchmen_model.common import Storable
+from watchmen_utilities import ArrayHelper
 
 from .handler import save_topic_data, handle_trigger_data
 from .housekeeping import init_task_housekeeping
@@ -25,15 +25,6 @@ logger = getLogger(__name__)
 identifier_delimiter = "~"
 
 
-class STATUS(str, Enum):
-	CHECK_KEY_FAILED = "CHECK_KEY_FAILED"
-	DEPENDENCY_FAILED = "DEPENDENCY_FAILED"
-	CREATE_TASK_FAILED = "CREATE_TASK_FAILED"
-	EMPTY_PAYLOAD = "EMPTY_PAYLOAD"
-	COMPLETED_TASK = "COMPLETED_TASK"
-	PROCESS_TASK_FAILED = "PROCESS_TASK_FAILED"
-
-
 def init_s3_collector(settings: S3CollectorSettings):
 	S3Connector(settings).create_connector()
 	init_task_housekeeping(settings)
@@ -44,6 +35,18 @@ class Dependency(Storable):
 	object_id: str
 
 
+class CollectTask:
+	"""
+	one object to be collected, payload is downloaded ahead of processing
+	"""
+	
+	def __init__(self, key: str, identifier: str):
+		self.key = key
+		self.identifier = identifier
+		self.lock: Optional[OSSCollectorCompetitiveLock] = None
+		self.payload: Optional[Future] = None
+
+
 class S3Connector:
 	
 	def __init__(self, settings: S3CollectorSettings):
@@ -59,92 +62,194 @@ class S3Connector:
 		self.consume_prefix = settings.consume_prefix
 		self.dead_prefix = settings.dead_prefix
 		self.maxKeys = settings.max_keys
+		self.downloadWorkers = settings.download_workers
+		self.processWorkers = settings.process_workers
 	
 	def create_connector(self) -> None:
 		Thread(target=S3Connector.run, args=(self,), daemon=True).start()
 	
 	def run(self):
 		try:
-			while True:
-				objects = self.simpleStorageService.list_objects(max_keys=self.maxKeys, prefix=self.consume_prefix)
-				logger.info("objects size {}".format(len(objects)))
-				if len(objects) == 0:
-					sleep(5)
-				else:
-					for object_ in objects:
-						result = self.consume(object_)
-						if result == STATUS.CREATE_TASK_FAILED or result == STATUS.DEPENDENCY_FAILED:
-							# logger.info("CREATE_TASK_FAILED or DEPENDENCY_FAILED , key is  {}".format(object_.key))
-							continue
-						elif result == STATUS.CHECK_KEY_FAILED or result == STATUS.COMPLETED_TASK or \
-								STATUS.EMPTY_PAYLOAD or result == STATUS.PROCESS_TASK_FAILED:
-							logger.info(
-								"CHECK_KEY_FAILED or COMPLETED_TASK or EMPTY_PAYLOAD or PROCESS_TASK_FAILED, key is  {}".format(
-									object_.key))
-							break
+			with ThreadPoolExecutor(max_workers=max(self.downloadWorkers, 1),
+			                        thread_name_prefix='s3-collector-download') as downloader, \
+					ThreadPoolExecutor(max_workers=max(self.processWorkers, 1),
+					                   thread_name_prefix='s3-collector-process') as processor:
+				while True:
+					if self.drain(downloader, processor) == 0:
+						sleep(5)
 		except Exception as e:
 			logger.error(e, exc_info=True, stack_info=True)
 			sleep(300)
 			self.create_connector()
 	
-	def consume(self, object_: ObjectContent) -> str:
-		object_key = self.get_identifier(self.consume_prefix, object_.key)
-		if self.validate_key_pattern(object_key):
-			dependency = self.get_dependency(object_key)
-			if self.check_dependency_finished(dependency):
-				distributed_lock = get_unique_key_distributed_lock(self.get_resource_lock(object_.key),
-				                                                   self.lock_service)
-				try:
-					if not self.ask_lock(distributed_lock):
-						return STATUS.CREATE_TASK_FAILED
-					else:
-						payload = self.get_payload(object_.key)
-						if payload:
-							try:
-								trigger_data = PipelineTriggerData(code=self.get_code(object_key), data=payload,
-								                                   tenantId=self.tenant_id)
-								topic_trigger = self.save_data(trigger_data)
-								self.trigger_pipeline(trigger_data, topic_trigger)
-								self.simpleStorageService.delete_object(object_.key)
-								return STATUS.COMPLETED_TASK
-							except Exception as e:
-								logger.error(e, exc_info=True, stack_info=True)
-								self.move_to_dead_queue(object_.key, payload)
-								return STATUS.PROCESS_TASK_FAILED
-						else:
-							self.move_to_dead_queue(object_.key, payload)
-							return STATUS.EMPTY_PAYLOAD
-				finally:
-					self.ask_unlock(distributed_lock)
-			else:
-				return STATUS.DEPENDENCY_FAILED
+	def drain(self, downloader: ThreadPoolExecutor, processor: ThreadPoolExecutor) -> int:
+		"""
+		list objects page by page by continuation token, until last page. returns count of consumed objects
+		"""
+		consumed = 0
+		continuation_token: Optional[str] = None
+		while True:
+			objects, continuation_token = self.simpleStorageService.list_objects_page(
+				max_keys=self.maxKeys, prefix=self.consume_prefix, continuation_token=continuation_token)
+			logger.info("objects size {}".format(len(objects)))
+			consumed = consumed + self.consume_page(objects, downloader, processor)
+			if continuation_token is None:
+				return consumed
+	
+	def consume_page(
+			self, objects: List[ObjectContent], downloader: ThreadPoolExecutor, processor: ThreadPoolExecutor) -> int:
+		"""
+		1. plan objects into groups, objects of same model and object id are in one group and processed in order,
+		2. lock all planned objects in one insertion,
+		3. download payloads ahead, by download workers,
+		4. process groups in parallel, by process workers,
+		5. delete consumed objects in batch, and release locks.
+		returns count of consumed objects
+		"""
+		tasks = ArrayHelper(objects) \
+			.map(lambda x: CollectTask(x.key, self.get_identifier(self.consume_prefix, x.key))) \
+			.to_list()
+		groups = self.plan(ArrayHelper(tasks).filter(lambda x: self.validate_key_pattern(x.identifier)).to_list())
+		# invalid keys are moved to dead queue, each of them is a group
+		groups.extend(ArrayHelper(tasks)
+		              .filter(lambda x: not self.validate_key_pattern(x.identifier))
+		              .map(lambda x: [x]).to_list())
+		groups = self.lock(groups)
+		locked_tasks = ArrayHelper(groups).flatten().to_list()
+		if len(locked_tasks) == 0:
+			return 0
+		
+		consumed_tasks: List[CollectTask] = []
+		try:
+			# prefetch
+			ArrayHelper(locked_tasks).each(lambda x: self.prefetch(x, downloader))
+			futures = ArrayHelper(groups).map(lambda x: processor.submit(self.consume_group, x)).to_list()
+			consumed_tasks = ArrayHelper(futures).map(lambda x: x.result()).flatten().to_list()
+			failed_keys = self.simpleStorageService.delete_objects(
+				ArrayHelper(consumed_tasks).map(lambda x: x.key).to_list())
+			if len(failed_keys) != 0:
+				logger.error(f'Delete consumed objects failed, keys are {failed_keys}.')
+		finally:
+			self.release(locked_tasks, consumed_tasks)
+		return len(consumed_tasks)
+	
+	def plan(self, tasks: List[CollectTask]) -> List[List[CollectTask]]:
+		"""
+		group tasks by model name and object id, in order of keys.
+		rest of group is skipped when its dependency is in progress, or will be collected in this page
+		"""
+		dependencies = ArrayHelper(tasks).map(lambda x: self.get_dependency(x.identifier)).to_list()
+		in_progress = self.find_in_progress(dependencies)
+		identities = ArrayHelper(tasks).map(lambda x: self.get_identity(x.identifier)).to_list()
+		planned_identities = set(identities)
+		groups: Dict[Tuple[str, str], List[CollectTask]] = {}
+		blocked: Set[Tuple[str, str]] = set()
+		for task, identity, dependency in zip(tasks, identities, dependencies):
+			if identity in blocked:
+				continue
+			if dependency is not None:
+				depend_on = (dependency.model_name, dependency.object_id)
+				if depend_on in in_progress or (depend_on != identity and depend_on in planned_identities):
+					blocked.add(identity)
+					continue
+			groups.setdefault(identity, []).append(task)
+		return list(groups.values())
+	
+	def find_in_progress(self, dependencies: List[Optional[Dependency]]) -> Set[Tuple[str, str]]:
+		"""
+		find dependencies in progress in one query
+		"""
+		object_ids = ArrayHelper(dependencies) \
+			.filter(lambda x: x is not None).map(lambda x: x.object_id).distinct().to_list()
+		return set(ArrayHelper(self.lock_service.find_in_progress_by_object_ids(object_ids))
+		           .map(lambda x: (x.modelName, x.objectId)).to_list())
+	
+	def lock(self, groups: List[List[CollectTask]]) -> List[List[CollectTask]]:
+		"""
+		lock all tasks in one insertion, returns groups of locked tasks.
+		group is cut at first task locked by others, locks of tasks after it are released
+		"""
+		tasks = ArrayHelper(groups).flatten().to_list()
+		ArrayHelper(tasks).each(lambda x: self.assign_lock(x))
+		acquired = set(ArrayHelper(try_lock_all_nowait(ArrayHelper(tasks).map(lambda x: x.lock).to_list(),
+		                                               self.lock_service)).map(lambda x: x.resourceId).to_list())
+		locked_groups: List[List[CollectTask]] = []
+		for group in groups:
+			locked: List[CollectTask] = []
+			for task in group:
+				if task.key not in acquired:
+					break
+				locked.append(task)
+			ArrayHelper(group[len(locked):]).filter(lambda x: x.key in acquired).each(self.remove_lock)
+			if len(locked) != 0:
+				locked_groups.append(locked)
+		return locked_groups
+	
+	def assign_lock(self, task: CollectTask) -> None:
+		if self.validate_key_pattern(task.identifier):
+			task.lock = self.get_resource_lock(task.key)
 		else:
-			distributed_lock = get_unique_key_distributed_lock(self.get_resource_lock(object_.key),
-			                                                   self.lock_service)
-			try:
-				if not self.ask_lock(distributed_lock):
-					return STATUS.CREATE_TASK_FAILED
-				else:
-					payload = self.simpleStorageService.get_object(object_.key)
-					self.move_to_dead_queue(object_.key, payload)
-					return STATUS.CHECK_KEY_FAILED
-			finally:
-				self.ask_unlock(distributed_lock)
+			task.lock = OSSCollectorCompetitiveLock(lockId=self.snowflakeGenerator.next_id(),
+			                                        resourceId=task.key,
+			                                        modelName='',
+			                                        objectId=task.identifier,
+			                                        tenantId=self.tenant_id,
+			                                        status=0)
 	
-	def get_payload(self, key: str) -> Dict:
-		return self.simpleStorageService.get_object(key)
+	def remove_lock(self, task: CollectTask) -> None:
+		"""
+		remove lock of task which is not consumed, it can be collected again
+		"""
+		self.lock_service.delete_by_id(task.lock.lockId)
 	
-	def ask_lock(self, lock: DistributedLock) -> bool:
-		return lock.try_lock_nowait()
+	def release(self, locked_tasks: List[CollectTask], consumed_tasks: List[CollectTask]) -> None:
+		consumed_keys = set(ArrayHelper(consumed_tasks).map(lambda x: x.key).to_list())
+		self.lock_service.update_status(ArrayHelper(consumed_tasks).map(lambda x: x.lock.lockId).to_list(), 1)
+		ArrayHelper(locked_tasks).filter(lambda x: x.key not in consumed_keys).each(self.remove_lock)
 	
-	def ask_unlock(self, lock: DistributedLock) -> bool:
-		return lock.unlock()
+	def prefetch(self, task: CollectTask, downloader: ThreadPoolExecutor) -> None:
+		task.payload = downloader.submit(self.get_payload, task.key)
 	
-	def process(self, key: str, code: str, payload: Dict[str, Any] = None):
-		logger.info("start to process %s and %s", code, key)
-		trigger_data = PipelineTriggerData(code=code, data=payload, tenantId=self.tenant_id)
-		result = save_topic_data(trigger_data)
-		asyncio.run(handle_trigger_data(trigger_data, result))
+	def consume_group(self, group: List[CollectTask]) -> List[CollectTask]:
+		"""
+		consume tasks in order, stop at first one failed. returns consumed tasks
+		"""
+		consumed: List[CollectTask] = []
+		for task in group:
+			if not self.consume(task):
+				break
+			consumed.append(task)
+		return consumed
+	
+	def consume(self, task: CollectTask) -> bool:
+		"""
+		returns true when object is processed, or moved to dead queue
+		"""
+		try:
+			payload = task.payload.result()
+			if not self.validate_key_pattern(task.identifier) or not payload:
+				self.put_to_dead_queue(task.key, payload)
+				return True
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+			return False
+		try:
+			trigger_data = PipelineTriggerData(code=self.get_code(task.identifier), data=payload,
+			                                   tenantId=self.tenant_id)
+			topic_trigger = self.save_data(trigger_data)
+			self.trigger_pipeline(trigger_data, topic_trigger)
+			return True
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+			try:
+				self.put_to_dead_queue(task.key, payload)
+				return True
+			except Exception as err:
+				logger.error(err, exc_info=True, stack_info=True)
+				return False
+	
+	def get_payload(self, key: str) -> Dict:
+		return self.simpleStorageService.get_object(key)
 	
 	def save_data(self, trigger_data: PipelineTriggerData) -> TopicTrigger:
 		return save_topic_data(trigger_data)
@@ -174,15 +279,9 @@ class S3Connector:
 		else:
 			return None
 	
-	def check_dependency_finished(self, dependency: Optional[Dependency]) -> bool:
-		if dependency:
-			result = self.lock_service.find_by_dependency(dependency.model_name, dependency.object_id)
-			if result == 0:
-				return True
-			else:
-				return False
-		else:
-			return True
+	def get_identity(self, identifier: str) -> Tuple[str, str]:
+		key_parts = identifier.split(identifier_delimiter)
+		return key_parts[1], key_parts[2]
 	
 	def get_code(self, identifier: str) -> str:
 		key_parts = identifier.split(identifier_delimiter)
@@ -197,10 +296,12 @@ class S3Connector:
 		else:
 			return False
 	
-	def move_to_dead_queue(self, key: str, payload: Optional[Dict]):
+	def put_to_dead_queue(self, key: str, payload: Optional[Dict]):
+		"""
+		put payload to dead queue, original object is not deleted
+		"""
 		dead_queue_key = self.generate_dead_file_key(key)
 		self.simpleStorageService.put_object(dead_queue_key, payload)
-		self.simpleStorageService.delete_object(key)
 	
 	def generate_dead_file_key(self, key_: str):
 		return self.dead_prefix + self.get_identifier(self.consume_prefix, key_)
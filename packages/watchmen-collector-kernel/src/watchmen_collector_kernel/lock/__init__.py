@@ -1,3 +1,3 @@
 from .distributed_lock import DistributedLock
 from .oss_collector_lock_service import get_oss_collector_lock_service
-from .unique_key_distributed_lock import get_unique_key_distributed_lock
+from .unique_key_distributed_lock import get_unique_key_distributed_lock, try_lock_all_nowait
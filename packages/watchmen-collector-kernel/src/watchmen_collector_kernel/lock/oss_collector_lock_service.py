@@ -5,7 +5,8 @@ from watchmen_meta.common import EntityService, ask_meta_storage
 from watchmen_meta.common.storage_service import StorableId
 from watchmen_model.common import Storable, OssCollectorCompetitiveLockId
 from watchmen_storage import EntityShaper, EntityRow, EntityName, TransactionalStorageSPI, \
-	EntityHelper, EntityIdHelper, EntityFinder, ColumnNameLiteral, EntityCriteriaExpression, Entity
+	EntityHelper, EntityIdHelper, EntityFinder, ColumnNameLiteral, EntityCriteriaExpression, Entity, \
+	EntityCriteriaOperator, EntityUpdater
 from watchmen_collector_kernel.model import OSSCollectorCompetitiveLock
 
 
@@ -69,6 +70,18 @@ class OssCollectorLockService(EntityService):
 		finally:
 			self.storage.close()
 	
+	def insert_all(self, locks: List[OSSCollectorCompetitiveLock]):
+		"""
+		insert all in one transaction, none of them inserted when any conflicts
+		"""
+		self.storage.begin()
+		try:
+			self.storage.insert_all(locks, self.get_entity_helper())
+			self.storage.commit_and_close()
+		except Exception as e:
+			self.storage.rollback_and_close()
+			raise e
+
 	def delete_by_id(self, id_: OssCollectorCompetitiveLockId):
 		try:
 			self.storage.connect()
@@ -91,15 +104,39 @@ class OssCollectorLockService(EntityService):
 		finally:
 			self.storage.close()
 	
-	def find_by_dependency(self, model_name: str, object_id: str) -> int:
+	def update_status(self, lock_ids: List[OssCollectorCompetitiveLockId], status: int) -> int:
+		if len(lock_ids) == 0:
+			return 0
+		try:
+			self.storage.connect()
+			return self.storage.update(EntityUpdater(
+				name=self.get_entity_name(),
+				shaper=self.get_entity_shaper(),
+				criteria=[
+					EntityCriteriaExpression(
+						left=ColumnNameLiteral(columnName='lock_id'), operator=EntityCriteriaOperator.IN,
+						right=lock_ids)
+				],
+				update={'status': status}
+			))
+		finally:
+			self.storage.close()
+
+	def find_in_progress_by_object_ids(self, object_ids: List[str]) -> List[OSSCollectorCompetitiveLock]:
+		"""
+		find locks in progress of given object ids in one query, model name should be checked by caller
+		"""
+		if len(object_ids) == 0:
+			return []
 		try:
 			self.storage.connect()
-			return self.storage.count(EntityFinder(
+			return self.storage.find(EntityFinder(
 				name=self.get_entity_name(),
 				shaper=self.get_entity_shaper(),
 				criteria=[
-					EntityCriteriaExpression(left=ColumnNameLiteral(columnName='model_name'), right=model_name),
-					EntityCriteriaExpression(left=ColumnNameLiteral(columnName='object_id'), right=object_id),
+					EntityCriteriaExpression(
+						left=ColumnNameLiteral(columnName='object_id'), operator=EntityCriteriaOperator.IN,
+						right=object_ids),
 					EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right=0)
 				]
 			))
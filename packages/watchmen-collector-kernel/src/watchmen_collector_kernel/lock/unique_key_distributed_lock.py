@@ -1,3 +1,5 @@
+from typing import List
+
 from sqlalchemy.exc import IntegrityError
 
 from .distributed_lock import DistributedLock
@@ -37,3 +39,19 @@ class UniqueKeyDistributedLock(DistributedLock):
 def get_unique_key_distributed_lock(lock: OSSCollectorCompetitiveLock,
                                     lock_service: OssCollectorLockService) -> UniqueKeyDistributedLock:
 	return UniqueKeyDistributedLock(lock=lock, lock_service=lock_service)
+
+
+def try_lock_all_nowait(
+		locks: List[OSSCollectorCompetitiveLock], lock_service: OssCollectorLockService
+) -> List[OSSCollectorCompetitiveLock]:
+	"""
+	try to lock all in one insertion, when any of them is locked by others, try to lock them one by one.
+	returns acquired locks
+	"""
+	if len(locks) == 0:
+		return []
+	try:
+		lock_service.insert_all(locks)
+		return locks
+	except IntegrityError:
+		return [lock for lock in locks if UniqueKeyDistributedLock(lock, lock_service).try_lock_nowait()]
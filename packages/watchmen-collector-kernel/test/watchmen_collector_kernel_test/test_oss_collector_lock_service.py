@@ -0,0 +1,162 @@
+from typing import Any, List, Optional, Set, Tuple
+from unittest import TestCase
+
+from sqlalchemy.exc import IntegrityError
+
+from watchmen_collector_kernel.lock import try_lock_all_nowait
+from watchmen_collector_kernel.lock.oss_collector_lock_service import OSS_COLLECTOR_COMPETITIVE_LOCK_TABLE, \
+	OssCollectorLockService
+from watchmen_collector_kernel.model import OSSCollectorCompetitiveLock
+from watchmen_storage import EntityCriteriaOperator
+
+
+def create_lock(lock_id: int, resource_id: str) -> OSSCollectorCompetitiveLock:
+	return OSSCollectorCompetitiveLock(
+		lockId=lock_id, resourceId=resource_id, modelName='order', objectId=resource_id, tenantId='1', status=0)
+
+
+def duplicated() -> IntegrityError:
+	return IntegrityError('insert', {}, Exception('Duplicated resource id.'))
+
+
+class FakeStorage:
+	def __init__(self, fail: bool = False):
+		self.fail = fail
+		self.calls: List[str] = []
+		self.inserted: List[Any] = []
+		self.updater = None
+		self.finder = None
+
+	def connect(self):
+		self.calls.append('connect')
+
+	def close(self):
+		self.calls.append('close')
+
+	def begin(self):
+		self.calls.append('begin')
+
+	def commit_and_close(self):
+		self.calls.append('commit')
+
+	def rollback_and_close(self):
+		self.calls.append('rollback')
+
+	# noinspection PyUnusedLocal
+	def insert_all(self, entities: List[Any], helper):
+		if self.fail:
+			raise duplicated()
+		self.calls.append('insert_all')
+		self.inserted.extend(entities)
+
+	def update(self, updater) -> int:
+		self.calls.append('update')
+		self.updater = updater
+		return 2
+
+	def find(self, finder) -> List[Any]:
+		self.calls.append('find')
+		self.finder = finder
+		return [create_lock(1, 'a')]
+
+
+class FakeLockService:
+	"""
+	resource ids in taken are locked by others
+	"""
+
+	def __init__(self, taken: Optional[Set[str]] = None):
+		self.taken = taken or set()
+		self.calls: List[Tuple[str, List[str]]] = []
+
+	def insert_all(self, locks: List[OSSCollectorCompetitiveLock]):
+		self.calls.append(('insert_all', [lock.resourceId for lock in locks]))
+		if any(lock.resourceId in self.taken for lock in locks):
+			raise duplicated()
+
+	def insert_one(self, lock: OSSCollectorCompetitiveLock):
+		self.calls.append(('insert_one', [lock.resourceId]))
+		if lock.resourceId in self.taken:
+			raise duplicated()
+
+
+class OssCollectorLockServiceTest(TestCase):
+	def test_insert_all(self):
+		storage = FakeStorage()
+		locks = [create_lock(1, 'a'), create_lock(2, 'b')]
+		# noinspection PyTypeChecker
+		OssCollectorLockService(storage).insert_all(locks)
+		self.assertEqual(storage.calls, ['begin', 'insert_all', 'commit'])
+		self.assertEqual(storage.inserted, locks)
+
+	def test_insert_all_rollback_when_conflict(self):
+		storage = FakeStorage(fail=True)
+		# noinspection PyTypeChecker
+		service = OssCollectorLockService(storage)
+		with self.assertRaises(IntegrityError):
+			service.insert_all([create_lock(1, 'a'), create_lock(2, 'b')])
+		self.assertEqual(storage.calls, ['begin', 'rollback'])
+
+	def test_update_status(self):
+		storage = FakeStorage()
+		# noinspection PyTypeChecker
+		self.assertEqual(OssCollectorLockService(storage).update_status([1, 2], 1), 2)
+		self.assertEqual(storage.calls, ['connect', 'update', 'close'])
+		self.assertEqual(storage.updater.name, OSS_COLLECTOR_COMPETITIVE_LOCK_TABLE)
+		self.assertEqual(storage.updater.update, {'status': 1})
+		self.assertEqual(len(storage.updater.criteria), 1)
+		criteria = storage.updater.criteria[0]
+		self.assertEqual(criteria.left.columnName, 'lock_id')
+		self.assertEqual(criteria.operator, EntityCriteriaOperator.IN)
+		self.assertEqual(criteria.right, [1, 2])
+
+	def test_update_status_of_nothing(self):
+		storage = FakeStorage()
+		# noinspection PyTypeChecker
+		self.assertEqual(OssCollectorLockService(storage).update_status([], 1), 0)
+		self.assertEqual(storage.calls, [])
+
+	def test_find_in_progress_by_object_ids(self):
+		storage = FakeStorage()
+		# noinspection PyTypeChecker
+		locks = OssCollectorLockService(storage).find_in_progress_by_object_ids(['a', 'b'])
+		self.assertEqual([lock.resourceId for lock in locks], ['a'])
+		self.assertEqual(storage.calls, ['connect', 'find', 'close'])
+		object_id_criteria, status_criteria = storage.finder.criteria
+		self.assertEqual(object_id_criteria.left.columnName, 'object_id')
+		self.assertEqual(object_id_criteria.operator, EntityCriteriaOperator.IN)
+		self.assertEqual(object_id_criteria.right, ['a', 'b'])
+		self.assertEqual(status_criteria.left.columnName, 'status')
+		self.assertEqual(status_criteria.right, 0)
+
+	def test_find_in_progress_by_no_object_ids(self):
+		storage = FakeStorage()
+		# noinspection PyTypeChecker
+		self.assertEqual(OssCollectorLockService(storage).find_in_progress_by_object_ids([]), [])
+		self.assertEqual(storage.calls, [])
+
+
+class TryLockAllNowaitTest(TestCase):
+	def test_nothing_to_lock(self):
+		lock_service = FakeLockService()
+		# noinspection PyTypeChecker
+		self.assertEqual(try_lock_all_nowait([], lock_service), [])
+		self.assertEqual(lock_service.calls, [])
+
+	def test_lock_all_in_one_insertion(self):
+		lock_service = FakeLockService()
+		locks = [create_lock(1, 'a'), create_lock(2, 'b'), create_lock(3, 'c')]
+		# noinspection PyTypeChecker
+		self.assertEqual(try_lock_all_nowait(locks, lock_service), locks)
+		self.assertEqual(lock_service.calls, [('insert_all', ['a', 'b', 'c'])])
+
+	def test_lock_one_by_one_when_conflict(self):
+		lock_service = FakeLockService(taken={'b'})
+		locks = [create_lock(1, 'a'), create_lock(2, 'b'), create_lock(3, 'c')]
+		# noinspection PyTypeChecker
+		acquired = try_lock_all_nowait(locks, lock_service)
+		self.assertEqual([lock.resourceId for lock in acquired], ['a', 'c'])
+		self.assertEqual(lock_service.calls, [
+			('insert_all', ['a', 'b', 'c']),
+			('insert_one', ['a']), ('insert_one', ['b']), ('insert_one', ['c'])
+		])
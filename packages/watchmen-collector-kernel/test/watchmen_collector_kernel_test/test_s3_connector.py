@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy.exc import IntegrityError
+
+from watchmen_collector_kernel.common import S3CollectorSettings
+from watchmen_collector_kernel.connector.s3_connector import S3Connector
+from watchmen_collector_kernel.model import OSSCollectorCompetitiveLock
+from watchmen_model.pipeline_kernel import PipelineTriggerData
+from watchmen_storage import immutable_worker_id, SnowflakeGenerator
+from watchmen_storage_s3 import ObjectContent
+
+
+def create_object(key: str) -> ObjectContent:
+	return ObjectContent(key=key, lastModified=datetime.now(), eTag='', size=0, storageClass='STANDARD')
+
+
+class FakeSimpleStorageService:
+	"""
+	objects are listed in pages, each page is returned with token of next page
+	"""
+
+	def __init__(self, pages: Dict[Optional[str], Tuple[List[str], Optional[str]]]):
+		self.pages = pages
+		self.tokens: List[Optional[str]] = []
+		self.deleted: List[str] = []
+		self.dead: List[str] = []
+
+	# noinspection PyUnusedLocal
+	def list_objects_page(
+			self, max_keys: int, prefix: str,
+			continuation_token: Optional[str]) -> Tuple[List[ObjectContent], Optional[str]]:
+		self.tokens.append(continuation_token)
+		keys, next_token = self.pages[continuation_token]
+		return [create_object(key) for key in keys], next_token
+
+	def get_object(self, key: str) -> Dict:
+		return {'key': key}
+
+	def put_object(self, key: str, data: Dict) -> None:
+		self.dead.append(key)
+
+	def delete_objects(self, keys: List[str]) -> List[str]:
+		self.deleted.extend(keys)
+		return []
+
+
+class FakeLockService:
+	"""
+	resource ids in taken are locked by others
+	"""
+
+	def __init__(self, taken: Optional[Set[str]] = None):
+		self.taken = taken or set()
+		self.locked: List[OSSCollectorCompetitiveLock] = []
+		self.removed: List[int] = []
+		self.finished: List[int] = []
+
+	# noinspection PyUnusedLocal
+	def find_in_progress_by_object_ids(self, object_ids: List[str]) -> List[OSSCollectorCompetitiveLock]:
+		return []
+
+	def insert_all(self, locks: List[OSSCollectorCompetitiveLock]):
+		if any(lock.resourceId in self.taken for lock in locks):
+			raise IntegrityError('insert', {}, Exception('Duplicated resource id.'))
+		self.locked.extend(locks)
+
+	def insert_one(self, lock: OSSCollectorCompetitiveLock):
+		self.insert_all([lock])
+
+	def delete_by_id(self, lock_id: int):
+		self.removed.append(lock_id)
+
+	def update_status(self, lock_ids: List[int], status: int) -> int:
+		if status == 1:
+			self.finished.extend(lock_ids)
+		return len(lock_ids)
+
+
+class FakeS3Connector(S3Connector):
+	"""
+	collected data are recorded, instead of saving and triggering pipelines
+	"""
+
+	def __init__(self, settings: S3CollectorSettings):
+		super().__init__(settings)
+		self.collected: List[str] = []
+
+	# noinspection PyTypeChecker
+	def save_data(self, trigger_data: PipelineTriggerData):
+		self.collected.append(trigger_data.data['key'])
+		return None
+
+	def trigger_pipeline(self, trigger_data: PipelineTriggerData, topic_trigger):
+		pass
+
+
+def create_connector(
+		simple_storage_service: FakeSimpleStorageService, lock_service: FakeLockService) -> FakeS3Connector:
+	settings = S3CollectorSettings(
+		access_key_id='', secret_access_key='', bucket_name='', region='', token='', tenant_id=1,
+		consume_prefix='in/', dead_prefix='dead/', max_keys=2)
+	with patch('watchmen_collector_kernel.connector.s3_connector.SimpleStorageService',
+	           return_value=simple_storage_service), \
+			patch('watchmen_collector_kernel.connector.s3_connector.get_oss_collector_lock_service',
+			      return_value=lock_service), \
+			patch('watchmen_collector_kernel.connector.s3_connector.ask_snowflake_generator',
+			      return_value=SnowflakeGenerator(0, immutable_worker_id(1))):
+		return FakeS3Connector(settings)
+
+
+class S3ConnectorTest(TestCase):
+	def drain(self, connector: S3Connector) -> int:
+		with ThreadPoolExecutor(max_workers=2) as downloader, ThreadPoolExecutor(max_workers=2) as processor:
+			return connector.drain(downloader, processor)
+
+	def test_drain_all_pages(self):
+		simple_storage_service = FakeSimpleStorageService({
+			None: (['in/1~order~1', 'in/2~order~2'], 't1'),
+			't1': (['in/3~order~1', 'in/bad'], 't2'),
+			't2': ([], None)
+		})
+		lock_service = FakeLockService()
+		connector = create_connector(simple_storage_service, lock_service)
+
+		self.assertEqual(self.drain(connector), 4)
+		self.assertEqual(simple_storage_service.tokens, [None, 't1', 't2'])
+		self.assertEqual(sorted(connector.collected), ['in/1~order~1', 'in/2~order~2', 'in/3~order~1'])
+		self.assertEqual(simple_storage_service.dead, ['dead/bad'])
+		self.assertEqual(
+			sorted(simple_storage_service.deleted), ['in/1~order~1', 'in/2~order~2', 'in/3~order~1', 'in/bad'])
+		self.assertEqual(
+			sorted(lock_service.finished), sorted([lock.lockId for lock in lock_service.locked]))
+		self.assertEqual(lock_service.removed, [])
+
+	def test_group_cut_at_locked_by_others(self):
+		simple_storage_service = FakeSimpleStorageService({
+			None: (['in/1~order~1', 'in/2~order~1', 'in/3~order~1', 'in/4~order~2'], None)
+		})
+		lock_service = FakeLockService(taken={'in/2~order~1'})
+		connector = create_connector(simple_storage_service, lock_service)
+
+		self.assertEqual(self.drain(connector), 2)
+		self.assertEqual(sorted(connector.collected), ['in/1~order~1', 'in/4~order~2'])
+		self.assertEqual(sorted(simple_storage_service.deleted), ['in/1~order~1', 'in/4~order~2'])
+		# lock of 3rd object is acquired one by one, removed since its group is cut at 2nd
+		lock_of_3rd = [lock.lockId for lock in lock_service.locked if lock.resourceId == 'in/3~order~1']
+		self.assertEqual(lock_service.removed, lock_of_3rd)
+		self.assertEqual(len(lock_service.finished), 2)
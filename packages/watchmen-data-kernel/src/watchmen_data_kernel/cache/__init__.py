@@ -1,4 +1,8 @@
 from .cache_manager import configure_cache, find_cache
-from .cache_service import CacheService
+from .cache_invalidation_bus import ask_cache_invalidation_bus_instance, broadcast_cache_invalidation, \
+	CacheInvalidation, CacheInvalidationBus, CacheInvalidationKind, defer_cache_invalidation, \
+	InMemoryCacheInvalidationBus, MetaStorageCacheInvalidationBus, use_cache_invalidation_bus
+from .cache_preloader import cache_preloader, CachePreloader, preload_caches
+from .cache_service import apply_cache_invalidation, CacheService
 from .internal_cache import InternalCache
 from .pipeline_cache import PipelineCacheListener
@@ -0,0 +1,280 @@
+from abc import ABC, abstractmethod
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from enum import Enum
+from logging import getLogger
+from threading import RLock
+from typing import Callable, Dict, List, Optional
+
+from watchmen_data_kernel.common import ask_cache_invalidation_bus, ask_cache_invalidation_retention, \
+	DataKernelException
+from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
+from watchmen_model.common import DataModel
+from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityCriteriaOperator, EntityDeleter, \
+	EntityFinder, EntityHelper, EntityRow, EntityShaper, EntitySortColumn, EntitySortMethod
+from watchmen_utilities import ArrayHelper, get_current_time_in_seconds, is_blank
+
+logger = getLogger(__name__)
+
+
+class CacheInvalidationKind(str, Enum):
+	TOPIC = 'topic',
+	PIPELINE = 'pipeline',
+	DATA_SOURCE = 'data-source'
+
+
+class CacheInvalidation(DataModel):
+	invalidationId: Optional[str] = None
+	kind: CacheInvalidationKind = None
+	entityId: str = None
+	# version of changed entity, entities cached with lower version are stale
+	version: Optional[int] = None
+	# last modified time of changed entity, for changes which do not increase version, such as rename
+	lastModifiedAt: Optional[datetime] = None
+	removed: bool = False
+	createdAt: Optional[datetime] = None
+
+
+class CacheInvalidationBus(ABC):
+	@abstractmethod
+	def publish(self, invalidation: CacheInvalidation) -> None:
+		pass
+
+	@abstractmethod
+	def poll(self) -> List[CacheInvalidation]:
+		"""
+		returns invalidations published since last polling, including the ones published by myself
+		"""
+		pass
+
+
+class InMemoryCacheInvalidationBus(CacheInvalidationBus):
+	"""
+	buses on same channel work as nodes of cluster, for testing purpose
+	"""
+
+	def __init__(self, channel: Optional[List[CacheInvalidation]] = None):
+		self.channel = [] if channel is None else channel
+		self.offset = len(self.channel)
+		self.lock = RLock()
+
+	def publish(self, invalidation: CacheInvalidation) -> None:
+		if invalidation.createdAt is None:
+			invalidation.createdAt = get_current_time_in_seconds()
+		self.channel.append(invalidation)
+
+	def poll(self) -> List[CacheInvalidation]:
+		with self.lock:
+			end = len(self.channel)
+			invalidations = self.channel[self.offset:end]
+			self.offset = end
+			return invalidations
+
+
+class CacheInvalidationShaper(EntityShaper):
+	def serialize(self, invalidation: CacheInvalidation) -> EntityRow:
+		return {
+			'invalidation_id': invalidation.invalidationId,
+			'kind': invalidation.kind,
+			'entity_id': invalidation.entityId,
+			'version': invalidation.version,
+			'last_modified_at': invalidation.lastModifiedAt,
+			'removed': invalidation.removed,
+			'created_at': invalidation.createdAt
+		}
+
+	def deserialize(self, row: EntityRow) -> CacheInvalidation:
+		return CacheInvalidation(
+			invalidationId=row.get('invalidation_id'),
+			kind=row.get('kind'),
+			entityId=row.get('entity_id'),
+			version=row.get('version'),
+			lastModifiedAt=row.get('last_modified_at'),
+			removed=row.get('removed'),
+			createdAt=row.get('created_at')
+		)
+
+
+CACHE_INVALIDATION_ENTITY_NAME = 'cache_invalidations'
+CACHE_INVALIDATION_ENTITY_SHAPER = CacheInvalidationShaper()
+
+
+class MetaStorageCacheInvalidationBus(CacheInvalidationBus):
+	"""
+	invalidations are saved into meta storage, and polled by creation time.
+	invalidations created in lag seconds before last polling are fetched again,
+	since clocks of nodes are not exactly same and invalidation might be committed late.
+	duplicated invalidations are ignored by its id.
+	"""
+
+	def __init__(self, lag: int = 10, retention: Optional[int] = None, purge_interval: int = 3600):
+		self.lag = timedelta(seconds=lag)
+		self.retention = timedelta(seconds=ask_cache_invalidation_retention() if retention is None else retention)
+		self.purgeInterval = timedelta(seconds=purge_interval)
+		self.polledAt = get_current_time_in_seconds()
+		self.purgedAt = self.polledAt
+		# invalidation id to creation time, of invalidations received in lag
+		self.received: Dict[str, datetime] = {}
+
+	# noinspection PyMethodMayBeStatic
+	def get_entity_helper(self) -> EntityHelper:
+		return EntityHelper(name=CACHE_INVALIDATION_ENTITY_NAME, shaper=CACHE_INVALIDATION_ENTITY_SHAPER)
+
+	def publish(self, invalidation: CacheInvalidation) -> None:
+		invalidation.invalidationId = str(ask_snowflake_generator().next_id())
+		invalidation.createdAt = get_current_time_in_seconds()
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			storage.insert_one(invalidation, self.get_entity_helper())
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			raise e
+
+	def poll(self) -> List[CacheInvalidation]:
+		now = get_current_time_in_seconds()
+		since = self.polledAt - self.lag
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			# noinspection PyTypeChecker
+			invalidations: List[CacheInvalidation] = storage.find(EntityFinder(
+				name=CACHE_INVALIDATION_ENTITY_NAME,
+				shaper=CACHE_INVALIDATION_ENTITY_SHAPER,
+				criteria=[
+					EntityCriteriaExpression(
+						left=ColumnNameLiteral(columnName='created_at'),
+						operator=EntityCriteriaOperator.GREATER_THAN_OR_EQUALS, right=since)
+				],
+				sort=[EntitySortColumn(name='created_at', method=EntitySortMethod.ASC)]
+			))
+		finally:
+			storage.close()
+		self.polledAt = now
+
+		invalidations = ArrayHelper(invalidations) \
+			.filter(lambda x: x.invalidationId not in self.received).to_list()
+		ArrayHelper(invalidations).each(lambda x: self.received.__setitem__(x.invalidationId, x.createdAt))
+		# forget the ones which will not be fetched again
+		self.received = {key: value for key, value in self.received.items() if value >= since}
+		self.try_to_purge(now)
+		return invalidations
+
+	# noinspection PyBroadException
+	def try_to_purge(self, now: datetime) -> None:
+		"""
+		remove expired invalidations, every node does it in purge interval, it is idempotent
+		"""
+		if now - self.purgedAt < self.purgeInterval:
+			return
+		self.purgedAt = now
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			storage.delete(EntityDeleter(
+				name=CACHE_INVALIDATION_ENTITY_NAME,
+				shaper=CACHE_INVALIDATION_ENTITY_SHAPER,
+				criteria=[
+					EntityCriteriaExpression(
+						left=ColumnNameLiteral(columnName='created_at'),
+						operator=EntityCriteriaOperator.LESS_THAN, right=now - self.retention)
+				]
+			))
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			logger.error(e, exc_info=True, stack_info=True)
+
+
+class CacheInvalidationBusHolder:
+	initialized: bool = False
+	bus: Optional[CacheInvalidationBus] = None
+
+
+cache_invalidation_bus_holder = CacheInvalidationBusHolder()
+
+
+def build_cache_invalidation_bus() -> Optional[CacheInvalidationBus]:
+	bus_type = ask_cache_invalidation_bus()
+	if is_blank(bus_type):
+		return None
+	bus_type = bus_type.strip().lower()
+	if bus_type == 'meta':
+		return MetaStorageCacheInvalidationBus()
+	elif bus_type == 'memory':
+		return InMemoryCacheInvalidationBus()
+	else:
+		raise DataKernelException(f'Cache invalidation bus[{bus_type}] is not supported.')
+
+
+def ask_cache_invalidation_bus_instance() -> Optional[CacheInvalidationBus]:
+	"""
+	returns none when cache invalidation bus is not enabled
+	"""
+	if not cache_invalidation_bus_holder.initialized:
+		cache_invalidation_bus_holder.bus = build_cache_invalidation_bus()
+		cache_invalidation_bus_holder.initialized = True
+	return cache_invalidation_bus_holder.bus
+
+
+def use_cache_invalidation_bus(bus: Optional[CacheInvalidationBus]) -> None:
+	"""
+	replace the bus, given none to disable it
+	"""
+	cache_invalidation_bus_holder.bus = bus
+	cache_invalidation_bus_holder.initialized = True
+
+
+# invalidations broadcast in transaction, held until transaction committed
+deferred_cache_invalidations: ContextVar[Optional[List[CacheInvalidation]]] = \
+	ContextVar('deferred_cache_invalidations', default=None)
+
+
+def publish_cache_invalidation(invalidation: CacheInvalidation) -> None:
+	bus = ask_cache_invalidation_bus_instance()
+	if bus is None:
+		return
+	# noinspection PyBroadException
+	try:
+		bus.publish(invalidation)
+	except Exception as e:
+		logger.error(e, exc_info=True, stack_info=True)
+
+
+def defer_cache_invalidation() -> Callable[[bool], None]:
+	"""
+	hold invalidations broadcast in current context, until returned function is called.
+	held invalidations are published when it is called with true, discarded with false.
+	nested deferring joins the outer one, therefore invalidations are published by outermost only
+	"""
+	if deferred_cache_invalidations.get() is not None:
+		return lambda publish: None
+	token = deferred_cache_invalidations.set([])
+
+	def done(publish: bool) -> None:
+		invalidations = deferred_cache_invalidations.get()
+		deferred_cache_invalidations.reset(token)
+		if publish:
+			ArrayHelper(invalidations).each(publish_cache_invalidation)
+
+	return done
+
+
+def broadcast_cache_invalidation(
+		kind: CacheInvalidationKind, entity_id: str, version: Optional[int] = None,
+		last_modified_at: Optional[datetime] = None, removed: bool = False) -> None:
+	"""
+	broadcast entity changed to all nodes, do nothing when cache invalidation bus is not enabled.
+	failure is logged only, changed entity will be refreshed by cache heart beat anyway.
+	held until transaction committed when it is deferred
+	"""
+	if ask_cache_invalidation_bus_instance() is None:
+		return
+	invalidation = CacheInvalidation(
+		kind=kind, entityId=entity_id, version=version, lastModifiedAt=last_modified_at, removed=removed)
+	deferred = deferred_cache_invalidations.get()
+	if deferred is not None:
+		deferred.append(invalidation)
+	else:
+		publish_cache_invalidation(invalidation)
@@ -0,0 +1,176 @@
+from logging import getLogger
+from math import ceil
+from threading import RLock
+from typing import Dict, List, Optional, Tuple
+
+from watchmen_data_kernel.common import ask_cache_enabled, ask_cache_preload_tenants, ask_cache_size_factor
+from watchmen_data_kernel.storage import RawTopicDataEntityHelper, RegularTopicDataEntityHelper
+from watchmen_meta.admin import PipelineService, TopicService
+from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator, ask_super_admin
+from watchmen_meta.system import TenantService
+from watchmen_model.admin import is_raw_topic, Pipeline, Topic
+from watchmen_model.common import PipelineId, TenantId, TopicId
+from watchmen_utilities import ArrayHelper
+from .cache_invalidation_bus import CacheInvalidation, CacheInvalidationKind
+from .cache_manager import configure_cache, find_cache
+from .pipeline_by_topic_cache import pipeline_by_topic_cache
+from .pipeline_cache import pipeline_cache
+from .topic_cache import topic_cache
+
+logger = getLogger(__name__)
+
+# caches sized by count of topics
+TOPIC_CACHE_NAMES = [
+	'TOPIC_BY_ID', 'TOPIC_BY_TENANT_AND_NAME', 'TOPIC_SCHEMA_BY_ID', 'TOPIC_ENTITY_HELPER_BY_ID',
+	'PIPELINE_BY_TOPIC_ID'
+]
+# caches sized by count of pipelines
+PIPELINE_CACHE_NAMES = ['PIPELINE_BY_ID']
+
+
+class CachePreloader:
+	def __init__(self):
+		self.lock = RLock()
+		# tenant id to count of topics and pipelines
+		self.inventory: Dict[TenantId, Tuple[int, int]] = {}
+
+	def is_preloaded(self, tenant_id: Optional[TenantId]) -> bool:
+		return tenant_id is not None and tenant_id in self.inventory
+
+	# noinspection PyMethodMayBeStatic
+	def resize_cache(self, name: str, count: int) -> None:
+		"""
+		grow cache to fit given count, never shrink
+		"""
+		cache = find_cache(name)
+		size = int(ceil(count * ask_cache_size_factor()))
+		if size > cache.maxsize:
+			configure_cache(name, {'maxsize': size})
+			logger.info(f'Cache[{name}] resized to {size}.')
+
+	def resize_caches(self) -> None:
+		topic_count = ArrayHelper(list(self.inventory.values())).reduce(lambda x, y: x + y[0], 0)
+		pipeline_count = ArrayHelper(list(self.inventory.values())).reduce(lambda x, y: x + y[1], 0)
+		ArrayHelper(TOPIC_CACHE_NAMES).each(lambda x: self.resize_cache(x, topic_count))
+		ArrayHelper(PIPELINE_CACHE_NAMES).each(lambda x: self.resize_cache(x, pipeline_count))
+
+	# noinspection PyMethodMayBeStatic
+	def put_topic(self, topic: Topic) -> None:
+		topic_cache.put(topic)
+		schema = topic_cache.get_schema(topic.topicId)
+		if is_raw_topic(topic):
+			topic_cache.put_entity_helper(RawTopicDataEntityHelper(schema))
+		else:
+			topic_cache.put_entity_helper(RegularTopicDataEntityHelper(schema))
+
+	# noinspection PyMethodMayBeStatic
+	def index_pipelines_of_topic(self, topic_id: TopicId) -> None:
+		"""
+		all pipelines of preloaded tenant are cached, therefore index can be built from pipeline cache
+		"""
+		pipelines = ArrayHelper(pipeline_cache.all()).filter(lambda x: x.topicId == topic_id).to_list()
+		if len(pipelines) == 0:
+			pipeline_by_topic_cache.declare_no_pipelines(topic_id)
+		else:
+			ArrayHelper(pipelines).each(lambda x: pipeline_by_topic_cache.append_one(topic_id, x.pipelineId))
+
+	def preload(self, tenant_id: TenantId) -> None:
+		"""
+		load all topics and pipelines of given tenant in one transaction, and put them into cache
+		"""
+		if not ask_cache_enabled():
+			return
+
+		topic_service = TopicService(ask_meta_storage(), ask_snowflake_generator(), ask_super_admin())
+		pipeline_service = PipelineService(
+			topic_service.storage, topic_service.snowflakeGenerator, topic_service.principalService)
+		topic_service.begin_transaction()
+		try:
+			topics: List[Topic] = topic_service.find_all(tenant_id)
+			pipelines: List[Pipeline] = pipeline_service.find_all(tenant_id)
+		finally:
+			topic_service.close_transaction()
+
+		with self.lock:
+			self.inventory[tenant_id] = (len(topics), len(pipelines))
+			self.resize_caches()
+			ArrayHelper(topics).each(lambda x: self.put_topic(x))
+			ArrayHelper(pipelines).each(lambda x: pipeline_cache.put(x))
+			# put pipeline appends it into index, declare topics without pipelines
+			ArrayHelper(topics) \
+				.filter(lambda x: pipeline_by_topic_cache.get(x.topicId) is None) \
+				.each(lambda x: pipeline_by_topic_cache.declare_no_pipelines(x.topicId))
+		logger.info(f'{len(topics)} topic(s) and {len(pipelines)} pipeline(s) of tenant[id={tenant_id}] preloaded.')
+
+	# noinspection PyMethodMayBeStatic
+	def find_tenant_ids(self) -> List[TenantId]:
+		tenant_ids = ask_cache_preload_tenants()
+		if len(tenant_ids) != 0:
+			return tenant_ids
+
+		tenant_service = TenantService(ask_meta_storage(), ask_snowflake_generator(), ask_super_admin())
+		tenant_service.begin_transaction()
+		try:
+			return ArrayHelper(tenant_service.find_all()).map(lambda x: x.tenantId).to_list()
+		finally:
+			tenant_service.close_transaction()
+
+	# noinspection PyBroadException
+	def preload_all(self) -> None:
+		for tenant_id in self.find_tenant_ids():
+			try:
+				self.preload(tenant_id)
+			except Exception as e:
+				logger.error(f'Failed to preload cache of tenant[id={tenant_id}].')
+				logger.error(e, exc_info=True, stack_info=True)
+
+	def reload_topic(self, topic_id: TopicId) -> None:
+		topic_service = TopicService(ask_meta_storage(), ask_snowflake_generator(), ask_super_admin())
+		topic_service.begin_transaction()
+		try:
+			# noinspection PyTypeChecker
+			topic: Optional[Topic] = topic_service.find_by_id(topic_id)
+		finally:
+			topic_service.close_transaction()
+		if topic is not None and self.is_preloaded(topic.tenantId):
+			with self.lock:
+				self.put_topic(topic)
+				self.index_pipelines_of_topic(topic_id)
+
+	def reload_pipeline(self, pipeline_id: PipelineId) -> None:
+		pipeline_service = PipelineService(ask_meta_storage(), ask_snowflake_generator(), ask_super_admin())
+		pipeline_service.begin_transaction()
+		try:
+			# noinspection PyTypeChecker
+			pipeline: Optional[Pipeline] = pipeline_service.find_by_id(pipeline_id)
+		finally:
+			pipeline_service.close_transaction()
+		if pipeline is not None and self.is_preloaded(pipeline.tenantId):
+			with self.lock:
+				pipeline_cache.put(pipeline)
+
+	# noinspection PyBroadException
+	def on_invalidated(self, invalidation: CacheInvalidation) -> None:
+		"""
+		reload invalidated entity eagerly when it belongs to preloaded tenant.
+		failure is logged only, entity will be loaded on next visit anyway
+		"""
+		if len(self.inventory) == 0 or invalidation.removed:
+			return
+		try:
+			if invalidation.kind == CacheInvalidationKind.TOPIC:
+				self.reload_topic(invalidation.entityId)
+			elif invalidation.kind == CacheInvalidationKind.PIPELINE:
+				self.reload_pipeline(invalidation.entityId)
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+
+
+cache_preloader = CachePreloader()
+
+
+def preload_caches() -> None:
+	"""
+	preload caches of tenants declared in settings, or all tenants when not declared
+	"""
+	cache_preloader.preload_all()
@@ -1,15 +1,19 @@
 from logging import getLogger
 from threading import Thread
-from typing import Optional
+from typing import Optional, Union
 
 from time import sleep
 
-from watchmen_data_kernel.common import ask_cache_heart_beat_enabled, ask_cache_heart_beat_interval
+from watchmen_data_kernel.common import ask_cache_heart_beat_enabled, ask_cache_heart_beat_interval, \
+	ask_cache_invalidation_interval
 from watchmen_meta.admin import PipelineService, TopicService
 from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator, ask_super_admin
 from watchmen_meta.system import DataSourceService, ExternalWriterService, TenantService
 from watchmen_model.admin import Pipeline, Topic
 from watchmen_model.system import DataSource, ExternalWriter, Tenant
+from watchmen_utilities import ArrayHelper
+from .cache_invalidation_bus import ask_cache_invalidation_bus_instance, CacheInvalidation, CacheInvalidationKind
+from .cache_preloader import cache_preloader
 from .data_source_cache import data_source_cache, DataSourceCache
 from .external_writer_cache import external_writer_cache, ExternalWriterCache
 from .key_store_cache import key_store_cache, KeyStoreCache
@@ -157,5 +161,69 @@ def cache_heart_beat():
 		cache_heart_beat()
 
 
+def is_stale(cached: Union[Topic, Pipeline, DataSource], invalidation: CacheInvalidation) -> bool:
+	"""
+	same as heart beat, cached one is stale when version or last modified time of changed entity is greater.
+	some changes do not increase version, such as rename and enablement of pipeline
+	"""
+	if invalidation.removed or invalidation.version is None or cached.version is None:
+		return True
+	if cached.version != invalidation.version:
+		return cached.version < invalidation.version
+	if invalidation.lastModifiedAt is None or cached.lastModifiedAt is None:
+		# cannot tell, treat as stale
+		return True
+	return cached.lastModifiedAt < invalidation.lastModifiedAt
+
+
+def apply_cache_invalidation(invalidation: CacheInvalidation) -> None:
+	"""
+	evict cached entity only when it is stale, entity will be reloaded on next visit,
+	or reloaded immediately when it belongs to preloaded tenant
+	"""
+	entity_id = invalidation.entityId
+	if invalidation.kind == CacheInvalidationKind.TOPIC:
+		topic: Optional[Topic] = CacheService.topic().get(entity_id)
+		if topic is None or is_stale(topic, invalidation):
+			CacheService.topic().remove(entity_id)
+			cache_preloader.on_invalidated(invalidation)
+	elif invalidation.kind == CacheInvalidationKind.PIPELINE:
+		pipeline: Optional[Pipeline] = CacheService.pipeline().get(entity_id)
+		if pipeline is None:
+			# might be a new one
+			cache_preloader.on_invalidated(invalidation)
+		elif is_stale(pipeline, invalidation):
+			CacheService.pipeline().remove(entity_id)
+			cache_preloader.on_invalidated(invalidation)
+	elif invalidation.kind == CacheInvalidationKind.DATA_SOURCE:
+		data_source: Optional[DataSource] = CacheService.data_source().get(entity_id)
+		if data_source is None or is_stale(data_source, invalidation):
+			CacheService.data_source().remove(entity_id)
+
+
+# cache invalidation listener, polls invalidations from bus
+def cache_invalidation_listener():
+	logger = getLogger(__name__)
+	logger.info('Cache invalidation listener started.')
+	interval = ask_cache_invalidation_interval()
+	try:
+		while True:
+			sleep(interval)
+			# bus might be replaced or disabled
+			bus = ask_cache_invalidation_bus_instance()
+			if bus is not None:
+				ArrayHelper(bus.poll()).each(apply_cache_invalidation)
+	except Exception as e:
+		logger.error(e, exc_info=True, stack_info=True)
+	finally:
+		logger.warning('Cache invalidation listener stopped.')
+		# try to restart
+		logger.info('Try to restart cache invalidation listener.')
+		cache_invalidation_listener()
+
+
 if ask_cache_heart_beat_enabled():
 	Thread(target=cache_heart_beat, args=(), daemon=True).start()
+
+if ask_cache_invalidation_bus_instance() is not None:
+	Thread(target=cache_invalidation_listener, args=(), daemon=True).start()
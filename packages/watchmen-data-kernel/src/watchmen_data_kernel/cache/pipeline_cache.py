@@ -64,6 +64,7 @@ class PipelineCache:
 		existing: Optional[Pipeline] = self.byIdCache.remove(pipeline_id)
 		if existing is not None:
 			pipeline_by_topic_cache.remove_one(existing.topicId, existing.pipelineId)
+			self.fire_pipeline_removed(existing)
 		return existing
 
 	def all(self) -> List[Pipeline]:
@@ -1,5 +1,9 @@
 from .exception import DataKernelException
 from .settings import ask_all_date_formats, ask_cache_enabled, ask_cache_heart_beat_enabled, \
-	ask_cache_heart_beat_interval, ask_date_formats, ask_datetime_formats, ask_encrypt_aes_params, \
+	ask_cache_heart_beat_interval, ask_cache_invalidation_bus, ask_cache_invalidation_interval, \
+	ask_cache_invalidation_retention, ask_cache_preload_enabled, ask_cache_preload_tenants, ask_cache_size_factor, \
+	ask_date_formats, ask_datetime_formats, ask_encrypt_aes_params, \
 	ask_full_datetime_formats, ask_ignore_default_on_raw, ask_replace_topic_to_storage, ask_storage_echo_enabled, \
-	ask_sync_topic_to_storage, ask_time_formats, ask_topic_snapshot_scheduler_heart_beat_interval, ask_trino_enabled
+	ask_sync_topic_to_storage, ask_time_formats, ask_topic_snapshot_page_size, ask_topic_snapshot_resume_after, \
+	ask_topic_snapshot_scheduler_heart_beat_interval, ask_topic_snapshot_task_batch_size, \
+	ask_topic_snapshot_task_idle_timeout, ask_topic_snapshot_task_workers, ask_trino_enabled
@@ -1,5 +1,5 @@
 from logging import getLogger
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from pydantic import BaseSettings
 
@@ -26,6 +26,7 @@ class KernelSettings(BaseSettings):
 		'%H%M'  # 4 digits
 	]  # all digits, other characters are prohibitive
 	ABANDON_DATE_TIME_ON_PARSE_FAIL: bool = False
+	PARSE_EPOCH_DATE_TIME: bool = False  # parse number, or text of 10 or 13 digits as epoch seconds or milliseconds
 
 	ENCRYPT_AES_KEY: str = 'hWmZq4t7w9z$C&F)J@NcRfUjXn2r5u8x'  # AES key of factor encryption
 	ENCRYPT_AES_IV: str = 'J@NcRfUjXn2r5u8x'  # AES iv of factor encryption
@@ -35,8 +36,19 @@ class KernelSettings(BaseSettings):
 	KERNEL_CACHE: bool = True  # enable kernel cache, keep it enabled in production
 	KERNEL_CACHE_HEART_BEAT: bool = True  # enable kernel cache heart beat
 	KERNEL_CACHE_HEART_BEAT_INTERVAL: int = 60  # kernel cache heart beat interval, in seconds
+	KERNEL_CACHE_INVALIDATION_BUS: Optional[str] = None  # cache invalidation bus, meta or memory. disabled when not set
+	KERNEL_CACHE_INVALIDATION_INTERVAL: int = 5  # cache invalidation bus polling interval, in seconds
+	KERNEL_CACHE_INVALIDATION_RETENTION: int = 86400  # keep invalidations on meta storage, in seconds
+	KERNEL_CACHE_PRELOAD: bool = False  # preload topics and pipelines into kernel cache on boot
+	KERNEL_CACHE_PRELOAD_TENANTS: Optional[str] = None  # tenant ids joined by comma, preload all when blank
+	KERNEL_CACHE_SIZE_FACTOR: float = 1.5  # cache size against preloaded inventory
 
 	TOPIC_SNAPSHOT_SCHEDULER_HEART_BEAT_INTERVAL: int = 30  # topic snapshot scheduler heart beat interval, in seconds
+	TOPIC_SNAPSHOT_PAGE_SIZE: int = 1000  # rows copied from source topic to task topic in one page
+	TOPIC_SNAPSHOT_TASK_BATCH_SIZE: int = 100  # tasks claimed in one batch
+	TOPIC_SNAPSHOT_TASK_WORKERS: int = 4  # threads to run claimed tasks
+	TOPIC_SNAPSHOT_TASK_IDLE_TIMEOUT: int = 30  # wait for new tasks before job accomplished, in seconds
+	TOPIC_SNAPSHOT_RESUME_AFTER: int = 3600  # ready job can be resumed when its lock is older than, in seconds
 
 	SYNC_TOPIC_TO_STORAGE: bool = False  # sync topic change to storage entity
 	REPLACE_TOPIC_TO_STORAGE: bool = False  # force replace existing topic entity (drop and recreate)
@@ -90,6 +102,10 @@ def ask_abandon_date_time_on_parse_fail() -> bool:
 	return settings.ABANDON_DATE_TIME_ON_PARSE_FAIL
 
 
+def ask_parse_epoch_date_time() -> bool:
+	return settings.PARSE_EPOCH_DATE_TIME
+
+
 def ask_encrypt_aes_params() -> Tuple[str, str]:
 	"""
 	key, iv
@@ -114,10 +130,57 @@ def ask_cache_heart_beat_interval() -> int:
 	return settings.KERNEL_CACHE_HEART_BEAT_INTERVAL
 
 
+def ask_cache_invalidation_bus() -> Optional[str]:
+	return settings.KERNEL_CACHE_INVALIDATION_BUS
+
+
+def ask_cache_invalidation_interval() -> int:
+	return settings.KERNEL_CACHE_INVALIDATION_INTERVAL
+
+
+def ask_cache_invalidation_retention() -> int:
+	return settings.KERNEL_CACHE_INVALIDATION_RETENTION
+
+
+def ask_cache_preload_enabled() -> bool:
+	return settings.KERNEL_CACHE_PRELOAD
+
+
+def ask_cache_preload_tenants() -> List[str]:
+	tenant_ids = settings.KERNEL_CACHE_PRELOAD_TENANTS
+	if tenant_ids is None or len(tenant_ids.strip()) == 0:
+		return []
+	return ArrayHelper(tenant_ids.split(',')).map(lambda x: x.strip()).filter(lambda x: len(x) != 0).to_list()
+
+
+def ask_cache_size_factor() -> float:
+	return settings.KERNEL_CACHE_SIZE_FACTOR
+
+
 def ask_topic_snapshot_scheduler_heart_beat_interval() -> int:
 	return settings.TOPIC_SNAPSHOT_SCHEDULER_HEART_BEAT_INTERVAL
 
 
+def ask_topic_snapshot_page_size() -> int:
+	return settings.TOPIC_SNAPSHOT_PAGE_SIZE
+
+
+def ask_topic_snapshot_task_batch_size() -> int:
+	return settings.TOPIC_SNAPSHOT_TASK_BATCH_SIZE
+
+
+def ask_topic_snapshot_task_workers() -> int:
+	return settings.TOPIC_SNAPSHOT_TASK_WORKERS
+
+
+def ask_topic_snapshot_task_idle_timeout() -> int:
+	return settings.TOPIC_SNAPSHOT_TASK_IDLE_TIMEOUT
+
+
+def ask_topic_snapshot_resume_after() -> int:
+	return settings.TOPIC_SNAPSHOT_RESUME_AFTER
+
+
 def ask_sync_topic_to_storage() -> bool:
 	return settings.SYNC_TOPIC_TO_STORAGE
 
@@ -8,8 +8,8 @@ from watchmen_model.admin import Topic
 from watchmen_model.common import Pageable, TenantId
 from watchmen_model.pipeline_kernel import TopicDataColumnNames
 from watchmen_storage import ColumnNameLiteral, EntityColumnName, EntityCriteria, EntityCriteriaExpression, \
-	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityIdHelper, EntityPager, EntitySort, \
-	EntityStraightColumn, EntityStraightValuesFinder, EntityUpdate, EntityUpdater, SnowflakeGenerator
+	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityIdHelper, EntityLimitedFinder, \
+	EntityPager, EntitySort, EntityStraightColumn, EntityStraightValuesFinder, EntityUpdate, EntityUpdater, SnowflakeGenerator
 from .shaper import TopicShaper
 
 
@@ -82,6 +82,17 @@ class TopicDataEntityHelper:
 			pageable=pageable
 		)
 
+	def get_entity_limited_finder(
+			self, criteria: EntityCriteria, limit: int, sort: Optional[EntitySort] = None) -> EntityLimitedFinder:
+		entity_helper = self.get_entity_helper()
+		return EntityLimitedFinder(
+			name=entity_helper.name,
+			shaper=entity_helper.shaper,
+			criteria=criteria,
+			sort=sort,
+			limit=limit
+		)
+
 	def get_distinct_values_finder(
 			self,
 			criteria: Optional[EntityCriteria], column_names: List[EntityColumnName],
@@ -194,9 +205,12 @@ class TopicDataEntityHelper:
 	def assign_fix_columns_on_create(
 			self, data: Dict[str, Any],
 			snowflake_generator: SnowflakeGenerator, principal_service: PrincipalService,
-			now: datetime
+			now: datetime, id_: Optional[int] = None
 	) -> None:
-		self.assign_id_column(data, snowflake_generator.next_id())
+		"""
+		id is generated when not given
+		"""
+		self.assign_id_column(data, snowflake_generator.next_id() if id_ is None else id_)
 		self.assign_tenant_id(data, principal_service.get_tenant_id())
 		self.assign_insert_time(data, now)
 		self.assign_update_time(data, now)
@@ -10,8 +10,8 @@ from watchmen_meta.common import ask_snowflake_generator
 from watchmen_model.admin import PipelineTriggerType, Topic
 from watchmen_model.common import DataModel, DataPage, Pageable
 from watchmen_model.pipeline_kernel import TopicDataColumnNames
-from watchmen_storage import EntityColumnName, EntityCriteria, EntityPager, EntityStraightColumn, SnowflakeGenerator, \
-	TopicDataStorageSPI
+from watchmen_storage import EntityColumnName, EntityCriteria, EntityPager, EntitySort, EntityStraightColumn, \
+	SnowflakeGenerator, TopicDataStorageSPI
 from watchmen_utilities import ArrayHelper, get_current_time_in_seconds
 from .data_entity_helper import TopicDataEntityHelper
 
@@ -156,6 +156,39 @@ class TopicDataService(TopicStructureService):
 		finally:
 			storage.close()
 
+	def trigger_by_insert_batch(self, data: List[Dict[str, Any]]) -> List[TopicTrigger]:
+		"""
+		data is list of pure data, all of them are inserted in one transaction.
+		triggers are returned in same order as given data
+		"""
+		if len(data) == 0:
+			return []
+		data_entity_helper = self.get_data_entity_helper()
+		storage = self.get_storage()
+		try:
+			now = self.now()
+			topic_data_list = ArrayHelper(data).map(lambda x: self.try_to_wrap_to_topic_data(x)).to_list()
+			# allocate ids in one block
+			ids = self.get_snowflake_generator().next_ids(len(topic_data_list))
+			ArrayHelper(topic_data_list).each_with_index(
+				lambda x, index: data_entity_helper.assign_fix_columns_on_create(
+					data=x,
+					snowflake_generator=self.get_snowflake_generator(), principal_service=self.get_principal_service(),
+					now=now, id_=ids[index]
+				))
+			storage.begin()
+			storage.insert_all(topic_data_list, data_entity_helper.get_entity_helper())
+			storage.commit_and_close()
+			return ArrayHelper(data).map_with_index(lambda x, index: TopicTrigger(
+				previous=None,
+				current=x,
+				triggerType=PipelineTriggerType.INSERT,
+				internalDataId=data_entity_helper.find_data_id(topic_data_list[index])[1]
+			)).to_list()
+		except Exception as e:
+			storage.rollback_and_close()
+			self.raise_exception(f'Failed to create [{len(data)}] data into {self.raise_on_topic()}.', e)
+
 	def find_data_by_id(self, id_: int) -> Optional[Dict[str, Any]]:
 		"""
 		return topic data
@@ -286,6 +319,18 @@ class TopicDataService(TopicStructureService):
 		finally:
 			storage.close()
 
+	def find_limited(self, criteria: EntityCriteria, sort: EntitySort, limit: int) -> List[Dict[str, Any]]:
+		"""
+		find first n rows by given criteria and sort
+		"""
+		data_entity_helper = self.get_data_entity_helper()
+		storage = self.get_storage()
+		try:
+			storage.connect()
+			return storage.find_limited(data_entity_helper.get_entity_limited_finder(criteria, limit, sort))
+		finally:
+			storage.close()
+
 	def find_and_lock_by_id(self, data_id: int) -> Optional[Dict[str, Any]]:
 		"""
 		no storage connect and close, it must be done outside
@@ -8,17 +8,25 @@ from watchmen_utilities import ArrayHelper, is_blank
 
 
 class PipelineVariables:
+	"""
+	variables are layered. cloned variables is a child layer of the original one, value put into child layer shadows
+	the same name in parent layers and never impacts them, values are shared between layers and never copied.
+	trigger data are snapshots shared by all layers, should not be changed in place.
+	"""
+
 	def __init__(
 			self, previous_data: Optional[Dict[str, Any]], current_data: Optional[Dict[str, Any]],
-			topic: Optional[Topic]
+			topic: Optional[Topic], parent: Optional[PipelineVariables] = None
 	):
 		self.previousData = previous_data
 		self.currentData = current_data
+		# variables of this layer only
 		self.variables: Dict[str, Any] = {}
 		# only variables from trigger data will record its factor name here
 		# key is variable key, value is factor name
 		self.variables_from: Dict[str, str] = {}
 		self.topic = topic
+		self.parent = parent
 
 	def is_list_on_trigger(self, names: List[str]) -> bool:
 		if self.topic is None:
@@ -33,7 +41,7 @@ class PipelineVariables:
 			return factor.type == FactorType.ARRAY
 
 	def is_list_on_variables(self, names: List[str]) -> bool:
-		factor_name = self.variables_from.get(names[0])
+		_, factor_name = self.trace_variable(names[0])
 		if is_blank(factor_name):
 			return False
 		else:
@@ -44,9 +52,21 @@ class PipelineVariables:
 			else:
 				return factor.type == FactorType.ARRAY
 
+	def find_layer(self, name: str) -> Optional[PipelineVariables]:
+		"""
+		find the nearest layer which holds given variable
+		"""
+		layer = self
+		while layer is not None:
+			if name in layer.variables:
+				return layer
+			layer = layer.parent
+		return None
+
 	def trace_variable(self, name: str) -> Tuple[bool, Optional[str]]:
-		if name in self.variables_from:
-			return True, self.variables_from.get(name)
+		layer = self.find_layer(name)
+		if layer is not None and name in layer.variables_from:
+			return True, layer.variables_from.get(name)
 		else:
 			return False, None
 
@@ -60,10 +80,11 @@ class PipelineVariables:
 			del self.variables_from[name]
 
 	def has(self, name: str) -> bool:
-		return name in self.variables
+		return self.find_layer(name) is not None
 
 	def find(self, name: str) -> Optional[Any]:
-		return self.variables.get(name)
+		layer = self.find_layer(name)
+		return None if layer is None else layer.variables.get(name)
 
 	def find_from_current_data(self, name: str) -> Optional[Any]:
 		return self.currentData.get(name)
@@ -74,23 +95,42 @@ class PipelineVariables:
 	def get_previous_trigger_data(self) -> Optional[Dict[str, Any]]:
 		return self.previousData
 
+	def flatten(self) -> Tuple[Dict[str, Any], Dict[str, str]]:
+		"""
+		returns visible variables and their factor names, values are not copied
+		"""
+		layers: List[PipelineVariables] = []
+		layer = self
+		while layer is not None:
+			layers.append(layer)
+			layer = layer.parent
+		variables: Dict[str, Any] = {}
+		variables_from: Dict[str, str] = {}
+		for layer in reversed(layers):
+			for name in layer.variables.keys():
+				variables_from.pop(name, None)
+			variables.update(layer.variables)
+			variables_from.update(layer.variables_from)
+		return variables, variables_from
+
 	def clone(self) -> PipelineVariables:
-		cloned = PipelineVariables(self.previousData, self.currentData, self.topic)
-		cloned.variables_from = deepcopy(self.variables_from)
-		cloned.variables = deepcopy(self.variables)
-		return cloned
+		"""
+		child layer, nothing copied
+		"""
+		return PipelineVariables(self.previousData, self.currentData, self.topic, self)
 
 	def clone_all(self) -> PipelineVariables:
+		"""
+		fully copied, without layers
+		"""
+		variables, variables_from = self.flatten()
 		cloned = PipelineVariables(deepcopy(self.previousData), deepcopy(self.currentData), self.topic)
-		cloned.variables_from = deepcopy(self.variables_from)
-		cloned.variables = deepcopy(self.variables)
+		cloned.variables_from = variables_from
+		cloned.variables = deepcopy(variables)
 		return cloned
 
 	def backward_to_previous(self):
 		"""
-		not cloned, assume it will not be changed
+		child layer on previous trigger data, nothing copied
 		"""
-		backed = PipelineVariables(None, self.previousData, self.topic)
-		backed.variables_from = deepcopy(self.variables_from)
-		backed.variables = self.variables
-		return backed
+		return PipelineVariables(None, self.previousData, self.topic, self)
@@ -4,9 +4,9 @@ from datetime import date, time
 from typing import Any, Dict, List, Optional, Union
 
 from watchmen_data_kernel.common import ask_all_date_formats, ask_time_formats
-from watchmen_data_kernel.common.settings import ask_abandon_date_time_on_parse_fail
+from watchmen_data_kernel.common.settings import ask_abandon_date_time_on_parse_fail, ask_parse_epoch_date_time
 from watchmen_model.admin import Factor, FactorType, Topic
-from watchmen_utilities import ArrayHelper, is_blank, is_not_blank, try_to_date, try_to_time
+from watchmen_utilities import ArrayHelper, DateParser, is_blank, is_not_blank, TimeParser
 
 """
 design of date/time/datetime translator. same with encryption, see that for more. 
@@ -18,20 +18,19 @@ class DateOrTimeFactor:
 		self.factor = factor
 		self.factorName = '' if is_blank(factor.name) else factor.name.strip()
 		self.names = self.factorName.split('.')
+		# compiled once for factor, remembers format of last parsed value
+		if factor.type == FactorType.TIME:
+			self.parser: Union[DateParser, TimeParser] = TimeParser(ask_time_formats())
+		else:
+			self.parser: Union[DateParser, TimeParser] = DateParser(
+				ask_all_date_formats(), allow_timestamp=ask_parse_epoch_date_time())
 
 	def pop_first_name(self):
 		self.names = self.names[1:]
 
 	def translate(self, value: Any) -> Optional[Union[date, time, Any]]:
-		factor_type = self.factor.type
-		if factor_type == FactorType.FULL_DATETIME:
-			parsed_value = try_to_date(value, ask_all_date_formats())
-		elif factor_type == FactorType.DATETIME:
-			parsed_value = try_to_date(value, ask_all_date_formats())
-		elif factor_type == FactorType.DATE or factor_type == FactorType.DATE_OF_BIRTH:
-			parsed_value = try_to_date(value, ask_all_date_formats())
-		elif factor_type == FactorType.TIME:
-			parsed_value = try_to_time(value, ask_time_formats())
+		if is_date_or_time(self.factor):
+			parsed_value = self.parser.parse(value)
 		else:
 			parsed_value = value
 		if parsed_value is not None:
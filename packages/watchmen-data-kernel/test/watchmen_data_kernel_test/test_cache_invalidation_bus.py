@@ -0,0 +1,90 @@
+from datetime import datetime
+from unittest import TestCase
+
+from watchmen_data_kernel.cache import apply_cache_invalidation, broadcast_cache_invalidation, CacheInvalidationKind, \
+	CacheService, defer_cache_invalidation, InMemoryCacheInvalidationBus, use_cache_invalidation_bus
+from watchmen_model.admin import Pipeline, Topic, TopicKind, TopicType
+
+
+def create_topic(version: int) -> Topic:
+	return Topic(
+		topicId='1', name='topic_x', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS,
+		factors=[], tenantId='1', version=version, lastModifiedAt=datetime(2022, 1, 1))
+
+
+def create_pipeline(enabled: bool, last_modified_at: datetime) -> Pipeline:
+	return Pipeline(
+		pipelineId='2', name='pipeline_x', topicId='1', stages=[], enabled=enabled, validated=True,
+		tenantId='1', version=1, lastModifiedAt=last_modified_at)
+
+
+class CacheInvalidationBusTest(TestCase):
+	def tearDown(self):
+		use_cache_invalidation_bus(None)
+		CacheService.topic().clear()
+		CacheService.pipeline().clear()
+
+	def test_in_memory_bus(self):
+		channel = []
+		node1 = InMemoryCacheInvalidationBus(channel)
+		node2 = InMemoryCacheInvalidationBus(channel)
+		use_cache_invalidation_bus(node1)
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 2)
+		self.assertEqual(len(node1.poll()), 1)
+		self.assertEqual(len(node1.poll()), 0)
+		invalidations = node2.poll()
+		self.assertEqual(len(invalidations), 1)
+		self.assertEqual(invalidations[0].entityId, '1')
+		self.assertEqual(invalidations[0].version, 2)
+
+	def test_evict_stale_only(self):
+		bus = InMemoryCacheInvalidationBus()
+		use_cache_invalidation_bus(bus)
+
+		CacheService.topic().put(create_topic(2))
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 2, datetime(2022, 1, 1))
+		for invalidation in bus.poll():
+			apply_cache_invalidation(invalidation)
+		# cached one is up-to-date
+		self.assertIsNotNone(CacheService.topic().get('1'))
+
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 3)
+		for invalidation in bus.poll():
+			apply_cache_invalidation(invalidation)
+		self.assertIsNone(CacheService.topic().get('1'))
+		self.assertIsNone(CacheService.topic().get_schema('1'))
+
+	def test_evict_on_disabled_without_version_increased(self):
+		bus = InMemoryCacheInvalidationBus()
+		use_cache_invalidation_bus(bus)
+
+		CacheService.pipeline().put(create_pipeline(True, datetime(2022, 1, 1)))
+		# pipeline is disabled on another node, version is not increased
+		disabled = create_pipeline(False, datetime(2022, 1, 2))
+		broadcast_cache_invalidation(
+			CacheInvalidationKind.PIPELINE, disabled.pipelineId, disabled.version, disabled.lastModifiedAt)
+		for invalidation in bus.poll():
+			apply_cache_invalidation(invalidation)
+		self.assertIsNone(CacheService.pipeline().get('2'))
+
+	def test_deferred_until_committed(self):
+		bus = InMemoryCacheInvalidationBus()
+		use_cache_invalidation_bus(bus)
+
+		done = defer_cache_invalidation()
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 2)
+		# nested one joins outer
+		nested_done = defer_cache_invalidation()
+		broadcast_cache_invalidation(CacheInvalidationKind.PIPELINE, '2', 1)
+		nested_done(True)
+		self.assertEqual(len(bus.poll()), 0)
+		done(True)
+		self.assertEqual(len(bus.poll()), 2)
+
+		done = defer_cache_invalidation()
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 3)
+		done(False)
+		self.assertEqual(len(bus.poll()), 0)
+		# not deferred anymore
+		broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, '1', 4)
+		self.assertEqual(len(bus.poll()), 1)
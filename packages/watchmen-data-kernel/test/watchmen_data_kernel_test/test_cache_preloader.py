@@ -0,0 +1,123 @@
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_data_kernel.cache import CachePreloader, CacheService
+from watchmen_data_kernel.cache.pipeline_by_topic_cache import pipeline_by_topic_cache
+from watchmen_data_kernel.common import ask_cache_preload_tenants
+from watchmen_data_kernel.common.settings import settings
+from watchmen_model.admin import Pipeline, Topic, TopicKind, TopicType
+from watchmen_model.common import TenantId
+from watchmen_model.system import Tenant
+
+# calls on fake services, reset on each test
+loaded: List[str] = []
+
+
+def create_topic(tenant_id: TenantId) -> Topic:
+	return Topic(
+		topicId=f't{tenant_id}', name=f'topic_{tenant_id}', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS,
+		factors=[], tenantId=tenant_id)
+
+
+def create_pipeline(tenant_id: TenantId) -> Pipeline:
+	return Pipeline(
+		pipelineId=f'p{tenant_id}', name=f'pipeline_{tenant_id}', topicId=f't{tenant_id}', stages=[], enabled=True,
+		validated=True, tenantId=tenant_id)
+
+
+class FakeService:
+	def __init__(self, storage, snowflake_generator, principal_service):
+		self.storage = storage
+		self.snowflakeGenerator = snowflake_generator
+		self.principalService = principal_service
+
+	def begin_transaction(self):
+		loaded.append('begin')
+
+	def close_transaction(self):
+		loaded.append('close')
+
+
+class FakeTopicService(FakeService):
+	def find_all(self, tenant_id: TenantId) -> List[Topic]:
+		loaded.append(f'topics of {tenant_id}')
+		return [create_topic(tenant_id)]
+
+
+class FakePipelineService(FakeService):
+	"""
+	tenant 2 is broken, there is no pipeline of tenant 3
+	"""
+
+	def find_all(self, tenant_id: TenantId) -> List[Pipeline]:
+		if tenant_id == '2':
+			raise Exception('Broken pipeline found.')
+		loaded.append(f'pipelines of {tenant_id}')
+		return [] if tenant_id == '3' else [create_pipeline(tenant_id)]
+
+
+class FakeTenantService(FakeService):
+	def find_all(self) -> List[Tenant]:
+		loaded.append('tenants')
+		return [Tenant(tenantId='1'), Tenant(tenantId='2'), Tenant(tenantId='3')]
+
+
+class CachePreloaderTest(TestCase):
+	def setUp(self):
+		loaded.clear()
+		patches = [
+			patch('watchmen_data_kernel.cache.cache_preloader.ask_cache_enabled', return_value=True),
+			patch('watchmen_data_kernel.cache.cache_preloader.ask_meta_storage', return_value=None),
+			patch('watchmen_data_kernel.cache.cache_preloader.ask_snowflake_generator', return_value=None),
+			patch('watchmen_data_kernel.cache.cache_preloader.ask_super_admin', return_value=None),
+			patch('watchmen_data_kernel.cache.cache_preloader.TopicService', FakeTopicService),
+			patch('watchmen_data_kernel.cache.cache_preloader.PipelineService', FakePipelineService),
+			patch('watchmen_data_kernel.cache.cache_preloader.TenantService', FakeTenantService)
+		]
+		for a_patch in patches:
+			a_patch.start()
+			self.addCleanup(a_patch.stop)
+
+	def tearDown(self):
+		CacheService.topic().clear()
+		CacheService.pipeline().clear()
+		pipeline_by_topic_cache.clear()
+
+	def test_preload_tenants_setting(self):
+		with patch.object(settings, 'KERNEL_CACHE_PRELOAD_TENANTS', ' 1, 3 ,,'):
+			self.assertEqual(ask_cache_preload_tenants(), ['1', '3'])
+		with patch.object(settings, 'KERNEL_CACHE_PRELOAD_TENANTS', ' '):
+			self.assertEqual(ask_cache_preload_tenants(), [])
+		with patch.object(settings, 'KERNEL_CACHE_PRELOAD_TENANTS', None):
+			self.assertEqual(ask_cache_preload_tenants(), [])
+
+	def test_preload_declared_tenants_only(self):
+		preloader = CachePreloader()
+		with patch.object(settings, 'KERNEL_CACHE_PRELOAD_TENANTS', '1,3'):
+			preloader.preload_all()
+
+		# tenants are not loaded when declared
+		self.assertNotIn('tenants', loaded)
+		self.assertEqual(preloader.inventory, {'1': (1, 1), '3': (1, 0)})
+		self.assertTrue(preloader.is_preloaded('1'))
+		self.assertFalse(preloader.is_preloaded('2'))
+
+	def test_preload_all_tenants(self):
+		preloader = CachePreloader()
+		with patch.object(settings, 'KERNEL_CACHE_PRELOAD_TENANTS', None):
+			preloader.preload_all()
+
+		self.assertEqual(loaded[:3], ['begin', 'tenants', 'close'])
+		# failure of tenant 2 does not stop the others
+		self.assertEqual(preloader.inventory, {'1': (1, 1), '3': (1, 0)})
+		self.assertIn('topics of 2', loaded)
+		self.assertIn('pipelines of 3', loaded)
+		# transaction of failed tenant is closed
+		self.assertEqual(loaded.count('begin'), loaded.count('close'))
+		self.assertIsNotNone(CacheService.topic().get('t1'))
+		self.assertIsNotNone(CacheService.topic().get('t3'))
+		self.assertIsNone(CacheService.topic().get('t2'))
+		self.assertIsNotNone(CacheService.pipeline().get('p1'))
+		self.assertEqual(pipeline_by_topic_cache.get('t1'), ['p1'])
+		self.assertEqual(pipeline_by_topic_cache.get('t3'), [])
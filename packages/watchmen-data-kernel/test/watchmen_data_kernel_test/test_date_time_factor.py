@@ -0,0 +1,64 @@
+from datetime import datetime, time
+from unittest import TestCase
+
+from watchmen_data_kernel.common import ask_all_date_formats
+from watchmen_data_kernel.topic_schema import TopicSchema
+from watchmen_model.admin import Factor, FactorType, Topic, TopicKind, TopicType
+from watchmen_utilities import DateParser, try_to_date
+
+
+def create_topic() -> Topic:
+	return Topic(
+		topicId='1', name='topic_x', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS,
+		factors=[
+			Factor(factorId='1', name='created_at', type=FactorType.DATETIME),
+			Factor(factorId='2', name='birthday', type=FactorType.DATE_OF_BIRTH),
+			Factor(factorId='3', name='order.time', type=FactorType.TIME),
+		],
+		tenantId='1')
+
+
+class DateTimeFactorTest(TestCase):
+	def test_cast_date_or_time(self):
+		schema = TopicSchema(create_topic())
+		data = schema.cast_date_or_time({
+			'created_at': '2023-01-05T10:20:30.123',
+			'birthday': '05/01/2023',
+			'order': [{'time': '10:20:30'}, {'time': '1020'}]
+		})
+		self.assertEqual(data['created_at'], datetime(2023, 1, 5, 10, 20, 30, 123000))
+		self.assertEqual(data['birthday'], datetime(2023, 1, 5))
+		self.assertEqual(data['order'][0]['time'], time(10, 20, 30))
+		self.assertEqual(data['order'][1]['time'], time(10, 20))
+
+	def test_same_as_try_to_date(self):
+		formats = ask_all_date_formats()
+		parser = DateParser(formats)
+		for value in [
+			'2023-01-05', '2023-01-05 10:20', '2023-01-05T10:20:30Z', '2023-01-05T10:20:30.123456',
+			'2023/01/05 10:20:30', '20230105102030123', '2023-13-05', '2023-01-05T10:20:30+08:00', 'abc', 12
+		]:
+			self.assertEqual(parser.parse(value), try_to_date(value, formats), value)
+
+	def test_epoch(self):
+		self.assertIsNone(DateParser(ask_all_date_formats()).parse('1700000000'))
+		parser = DateParser(ask_all_date_formats(), allow_timestamp=True)
+		self.assertEqual(parser.parse('1700000000'), datetime.fromtimestamp(1700000000))
+		self.assertEqual(parser.parse('1700000000000'), datetime.fromtimestamp(1700000000))
+		self.assertEqual(parser.parse(1700000000), datetime.fromtimestamp(1700000000))
+		self.assertEqual(parser.parse(1700000000000), datetime.fromtimestamp(1700000000))
+		self.assertEqual(parser.parse(1700000000000.0), datetime.fromtimestamp(1700000000))
+		self.assertEqual(parser.parse(1700000000.5), datetime.fromtimestamp(1700000000.5))
+		self.assertIsNone(parser.parse(True))
+		self.assertIsNone(parser.parse(10 ** 20))
+		self.assertIsNone(parser.parse(float('nan')))
+		self.assertIsNone(parser.parse(float('inf')))
+
+	def test_result_not_depends_on_previous_values(self):
+		formats = ask_all_date_formats()
+		parser = DateParser(formats)
+		self.assertEqual(parser.parse('01/02/2023'), try_to_date('01/02/2023', formats))
+		# only %m%d%Y matches, must not make it preferred for following values
+		self.assertEqual(parser.parse('02/13/2023'), datetime(2023, 2, 13))
+		self.assertEqual(parser.parse('01/02/2023'), try_to_date('01/02/2023', formats))
+		self.assertEqual(parser.parse('01/02/2023'), datetime(2023, 2, 1))
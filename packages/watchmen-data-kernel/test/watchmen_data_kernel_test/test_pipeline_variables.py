@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from watchmen_data_kernel.storage_bridge import PipelineVariables
+
+
+class PipelineVariablesTest(TestCase):
+	def test_shadow_in_child_layer(self):
+		variables = PipelineVariables(None, {'a': 1}, None)
+		variables.put('x', 1)
+		variables.put_with_from('y', [1, 2], 'items')
+
+		cloned = variables.clone()
+		self.assertTrue(cloned.has('x'))
+		self.assertEqual(cloned.find('y'), [1, 2])
+		self.assertEqual(cloned.trace_variable('y'), (True, 'items'))
+		self.assertIs(cloned.currentData, variables.currentData)
+
+		cloned.put('x', 2)
+		cloned.put('y', 3)
+		cloned.put('z', 4)
+		self.assertEqual(cloned.find('x'), 2)
+		self.assertEqual(cloned.trace_variable('y'), (False, None))
+		# parent layer is not impacted
+		self.assertEqual(variables.find('x'), 1)
+		self.assertEqual(variables.trace_variable('y'), (True, 'items'))
+		self.assertFalse(variables.has('z'))
+
+	def test_value_shared(self):
+		value = {'b': [1, 2]}
+		variables = PipelineVariables(None, {'a': 1}, None)
+		variables.put('x', value)
+		self.assertIs(variables.clone().clone().find('x'), value)
+
+	def test_flatten_and_clone_all(self):
+		variables = PipelineVariables({'a': 0}, {'a': 1}, None)
+		variables.put_with_from('x', 1, 'a')
+		variables.put('y', [1])
+		cloned = variables.clone()
+		cloned.put('x', 2)
+
+		self.assertEqual(cloned.flatten(), ({'x': 2, 'y': [1]}, {}))
+		copied = cloned.clone_all()
+		self.assertIsNone(copied.parent)
+		self.assertEqual(copied.variables, {'x': 2, 'y': [1]})
+		self.assertIsNot(copied.variables['y'], variables.find('y'))
+		self.assertIsNot(copied.currentData, variables.currentData)
+
+	def test_backward_to_previous(self):
+		variables = PipelineVariables({'a': 0}, {'a': 1}, None)
+		variables.put('x', 1)
+		backed = variables.backward_to_previous()
+		self.assertEqual(backed.currentData, {'a': 0})
+		self.assertIsNone(backed.previousData)
+		self.assertEqual(backed.find('x'), 1)
@@ -0,0 +1,82 @@
+from typing import Any, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import PrincipalService
+from watchmen_data_kernel.common import DataKernelException
+from watchmen_data_kernel.storage import RegularTopicDataEntityHelper, RegularTopicDataService
+from watchmen_data_kernel.topic_schema import TopicSchema
+from watchmen_model.admin import Factor, FactorType, PipelineTriggerType, Topic, TopicKind, TopicType, User, \
+	UserRole
+from watchmen_storage import immutable_worker_id, SnowflakeGenerator
+
+
+def create_topic() -> Topic:
+	return Topic(
+		topicId='1', name='topic_x', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS,
+		factors=[Factor(factorId='1', name='code', type=FactorType.TEXT)],
+		tenantId='1')
+
+
+class FakeStorage:
+	def __init__(self, fail: bool = False):
+		self.fail = fail
+		self.calls: List[str] = []
+		self.rows: List[Dict[str, Any]] = []
+
+	def begin(self):
+		self.calls.append('begin')
+
+	# noinspection PyUnusedLocal
+	def insert_all(self, rows: List[Dict[str, Any]], helper):
+		if self.fail:
+			raise Exception('Duplicated key.')
+		self.calls.append('insert_all')
+		self.rows.extend(rows)
+
+	def commit_and_close(self):
+		self.calls.append('commit')
+
+	def rollback_and_close(self):
+		self.calls.append('rollback')
+
+
+def create_data_service(storage: FakeStorage) -> RegularTopicDataService:
+	schema = TopicSchema(create_topic())
+	principal_service = PrincipalService(User(userId='1', tenantId='1', name='admin', role=UserRole.ADMIN))
+	with patch(
+			'watchmen_data_kernel.storage.data_service.ask_snowflake_generator',
+			return_value=SnowflakeGenerator(0, immutable_worker_id(1))):
+		# noinspection PyTypeChecker
+		return RegularTopicDataService(schema, RegularTopicDataEntityHelper(schema), storage, principal_service)
+
+
+class TriggerByInsertBatchTest(TestCase):
+	def test_in_order(self):
+		storage = FakeStorage()
+		data_service = create_data_service(storage)
+		triggers = data_service.trigger_by_insert_batch([{'code': 'a'}, {'code': 'b'}, {'code': 'c'}])
+
+		self.assertEqual(storage.calls, ['begin', 'insert_all', 'commit'])
+		self.assertEqual(len(storage.rows), 3)
+		self.assertEqual(
+			[trigger.current['code'] for trigger in triggers], ['a', 'b', 'c'])
+		self.assertEqual(
+			[trigger.internalDataId for trigger in triggers], [row['id_'] for row in storage.rows])
+		# ids are allocated in one block, ascending
+		ids = [trigger.internalDataId for trigger in triggers]
+		self.assertEqual(ids, sorted(ids))
+		self.assertEqual(len(set(ids)), 3)
+		self.assertTrue(all(trigger.triggerType == PipelineTriggerType.INSERT for trigger in triggers))
+
+	def test_empty(self):
+		storage = FakeStorage()
+		self.assertEqual(create_data_service(storage).trigger_by_insert_batch([]), [])
+		self.assertEqual(storage.calls, [])
+
+	def test_rollback_when_failed(self):
+		storage = FakeStorage(fail=True)
+		data_service = create_data_service(storage)
+		with self.assertRaises(DataKernelException):
+			data_service.trigger_by_insert_batch([{'code': 'a'}, {'code': 'b'}])
+		self.assertEqual(storage.calls, ['begin', 'rollback'])
@@ -1,3 +1,6 @@
 from .exception import DqcException
-from .settings import ask_daily_monitor_job_trigger_time, ask_monitor_job_trigger, ask_monitor_jobs_enabled, \
-	ask_monitor_result_pipeline_async, ask_monthly_monitor_job_trigger_time, ask_weekly_monitor_job_trigger_time
+from .settings import ask_daily_monitor_job_trigger_time, ask_monitor_data_source_concurrency, \
+	ask_monitor_job_trigger, ask_monitor_jobs_enabled, ask_monitor_result_pipeline_async, ask_monitor_scan_chunk_size, \
+	ask_monitor_workers, ask_monthly_monitor_job_trigger_time, ask_profile_cache_size, ask_profile_cache_ttl, \
+	ask_profile_chunk_size, ask_profile_row_cap, ask_profile_sample_mode, ask_weekly_monitor_job_trigger_time, \
+	ProfileSampleMode
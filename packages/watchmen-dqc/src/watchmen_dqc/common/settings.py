@@ -1,3 +1,4 @@
+from enum import Enum
 from logging import getLogger
 from typing import Tuple
 
@@ -6,6 +7,12 @@ from pydantic import BaseSettings
 logger = getLogger(__name__)
 
 
+class ProfileSampleMode(str, Enum):
+	NONE = 'none',  # first rows in window, row cap at most
+	RESERVOIR = 'reservoir',  # uniform sample of all rows in window, all rows are read
+	ID_RANGE = 'id-range'  # rows of evenly distributed id ranges, sampled in storage
+
+
 class DqcSettings(BaseSettings):
 	MONITOR_JOBS: bool = False
 	MONITOR_JOB_TRIGGER: str = "cron"
@@ -19,6 +26,14 @@ class DqcSettings(BaseSettings):
 	MONITOR_JOB_MONTHLY_HOURS: int = 0
 	MONITOR_JOB_MONTHLY_MINUTES: int = 1
 	MONITOR_RESULT_PIPELINE_ASYNC: bool = False
+	MONITOR_SCAN_CHUNK_SIZE: int = 10000  # rows read in one chunk when scan topic data
+	MONITOR_WORKERS: int = 4  # topics monitored in parallel
+	MONITOR_DATA_SOURCE_CONCURRENCY: int = 2  # topics monitored in parallel on one data source
+	PROFILE_SAMPLE_MODE: ProfileSampleMode = ProfileSampleMode.ID_RANGE  # none, reservoir, id-range
+	PROFILE_ROW_CAP: int = 100000  # max rows used in profiling
+	PROFILE_CHUNK_SIZE: int = 10000  # rows read in one chunk when load topic data for profiling
+	PROFILE_CACHE_SIZE: int = 64  # count of cached profile results
+	PROFILE_CACHE_TTL: int = 1800  # in seconds
 
 
 settings = DqcSettings()
@@ -47,3 +62,35 @@ def ask_monthly_monitor_job_trigger_time() -> Tuple[str, int, int]:
 
 def ask_monitor_result_pipeline_async() -> bool:
 	return settings.MONITOR_RESULT_PIPELINE_ASYNC
+
+
+def ask_monitor_scan_chunk_size() -> int:
+	return settings.MONITOR_SCAN_CHUNK_SIZE
+
+
+def ask_monitor_workers() -> int:
+	return settings.MONITOR_WORKERS
+
+
+def ask_monitor_data_source_concurrency() -> int:
+	return settings.MONITOR_DATA_SOURCE_CONCURRENCY
+
+
+def ask_profile_sample_mode() -> ProfileSampleMode:
+	return settings.PROFILE_SAMPLE_MODE
+
+
+def ask_profile_row_cap() -> int:
+	return settings.PROFILE_ROW_CAP
+
+
+def ask_profile_chunk_size() -> int:
+	return settings.PROFILE_CHUNK_SIZE
+
+
+def ask_profile_cache_size() -> int:
+	return settings.PROFILE_CACHE_SIZE
+
+
+def ask_profile_cache_ttl() -> int:
+	return settings.PROFILE_CACHE_TTL
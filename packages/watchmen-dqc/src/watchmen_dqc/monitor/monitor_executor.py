@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from threading import BoundedSemaphore, RLock
+from typing import Callable, Dict, List, Optional
+
+from watchmen_dqc.common import ask_monitor_data_source_concurrency, ask_monitor_workers
+from watchmen_model.common import DataSourceId
+from watchmen_utilities import ArrayHelper
+
+logger = getLogger(__name__)
+
+MonitorTask = Callable[[], None]
+
+
+class DataSourceSemaphores:
+	"""
+	limit count of topics monitored at the same time on one data source, shared by all monitor runs of this node
+	"""
+
+	def __init__(self):
+		self.lock = RLock()
+		self.semaphores: Dict[Optional[DataSourceId], BoundedSemaphore] = {}
+
+	def ask(self, data_source_id: Optional[DataSourceId]) -> BoundedSemaphore:
+		with self.lock:
+			semaphore = self.semaphores.get(data_source_id)
+			if semaphore is None:
+				semaphore = BoundedSemaphore(max(ask_monitor_data_source_concurrency(), 1))
+				self.semaphores[data_source_id] = semaphore
+			return semaphore
+
+
+data_source_semaphores = DataSourceSemaphores()
+
+
+def ask_data_source_semaphore(data_source_id: Optional[DataSourceId]) -> BoundedSemaphore:
+	return data_source_semaphores.ask(data_source_id)
+
+
+# noinspection PyBroadException
+def run_monitor_task(task: MonitorTask) -> Optional[Exception]:
+	try:
+		task()
+		return None
+	except Exception as e:
+		return e
+
+
+def run_monitor_tasks(tasks: List[MonitorTask], workers: Optional[int] = None) -> None:
+	"""
+	run tasks on worker threads, or in current thread when there is only one task or one worker.
+	all tasks are executed even some of them failed, and first exception is raised after all done.
+	"""
+	workers = ask_monitor_workers() if workers is None else workers
+	if len(tasks) <= 1 or workers <= 1:
+		exceptions = ArrayHelper(tasks).map(run_monitor_task).filter(lambda x: x is not None).to_list()
+	else:
+		with ThreadPoolExecutor(max_workers=min(workers, len(tasks)), thread_name_prefix='dqc-monitor') as executor:
+			futures = ArrayHelper(tasks).map(lambda x: executor.submit(run_monitor_task, x)).to_list()
+		exceptions = ArrayHelper(futures).map(lambda x: x.result()).filter(lambda x: x is not None).to_list()
+	if len(exceptions) != 0:
+		ArrayHelper(exceptions[1:]).each(lambda x: logger.error(x, exc_info=x))
+		raise exceptions[0]
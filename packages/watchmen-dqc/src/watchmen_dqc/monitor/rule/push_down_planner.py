@@ -0,0 +1,131 @@
+from datetime import datetime
+from logging import getLogger
+from typing import Any, Dict, List, Tuple
+
+from watchmen_data_kernel.storage import TopicDataService
+from watchmen_dqc.util import convert_to_pandas_type
+from watchmen_model.admin import Factor
+from watchmen_model.dqc import MonitorRule, MonitorRuleCode
+from watchmen_storage import EntityColumnAggregateArithmetic, EntityCriteria, EntityStraightAggregateColumn
+from watchmen_utilities import ArrayHelper, is_decimal
+from .data_service_utils import build_date_range_criteria, find_factor
+from .types import RuleResult
+from .value_range import in_range
+
+logger = getLogger(__name__)
+
+push_down_rules_map: Dict[MonitorRuleCode, EntityColumnAggregateArithmetic] = {
+	MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE: EntityColumnAggregateArithmetic.AVG,
+	MonitorRuleCode.FACTOR_MAX_NOT_IN_RANGE: EntityColumnAggregateArithmetic.MAX,
+	MonitorRuleCode.FACTOR_MIN_NOT_IN_RANGE: EntityColumnAggregateArithmetic.MIN,
+	MonitorRuleCode.FACTOR_STDEV_NOT_IN_RANGE: EntityColumnAggregateArithmetic.STDDEV,
+	MonitorRuleCode.FACTOR_MEDIAN_NOT_IN_RANGE: EntityColumnAggregateArithmetic.MEDIAN,
+	# quantile rule is computed on 50th percentile
+	MonitorRuleCode.FACTOR_QUANTILE_NOT_IN_RANGE: EntityColumnAggregateArithmetic.MEDIAN,
+	MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE: EntityColumnAggregateArithmetic.NULL_COUNT
+}
+
+
+class PushDownColumn:
+	def __init__(self, rule: MonitorRule, factor: Factor, column_name: str, alias: str):
+		self.rule = rule
+		self.factor = factor
+		self.columnName = column_name
+		self.alias = alias
+
+	def is_on_all_data(self) -> bool:
+		"""
+		empty coverage is computed on all data, others are computed on data in date range
+		"""
+		return self.rule.code == MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE
+
+	def to_straight_column(self) -> EntityStraightAggregateColumn:
+		return EntityStraightAggregateColumn(
+			arithmetic=push_down_rules_map[self.rule.code], columnName=self.columnName, alias=self.alias)
+
+
+class PushDownPlan:
+	def __init__(self):
+		# rules compiled into aggregate query
+		self.columns: List[PushDownColumn] = []
+		# rules cannot be pushed down, should be computed in original way
+		self.rest: List[MonitorRule] = []
+
+
+def could_push_down(data_service: TopicDataService, rule: MonitorRule, factor: Factor) -> bool:
+	arithmetic = push_down_rules_map.get(rule.code)
+	if arithmetic is None:
+		return False
+	if not data_service.get_storage().is_straight_aggregate_supported(arithmetic):
+		return False
+	if rule.code == MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE:
+		# empty string is treated as empty as well, null count is accurate only when factor is not a text
+		return convert_to_pandas_type(factor.type) != 'object'
+	return True
+
+
+def plan_push_down(data_service: TopicDataService, rules: List[MonitorRule]) -> PushDownPlan:
+	"""
+	compile eligible rules into aggregate columns, others are kept in rest
+	"""
+	plan = PushDownPlan()
+	data_entity_helper = data_service.get_data_entity_helper()
+	for rule in rules:
+		if rule.code not in push_down_rules_map:
+			plan.rest.append(rule)
+			continue
+		found, factor = find_factor(data_service, rule.factorId, rule)
+		if not found:
+			# ignored anyway
+			continue
+		if could_push_down(data_service, rule, factor):
+			plan.columns.append(PushDownColumn(
+				rule, factor, data_entity_helper.get_column_name(factor.name), f'pd_{len(plan.columns)}'))
+		else:
+			plan.rest.append(rule)
+	return plan
+
+
+def find_aggregate_values(
+		data_service: TopicDataService, columns: List[PushDownColumn],
+		criteria: EntityCriteria) -> Dict[str, Any]:
+	if len(columns) == 0:
+		return {}
+	rows = data_service.find_straight_values(
+		criteria=criteria, columns=ArrayHelper(columns).map(lambda x: x.to_straight_column()).to_list())
+	return {} if len(rows) == 0 else rows[0]
+
+
+def compute_result(column: PushDownColumn, value: Any, total_rows_count: int) -> RuleResult:
+	rule = column.rule
+	if column.is_on_all_data():
+		if total_rows_count == 0:
+			return RuleResult.SUCCESS
+		parsed, count = is_decimal(value)
+		rate = (count if parsed else 0) / total_rows_count * 100
+		return RuleResult.SUCCESS if rate > rule.params.coverageRate else RuleResult.FAILED
+
+	if value is None:
+		# no data found
+		return RuleResult.SUCCESS
+	return RuleResult.SUCCESS if in_range(value, rule.params.min, rule.params.max) else RuleResult.FAILED
+
+
+def run_push_down_rules(
+		data_service: TopicDataService, plan: PushDownPlan,
+		date_range: Tuple[datetime, datetime], total_rows_count: int) -> List[Tuple[MonitorRule, RuleResult]]:
+	"""
+	at most 2 aggregate queries, one for data in date range and one for all data.
+	raise exception when query failed, rules should be computed in original way
+	"""
+	in_range_columns = ArrayHelper(plan.columns).filter(lambda x: not x.is_on_all_data()).to_list()
+	all_data_columns = ArrayHelper(plan.columns).filter(lambda x: x.is_on_all_data()).to_list()
+	values = {
+		**find_aggregate_values(data_service, in_range_columns, build_date_range_criteria(date_range)),
+		**find_aggregate_values(data_service, all_data_columns, [])
+	}
+	logger.debug(
+		f'{len(plan.columns)} rule(s) of topic[id={data_service.get_topic().topicId}] pushed down to storage.')
+	return ArrayHelper(plan.columns) \
+		.map(lambda x: (x.rule, compute_result(x, values.get(x.alias), total_rows_count))) \
+		.to_list()
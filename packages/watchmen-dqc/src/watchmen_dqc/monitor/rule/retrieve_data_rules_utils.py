@@ -19,7 +19,9 @@ def find_factors_and_log_missed(
 		data_service: TopicDataService,
 		rules_by_factor: Dict[FactorId, List[MonitorRule]]) -> List[Factor]:
 	factors = ArrayHelper(list(rules_by_factor.keys())) \
-		.map(lambda x: find_factor(data_service, x, rules_by_factor[x][0])).to_list()
+		.map(lambda x: find_factor(data_service, x, rules_by_factor[x][0])) \
+		.filter(lambda x: x[0]) \
+		.map(lambda x: x[1]).to_list()
 
 	def factor_not_found(factor_id: FactorId) -> bool:
 		return ArrayHelper(factors).every(lambda x: x.factorId != factor_id)
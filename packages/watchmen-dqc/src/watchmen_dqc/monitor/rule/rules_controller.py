@@ -17,9 +17,11 @@ from .factor_mismatch_type import factor_mismatch_type
 from .factor_not_in_range import factor_not_in_range
 from .factor_string_length_mismatch import factor_string_length_mismatch
 from .factor_string_length_not_in_range import factor_string_length_not_in_range
-from .retrieve_all_data_rules import run_retrieve_all_data_rules
-from .retrieve_distinct_data_rules import run_retrieve_distinct_data_rules, should_retrieve_distinct_data
+from .push_down_planner import plan_push_down, run_push_down_rules
+from .retrieve_all_data_rules import should_retrieve_all_data
+from .retrieve_distinct_data_rules import run_retrieve_distinct_data_rules
 from .rows_no_change import rows_no_change
+from .scan_engine import run_scan_rules, should_scan
 from .trigger_pipeline import trigger
 from .types import RuleHandler, RuleResult
 
@@ -41,15 +43,7 @@ in_storage_rules_map: Dict[MonitorRuleCode, RuleHandler] = {
 }
 
 
-def should_retrieve_all_data(rule: MonitorRule) -> bool:
-	return rule.code in [
-		MonitorRuleCode.FACTOR_MEDIAN_NOT_IN_RANGE,
-		MonitorRuleCode.FACTOR_QUANTILE_NOT_IN_RANGE,
-		MonitorRuleCode.FACTOR_STDEV_NOT_IN_RANGE
-	]
-
-
-def could_run_in_storage(rule: MonitorRule) -> bool:
+def could_run(rule: MonitorRule) -> bool:
 	rule_code = rule.code
 	if rule_code in disabled_rules:
 		return False
@@ -57,13 +51,13 @@ def could_run_in_storage(rule: MonitorRule) -> bool:
 		return False
 	elif rule_code == MonitorRuleCode.ROWS_COUNT_MISMATCH_AND_ANOTHER:
 		return False
-	elif should_retrieve_all_data(rule):
-		return False
-	elif should_retrieve_distinct_data(rule):
-		return False
 	return True
 
 
+def could_run_in_storage(rule: MonitorRule) -> bool:
+	return could_run(rule) and not should_scan(rule)
+
+
 def accept_result(result: Tuple[MonitorRule, RuleResult]) -> bool:
 	return result[1] != RuleResult.IGNORED
 
@@ -85,19 +79,33 @@ def run_all_rules(
 	def trigger_pipeline(result: Tuple[MonitorRule, RuleResult]) -> None:
 		trigger(result[0], result[1], date_range[0], data_service.get_principal_service())
 
-	# rules in storage
-	ArrayHelper(rules).filter(could_run_in_storage).map(run_rule).filter(accept_result).each(trigger_pipeline)
-
-	# rules need to retrieve distinct data and count
-	retrieve_distinct_data_rules = ArrayHelper(rules).filter(should_retrieve_distinct_data).to_list()
-	if len(retrieve_distinct_data_rules) != 0:
-		results = run_retrieve_distinct_data_rules(
-			data_service, retrieve_distinct_data_rules, date_range, changed_rows_count_in_range, total_rows_count)
+	# compile eligible rules into aggregate queries
+	plan = plan_push_down(data_service, ArrayHelper(rules).filter(could_run).to_list())
+	rest_rules = plan.rest
+	if len(plan.columns) != 0:
+		# noinspection PyBroadException
+		try:
+			results = run_push_down_rules(data_service, plan, date_range, total_rows_count)
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+			logger.warning('Failed to run rules in aggregate query, fall back to run them one by one.')
+			results = []
+			rest_rules = [*rest_rules, *ArrayHelper(plan.columns).map(lambda x: x.rule).to_list()]
+		# failure of triggering is not a failure of query, never fall back on it
 		ArrayHelper(results).filter(accept_result).each(trigger_pipeline)
 
-	# rules need to retrieve all data
-	retrieve_all_data_rules = ArrayHelper(rules).filter(should_retrieve_all_data).to_list()
-	if len(retrieve_all_data_rules) != 0:
-		results = run_retrieve_all_data_rules(
-			data_service, retrieve_all_data_rules, date_range, changed_rows_count_in_range, total_rows_count)
-		ArrayHelper(results).filter(accept_result).each(trigger_pipeline)
+	# rules in storage
+	ArrayHelper(rest_rules).filter(could_run_in_storage).map(run_rule).filter(accept_result).each(trigger_pipeline)
+
+	scan_rules = ArrayHelper(rest_rules).filter(should_scan).to_list()
+	if len(scan_rules) == 0:
+		return
+	if ArrayHelper(scan_rules).some(should_retrieve_all_data):
+		# rules need to retrieve all data, scan data once for all of them and rules need distinct data
+		results = run_scan_rules(
+			data_service, scan_rules, date_range, changed_rows_count_in_range, total_rows_count)
+	else:
+		# rules need distinct data only, group and count them in storage
+		results = run_retrieve_distinct_data_rules(
+			data_service, scan_rules, date_range, changed_rows_count_in_range, total_rows_count)
+	ArrayHelper(results).filter(accept_result).each(trigger_pipeline)
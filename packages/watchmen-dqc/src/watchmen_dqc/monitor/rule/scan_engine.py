@@ -0,0 +1,157 @@
+from collections import Counter
+from datetime import datetime
+from logging import getLogger
+from math import isfinite
+from typing import Any, Dict, List, Optional, Tuple
+
+from numpy import empty, float64, ndarray
+
+from watchmen_data_kernel.storage import TopicDataService
+from watchmen_dqc.common import ask_monitor_scan_chunk_size
+from watchmen_dqc.util import find_topic_data_chunk
+from watchmen_model.admin import Factor
+from watchmen_model.dqc import MonitorRule
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_utilities import ArrayHelper
+from .data_service_utils import build_date_range_criteria
+from .retrieve_all_data_rules import retrieve_all_data_rules_map, should_retrieve_all_data
+from .retrieve_data_rules_utils import find_factors_and_log_missed, group_rules_by_factor
+from .retrieve_distinct_data_rules import retrieve_distinct_data_rules_map, should_retrieve_distinct_data
+from .types import RuleResult
+
+logger = getLogger(__name__)
+
+
+def should_scan(rule: MonitorRule) -> bool:
+	return should_retrieve_all_data(rule) or should_retrieve_distinct_data(rule)
+
+
+def to_float(value: Any) -> Optional[float]:
+	"""
+	returns none when value is none, value cannot be cast will be treated as 0
+	"""
+	if value is None:
+		return None
+	try:
+		parsed = float(value)
+		return parsed if isfinite(parsed) else 0
+	except (TypeError, ValueError):
+		return 0
+
+
+class NumericColumnBuffer:
+	"""
+	growable float64 buffer of one column, none values are not collected
+	"""
+
+	def __init__(self, capacity: int = 1024):
+		self.data: ndarray = empty(capacity, dtype=float64)
+		self.size: int = 0
+
+	def ensure_capacity(self, capacity: int) -> None:
+		if capacity <= len(self.data):
+			return
+		data = empty(max(capacity, len(self.data) * 2), dtype=float64)
+		data[:self.size] = self.data[:self.size]
+		self.data = data
+
+	def append(self, values: List[Any]) -> None:
+		floats = ArrayHelper(values).map(to_float).filter(lambda x: x is not None).to_list()
+		self.ensure_capacity(self.size + len(floats))
+		self.data[self.size:self.size + len(floats)] = floats
+		self.size = self.size + len(floats)
+
+	def values(self) -> ndarray:
+		return self.data[:self.size]
+
+
+class FactorScanBuffer:
+	"""
+	collects values of one factor in scan, for rules need all data and rules need distinct data.
+	scanned rows are deserialized, values are keyed by factor name
+	"""
+
+	def __init__(self, factor: Factor, rules: List[MonitorRule]):
+		self.factor = factor
+		self.rules = rules
+		self.numeric: Optional[NumericColumnBuffer] = \
+			NumericColumnBuffer() if ArrayHelper(rules).some(should_retrieve_all_data) else None
+		self.counter: Optional[Counter] = Counter() if ArrayHelper(rules).some(should_retrieve_distinct_data) else None
+
+	def accept(self, rows: List[Dict[str, Any]]) -> None:
+		values = ArrayHelper(rows).map(lambda x: x.get(self.factor.name)).to_list()
+		if self.numeric is not None:
+			self.numeric.append(values)
+		if self.counter is not None:
+			for value in values:
+				try:
+					self.counter[value] += 1
+				except TypeError:
+					# value is not hashable, e.g. object or array of raw topic
+					self.counter[str(value)] += 1
+
+	def get_distinct_data(self) -> List[Tuple[Any, int]]:
+		return [] if self.counter is None else list(self.counter.items())
+
+	def get_all_data(self) -> ndarray:
+		return empty(0, dtype=float64) if self.numeric is None else self.numeric.values()
+
+
+def scan_topic_data(
+		data_service: TopicDataService, buffers: List[FactorScanBuffer],
+		date_range: Tuple[datetime, datetime], chunk_size: Optional[int] = None) -> int:
+	"""
+	read rows in date range chunk by chunk, pass each chunk to all buffers.
+	returns count of scanned rows
+	"""
+	chunk_size = ask_monitor_scan_chunk_size() if chunk_size is None else chunk_size
+	criteria = build_date_range_criteria(date_range)
+	scanned = 0
+	last_data_id: Optional[int] = None
+	while True:
+		rows = find_topic_data_chunk(data_service, criteria, last_data_id, chunk_size)
+		if len(rows) == 0:
+			break
+		ArrayHelper(buffers).each(lambda x: x.accept(rows))
+		scanned = scanned + len(rows)
+		last_data_id = rows[-1].get(TopicDataColumnNames.ID.value)
+		if len(rows) < chunk_size or last_data_id is None:
+			break
+	return scanned
+
+
+def run_scan_rules(
+		data_service: TopicDataService, rules: List[MonitorRule],
+		date_range: Tuple[datetime, datetime],
+		changed_rows_count_in_range: int, total_rows_count: int) -> List[Tuple[MonitorRule, RuleResult]]:
+	"""
+	run rules which should retrieve all data or distinct data,
+	data in date range is read only once, and shared by all rules of all factors.
+	make sure pass-in rules are qualified, will not check them inside
+	"""
+	rules_by_factor = group_rules_by_factor(rules)
+	factors = find_factors_and_log_missed(data_service, rules_by_factor)
+	if len(factors) == 0:
+		return []
+
+	buffers = ArrayHelper(factors).map(lambda x: FactorScanBuffer(x, rules_by_factor[x.factorId])).to_list()
+	scanned = scan_topic_data(data_service, buffers, date_range)
+	logger.debug(
+		f'{scanned} row(s) of topic[id={data_service.get_topic().topicId}] scanned '
+		f'for {len(rules)} rule(s) on {len(factors)} factor(s).')
+
+	def run_rule(buffer: FactorScanBuffer, rule: MonitorRule) -> Tuple[MonitorRule, RuleResult]:
+		if should_retrieve_all_data(rule):
+			result = retrieve_all_data_rules_map[rule.code](
+				data_service, buffer.factor, buffer.get_all_data(), rule,
+				date_range, changed_rows_count_in_range, total_rows_count)
+		else:
+			result = retrieve_distinct_data_rules_map[rule.code](
+				data_service, buffer.factor, buffer.get_distinct_data(), rule,
+				date_range, changed_rows_count_in_range, total_rows_count)
+		return rule, result
+
+	results: List[Tuple[MonitorRule, RuleResult]] = []
+	for a_buffer in buffers:
+		results.extend(ArrayHelper(a_buffer.rules).map(lambda x: run_rule(a_buffer, x)).to_list())
+	return results
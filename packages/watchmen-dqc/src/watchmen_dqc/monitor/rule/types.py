@@ -2,6 +2,8 @@ from datetime import datetime
 from enum import Enum
 from typing import Any, Callable, List, Tuple
 
+from numpy import ndarray
+
 from watchmen_data_kernel.storage import TopicDataService
 from watchmen_model.admin import Factor
 from watchmen_model.dqc import MonitorRule
@@ -18,7 +20,8 @@ DistinctDataRuleHandler = Callable[
 	[TopicDataService, Factor, List[Tuple[Any, int]], MonitorRule, Tuple[datetime, datetime], int, int],
 	RuleResult
 ]
+# values of factor are passed as float64 array
 AllDataRuleHandler = Callable[
-	[TopicDataService, Factor, List[List[Any]], MonitorRule, Tuple[datetime, datetime], int, int],
+	[TopicDataService, Factor, ndarray, MonitorRule, Tuple[datetime, datetime], int, int],
 	RuleResult
 ]
@@ -1,5 +1,6 @@
 from datetime import date, datetime
 from logging import getLogger
+from random import shuffle
 from typing import Dict, List, Optional, Tuple
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -19,6 +20,7 @@ from watchmen_model.dqc.monitor_job_lock import MonitorJobLockStatus
 from watchmen_model.system import Tenant
 from watchmen_utilities import ArrayHelper, get_current_time_in_seconds, to_previous_month, to_previous_week, \
 	to_yesterday
+from .monitor_executor import ask_data_source_semaphore, MonitorTask, run_monitor_tasks
 from .rule import compute_date_range, disabled_rules, enum_service, rows_count_mismatch_with_another, rows_not_exists, \
 	run_all_rules
 
@@ -61,7 +63,11 @@ class MonitorRulesRunner:
 			.filter(lambda x: x.topicId is not None) \
 			.to_list()
 		rules_by_topic: Dict[TopicId, List[MonitorRule]] = ArrayHelper(rules).group_by(lambda x: x.topicId)
-		ArrayHelper(list(rules_by_topic.keys())).each(lambda x: self.run_on_topic(x, process_date, rules_by_topic[x]))
+
+		def as_task(topic_id: TopicId) -> MonitorTask:
+			return lambda: self.run_on_topic(topic_id, process_date, rules_by_topic[topic_id])
+
+		run_monitor_tasks(ArrayHelper(list(rules_by_topic.keys())).map(as_task).to_list())
 
 	def get_topic_data_service(self, topic_id: TopicId, rules_count: int) -> Tuple[bool, Optional[TopicDataService]]:
 		topic_service = get_topic_service(self.principalService)
@@ -88,8 +94,10 @@ class MonitorRulesRunner:
 		rules_by_frequency: Dict[MonitorRuleStatisticalInterval, List[MonitorRule]] = \
 			ArrayHelper(rules).group_by(lambda x: x.params.statisticalInterval)
 
-		ArrayHelper(list(rules_by_frequency)) \
-			.each(lambda x: self.run_on_topic_and_frequency(data_service, process_date, rules_by_frequency[x], x))
+		# topics on same data source are monitored in limited concurrency, to protect the data source
+		with ask_data_source_semaphore(data_service.get_topic().dataSourceId):
+			ArrayHelper(list(rules_by_frequency)) \
+				.each(lambda x: self.run_on_topic_and_frequency(data_service, process_date, rules_by_frequency[x], x))
 
 	def run_on_topic_and_frequency(
 			self, data_service: TopicDataService, process_date: date,
@@ -183,31 +191,49 @@ def accomplish_job(lock: MonitorJobLock, status: MonitorJobLockStatus, principal
 	lock_service.begin_transaction()
 	try:
 		lock.status = status
-		lock_service.create(lock)
+		lock_service.update_status(lock)
 		lock_service.commit_transaction()
 	except Exception:
 		lock_service.rollback_transaction()
 
 
+def run_monitor_rules_on_topic(
+		tenant_id: TenantId, topic: Topic, process_date: date, frequency: MonitorRuleStatisticalInterval) -> None:
+	"""
+	topic is monitored by the node which creates lock first, therefore topics are split by nodes
+	"""
+	principal_service = fake_tenant_admin(tenant_id)
+	lock, locked = try_to_lock_topic_for_monitor(topic, frequency, process_date, principal_service)
+	if not locked:
+		return
+	try:
+		MonitorRulesRunner(principal_service).run(process_date, topic.topicId, frequency)
+		accomplish_job(lock, MonitorJobLockStatus.SUCCESS, principal_service)
+	except Exception as e:
+		logger.error(e, exc_info=True, stack_info=True)
+		accomplish_job(lock, MonitorJobLockStatus.FAILED, principal_service)
+
+
 def run_monitor_rules(
 		process_date: date, frequency: MonitorRuleStatisticalInterval
 ) -> None:
-	tenants = find_all_tenants()
-	for tenant in tenants:
-		topics = find_all_topics(tenant.tenantId)
-		for topic in topics:
-			principal_service = fake_tenant_admin(tenant.tenantId)
-			lock, locked = try_to_lock_topic_for_monitor(topic, frequency, process_date, principal_service)
-			if locked:
-				try:
-					MonitorRulesRunner(principal_service).run(process_date, frequency, topic.topicId)
-					accomplish_job(lock, MonitorJobLockStatus.SUCCESS, principal_service)
-				except Exception as e:
-					logger.error(e, exc_info=True, stack_info=True)
-					accomplish_job(lock, MonitorJobLockStatus.FAILED, principal_service)
-
-	# clear enumeration cache
-	enum_service.clear()
+	"""
+	topics of all tenants are monitored in parallel.
+	order of topics is shuffled, reduce lock competition when there are multiple nodes
+	"""
+	tasks: List[MonitorTask] = []
+
+	def as_task(tenant_id: TenantId, topic: Topic) -> MonitorTask:
+		return lambda: run_monitor_rules_on_topic(tenant_id, topic, process_date, frequency)
+
+	for tenant in find_all_tenants():
+		tasks.extend(ArrayHelper(find_all_topics(tenant.tenantId)).map(lambda x: as_task(tenant.tenantId, x)).to_list())
+	shuffle(tasks)
+	try:
+		run_monitor_tasks(tasks)
+	finally:
+		# clear enumeration cache
+		enum_service.clear()
 
 
 def create_monthly_runner(scheduler: AsyncIOScheduler) -> None:
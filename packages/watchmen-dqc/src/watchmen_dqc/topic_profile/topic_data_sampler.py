@@ -0,0 +1,142 @@
+from logging import getLogger
+from math import ceil
+from random import randint
+from typing import Any, Dict, List, Optional, Tuple
+
+from watchmen_data_kernel.storage import TopicDataService
+from watchmen_dqc.common import ask_profile_chunk_size, ask_profile_row_cap, ask_profile_sample_mode, \
+	ProfileSampleMode
+from watchmen_dqc.util import find_topic_data_chunk
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_storage import ColumnNameLiteral, EntityColumnAggregateArithmetic, EntityCriteria, \
+	EntityCriteriaExpression, EntityCriteriaOperator, EntitySortColumn, EntitySortMethod, \
+	EntityStraightAggregateColumn
+from watchmen_utilities import ArrayHelper, try_to_decimal
+
+logger = getLogger(__name__)
+
+# count of id ranges which rows are sampled from
+ID_RANGE_SLICES = 100
+
+
+class TopicDataSampler:
+	def __init__(
+			self, data_service: TopicDataService, criteria: EntityCriteria,
+			mode: Optional[ProfileSampleMode] = None, row_cap: Optional[int] = None, chunk_size: Optional[int] = None):
+		self.dataService = data_service
+		self.criteria = criteria
+		self.mode = ask_profile_sample_mode() if mode is None else ProfileSampleMode(mode)
+		self.rowCap = ask_profile_row_cap() if row_cap is None else row_cap
+		self.chunkSize = ask_profile_chunk_size() if chunk_size is None else chunk_size
+
+	def load_first(self, criteria: EntityCriteria, limit: int) -> List[Dict[str, Any]]:
+		"""
+		load rows chunk by chunk, until given limit reached or no more rows
+		"""
+		rows: List[Dict[str, Any]] = []
+		last_data_id: Optional[int] = None
+		while len(rows) < limit:
+			chunk_size = min(self.chunkSize, limit - len(rows))
+			chunk = find_topic_data_chunk(self.dataService, criteria, last_data_id, chunk_size)
+			rows.extend(chunk)
+			last_data_id = None if len(chunk) == 0 else chunk[-1].get(TopicDataColumnNames.ID.value)
+			if len(chunk) < chunk_size or last_data_id is None:
+				break
+		return rows
+
+	def sample_reservoir(self) -> List[Dict[str, Any]]:
+		"""
+		read all rows chunk by chunk, keep a uniform sample of row cap rows in memory
+		"""
+		reservoir: List[Dict[str, Any]] = []
+		seen = 0
+		last_data_id: Optional[int] = None
+		while True:
+			chunk = find_topic_data_chunk(self.dataService, self.criteria, last_data_id, self.chunkSize)
+			for row in chunk:
+				seen = seen + 1
+				if len(reservoir) < self.rowCap:
+					reservoir.append(row)
+				else:
+					index = randint(0, seen - 1)
+					if index < self.rowCap:
+						reservoir[index] = row
+			last_data_id = None if len(chunk) == 0 else chunk[-1].get(TopicDataColumnNames.ID.value)
+			if len(chunk) < self.chunkSize or last_data_id is None:
+				break
+		return reservoir
+
+	def find_id_range(self) -> Tuple[Optional[int], Optional[int], int]:
+		"""
+		returns min id, max id and count of rows in window
+		"""
+		id_column_name = TopicDataColumnNames.ID.value
+		rows = self.dataService.find_straight_values(criteria=self.criteria, columns=[
+			EntityStraightAggregateColumn(
+				arithmetic=EntityColumnAggregateArithmetic.MIN, columnName=id_column_name, alias='min_id'),
+			EntityStraightAggregateColumn(
+				arithmetic=EntityColumnAggregateArithmetic.MAX, columnName=id_column_name, alias='max_id'),
+			EntityStraightAggregateColumn(
+				arithmetic=EntityColumnAggregateArithmetic.COUNT, columnName=id_column_name, alias='count')
+		])
+		if len(rows) == 0:
+			return None, None, 0
+
+		def to_int(value: Any) -> Optional[int]:
+			decimal_value = try_to_decimal(value)
+			return None if decimal_value is None else int(decimal_value)
+
+		return to_int(rows[0].get('min_id')), to_int(rows[0].get('max_id')), to_int(rows[0].get('count')) or 0
+
+	def find_in_id_range(self, start: int, end: int, limit: int) -> List[Dict[str, Any]]:
+		"""
+		first rows which id is in [start, end)
+		"""
+		id_column = ColumnNameLiteral(columnName=TopicDataColumnNames.ID.value)
+		return self.dataService.find_limited([
+			*self.criteria,
+			EntityCriteriaExpression(
+				left=id_column, operator=EntityCriteriaOperator.GREATER_THAN_OR_EQUALS, right=start),
+			EntityCriteriaExpression(
+				left=id_column, operator=EntityCriteriaOperator.LESS_THAN, right=end)
+		], [EntitySortColumn(name=TopicDataColumnNames.ID.value, method=EntitySortMethod.ASC)], limit)
+
+	def sample_id_range(self) -> List[Dict[str, Any]]:
+		"""
+		split id range of window into slices, and read rows from a random start id of each slice.
+		ids are sparse (snowflake), so start id is picked in whole slice, and rows are read from start id to slice end,
+		wrapped to slice start when not enough.
+		only sampled rows are read from storage
+		"""
+		min_id, max_id, count = self.find_id_range()
+		if min_id is None or max_id is None or count <= self.rowCap:
+			return self.load_first(self.criteria, self.rowCap)
+
+		slices = min(ID_RANGE_SLICES, self.rowCap)
+		rows_per_slice = ceil(self.rowCap / slices)
+		slice_width = (max_id - min_id + 1) / slices
+
+		def sample_slice(index: int) -> List[Dict[str, Any]]:
+			slice_start = min_id + int(index * slice_width)
+			slice_end = max_id + 1 if index == slices - 1 else min_id + int((index + 1) * slice_width)
+			if slice_end <= slice_start:
+				return []
+			start = randint(slice_start, slice_end - 1)
+			rows = self.find_in_id_range(start, slice_end, rows_per_slice)
+			if len(rows) < rows_per_slice and start > slice_start:
+				rows = [*rows, *self.find_in_id_range(slice_start, start, rows_per_slice - len(rows))]
+			return rows
+
+		return ArrayHelper(list(range(slices))).map(sample_slice).flatten().to_list()[:self.rowCap]
+
+	def sample(self) -> List[Dict[str, Any]]:
+		if self.mode == ProfileSampleMode.RESERVOIR:
+			rows = self.sample_reservoir()
+		elif self.mode == ProfileSampleMode.ID_RANGE:
+			rows = self.sample_id_range()
+		else:
+			rows = self.load_first(self.criteria, self.rowCap)
+		logger.info(
+			f'{len(rows)} row(s) of topic[id={self.dataService.get_topic().topicId}] sampled '
+			f'in mode[{self.mode.value}] for profiling.')
+		return rows
@@ -3,6 +3,7 @@ from json import loads
 from logging import getLogger
 from typing import Any, Dict, List, Optional
 
+from cacheout import Cache
 from pandas_profiling import ProfileReport
 
 from watchmen_auth import PrincipalService
@@ -10,14 +11,15 @@ from watchmen_data_kernel.common import DataKernelException
 from watchmen_data_kernel.meta import TopicService
 from watchmen_data_kernel.service import ask_topic_data_service, ask_topic_storage
 from watchmen_data_kernel.topic_schema import TopicSchema
-from watchmen_dqc.common import DqcException
+from watchmen_dqc.common import ask_profile_cache_size, ask_profile_cache_ttl, DqcException
 from watchmen_dqc.util import build_data_frame, convert_data_frame_type_by_topic
 from watchmen_model.admin import is_raw_topic
-from watchmen_model.common import TopicId
+from watchmen_model.common import TenantId, TopicId
 from watchmen_model.dqc import TopicProfile
 from watchmen_model.pipeline_kernel import TopicDataColumnNames
 from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityCriteriaOperator
 from watchmen_utilities import ArrayHelper
+from .topic_data_sampler import TopicDataSampler
 
 logger = getLogger(__name__)
 
@@ -38,11 +40,33 @@ def get_topic_schema(
 	return schema
 
 
+# profile results keyed by tenant, topic and window
+topic_profile_cache = Cache(maxsize=ask_profile_cache_size(), ttl=ask_profile_cache_ttl())
+
+
+def build_profile_cache_key(
+		tenant_id: TenantId, topic_id: TopicId, start_time: datetime, end_time: datetime) -> str:
+	return f'{tenant_id}-{topic_id}-{start_time.isoformat()}-{end_time.isoformat()}'
+
+
 class TopicProfileService:
 	def __init__(self, principal_service: PrincipalService):
 		self.principalService = principal_service
 
 	def find(self, topic_id: TopicId, start_time: datetime, end_time: datetime) -> Optional[TopicProfile]:
+		"""
+		profile is built on sampled rows, and cached by topic and window
+		"""
+		key = build_profile_cache_key(self.principalService.get_tenant_id(), topic_id, start_time, end_time)
+		profile = topic_profile_cache.get(key)
+		if profile is not None:
+			return profile
+		profile = self.build(topic_id, start_time, end_time)
+		if profile is not None:
+			topic_profile_cache.set(key, profile)
+		return profile
+
+	def build(self, topic_id: TopicId, start_time: datetime, end_time: datetime) -> Optional[TopicProfile]:
 		schema = get_topic_schema(topic_id, self.principalService)
 		if is_raw_topic(schema.get_topic()):
 			raise DqcException(f'Raw topic[name={schema.get_topic().name}] is not supported for profiling.')
@@ -61,7 +85,7 @@ class TopicProfileService:
 				operator=EntityCriteriaOperator.LESS_THAN_OR_EQUALS,
 				right=end_time)
 		]
-		data = service.find(criteria)
+		data = TopicDataSampler(service, criteria).sample()
 
 		columns = [
 			TopicDataColumnNames.ID.value,
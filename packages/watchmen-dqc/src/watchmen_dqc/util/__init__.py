@@ -1,2 +1,3 @@
 from .data_frame import build_data_frame, convert_data_frame_type_by_topic, convert_data_frame_type_by_types, \
 	convert_to_pandas_type
+from .topic_data_chunk import find_topic_data_chunk
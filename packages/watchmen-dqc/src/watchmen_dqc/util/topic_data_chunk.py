@@ -0,0 +1,24 @@
+from typing import Any, Dict, List, Optional
+
+from watchmen_data_kernel.storage import TopicDataService
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_storage import ColumnNameLiteral, EntityCriteria, EntityCriteriaExpression, EntityCriteriaOperator, \
+	EntitySortColumn, EntitySortMethod
+
+
+def find_topic_data_chunk(
+		data_service: TopicDataService, criteria: EntityCriteria, last_data_id: Optional[int],
+		chunk_size: int) -> List[Dict[str, Any]]:
+	"""
+	rows are sorted by id, paged by id range instead of offset.
+	only rows which id is greater than given last data id are included
+	"""
+	if last_data_id is not None:
+		criteria = [
+			*criteria,
+			EntityCriteriaExpression(
+				left=ColumnNameLiteral(columnName=TopicDataColumnNames.ID.value),
+				operator=EntityCriteriaOperator.GREATER_THAN, right=last_data_id)
+		]
+	return data_service.find_limited(
+		criteria, [EntitySortColumn(name=TopicDataColumnNames.ID.value, method=EntitySortMethod.ASC)], chunk_size)
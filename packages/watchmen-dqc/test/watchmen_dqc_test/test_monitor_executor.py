@@ -0,0 +1,167 @@
+from datetime import date
+from threading import Lock
+from time import sleep
+from typing import Dict, List, Optional, Set, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import PrincipalService
+from watchmen_dqc.monitor.monitor_executor import DataSourceSemaphores, run_monitor_tasks
+from watchmen_dqc.monitor.rules_runner import MonitorRulesRunner, run_monitor_rules
+from watchmen_meta.dqc import MonitorJobLockService
+from watchmen_model.admin import Topic
+from watchmen_model.dqc import MonitorJobLock, MonitorRule, MonitorRuleStatisticalInterval
+from watchmen_model.dqc.monitor_job_lock import MonitorJobLockStatus
+from watchmen_model.system import Tenant
+from watchmen_storage import immutable_worker_id, SnowflakeGenerator
+
+PROCESS_DATE = date(2023, 1, 1)
+
+
+class FakeStorage:
+	"""
+	lock is unique on topic, frequency and process date, keys in locked are created by other nodes
+	"""
+
+	def __init__(self, locked: Set[Tuple[str, MonitorRuleStatisticalInterval, date]]):
+		self.lock = Lock()
+		self.locked = locked
+		self.inserted: List[str] = []
+		self.updated: List[Tuple[str, MonitorJobLockStatus]] = []
+
+	def begin(self):
+		pass
+
+	def commit_and_close(self):
+		pass
+
+	def rollback_and_close(self):
+		pass
+
+	# noinspection PyUnusedLocal
+	def insert_one(self, lock: MonitorJobLock, helper):
+		with self.lock:
+			key = (lock.topicId, lock.frequency, lock.processDate)
+			if key in self.locked:
+				raise Exception('Duplicated lock.')
+			self.locked.add(key)
+			self.inserted.append(lock.topicId)
+
+	# noinspection PyUnusedLocal
+	def update_one(self, lock: MonitorJobLock, helper) -> int:
+		with self.lock:
+			self.updated.append((lock.topicId, lock.status))
+		return 1
+
+
+class FakeDataService:
+	def __init__(self, data_source_id: str):
+		self.topic = Topic(topicId='1', dataSourceId=data_source_id)
+
+	def get_topic(self) -> Topic:
+		return self.topic
+
+
+class ConcurrencyTracker:
+	def __init__(self):
+		self.lock = Lock()
+		self.running: Dict[str, int] = {}
+		self.max: Dict[str, int] = {}
+		self.max_total = 0
+
+	def run(self, data_source_id: str):
+		with self.lock:
+			self.running[data_source_id] = self.running.get(data_source_id, 0) + 1
+			self.max[data_source_id] = max(self.max.get(data_source_id, 0), self.running[data_source_id])
+			self.max_total = max(self.max_total, sum(self.running.values()))
+		sleep(0.1)
+		with self.lock:
+			self.running[data_source_id] = self.running[data_source_id] - 1
+
+
+def run_monitor_rules_on(
+		storage: FakeStorage, topic_ids: List[str], fail_on: Optional[str] = None) -> List[str]:
+	"""
+	returns topic ids which rules run on
+	"""
+	ran: List[str] = []
+
+	# noinspection PyUnusedLocal
+	def run(runner: MonitorRulesRunner, process_date: date, topic_id: str, frequency) -> None:
+		ran.append(topic_id)
+		if topic_id == fail_on:
+			raise Exception('Monitor failed.')
+
+	def get_lock_service(principal_service: PrincipalService) -> MonitorJobLockService:
+		# noinspection PyTypeChecker
+		return MonitorJobLockService(storage, SnowflakeGenerator(0, immutable_worker_id(1)), principal_service)
+
+	with patch('watchmen_dqc.monitor.rules_runner.find_all_tenants', return_value=[Tenant(tenantId='1')]), \
+			patch('watchmen_dqc.monitor.rules_runner.find_all_topics',
+			      return_value=[Topic(topicId=topic_id, tenantId='1') for topic_id in topic_ids]), \
+			patch('watchmen_dqc.monitor.rules_runner.get_lock_service', get_lock_service), \
+			patch.object(MonitorRulesRunner, 'run', run):
+		run_monitor_rules(PROCESS_DATE, MonitorRuleStatisticalInterval.DAILY)
+	return ran
+
+
+class MonitorExecutorTest(TestCase):
+	def test_skip_job_locked(self):
+		storage = FakeStorage({('2', MonitorRuleStatisticalInterval.DAILY, PROCESS_DATE)})
+		ran = run_monitor_rules_on(storage, ['1', '2', '3'])
+
+		self.assertEqual(sorted(ran), ['1', '3'])
+		# lock is created once, and status is updated on it
+		self.assertEqual(sorted(storage.inserted), ['1', '3'])
+		self.assertEqual(
+			sorted(storage.updated), [('1', MonitorJobLockStatus.SUCCESS), ('3', MonitorJobLockStatus.SUCCESS)])
+
+	def test_job_failed(self):
+		storage = FakeStorage(set())
+		ran = run_monitor_rules_on(storage, ['1', '2'], fail_on='2')
+
+		self.assertEqual(sorted(ran), ['1', '2'])
+		self.assertEqual(
+			sorted(storage.updated), [('1', MonitorJobLockStatus.SUCCESS), ('2', MonitorJobLockStatus.FAILED)])
+
+	def test_concurrency_bounded_by_data_source(self):
+		tracker = ConcurrencyTracker()
+		topics = [('1', 'ds1'), ('2', 'ds1'), ('3', 'ds1'), ('4', 'ds1'), ('5', 'ds1'), ('6', 'ds2'), ('7', 'ds2')]
+		data_sources = dict(topics)
+		rules = [MonitorRule(topicId='1', params={'statisticalInterval': MonitorRuleStatisticalInterval.DAILY})]
+
+		# noinspection PyUnusedLocal
+		def get_topic_data_service(runner: MonitorRulesRunner, topic_id: str, rules_count: int):
+			return True, FakeDataService(data_sources[topic_id])
+
+		# noinspection PyUnusedLocal
+		def run_on_topic_and_frequency(runner: MonitorRulesRunner, data_service: FakeDataService, *args):
+			tracker.run(data_service.get_topic().dataSourceId)
+
+		# noinspection PyTypeChecker
+		runner = MonitorRulesRunner(None)
+		with patch('watchmen_dqc.monitor.monitor_executor.ask_monitor_data_source_concurrency', return_value=2), \
+				patch('watchmen_dqc.monitor.rules_runner.ask_data_source_semaphore', DataSourceSemaphores().ask), \
+				patch.object(MonitorRulesRunner, 'get_topic_data_service', get_topic_data_service), \
+				patch.object(MonitorRulesRunner, 'run_on_topic_and_frequency', run_on_topic_and_frequency):
+			run_monitor_tasks(
+				[(lambda x=topic_id: runner.run_on_topic(x, PROCESS_DATE, rules)) for topic_id, _ in topics],
+				workers=len(topics))
+
+		self.assertEqual(tracker.max['ds1'], 2)
+		self.assertEqual(tracker.max['ds2'], 2)
+		# data sources are not blocked by each other
+		self.assertGreater(tracker.max_total, 2)
+		self.assertEqual(tracker.running, {'ds1': 0, 'ds2': 0})
+
+	def test_run_all_tasks_when_failed(self):
+		ran: List[int] = []
+
+		def task(index: int) -> None:
+			ran.append(index)
+			if index % 2 == 1:
+				raise Exception(f'Task[{index}] failed.')
+
+		with self.assertRaises(Exception):
+			run_monitor_tasks([(lambda index=index: task(index)) for index in range(4)], workers=2)
+		self.assertEqual(sorted(ran), [0, 1, 2, 3])
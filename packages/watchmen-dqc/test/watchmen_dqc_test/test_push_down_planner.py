@@ -0,0 +1,188 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_dqc.monitor.rule import rules_controller
+from watchmen_dqc.monitor.rule.push_down_planner import plan_push_down, run_push_down_rules
+from watchmen_dqc.monitor.rule.types import RuleResult
+from watchmen_model.admin import Factor, FactorType, Topic, TopicKind, TopicType
+from watchmen_model.dqc import MonitorRule, MonitorRuleCode, MonitorRuleParameters
+from watchmen_storage import EntityColumnAggregateArithmetic, EntityCriteria, EntityStraightAggregateColumn
+
+DATE_RANGE = (datetime(2022, 1, 1), datetime(2022, 1, 31))
+
+
+class FakeStorage:
+	def __init__(self, supported: Set[EntityColumnAggregateArithmetic]):
+		self.supported = supported
+
+	def is_straight_aggregate_supported(self, arithmetic: EntityColumnAggregateArithmetic) -> bool:
+		return arithmetic in self.supported
+
+
+class FakeDataEntityHelper:
+	# noinspection PyMethodMayBeStatic
+	def get_column_name(self, factor_name: str) -> str:
+		return factor_name.lower()
+
+
+class FakeTopicDataService:
+	def __init__(
+			self, supported: Set[EntityColumnAggregateArithmetic],
+			values: Optional[Dict[str, Any]] = None, fail: bool = False):
+		self.topic = Topic(
+			topicId='1', name='orders', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS, tenantId='1',
+			factors=[
+				Factor(factorId='1', name='orderAmount', type=FactorType.NUMBER),
+				Factor(factorId='2', name='remark', type=FactorType.TEXT)
+			])
+		self.storage = FakeStorage(supported)
+		self.values = values or {}
+		self.fail = fail
+		self.queries: List[List[EntityStraightAggregateColumn]] = []
+		self.criteria: List[EntityCriteria] = []
+
+	def get_topic(self) -> Topic:
+		return self.topic
+
+	def get_storage(self) -> FakeStorage:
+		return self.storage
+
+	# noinspection PyMethodMayBeStatic
+	def get_data_entity_helper(self) -> FakeDataEntityHelper:
+		return FakeDataEntityHelper()
+
+	# noinspection PyMethodMayBeStatic
+	def get_principal_service(self) -> None:
+		return None
+
+	def find_straight_values(
+			self, criteria: EntityCriteria, columns: List[EntityStraightAggregateColumn]) -> List[Dict[str, Any]]:
+		if self.fail:
+			raise Exception('Aggregate query failed.')
+		self.queries.append(columns)
+		self.criteria.append(criteria)
+		return [{column.alias: self.values.get(column.alias) for column in columns}]
+
+
+ALL_SUPPORTED = {
+	EntityColumnAggregateArithmetic.AVG, EntityColumnAggregateArithmetic.MAX, EntityColumnAggregateArithmetic.MIN,
+	EntityColumnAggregateArithmetic.STDDEV, EntityColumnAggregateArithmetic.MEDIAN,
+	EntityColumnAggregateArithmetic.NULL_COUNT
+}
+
+
+def create_rule(
+		rule_id: str, code: MonitorRuleCode, factor_id: Optional[str] = '1',
+		min_value: Optional[int] = None, max_value: Optional[int] = None,
+		coverage_rate: Optional[int] = None) -> MonitorRule:
+	return MonitorRule(
+		ruleId=rule_id, code=code, topicId='1', factorId=factor_id, enabled=True,
+		params=MonitorRuleParameters(min=min_value, max=max_value, coverageRate=coverage_rate))
+
+
+class PushDownPlannerTest(TestCase):
+	def test_plan(self):
+		data_service = FakeTopicDataService(ALL_SUPPORTED)
+		rules = [
+			create_rule('1', MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE),
+			create_rule('2', MonitorRuleCode.FACTOR_MEDIAN_NOT_IN_RANGE),
+			create_rule('3', MonitorRuleCode.FACTOR_QUANTILE_NOT_IN_RANGE),
+			create_rule('4', MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE),
+			# not an aggregate rule
+			create_rule('5', MonitorRuleCode.FACTOR_IS_EMPTY),
+			# null count is not accurate on text, empty string is treated as empty
+			create_rule('6', MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE, '2'),
+			# factor not found, ignored
+			create_rule('7', MonitorRuleCode.FACTOR_MAX_NOT_IN_RANGE, '3')
+		]
+		# noinspection PyTypeChecker
+		plan = plan_push_down(data_service, rules)
+		self.assertEqual([column.rule.ruleId for column in plan.columns], ['1', '2', '3', '4'])
+		self.assertEqual([column.alias for column in plan.columns], ['pd_0', 'pd_1', 'pd_2', 'pd_3'])
+		self.assertEqual(
+			[column.to_straight_column().arithmetic for column in plan.columns], [
+				EntityColumnAggregateArithmetic.AVG, EntityColumnAggregateArithmetic.MEDIAN,
+				EntityColumnAggregateArithmetic.MEDIAN, EntityColumnAggregateArithmetic.NULL_COUNT
+			])
+		self.assertTrue(all(column.columnName == 'orderamount' for column in plan.columns))
+		self.assertEqual([rule.ruleId for rule in plan.rest], ['5', '6'])
+
+	def test_fall_back_when_not_supported(self):
+		data_service = FakeTopicDataService({EntityColumnAggregateArithmetic.AVG})
+		rules = [
+			create_rule('1', MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE),
+			create_rule('2', MonitorRuleCode.FACTOR_STDEV_NOT_IN_RANGE),
+			create_rule('3', MonitorRuleCode.FACTOR_MEDIAN_NOT_IN_RANGE),
+			create_rule('4', MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE)
+		]
+		# noinspection PyTypeChecker
+		plan = plan_push_down(data_service, rules)
+		self.assertEqual([column.rule.ruleId for column in plan.columns], ['1'])
+		self.assertEqual([rule.ruleId for rule in plan.rest], ['2', '3', '4'])
+
+	def test_run(self):
+		data_service = FakeTopicDataService(
+			ALL_SUPPORTED, {'pd_0': 5, 'pd_1': 100, 'pd_2': None, 'pd_3': 30})
+		rules = [
+			create_rule('1', MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE, min_value=0, max_value=10),
+			create_rule('2', MonitorRuleCode.FACTOR_MAX_NOT_IN_RANGE, min_value=0, max_value=10),
+			create_rule('3', MonitorRuleCode.FACTOR_STDEV_NOT_IN_RANGE, min_value=0, max_value=10),
+			create_rule('4', MonitorRuleCode.FACTOR_EMPTY_OVER_COVERAGE, coverage_rate=20)
+		]
+		# noinspection PyTypeChecker
+		plan = plan_push_down(data_service, rules)
+		# noinspection PyTypeChecker
+		results = run_push_down_rules(data_service, plan, DATE_RANGE, 100)
+		self.assertEqual([(rule.ruleId, result) for rule, result in results], [
+			('1', RuleResult.SUCCESS),
+			('2', RuleResult.FAILED),
+			# no data in range
+			('3', RuleResult.SUCCESS),
+			# 30% empty, over coverage
+			('4', RuleResult.SUCCESS)
+		])
+		# one query on date range, one on all data
+		self.assertEqual([[column.alias for column in columns] for columns in data_service.queries], [
+			['pd_0', 'pd_1', 'pd_2'], ['pd_3']
+		])
+		self.assertEqual(len(data_service.criteria[0]), 2)
+		self.assertEqual(data_service.criteria[1], [])
+
+	def test_controller_falls_back_when_query_failed(self):
+		data_service = FakeTopicDataService(ALL_SUPPORTED, fail=True)
+		rules = [
+			create_rule('1', MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE, min_value=0, max_value=10),
+			create_rule('2', MonitorRuleCode.FACTOR_MAX_NOT_IN_RANGE, min_value=0, max_value=10)
+		]
+		ran: List[str] = []
+
+		# noinspection PyUnusedLocal
+		def run_rule(a_data_service, rule: MonitorRule, *args) -> RuleResult:
+			ran.append(rule.ruleId)
+			return RuleResult.FAILED
+
+		triggered: List[str] = []
+		with patch.dict(rules_controller.in_storage_rules_map, {
+			MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE: run_rule,
+			MonitorRuleCode.FACTOR_MAX_NOT_IN_RANGE: run_rule
+		}), patch.object(rules_controller, 'trigger', lambda rule, *args: triggered.append(rule.ruleId)):
+			# noinspection PyTypeChecker
+			rules_controller.run_all_rules(data_service, rules, DATE_RANGE, 10, 100)
+		self.assertEqual(ran, ['1', '2'])
+		self.assertEqual(triggered, ['1', '2'])
+
+	def test_controller_triggers_pushed_down_results(self):
+		data_service = FakeTopicDataService(ALL_SUPPORTED, {'pd_0': 5})
+		rules = [create_rule('1', MonitorRuleCode.FACTOR_AVG_NOT_IN_RANGE, min_value=0, max_value=10)]
+		triggered: List[Any] = []
+
+		# noinspection PyUnusedLocal
+		def trigger(rule: MonitorRule, result: RuleResult, *args) -> None:
+			triggered.append((rule.ruleId, result))
+
+		with patch.object(rules_controller, 'trigger', trigger):
+			# noinspection PyTypeChecker
+			rules_controller.run_all_rules(data_service, rules, DATE_RANGE, 10, 100)
+		self.assertEqual(triggered, [('1', RuleResult.SUCCESS)])
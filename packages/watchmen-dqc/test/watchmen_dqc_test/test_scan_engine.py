@@ -0,0 +1,70 @@
+from datetime import datetime
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from watchmen_dqc.monitor.rule.scan_engine import FactorScanBuffer, run_scan_rules, scan_topic_data
+from watchmen_dqc.monitor.rule.types import RuleResult
+from watchmen_model.admin import Factor, FactorType, Topic, TopicKind, TopicType
+from watchmen_model.dqc import MonitorRule, MonitorRuleCode, MonitorRuleParameters
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_storage import EntityCriteria, EntitySort
+
+
+class FakeTopicDataService:
+	"""
+	returns deserialized rows, keyed by factor name
+	"""
+
+	def __init__(self, topic: Topic, rows: List[Dict[str, Any]]):
+		self.topic = topic
+		self.rows = rows
+		self.queries = 0
+
+	def get_topic(self) -> Topic:
+		return self.topic
+
+	# noinspection PyUnusedLocal
+	def find_limited(self, criteria: EntityCriteria, sort: EntitySort, limit: int) -> List[Dict[str, Any]]:
+		self.queries = self.queries + 1
+		last_data_id = criteria[-1].right if len(criteria) > 2 else 0
+		return [row for row in self.rows if row[TopicDataColumnNames.ID.value] > last_data_id][:limit]
+
+
+def create_topic() -> Topic:
+	return Topic(
+		topicId='1', name='orders', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS, tenantId='1',
+		factors=[Factor(factorId='1', name='orderAmount', type=FactorType.NUMBER)])
+
+
+def create_rows(values: List[Any]) -> List[Dict[str, Any]]:
+	return [{TopicDataColumnNames.ID.value: index + 1, 'orderAmount': value} for index, value in enumerate(values)]
+
+
+def create_median_rule(min_value: int, max_value: int) -> MonitorRule:
+	return MonitorRule(
+		ruleId='1', code=MonitorRuleCode.FACTOR_MEDIAN_NOT_IN_RANGE, topicId='1', factorId='1', enabled=True,
+		params=MonitorRuleParameters(min=min_value, max=max_value))
+
+
+DATE_RANGE = (datetime(2022, 1, 1), datetime(2022, 1, 31))
+
+
+class ScanEngineTest(TestCase):
+	def test_camel_case_factor(self):
+		topic = create_topic()
+		data_service = FakeTopicDataService(topic, create_rows([1, 2, 'x', None, 2]))
+		buffer = FactorScanBuffer(topic.factors[0], [create_median_rule(0, 3)])
+		# noinspection PyTypeChecker
+		scanned = scan_topic_data(data_service, [buffer], DATE_RANGE, 2)
+		self.assertEqual(scanned, 5)
+		self.assertEqual(data_service.queries, 3)
+		# none is not collected, value cannot be cast is treated as 0
+		self.assertEqual(buffer.get_all_data().tolist(), [1.0, 2.0, 0.0, 2.0])
+
+	def test_median_on_all_rows(self):
+		# median of all rows is 1, median of distinct values is 5
+		data_service = FakeTopicDataService(create_topic(), create_rows([1, 1, 1, 9]))
+		# noinspection PyTypeChecker
+		results = run_scan_rules(data_service, [create_median_rule(0, 3)], DATE_RANGE, 4, 4)
+		self.assertEqual(len(results), 1)
+		self.assertEqual(results[0][1], RuleResult.SUCCESS)
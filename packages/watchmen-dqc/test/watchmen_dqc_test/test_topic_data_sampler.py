@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+from unittest import TestCase
+
+from pydantic import ValidationError
+
+from watchmen_dqc.common import ProfileSampleMode
+from watchmen_dqc.common.settings import DqcSettings
+from watchmen_dqc.topic_profile.topic_data_sampler import TopicDataSampler
+from watchmen_model.admin import Topic, TopicKind, TopicType
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_storage import EntityCriteria, EntityCriteriaOperator, EntitySort, EntityStraightColumn
+
+ID = TopicDataColumnNames.ID.value
+
+
+class FakeTopicDataService:
+	def __init__(self, ids: List[int]):
+		self.topic = Topic(topicId='1', name='orders', type=TopicType.DISTINCT, kind=TopicKind.BUSINESS, tenantId='1')
+		self.rows = [{ID: an_id} for an_id in sorted(ids)]
+
+	def get_topic(self) -> Topic:
+		return self.topic
+
+	# noinspection PyUnusedLocal
+	def find_straight_values(self, criteria: EntityCriteria, columns: List[EntityStraightColumn]) -> List[Dict[str, Any]]:
+		if len(self.rows) == 0:
+			return [{'min_id': None, 'max_id': None, 'count': 0}]
+		return [{'min_id': self.rows[0][ID], 'max_id': self.rows[-1][ID], 'count': len(self.rows)}]
+
+	# noinspection PyUnusedLocal
+	def find_limited(self, criteria: EntityCriteria, sort: EntitySort, limit: int) -> List[Dict[str, Any]]:
+		def matched(row: Dict[str, Any]) -> bool:
+			for expression in criteria:
+				if expression.operator == EntityCriteriaOperator.GREATER_THAN and not row[ID] > expression.right:
+					return False
+				if expression.operator == EntityCriteriaOperator.GREATER_THAN_OR_EQUALS \
+						and not row[ID] >= expression.right:
+					return False
+				if expression.operator == EntityCriteriaOperator.LESS_THAN and not row[ID] < expression.right:
+					return False
+			return True
+
+		return [row for row in self.rows if matched(row)][:limit]
+
+
+class TopicDataSamplerTest(TestCase):
+	def test_first_rows(self):
+		service = FakeTopicDataService(list(range(1, 101)))
+		# noinspection PyTypeChecker
+		rows = TopicDataSampler(service, [], ProfileSampleMode.NONE, row_cap=30, chunk_size=7).sample()
+		self.assertEqual([row[ID] for row in rows], list(range(1, 31)))
+
+	def test_reservoir(self):
+		service = FakeTopicDataService(list(range(1, 101)))
+		# noinspection PyTypeChecker
+		rows = TopicDataSampler(service, [], ProfileSampleMode.RESERVOIR, row_cap=30, chunk_size=7).sample()
+		self.assertEqual(len(rows), 30)
+		self.assertEqual(len(set(row[ID] for row in rows)), 30)
+
+	def test_id_range_on_sparse_ids(self):
+		# 100 slices of width 10000, each has 2 rows at the very start of slice, as snowflake ids are sparse
+		ids = [index * 10000 + offset for index in range(100) for offset in range(2)]
+		ids.append(999999)
+		service = FakeTopicDataService(ids)
+		for _ in range(10):
+			# noinspection PyTypeChecker
+			rows = TopicDataSampler(service, [], ProfileSampleMode.ID_RANGE, row_cap=100, chunk_size=10).sample()
+			sampled = [row[ID] for row in rows]
+			self.assertEqual(len(sampled), 100)
+			self.assertEqual(len(set(sampled)), 100)
+			# one row from each slice
+			self.assertEqual(sorted(set(an_id // 10000 for an_id in sampled)), list(range(100)))
+
+	def test_id_range_when_less_than_row_cap(self):
+		service = FakeTopicDataService([1, 1000, 1000000])
+		# noinspection PyTypeChecker
+		rows = TopicDataSampler(service, [], ProfileSampleMode.ID_RANGE, row_cap=10, chunk_size=10).sample()
+		self.assertEqual([row[ID] for row in rows], [1, 1000, 1000000])
+
+	def test_invalid_mode_on_settings_load(self):
+		with self.assertRaises(ValidationError):
+			DqcSettings(PROFILE_SAMPLE_MODE='random')
+		self.assertEqual(DqcSettings(PROFILE_SAMPLE_MODE='reservoir').PROFILE_SAMPLE_MODE, ProfileSampleMode.RESERVOIR)
@@ -0,0 +1,51 @@
+from datetime import datetime
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import PrincipalService
+from watchmen_dqc.topic_profile import TopicProfileService
+from watchmen_dqc.topic_profile.topic_profile_service import build_profile_cache_key, topic_profile_cache
+from watchmen_model.admin import User, UserRole
+
+
+def create_principal_service(tenant_id: str) -> PrincipalService:
+	return PrincipalService(User(userId='1', tenantId=tenant_id, name='admin', role=UserRole.ADMIN))
+
+
+class TopicProfileCacheTest(TestCase):
+	def tearDown(self):
+		topic_profile_cache.clear()
+
+	def test_key(self):
+		start_time = datetime(2023, 1, 1)
+		end_time = datetime(2023, 1, 31, 23, 59, 59)
+		self.assertEqual(
+			build_profile_cache_key('1', '100', start_time, end_time),
+			'1-100-2023-01-01T00:00:00-2023-01-31T23:59:59')
+		self.assertNotEqual(
+			build_profile_cache_key('1', '100', start_time, end_time),
+			build_profile_cache_key('2', '100', start_time, end_time))
+		self.assertNotEqual(
+			build_profile_cache_key('1', '100', start_time, end_time),
+			build_profile_cache_key('1', '100', start_time, datetime(2023, 1, 30)))
+
+	def test_cached_by_tenant_topic_and_window(self):
+		start_time = datetime(2023, 1, 1)
+		end_time = datetime(2023, 1, 31)
+		with patch.object(TopicProfileService, 'build', side_effect=lambda *args: {'built': args}) as build:
+			service = TopicProfileService(create_principal_service('1'))
+			profile = service.find('100', start_time, end_time)
+			self.assertIs(service.find('100', start_time, end_time), profile)
+			self.assertEqual(build.call_count, 1)
+
+			service.find('100', start_time, datetime(2023, 1, 30))
+			service.find('101', start_time, end_time)
+			TopicProfileService(create_principal_service('2')).find('100', start_time, end_time)
+			self.assertEqual(build.call_count, 4)
+
+	def test_none_not_cached(self):
+		with patch.object(TopicProfileService, 'build', return_value=None) as build:
+			service = TopicProfileService(create_principal_service('1'))
+			self.assertIsNone(service.find('100', datetime(2023, 1, 1), datetime(2023, 1, 31)))
+			self.assertIsNone(service.find('100', datetime(2023, 1, 1), datetime(2023, 1, 31)))
+			self.assertEqual(build.call_count, 2)
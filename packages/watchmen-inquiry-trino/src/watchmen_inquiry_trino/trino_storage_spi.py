@@ -4,8 +4,8 @@ from typing import Any, Dict, List, Optional
 from watchmen_model.admin import Factor, Topic
 from watchmen_model.common import DataPage
 from watchmen_storage import Entity, EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, \
-	EntityIdHelper, EntityList, EntityPager, EntityStraightValuesFinder, EntityUpdater, FreeAggregatePager, \
-	FreeAggregator, FreeFinder, FreePager, TopicDataStorageSPI
+	EntityIdHelper, EntityLimitedFinder, EntityList, EntityPager, EntityStraightValuesFinder, EntityUpdater, \
+	FreeAggregatePager, FreeAggregator, FreeFinder, FreePager, TopicDataStorageSPI
 from .exception import InquiryTrinoException
 
 
@@ -184,6 +184,12 @@ class TrinoStorageSPI(TopicDataStorageSPI):
 		"""
 		raise InquiryTrinoException('Method[page] does not support by trino storage.')
 
+	def find_limited(self, finder: EntityLimitedFinder) -> EntityList:
+		"""
+		not supported by trino
+		"""
+		raise InquiryTrinoException('Method[find_limited] does not support by trino storage.')
+
 	def exists(self, finder: EntityFinder) -> bool:
 		"""
 		not supported by trino
@@ -1,14 +1,12 @@
-from datetime import date
+from datetime import date, datetime
 from typing import Optional
 
 from watchmen_auth import PrincipalService
 from watchmen_meta.common import StorageService
 from watchmen_model.admin import TopicSnapshotFrequency, TopicSnapshotJobLock, TopicSnapshotJobLockId, \
-	TopicSnapshotSchedulerId
-from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityFinder, EntityHelper, EntityIdHelper, \
-	EntityRow, \
-	EntityShaper, SnowflakeGenerator, \
-	TransactionalStorageSPI
+	TopicSnapshotJobLockStatus, TopicSnapshotSchedulerId
+from watchmen_storage import ColumnNameLiteral, EntityCriteria, EntityCriteriaExpression, EntityFinder, EntityHelper, \
+	EntityIdHelper, EntityRow, EntityShaper, EntityUpdater, SnowflakeGenerator, TransactionalStorageSPI
 from watchmen_utilities import get_current_time_in_seconds
 
 
@@ -23,7 +21,8 @@ class TopicSnapshotJobLockShaper(EntityShaper):
 			'row_count': lock.rowCount,
 			'status': lock.status,
 			'user_id': lock.userId,
-			'created_at': lock.createdAt
+			'created_at': lock.createdAt,
+			'heartbeat_at': lock.heartbeatAt
 		}
 
 	def deserialize(self, row: EntityRow) -> TopicSnapshotJobLock:
@@ -36,7 +35,8 @@ class TopicSnapshotJobLockShaper(EntityShaper):
 			rowCount=row.get('row_count'),
 			status=row.get('status'),
 			userId=row.get('user_id'),
-			createdAt=row.get('created_at')
+			createdAt=row.get('created_at'),
+			heartbeatAt=row.get('heartbeat_at')
 		)
 
 
@@ -97,6 +97,7 @@ class TopicSnapshotJobLockService(StorageService):
 	def create(self, lock: TopicSnapshotJobLock) -> TopicSnapshotJobLock:
 		lock.lockId = self.generate_lock_id()
 		lock.createdAt = get_current_time_in_seconds()
+		lock.heartbeatAt = lock.createdAt
 
 		self.storage.insert_one(lock, self.get_entity_helper())
 		return lock
@@ -104,3 +105,58 @@ class TopicSnapshotJobLockService(StorageService):
 	def update(self, lock: TopicSnapshotJobLock) -> TopicSnapshotJobLock:
 		self.storage.update_one(lock, self.get_entity_id_helper())
 		return lock
+
+	def build_ready_lock_criteria(self, lock_id: TopicSnapshotJobLockId) -> EntityCriteria:
+		return [
+			EntityCriteriaExpression(left=ColumnNameLiteral(columnName='lock_id'), right=lock_id),
+			EntityCriteriaExpression(
+				left=ColumnNameLiteral(columnName='status'), right=TopicSnapshotJobLockStatus.READY)
+		]
+
+	def update_row_count(self, lock: TopicSnapshotJobLock, row_count: int, heartbeat_at: datetime) -> int:
+		"""
+		update row count and renew heartbeat, only when lock is ready and still held by given one.
+		created time is renewed when lock is taken over, returns 0 when lock is taken over by others
+		"""
+		return self.storage.update(EntityUpdater(
+			name=self.get_entity_name(),
+			shaper=self.get_entity_shaper(),
+			criteria=[
+				*self.build_ready_lock_criteria(lock.lockId),
+				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='created_at'), right=lock.createdAt)
+			],
+			update={'row_count': row_count, 'heartbeat_at': heartbeat_at}
+		))
+
+	def accomplish(self, lock_id: TopicSnapshotJobLockId, status: TopicSnapshotJobLockStatus) -> int:
+		"""
+		update status only, and only when lock is ready. returns 0 when lock is accomplished already
+		"""
+		return self.storage.update(EntityUpdater(
+			name=self.get_entity_name(),
+			shaper=self.get_entity_shaper(),
+			criteria=self.build_ready_lock_criteria(lock_id),
+			update={'status': status}
+		))
+
+	def take_over(self, lock: TopicSnapshotJobLock, created_at: datetime) -> bool:
+		"""
+		reset lock to ready and renew its created time and heartbeat,
+		only when status, created time and heartbeat are not changed since read.
+		returns false when lock is taken over by others, or renewed by its holder
+		"""
+		criteria = [
+			EntityCriteriaExpression(left=ColumnNameLiteral(columnName='lock_id'), right=lock.lockId),
+			EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right=lock.status),
+			EntityCriteriaExpression(left=ColumnNameLiteral(columnName='created_at'), right=lock.createdAt)
+		]
+		if lock.heartbeatAt is not None:
+			criteria.append(
+				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='heartbeat_at'), right=lock.heartbeatAt))
+		updated_count = self.storage.update(EntityUpdater(
+			name=self.get_entity_name(),
+			shaper=self.get_entity_shaper(),
+			criteria=criteria,
+			update={'status': TopicSnapshotJobLockStatus.READY, 'created_at': created_at, 'heartbeat_at': created_at}
+		))
+		return updated_count == 1
@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from watchmen_meta.common import TupleService, TupleShaper
+from watchmen_meta.common import invalidate_principal_of_user, TupleService, TupleShaper
 from watchmen_model.admin import User, UserRole
 from watchmen_model.common import DataPage, Pageable, TenantId, UserId
 from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityCriteriaJoint, \
@@ -53,6 +53,19 @@ class UserService(TupleService):
 	def get_storable_id_column_name(self) -> str:
 		return 'user_id'
 
+	def update(self, user: User) -> User:
+		# noinspection PyTypeChecker
+		user: User = super().update(user)
+		user_id = user.userId
+		self.run_after_committed(lambda: invalidate_principal_of_user(user_id))
+		return user
+
+	def delete(self, user_id: UserId) -> Optional[User]:
+		# noinspection PyTypeChecker
+		user: Optional[User] = super().delete(user_id)
+		self.run_after_committed(lambda: invalidate_principal_of_user(user_id))
+		return user
+
 	# noinspection DuplicatedCode
 	def find_page_by_text(self, text: Optional[str], tenant_id: Optional[TenantId], pageable: Pageable) -> DataPage:
 		# always ignore super admin
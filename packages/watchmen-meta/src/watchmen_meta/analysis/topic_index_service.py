@@ -88,6 +88,7 @@ class TopicIndexService(StorageService):
 			shaper=FACTOR_INDEX_ENTITY_SHAPER,
 			idColumnName='factor_index_id'
 		)
+		to_insert_list: List[FactorIndex] = []
 		for factor_index in current_index_list:
 			if factor_index.factorId in index_map:
 				old_factor_index = index_map[factor_index.factorId]
@@ -95,7 +96,8 @@ class TopicIndexService(StorageService):
 				factor_index.createdAt = old_factor_index.createdAt
 				self.storage.update_one(factor_index, entity_id_helper)
 			else:
-				self.storage.insert_one(factor_index, entity_id_helper)
+				to_insert_list.append(factor_index)
+		self.storage.insert_all(to_insert_list, entity_id_helper)
 		current_factor_ids = ArrayHelper(current_index_list).map(lambda x: x.factorId).to_list()
 		to_remove_list: List[FactorIndex] = ArrayHelper(list(index_map.values())) \
 			.filter(lambda x: x.factorId not in current_factor_ids).to_list()
@@ -1,8 +1,8 @@
 from datetime import datetime
-from typing import Callable, Optional
+from typing import Callable, Optional, Tuple
 
 from watchmen_meta.admin.user_service import USER_ENTITY_NAME, USER_ENTITY_SHAPER
-from watchmen_meta.common import ask_meta_storage
+from watchmen_meta.common import ask_meta_storage, ask_principal_cache
 from watchmen_meta.system.pat_service import PAT_ENTITY_NAME, PAT_ENTITY_SHAPER
 from watchmen_model.admin import User
 from watchmen_model.system import PersonalAccessToken
@@ -39,10 +39,28 @@ def find_user_by_name(storage: TransactionalStorageSPI, username: str, clear_pwd
 		storage.close()
 
 
+def find_user_by_name_with_cache(username: str) -> Optional[User]:
+	cache = ask_principal_cache()
+	if cache is None or username is None:
+		return find_user_by_name(ask_meta_storage(), username, True)
+
+	key = cache.to_name_key(username)
+	user = cache.get(key)
+	if user is not None:
+		return user
+	user = find_user_by_name(ask_meta_storage(), username, True)
+	if user is not None:
+		cache.put(key, user)
+	return user
+
+
 def build_find_user_by_name(clear_pwd: bool = True) -> Callable[[str], Optional[User]]:
 	"""
-	autonomous transaction inside
+	autonomous transaction inside.
+	user is cached when password is cleared, user with password is always loaded from storage
 	"""
+	if clear_pwd:
+		return find_user_by_name_with_cache
 	return lambda username: find_user_by_name(ask_meta_storage(), username, clear_pwd)
 
 
@@ -68,29 +86,52 @@ def find_pat_by_token(storage: TransactionalStorageSPI, pat_token: str) -> Optio
 	return pat
 
 
-def find_user_by_pat(storage: TransactionalStorageSPI, pat_token: str) -> Optional[User]:
-	"""
-	find unexpired pat, find active user. Otherwise, return none
-	"""
-
+def find_user_and_pat_by_pat(
+		storage: TransactionalStorageSPI, pat_token: str) -> Tuple[Optional[User], Optional[PersonalAccessToken]]:
 	storage.begin()
 	try:
 		pat = find_pat_by_token(storage, pat_token)
 		if pat is None:
-			return None
+			return None, None
 		# noinspection PyTypeChecker
 		user: User = storage.find_by_id(pat.userId, EntityIdHelper(
 			name=USER_ENTITY_NAME,
 			shaper=USER_ENTITY_SHAPER,
 			idColumnName='user_id'
 		))
-		return redress_user(user, True)
+		return redress_user(user, True), pat
 	finally:
 		storage.close()
 
 
+def find_user_by_pat(storage: TransactionalStorageSPI, pat_token: str) -> Optional[User]:
+	"""
+	find unexpired pat, find active user. Otherwise, return none
+	"""
+	user, _ = find_user_and_pat_by_pat(storage, pat_token)
+	return user
+
+
+def find_user_by_pat_with_cache(pat_token: str) -> Optional[User]:
+	"""
+	cached user expires when pat expired
+	"""
+	cache = ask_principal_cache()
+	if cache is None or pat_token is None or len(pat_token.strip()) == 0:
+		return find_user_by_pat(ask_meta_storage(), pat_token)
+
+	key = cache.to_pat_key(pat_token)
+	user = cache.get(key)
+	if user is not None:
+		return user
+	user, pat = find_user_and_pat_by_pat(ask_meta_storage(), pat_token)
+	if user is not None:
+		cache.put(key, user, pat.expired, pat.patId)
+	return user
+
+
 def build_find_user_by_pat() -> Callable[[str], Optional[User]]:
 	"""
 	autonomous transaction inside
 	"""
-	return lambda pat_token: find_user_by_pat(ask_meta_storage(), pat_token)
+	return find_user_by_pat_with_cache
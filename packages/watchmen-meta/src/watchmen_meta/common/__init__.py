@@ -1,7 +1,9 @@
 from .exception import InitialMetaAppException
 from .last_visit_service import LastVisitShaper
+from .principal_cache import ask_principal_cache, invalidate_principal_of_pat, invalidate_principal_of_user, \
+	PrincipalCache
 from .settings import ask_datasource_aes_enabled, ask_datasource_aes_params, ask_engine_index_enabled, \
-	ask_meta_storage, ask_snowflake_generator, ask_super_admin, MetaSettings
+	ask_meta_storage, ask_principal_cache_enabled, ask_snowflake_generator, ask_super_admin, MetaSettings
 from .storage_service import EntityService, IdentifiedStorableService, StorageService, TupleNotFoundException
 from .tuple_service import AuditableShaper, OptimisticLockShaper, TupleService, TupleShaper
 from .user_based_tuple_service import UserBasedTupleService, UserBasedTupleShaper
@@ -0,0 +1,130 @@
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime, timedelta
+from hashlib import sha256
+from threading import RLock
+from typing import Optional
+
+from watchmen_model.admin import User
+from watchmen_model.common import PatId, UserId
+from .settings import ask_principal_cache_enabled, ask_principal_cache_size, ask_principal_cache_ttl
+
+
+def to_local_naive(value: datetime) -> datetime:
+	"""
+	aware datetime is converted to local time, naive datetime is treated as local time already
+	"""
+	if value.tzinfo is None:
+		return value
+	return value.astimezone().replace(tzinfo=None)
+
+
+class PrincipalCacheEntry:
+	def __init__(self, user: User, expires_at: datetime, pat_id: Optional[PatId] = None):
+		self.user = user
+		self.expiresAt = expires_at
+		self.patId = pat_id
+
+
+class PrincipalCache:
+	"""
+	bounded cache of authenticated users, least recently used entry is evicted when full.
+	entry is invalidated explicitly when user or pat changed on current node,
+	and expired in ttl anyway, for changes made on other nodes.
+	"""
+
+	def __init__(self, maxsize: Optional[int] = None, ttl: Optional[int] = None):
+		self.maxsize = ask_principal_cache_size() if maxsize is None else maxsize
+		self.ttl = timedelta(seconds=ask_principal_cache_ttl() if ttl is None else ttl)
+		self.entries: OrderedDict[str, PrincipalCacheEntry] = OrderedDict()
+		self.lock = RLock()
+
+	# noinspection PyMethodMayBeStatic
+	def to_pat_key(self, pat_token: str) -> str:
+		"""
+		token is hashed, never keep plain token in memory longer than needed
+		"""
+		return f'pat-{sha256(pat_token.encode("utf-8")).hexdigest()}'
+
+	# noinspection PyMethodMayBeStatic
+	def to_name_key(self, username: str) -> str:
+		return f'name-{username}'
+
+	def get(self, key: str) -> Optional[User]:
+		with self.lock:
+			entry = self.entries.get(key)
+			if entry is None:
+				return None
+			if entry.expiresAt <= datetime.now():
+				del self.entries[key]
+				return None
+			self.entries.move_to_end(key)
+			# copy it, avoid cached one changed by caller
+			return deepcopy(entry.user)
+
+	def put(
+			self, key: str, user: User,
+			expired: Optional[datetime] = None, pat_id: Optional[PatId] = None) -> None:
+		"""
+		entry expires in ttl, or at given expired time when it is earlier
+		"""
+		if self.maxsize <= 0:
+			return
+		expires_at = datetime.now() + self.ttl
+		if expired is not None and to_local_naive(expired) < expires_at:
+			expires_at = to_local_naive(expired)
+		with self.lock:
+			self.entries[key] = PrincipalCacheEntry(deepcopy(user), expires_at, pat_id)
+			self.entries.move_to_end(key)
+			while len(self.entries) > self.maxsize:
+				self.entries.popitem(last=False)
+
+	def remove_by_user(self, user_id: Optional[UserId]) -> None:
+		if user_id is None:
+			return
+		with self.lock:
+			keys = [key for key, entry in self.entries.items() if entry.user.userId == user_id]
+			for key in keys:
+				del self.entries[key]
+
+	def remove_by_pat(self, pat_id: Optional[PatId]) -> None:
+		if pat_id is None:
+			return
+		with self.lock:
+			keys = [key for key, entry in self.entries.items() if entry.patId == pat_id]
+			for key in keys:
+				del self.entries[key]
+
+	def clear(self) -> None:
+		with self.lock:
+			self.entries.clear()
+
+
+class PrincipalCacheHolder:
+	cache: Optional[PrincipalCache] = None
+
+
+principal_cache_holder = PrincipalCacheHolder()
+
+
+def ask_principal_cache() -> Optional[PrincipalCache]:
+	"""
+	returns none when principal cache is disabled
+	"""
+	if not ask_principal_cache_enabled():
+		return None
+	if principal_cache_holder.cache is None:
+		principal_cache_holder.cache = PrincipalCache()
+	return principal_cache_holder.cache
+
+
+def invalidate_principal_of_user(user_id: Optional[UserId]) -> None:
+	cache = ask_principal_cache()
+	if cache is not None:
+		cache.remove_by_user(user_id)
+
+
+def invalidate_principal_of_pat(pat_id: Optional[PatId]) -> None:
+	cache = ask_principal_cache()
+	if cache is not None:
+		cache.remove_by_pat(pat_id)
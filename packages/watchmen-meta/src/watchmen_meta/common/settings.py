@@ -41,6 +41,10 @@ class MetaSettings(BaseSettings):
 
 	ENGINE_INDEX: bool = True
 
+	PRINCIPAL_CACHE: bool = False  # cache authenticated users by pat and name
+	PRINCIPAL_CACHE_SIZE: int = 1024  # max users cached
+	PRINCIPAL_CACHE_TTL: int = 60  # cached user expires, in seconds
+
 	class Config:
 		# secrets_dir = '/var/run'
 		env_file = '.env'
@@ -203,3 +207,15 @@ def ask_datasource_aes_params() -> Tuple[str, str]:
 
 def ask_engine_index_enabled() -> bool:
 	return settings.ENGINE_INDEX
+
+
+def ask_principal_cache_enabled() -> bool:
+	return settings.PRINCIPAL_CACHE
+
+
+def ask_principal_cache_size() -> int:
+	return settings.PRINCIPAL_CACHE_SIZE
+
+
+def ask_principal_cache_ttl() -> int:
+	return settings.PRINCIPAL_CACHE_TTL
@@ -2,7 +2,8 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import List, Optional, Tuple, TypeVar
+from typing import Callable, List, Optional, Tuple, TypeVar
+from weakref import WeakKeyDictionary
 
 from watchmen_auth import PrincipalService
 from watchmen_model.common import Auditable, OptimisticLock, Pageable, Storable, UserId
@@ -19,6 +20,12 @@ class TupleNotFoundException(Exception):
 	pass
 
 
+# actions run after transaction committed, by storage.
+# kept on storage since services might share one storage, and transaction is begun by one of them only
+committed_actions_of_storage: WeakKeyDictionary[TransactionalStorageSPI, List[Callable[[], None]]] = \
+	WeakKeyDictionary()
+
+
 class StorageService(ABC):
 	storage: TransactionalStorageSPI
 	principalService: Optional[PrincipalService] = None
@@ -37,16 +44,33 @@ class StorageService(ABC):
 
 	def begin_transaction(self):
 		self.storage.begin()
+		committed_actions_of_storage[self.storage] = []
 
 	def commit_transaction(self):
 		self.storage.commit_and_close()
+		actions = committed_actions_of_storage.pop(self.storage, [])
+		for action in actions:
+			action()
 
 	def rollback_transaction(self):
+		committed_actions_of_storage.pop(self.storage, None)
 		self.storage.rollback_and_close()
 
 	def close_transaction(self):
+		committed_actions_of_storage.pop(self.storage, None)
 		self.storage.close()
 
+	def run_after_committed(self, action: Callable[[], None]) -> None:
+		"""
+		run given action after transaction of storage committed, or immediately when not in transaction.
+		transaction might be begun by another service which shares the storage
+		"""
+		actions = committed_actions_of_storage.get(self.storage)
+		if actions is None:
+			action()
+		else:
+			actions.append(action)
+
 	# noinspection PyMethodMayBeStatic
 	def now(self) -> datetime:
 		"""
@@ -77,3 +77,7 @@ class MonitorJobLockService(StorageService):
 
 		self.storage.insert_one(lock, self.get_entity_helper())
 		return lock
+
+	def update_status(self, lock: MonitorJobLock) -> MonitorJobLock:
+		self.storage.update_one(lock, self.get_entity_id_helper())
+		return lock
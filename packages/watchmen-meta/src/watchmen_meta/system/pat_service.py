@@ -1,7 +1,7 @@
 from typing import List, Optional
 
 from watchmen_auth import PrincipalService
-from watchmen_meta.common import StorageService
+from watchmen_meta.common import invalidate_principal_of_pat, StorageService
 from watchmen_model.common import PatId, TenantId, UserId
 from watchmen_model.system import PersonalAccessToken
 from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityFinder, EntityHelper, EntityIdHelper, \
@@ -114,3 +114,4 @@ class PatService(StorageService):
 			shaper=self.get_entity_shaper(),
 			idColumnName=self.get_pat_id_column_name()
 		))
+		self.run_after_committed(lambda: invalidate_principal_of_pat(pat_id))
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+from typing import List
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_meta.admin import UserGroupService, UserService
+from watchmen_meta.common import PrincipalCache
+from watchmen_meta.common.principal_cache import principal_cache_holder
+from watchmen_meta.system import PatService
+from watchmen_model.admin import User, UserRole
+
+
+def create_user(user_id: str) -> User:
+	return User(userId=user_id, tenantId='1', name=f'user-{user_id}', role=UserRole.ADMIN, isActive=True)
+
+
+class FakeStorage:
+	def __init__(self):
+		self.calls: List[str] = []
+
+	def begin(self):
+		self.calls.append('begin')
+
+	def commit_and_close(self):
+		self.calls.append('commit')
+
+	def rollback_and_close(self):
+		self.calls.append('rollback')
+
+	# noinspection PyUnusedLocal
+	def delete_by_id(self, entity_id, helper):
+		self.calls.append('delete')
+
+	# noinspection PyUnusedLocal
+	def update_only(self, updater):
+		self.calls.append('update')
+		return 1
+
+
+class FakePrincipalService:
+	# noinspection PyMethodMayBeStatic
+	def get_user_id(self) -> str:
+		return '0'
+
+
+class PrincipalCacheTest(TestCase):
+	def tearDown(self):
+		principal_cache_holder.cache = None
+
+	def test_lru(self):
+		cache = PrincipalCache(maxsize=2, ttl=60)
+		cache.put('a', create_user('1'))
+		cache.put('b', create_user('2'))
+		self.assertEqual(cache.get('a').userId, '1')
+		cache.put('c', create_user('3'))
+		# b is least recently used
+		self.assertIsNone(cache.get('b'))
+		self.assertIsNotNone(cache.get('a'))
+		self.assertIsNotNone(cache.get('c'))
+
+	def test_copied(self):
+		cache = PrincipalCache(maxsize=10, ttl=60)
+		user = create_user('1')
+		cache.put('a', user)
+		user.name = 'changed'
+		cached = cache.get('a')
+		self.assertEqual(cached.name, 'user-1')
+		cached.name = 'changed'
+		self.assertEqual(cache.get('a').name, 'user-1')
+
+	def test_expired_in_utc(self):
+		cache = PrincipalCache(maxsize=10, ttl=60)
+		# expired already, in aware utc time
+		cache.put('a', create_user('1'), datetime.now(timezone.utc) - timedelta(seconds=1))
+		self.assertIsNone(cache.get('a'))
+		cache.put('b', create_user('2'), datetime.now(timezone.utc) + timedelta(seconds=30))
+		self.assertIsNotNone(cache.get('b'))
+		# naive is treated as local time
+		cache.put('c', create_user('3'), datetime.now() - timedelta(seconds=1))
+		self.assertIsNone(cache.get('c'))
+
+	def test_remove(self):
+		cache = PrincipalCache(maxsize=10, ttl=60)
+		cache.put('a', create_user('1'), None, '100')
+		cache.put('b', create_user('1'))
+		cache.put('c', create_user('2'), None, '200')
+		cache.remove_by_pat('200')
+		self.assertIsNone(cache.get('c'))
+		cache.remove_by_user('1')
+		self.assertEqual(len(cache.entries), 0)
+
+	@patch('watchmen_meta.common.principal_cache.ask_principal_cache_enabled', return_value=True)
+	def test_invalidate_after_committed(self, _):
+		cache = PrincipalCache(maxsize=10, ttl=60)
+		principal_cache_holder.cache = cache
+		cache.put('a', create_user('1'), None, '100')
+
+		storage = FakeStorage()
+		pat_service = PatService(storage, None, None)
+		pat_service.begin_transaction()
+		pat_service.delete_by_id('100')
+		# still cached before committed
+		self.assertIsNotNone(cache.get('a'))
+		pat_service.commit_transaction()
+		self.assertIsNone(cache.get('a'))
+
+		cache.put('a', create_user('1'), None, '100')
+		pat_service.begin_transaction()
+		pat_service.delete_by_id('100')
+		pat_service.rollback_transaction()
+		self.assertIsNotNone(cache.get('a'))
+		self.assertEqual(storage.calls, ['begin', 'delete', 'commit', 'begin', 'delete', 'rollback'])
+
+	@patch('watchmen_meta.common.principal_cache.ask_principal_cache_enabled', return_value=True)
+	def test_invalidate_after_committed_by_derived_service(self, _):
+		cache = PrincipalCache(maxsize=10, ttl=60)
+		principal_cache_holder.cache = cache
+		cache.put('a', create_user('1'))
+
+		storage = FakeStorage()
+		# transaction is begun by user group service, user service shares its storage
+		user_group_service = UserGroupService(storage, None, FakePrincipalService())
+		user_service = UserService(
+			user_group_service.storage, user_group_service.snowflakeGenerator, user_group_service.principalService)
+		user_group_service.begin_transaction()
+		user_service.update(create_user('1'))
+		# still cached before committed
+		self.assertIsNotNone(cache.get('a'))
+		user_group_service.commit_transaction()
+		self.assertIsNone(cache.get('a'))
+
+		cache.put('a', create_user('1'))
+		user_group_service.begin_transaction()
+		user_service.update(create_user('1'))
+		user_group_service.rollback_transaction()
+		self.assertIsNotNone(cache.get('a'))
+		self.assertEqual(storage.calls, ['begin', 'update', 'commit', 'begin', 'update', 'rollback'])
+
+		# not in transaction, invalidated immediately
+		user_service.update(create_user('1'))
+		self.assertIsNone(cache.get('a'))
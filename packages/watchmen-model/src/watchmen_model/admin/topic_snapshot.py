@@ -57,3 +57,5 @@ class TopicSnapshotJobLock(Storable):
 	status: TopicSnapshotJobLockStatus = None
 	userId: UserId = None,
 	createdAt: datetime = None
+	# renewed by lock holder while copying, job is treated as crashed when it is not renewed for a while
+	heartbeatAt: Optional[datetime] = None
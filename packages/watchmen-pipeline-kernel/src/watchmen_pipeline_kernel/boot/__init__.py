@@ -1 +1,2 @@
-from .boot import init_prebuilt_external_writers, init_topic_snapshot_jobs
+from .boot import init_compiled_pipelines, init_kernel_caches, init_prebuilt_external_writers, \
+	init_topic_snapshot_jobs
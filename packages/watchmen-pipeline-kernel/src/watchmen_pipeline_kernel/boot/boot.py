@@ -1,16 +1,36 @@
+from watchmen_data_kernel.cache import preload_caches
+from watchmen_data_kernel.common import ask_cache_preload_enabled
 from watchmen_pipeline_kernel.common.settings import ask_elastic_search_writer_enabled, \
-	ask_standard_external_writer_enabled
+	ask_pipeline_compile_warm_up, ask_pipeline_compile_warm_up_tenants, ask_standard_external_writer_enabled
 from watchmen_pipeline_kernel.external_writer import register_elastic_search_external_writer, \
-	register_standard_external_writer
+	register_standard_external_writer, start_external_write_outbox
+from watchmen_pipeline_kernel.pipeline_schema import warm_up_compiled_pipelines
 from watchmen_pipeline_kernel.topic_snapshot import create_periodic_topic_snapshot_jobs
+from watchmen_utilities import ArrayHelper
 
 
 def init_prebuilt_external_writers() -> None:
 	if ask_standard_external_writer_enabled():
 		register_standard_external_writer()
+		start_external_write_outbox()
 	if ask_elastic_search_writer_enabled():
 		register_elastic_search_external_writer()
 
 
 def init_topic_snapshot_jobs() -> None:
 	create_periodic_topic_snapshot_jobs()
+
+
+def init_compiled_pipelines() -> None:
+	if not ask_pipeline_compile_warm_up():
+		return
+	tenant_ids = ask_pipeline_compile_warm_up_tenants()
+	if len(tenant_ids) == 0:
+		warm_up_compiled_pipelines()
+	else:
+		ArrayHelper(tenant_ids).each(lambda x: warm_up_compiled_pipelines(x))
+
+
+def init_kernel_caches() -> None:
+	if ask_cache_preload_enabled():
+		preload_caches()
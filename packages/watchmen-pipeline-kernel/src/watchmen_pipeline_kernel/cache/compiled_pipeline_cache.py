@@ -1,4 +1,7 @@
-from typing import Optional
+from datetime import datetime
+from logging import getLogger
+from threading import RLock
+from typing import Callable, Optional, Tuple
 
 from cacheout import Cache
 
@@ -7,6 +10,15 @@ from watchmen_model.admin import Pipeline
 from watchmen_model.common import PipelineId
 from watchmen_pipeline_kernel.pipeline_schema_interface import CompiledPipeline
 
+logger = getLogger(__name__)
+
+# version and last modified time of pipeline
+CompiledPipelineVersion = Tuple[Optional[int], Optional[datetime]]
+
+
+def get_compiled_pipeline_version(pipeline: Pipeline) -> CompiledPipelineVersion:
+	return pipeline.version, pipeline.lastModifiedAt
+
 
 class CompiledPipelineByIdCache(Cache):
 	pass
@@ -20,25 +32,97 @@ def get_compiled_pipeline_by_id_cache() -> CompiledPipelineByIdCache:
 	return find_cache('COMPILED_PIPELINE_BY_ID')
 
 
+class CompilePipelineMetrics:
+	def __init__(self):
+		self.lock = RLock()
+		# count of compiling
+		self.compiled: int = 0
+		# count of compiled pipeline reused
+		self.reused: int = 0
+		# total and max seconds spent on compiling
+		self.totalSeconds: float = 0
+		self.maxSeconds: float = 0
+
+	def on_compiled(self, seconds: float) -> None:
+		with self.lock:
+			self.compiled = self.compiled + 1
+			self.totalSeconds = self.totalSeconds + seconds
+			self.maxSeconds = max(self.maxSeconds, seconds)
+
+	def on_reused(self) -> None:
+		with self.lock:
+			self.reused = self.reused + 1
+
+	def to_dict(self):
+		return {
+			'compiled': self.compiled, 'reused': self.reused,
+			'totalSeconds': self.totalSeconds, 'maxSeconds': self.maxSeconds
+		}
+
+
 class CompilePipelineCache(PipelineCacheListener):
 	def __init__(self):
 		# noinspection PyTypeChecker
 		self.compiledByIdCache = InternalCache(cache=get_compiled_pipeline_by_id_cache)
+		self.metrics = CompilePipelineMetrics()
 		CacheService.pipeline().add_cache_listener(self)
 
 	def put(self, pipeline_id: PipelineId, compiled: CompiledPipeline) -> Optional[CompiledPipeline]:
-		return self.compiledByIdCache.put(pipeline_id, compiled)
+		"""
+		compiled pipeline is cached with version of its pipeline
+		"""
+		existing = self.compiledByIdCache.put(
+			pipeline_id, (get_compiled_pipeline_version(compiled.get_pipeline()), compiled))
+		return None if existing is None else existing[1]
 
 	def get(self, pipeline_id: PipelineId) -> Optional[CompiledPipeline]:
-		return self.compiledByIdCache.get(pipeline_id)
+		existing = self.compiledByIdCache.get(pipeline_id)
+		return None if existing is None else existing[1]
+
+	def get_by_version(self, pipeline: Pipeline) -> Optional[CompiledPipeline]:
+		"""
+		returns compiled pipeline only when it is compiled from same version of given pipeline
+		"""
+		existing = self.compiledByIdCache.get(pipeline.pipelineId)
+		if existing is None:
+			return None
+		version, compiled = existing
+		return compiled if version == get_compiled_pipeline_version(pipeline) else None
+
+	def compile(
+			self, pipeline: Pipeline,
+			compile_pipeline: Callable[[Pipeline], CompiledPipeline]) -> CompiledPipeline:
+		"""
+		returns cached compiled pipeline when version matched, otherwise compile and cache it
+		"""
+		compiled = self.get_by_version(pipeline)
+		if compiled is not None:
+			self.metrics.on_reused()
+			return compiled
+
+		start = datetime.now()
+		compiled = compile_pipeline(pipeline)
+		seconds = (datetime.now() - start).total_seconds()
+		self.metrics.on_compiled(seconds)
+		logger.debug(
+			f'Pipeline[id={pipeline.pipelineId}, version={pipeline.version}] compiled in {seconds} seconds, '
+			f'metrics[{self.metrics.to_dict()}].')
+		self.put(pipeline.pipelineId, compiled)
+		return compiled
 
 	def remove(self, pipeline_id: PipelineId) -> Optional[CompiledPipeline]:
-		return self.compiledByIdCache.remove(pipeline_id)
+		existing = self.compiledByIdCache.remove(pipeline_id)
+		return None if existing is None else existing[1]
 
 	def on_pipeline_added(self, pipeline: Pipeline) -> None:
 		pass
 
 	def on_pipeline_removed(self, pipeline: Pipeline) -> None:
+		# pipeline cache reloads same definition on heart beat,
+		# keep the compiled one when pipeline is still cached with same version
+		cached = CacheService.pipeline().get(pipeline.pipelineId)
+		if cached is not None and self.get_by_version(cached) is not None:
+			return
 		self.compiledByIdCache.remove(pipeline.pipelineId)
 
 	def on_cache_cleared(self) -> None:
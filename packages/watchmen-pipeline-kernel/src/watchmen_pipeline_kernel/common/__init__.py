@@ -3,4 +3,14 @@ from .settings import ask_async_handle_monitor_log, ask_decrypt_factor_value, as
 	ask_parallel_actions_dask_temp_dir, ask_parallel_actions_dask_use_process, ask_parallel_actions_in_loop_unit, \
 	ask_pipeline_update_retry, ask_pipeline_update_retry_force, ask_pipeline_update_retry_interval, \
 	ask_pipeline_update_retry_times, ask_parallel_actions_dask_threads_per_work, \
-	ask_parallel_actions_use_multithreading
+	ask_parallel_actions_use_multithreading, ask_pipeline_dispatch_max_contexts, ask_pipeline_dispatch_max_depth, \
+	ask_pipeline_dispatch_concurrent, ask_pipeline_dispatch_concurrent_workers, ask_pipeline_dispatch_max_fan_out, \
+	ask_pipeline_compile_warm_up, ask_pipeline_compile_warm_up_tenants, ask_monitor_log_sink_batch_size, \
+	ask_monitor_log_sink_enabled, ask_monitor_log_sink_flush_interval, ask_monitor_log_sink_full_policy, \
+	ask_monitor_log_sink_queue_size, ask_monitor_log_sink_sample_rate, ask_external_write_outbox, \
+	ask_external_write_outbox_batch_size, ask_external_write_outbox_claim_timeout, \
+	ask_external_write_outbox_fetch_size, ask_external_write_outbox_max_retries, \
+	ask_external_write_outbox_poll_interval, ask_external_write_outbox_retry_interval, \
+	ask_external_write_outbox_timeout, ask_external_write_outbox_workers, ask_elastic_search_bulk_flush_interval, \
+	ask_elastic_search_bulk_max_actions, ask_elastic_search_bulk_max_bytes, ask_elastic_search_bulk_max_retries, \
+	ask_elastic_search_bulk_timeout
@@ -1,8 +1,10 @@
 from logging import getLogger
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseSettings
 
+from watchmen_utilities import ArrayHelper, is_blank
+
 logger = getLogger(__name__)
 
 
@@ -16,11 +18,39 @@ class PipelineKernelSettings(BaseSettings):
 	PIPELINE_PARALLEL_ACTIONS_DASK_USE_PROCESS: bool = True
 	PIPELINE_STANDARD_EXTERNAL_WRITER: bool = True
 	PIPELINE_ELASTIC_SEARCH_EXTERNAL_WRITER: bool = False
+	PIPELINE_ELASTIC_SEARCH_BULK_MAX_ACTIONS: int = 1000  # max actions in one bulk request
+	PIPELINE_ELASTIC_SEARCH_BULK_MAX_BYTES: int = 5242880  # max bytes of one bulk request, 5MB
+	PIPELINE_ELASTIC_SEARCH_BULK_FLUSH_INTERVAL: float = 1  # in seconds, buffered actions are sent after
+	PIPELINE_ELASTIC_SEARCH_BULK_MAX_RETRIES: int = 3  # action is dropped after retries
+	PIPELINE_ELASTIC_SEARCH_BULK_TIMEOUT: float = 10  # http timeout in seconds
+	# meta or memory, standard external writer enqueues events into outbox instead of posting them. disabled when blank
+	PIPELINE_EXTERNAL_WRITE_OUTBOX: Optional[str] = None
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_WORKERS: int = 8  # max threads of posting events
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_FETCH_SIZE: int = 500  # max events claimed in one polling
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_BATCH_SIZE: int = 1  # events posted in one request, as json array when more than 1
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_POLL_INTERVAL: float = 1  # in seconds
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_TIMEOUT: float = 10  # http timeout in seconds
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_MAX_RETRIES: int = 5  # event is dead after retries
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_RETRY_INTERVAL: float = 2  # in seconds, doubled on each retry
+	PIPELINE_EXTERNAL_WRITE_OUTBOX_CLAIM_TIMEOUT: int = 300  # in seconds, event in sending is claimed again after
 	PIPELINE_UPDATE_RETRY: bool = True  # enable pipeline update retry if it is failed on optimistic lock
 	PIPELINE_UPDATE_RETRY_TIMES: int = 3  # optimistic lock retry times
 	PIPELINE_UPDATE_RETRY_INTERVAL: int = 10  # retry interval in milliseconds
 	PIPELINE_UPDATE_RETRY_FORCE: bool = True  # enable force retry after all retries failed
 	PIPELINE_ASYNC_HANDLE_MONITOR_LOG: bool = True  # handle monitor log (might with pipelines) asynchronized
+	PIPELINE_DISPATCH_MAX_DEPTH: int = 0  # max cascade depth of pipelines in one trigger, 0 is unlimited
+	PIPELINE_DISPATCH_MAX_FAN_OUT: int = 0  # max pipelines created by one pipeline, 0 is unlimited
+	PIPELINE_DISPATCH_MAX_CONTEXTS: int = 0  # max pipelines dispatched in one trigger, 0 is unlimited
+	PIPELINE_DISPATCH_CONCURRENT: bool = False  # run pipelines which write different topics concurrently
+	PIPELINE_DISPATCH_CONCURRENT_WORKERS: int = 8  # max threads of concurrent dispatching
+	PIPELINE_MONITOR_LOG_SINK: bool = False  # write monitor logs in bulk by background worker
+	PIPELINE_MONITOR_LOG_SINK_QUEUE_SIZE: int = 10000  # max monitor logs buffered
+	PIPELINE_MONITOR_LOG_SINK_BATCH_SIZE: int = 500  # max monitor logs written in one batch
+	PIPELINE_MONITOR_LOG_SINK_FLUSH_INTERVAL: float = 1  # in seconds
+	PIPELINE_MONITOR_LOG_SINK_FULL_POLICY: str = 'block'  # block or drop, when buffer is full
+	PIPELINE_MONITOR_LOG_SINK_SAMPLE_RATE: float = 1  # rate of non-error monitor logs kept, 1 keeps all
+	PIPELINE_COMPILE_WARM_UP: bool = False  # compile enabled pipelines on boot
+	PIPELINE_COMPILE_WARM_UP_TENANTS: Optional[str] = None  # tenant ids joined by comma, warm up all when blank
 
 	class Config:
 		# secrets_dir = '/var/run'
@@ -71,6 +101,62 @@ def ask_elastic_search_writer_enabled() -> bool:
 	return settings.PIPELINE_ELASTIC_SEARCH_EXTERNAL_WRITER
 
 
+def ask_elastic_search_bulk_max_actions() -> int:
+	return settings.PIPELINE_ELASTIC_SEARCH_BULK_MAX_ACTIONS
+
+
+def ask_elastic_search_bulk_max_bytes() -> int:
+	return settings.PIPELINE_ELASTIC_SEARCH_BULK_MAX_BYTES
+
+
+def ask_elastic_search_bulk_flush_interval() -> float:
+	return settings.PIPELINE_ELASTIC_SEARCH_BULK_FLUSH_INTERVAL
+
+
+def ask_elastic_search_bulk_max_retries() -> int:
+	return settings.PIPELINE_ELASTIC_SEARCH_BULK_MAX_RETRIES
+
+
+def ask_elastic_search_bulk_timeout() -> float:
+	return settings.PIPELINE_ELASTIC_SEARCH_BULK_TIMEOUT
+
+
+def ask_external_write_outbox() -> Optional[str]:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX
+
+
+def ask_external_write_outbox_workers() -> int:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_WORKERS
+
+
+def ask_external_write_outbox_fetch_size() -> int:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_FETCH_SIZE
+
+
+def ask_external_write_outbox_batch_size() -> int:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_BATCH_SIZE
+
+
+def ask_external_write_outbox_poll_interval() -> float:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_POLL_INTERVAL
+
+
+def ask_external_write_outbox_timeout() -> float:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_TIMEOUT
+
+
+def ask_external_write_outbox_max_retries() -> int:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_MAX_RETRIES
+
+
+def ask_external_write_outbox_retry_interval() -> float:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_RETRY_INTERVAL
+
+
+def ask_external_write_outbox_claim_timeout() -> int:
+	return settings.PIPELINE_EXTERNAL_WRITE_OUTBOX_CLAIM_TIMEOUT
+
+
 def ask_pipeline_update_retry() -> bool:
 	return settings.PIPELINE_UPDATE_RETRY
 
@@ -89,3 +175,58 @@ def ask_pipeline_update_retry_force() -> bool:
 
 def ask_async_handle_monitor_log() -> bool:
 	return settings.PIPELINE_ASYNC_HANDLE_MONITOR_LOG
+
+
+def ask_pipeline_dispatch_max_depth() -> int:
+	return settings.PIPELINE_DISPATCH_MAX_DEPTH
+
+
+def ask_pipeline_dispatch_max_fan_out() -> int:
+	return settings.PIPELINE_DISPATCH_MAX_FAN_OUT
+
+
+def ask_pipeline_dispatch_max_contexts() -> int:
+	return settings.PIPELINE_DISPATCH_MAX_CONTEXTS
+
+
+def ask_pipeline_dispatch_concurrent() -> bool:
+	return settings.PIPELINE_DISPATCH_CONCURRENT
+
+
+def ask_pipeline_dispatch_concurrent_workers() -> int:
+	return settings.PIPELINE_DISPATCH_CONCURRENT_WORKERS
+
+
+def ask_monitor_log_sink_enabled() -> bool:
+	return settings.PIPELINE_MONITOR_LOG_SINK
+
+
+def ask_monitor_log_sink_queue_size() -> int:
+	return settings.PIPELINE_MONITOR_LOG_SINK_QUEUE_SIZE
+
+
+def ask_monitor_log_sink_batch_size() -> int:
+	return settings.PIPELINE_MONITOR_LOG_SINK_BATCH_SIZE
+
+
+def ask_monitor_log_sink_flush_interval() -> float:
+	return settings.PIPELINE_MONITOR_LOG_SINK_FLUSH_INTERVAL
+
+
+def ask_monitor_log_sink_full_policy() -> str:
+	return settings.PIPELINE_MONITOR_LOG_SINK_FULL_POLICY
+
+
+def ask_monitor_log_sink_sample_rate() -> float:
+	return settings.PIPELINE_MONITOR_LOG_SINK_SAMPLE_RATE
+
+
+def ask_pipeline_compile_warm_up() -> bool:
+	return settings.PIPELINE_COMPILE_WARM_UP
+
+
+def ask_pipeline_compile_warm_up_tenants() -> List[str]:
+	tenant_ids = settings.PIPELINE_COMPILE_WARM_UP_TENANTS
+	if is_blank(tenant_ids):
+		return []
+	return ArrayHelper(tenant_ids.split(',')).map(lambda x: x.strip()).filter(lambda x: len(x) != 0).to_list()
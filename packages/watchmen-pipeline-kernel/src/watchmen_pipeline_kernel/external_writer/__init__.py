@@ -1,4 +1,8 @@
-from .elastic_search_writer import create_elastic_search_writer, ElasticSearchExternalWriter, \
-	register_elastic_search_writer
+from .elastic_search_writer import ask_elastic_search_bulk_writer, build_bulk_action, create_elastic_search_writer, \
+	ElasticSearchBulkAction, ElasticSearchBulkActionType, ElasticSearchBulkWriter, ElasticSearchExternalWriter, \
+	parse_elastic_search_url, register_elastic_search_writer
+from .external_write_outbox import ask_external_write_outbox_instance, ExternalWriteEvent, \
+	ExternalWriteEventStatus, ExternalWriteOutbox, ExternalWriteOutboxQueue, InMemoryExternalWriteOutboxQueue, \
+	MetaStorageExternalWriteOutboxQueue, start_external_write_outbox, use_external_write_outbox
 from .prebuilt_writers import register_elastic_search_external_writer, register_standard_external_writer
 from .standard_writer import create_standard_writer, register_standard_writer, StandardExternalWriter
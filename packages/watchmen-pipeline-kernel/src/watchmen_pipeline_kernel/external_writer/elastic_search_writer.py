@@ -1,14 +1,333 @@
+from atexit import register
+from enum import Enum
+from json import loads
+from logging import getLogger
+from threading import Event, Lock, RLock, Thread
+from time import monotonic
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
 from watchmen_data_kernel.external_writer import BuildExternalWriter, ExternalWriter, ExternalWriterParams
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_pipeline_kernel.common import ask_elastic_search_bulk_flush_interval, \
+	ask_elastic_search_bulk_max_actions, ask_elastic_search_bulk_max_bytes, ask_elastic_search_bulk_max_retries, \
+	ask_elastic_search_bulk_timeout, PipelineKernelException
+from watchmen_utilities import ArrayHelper, is_blank, is_not_blank, serialize_to_json
 
+logger = getLogger(__name__)
 
-class ElasticSearchExternalWriter(ExternalWriter):
-	# noinspection PyMethodMayBeStatic
-	async def do_run(self, params: ExternalWriterParams) -> None:
-		# TODO elastic search external writer
-		pass
 
+class ElasticSearchBulkActionType(str, Enum):
+	INDEX = 'index',
+	UPDATE = 'update',
+	DELETE = 'delete'
+
+
+class ElasticSearchBulkAction:
+	def __init__(
+			self, action_type: ElasticSearchBulkActionType, index: str,
+			document_id: Optional[str], document: Optional[Dict[str, Any]]):
+		self.actionType = action_type
+		self.index = index
+		self.documentId = document_id
+		self.document = document
+		self.retries: int = 0
+		self.body = self.to_lines()
+
+	def to_lines(self) -> bytes:
+		"""
+		action and metadata line, followed by source line when action is not delete. each line ends with new line
+		"""
+		metadata: Dict[str, Any] = {'_index': self.index}
+		if self.documentId is not None:
+			metadata['_id'] = self.documentId
+		lines = [serialize_to_json({self.actionType.value: metadata})]
+		if self.actionType == ElasticSearchBulkActionType.UPDATE:
+			lines.append(serialize_to_json({'doc': self.document, 'doc_as_upsert': True}))
+		elif self.actionType == ElasticSearchBulkActionType.INDEX:
+			lines.append(serialize_to_json(self.document))
+		return ''.join(ArrayHelper(lines).map(lambda x: f'{x}\n').to_list()).encode('utf-8')
+
+
+def parse_elastic_search_url(url: str) -> Tuple[str, Optional[str]]:
+	"""
+	returns base url and index name.
+	last segment of path is treated as index name, e.g. http://host:9200/orders -> (http://host:9200, orders)
+	"""
+	if is_blank(url):
+		raise PipelineKernelException('Url of elastic search external writer cannot be blank.')
+	parts = urlsplit(url.strip())
+	segments = ArrayHelper(parts.path.split('/')).filter(lambda x: is_not_blank(x)).to_list()
+	if len(segments) == 0:
+		return urlunsplit((parts.scheme, parts.netloc, '', '', '')), None
+	base_path = '/'.join(segments[:-1])
+	base_path = f'/{base_path}' if len(base_path) != 0 else ''
+	return urlunsplit((parts.scheme, parts.netloc, base_path, '', '')), segments[-1].lower()
+
+
+def find_document_id(data: Optional[Dict[str, Any]]) -> Optional[str]:
+	if data is None:
+		return None
+	document_id = data.get(TopicDataColumnNames.ID.value)
+	return None if document_id is None else str(document_id)
+
+
+def build_bulk_action(params: ExternalWriterParams, index: Optional[str]) -> Optional[ElasticSearchBulkAction]:
+	"""
+	index name is from url, or event code when url has no path.
+	insert to index, merge to update as upsert, delete to delete. document id is the id of topic data
+	"""
+	if index is None:
+		if is_blank(params.eventCode):
+			raise PipelineKernelException(
+				f'Index of elastic search is not declared neither in url[{params.url}] nor by event code.')
+		index = params.eventCode.strip().lower()
+	previous_data = params.previousData
+	current_data = params.currentData
+	if previous_data is None and current_data is not None:
+		return ElasticSearchBulkAction(
+			ElasticSearchBulkActionType.INDEX, index, find_document_id(current_data), current_data)
+	elif previous_data is not None and current_data is not None:
+		document_id = find_document_id(current_data) or find_document_id(previous_data)
+		if document_id is None:
+			# nothing to update on, index as a new document
+			return ElasticSearchBulkAction(ElasticSearchBulkActionType.INDEX, index, None, current_data)
+		return ElasticSearchBulkAction(ElasticSearchBulkActionType.UPDATE, index, document_id, current_data)
+	elif previous_data is not None and current_data is None:
+		document_id = find_document_id(previous_data)
+		if document_id is None:
+			logger.warning(f'Delete document from index[{index}] is ignored since no document id found.')
+			return None
+		return ElasticSearchBulkAction(ElasticSearchBulkActionType.DELETE, index, document_id, None)
+	else:
+		raise PipelineKernelException(
+			f'Fire elastic search external writer when previous and current are none is not supported.')
+
+
+def is_retryable_status(status: int) -> bool:
+	return status == 429 or status >= 500
+
+
+class ElasticSearchBulkWriter:
+	"""
+	buffer actions of one elastic search endpoint, send them by bulk api when actions, bytes or seconds limit reached.
+	items of bulk response are handled one by one, rejected (429) and server failed (5xx) items are buffered again
+	until max retries reached, together with the following items on same document. other failed items are logged
+	and dropped.
+	"""
+
+	def __init__(
+			self, url: str, pat: Optional[str] = None,
+			max_actions: Optional[int] = None, max_bytes: Optional[int] = None,
+			flush_interval: Optional[float] = None, max_retries: Optional[int] = None, timeout: Optional[float] = None):
+		self.url = url.rstrip('/')
+		self.pat = pat
+		self.maxActions = ask_elastic_search_bulk_max_actions() if max_actions is None else max_actions
+		self.maxBytes = ask_elastic_search_bulk_max_bytes() if max_bytes is None else max_bytes
+		self.flushInterval = ask_elastic_search_bulk_flush_interval() if flush_interval is None else flush_interval
+		self.maxRetries = ask_elastic_search_bulk_max_retries() if max_retries is None else max_retries
+		self.timeout = ask_elastic_search_bulk_timeout() if timeout is None else timeout
+		self.actions: List[ElasticSearchBulkAction] = []
+		self.size: int = 0
+		self.createdAt: float = monotonic()
+		self.lock = RLock()
+		# one bulk request in flight, retried actions are restored before next taking,
+		# therefore actions on same document are never sent out of order
+		self.sendLock = Lock()
+		self.stopped = Event()
+		self.flusher: Optional[Thread] = None
+
+	def append(self, action: ElasticSearchBulkAction) -> None:
+		with self.lock:
+			if len(self.actions) == 0:
+				self.createdAt = monotonic()
+			self.actions.append(action)
+			self.size = self.size + len(action.body)
+			full = len(self.actions) >= self.maxActions or self.size >= self.maxBytes
+		self.start_flusher()
+		if full:
+			self.flush()
+
+	def take(self, expired_only: bool) -> List[ElasticSearchBulkAction]:
+		with self.lock:
+			if len(self.actions) == 0:
+				return []
+			if expired_only and monotonic() - self.createdAt < self.flushInterval:
+				return []
+			# keep bulk request in limitation, remained actions are sent in next round
+			taken: List[ElasticSearchBulkAction] = []
+			size = 0
+			for action in self.actions:
+				if len(taken) != 0 and (len(taken) >= self.maxActions or size + len(action.body) > self.maxBytes):
+					break
+				taken.append(action)
+				size = size + len(action.body)
+			self.actions = self.actions[len(taken):]
+			self.size = self.size - size
+			return taken
+
+	def restore(self, actions: List[ElasticSearchBulkAction]) -> None:
+		def can_retry(action: ElasticSearchBulkAction) -> bool:
+			action.retries = action.retries + 1
+			if action.retries > self.maxRetries:
+				logger.error(
+					f'Bulk action[{action.actionType.value}] of document[{action.documentId}] '
+					f'on index[{action.index}] is dropped after {self.maxRetries} retries.')
+				return False
+			return True
+
+		retryable = ArrayHelper(actions).filter(can_retry).to_list()
+		if len(retryable) == 0:
+			return
+		with self.lock:
+			if len(self.actions) == 0:
+				self.createdAt = monotonic()
+			# keep the order of actions on same document
+			self.actions = [*retryable, *self.actions]
+			self.size = self.size + ArrayHelper(retryable).reduce(lambda size, x: size + len(x.body), 0)
+
+	def post(self, body: bytes) -> Dict[str, Any]:
+		headers = {'Content-Type': 'application/x-ndjson'}
+		if is_not_blank(self.pat):
+			headers['Authorization'] = f'ApiKey {self.pat.strip()}'
+
+		# lazy load
+		# noinspection PyPackageRequirements
+		from requests import post
+		response = post(url=f'{self.url}/_bulk', timeout=self.timeout, data=body, headers=headers)
+		if response.status_code != 200:
+			raise PipelineKernelException(
+				f'Response status[{response.status_code}] of elastic search bulk api, body[{response.text}].')
+		return loads(response.text)
+
+	def handle_response(self, actions: List[ElasticSearchBulkAction], response: Dict[str, Any]) -> None:
+		if not response.get('errors', False):
+			return
+		items: List[Dict[str, Any]] = response.get('items') or []
+		failed: List[ElasticSearchBulkAction] = []
+		# documents which have action buffered again, following actions on them are buffered again as well,
+		# even succeeded, otherwise the retried action is applied after them
+		failed_documents: Set[Tuple[str, str]] = set()
+		for index, action in enumerate(actions):
+			if action.documentId is not None and (action.index, action.documentId) in failed_documents:
+				failed.append(action)
+				continue
+			if index >= len(items):
+				# no response item, treated as failed
+				failed.append(action)
+				if action.documentId is not None:
+					failed_documents.add((action.index, action.documentId))
+				continue
+			# item is like {"index": {"_id": "1", "status": 201}}, keyed by action type
+			result = next(iter(items[index].values()), {})
+			status = result.get('status', 500)
+			if 200 <= status < 300:
+				continue
+			elif action.actionType == ElasticSearchBulkActionType.DELETE and status == 404:
+				# document already gone
+				continue
+			elif is_retryable_status(status):
+				failed.append(action)
+				if action.documentId is not None:
+					failed_documents.add((action.index, action.documentId))
+			else:
+				logger.error(
+					f'Bulk action[{action.actionType.value}] of document[{action.documentId}] '
+					f'on index[{action.index}] failed, status[{status}], error[{result.get("error")}].')
+		self.restore(failed)
+
+	# noinspection PyBroadException
+	def send(self, actions: List[ElasticSearchBulkAction]) -> None:
+		if len(actions) == 0:
+			return
+		try:
+			response = self.post(b''.join(ArrayHelper(actions).map(lambda x: x.body).to_list()))
+		except Exception as e:
+			logger.error(
+				f'Send {len(actions)} action(s) to elastic search[{self.url}] failed, will retry in next flush.',
+				exc_info=e)
+			self.restore(actions)
+			return
+		self.handle_response(actions, response)
+
+	def take_and_send(self, expired_only: bool) -> int:
+		"""
+		returns count of taken actions
+		"""
+		with self.sendLock:
+			actions = self.take(expired_only)
+			self.send(actions)
+			return len(actions)
+
+	def flush_expired(self) -> None:
+		self.take_and_send(True)
+
+	def flush(self) -> None:
+		"""
+		send all buffered actions, retried actions are kept in buffer
+		"""
+		with self.lock:
+			count = len(self.actions)
+		while count > 0:
+			sent_count = self.take_and_send(False)
+			if sent_count == 0:
+				break
+			count = count - sent_count
+
+	def run_flusher(self) -> None:
+		interval = max(min(self.flushInterval / 2, 5), 0.1)
+		while not self.stopped.wait(interval):
+			self.flush_expired()
+
+	def start_flusher(self) -> None:
+		if self.flusher is not None:
+			return
+		with self.lock:
+			if self.flusher is None:
+				self.flusher = Thread(target=self.run_flusher, name='elastic-search-bulk-flusher', daemon=True)
+				self.flusher.start()
+				# send buffered actions on exit
+				register(self.close)
+
+	def close(self) -> None:
+		self.stopped.set()
+		self.flush()
+
+
+class ElasticSearchBulkWriters:
+	def __init__(self):
+		self.writers: Dict[Tuple[str, Optional[str]], ElasticSearchBulkWriter] = {}
+		self.lock = RLock()
+
+	def ask_writer(self, url: str, pat: Optional[str]) -> ElasticSearchBulkWriter:
+		key = (url, pat)
+		writer = self.writers.get(key)
+		if writer is not None:
+			return writer
+		with self.lock:
+			writer = self.writers.get(key)
+			if writer is None:
+				writer = ElasticSearchBulkWriter(url, pat)
+				self.writers[key] = writer
+			return writer
+
+
+elastic_search_bulk_writers = ElasticSearchBulkWriters()
+
+
+def ask_elastic_search_bulk_writer(url: str, pat: Optional[str]) -> ElasticSearchBulkWriter:
+	"""
+	writers are shared by endpoint, since external writer is created on each write
+	"""
+	return elastic_search_bulk_writers.ask_writer(url, pat)
+
+
+class ElasticSearchExternalWriter(ExternalWriter):
 	def run(self, params: ExternalWriterParams) -> bool:
-		self.do_run(params)
+		url, index = parse_elastic_search_url(params.url)
+		action = build_bulk_action(params, index)
+		if action is not None:
+			ask_elastic_search_bulk_writer(url, params.pat).append(action)
 		return True
 
 
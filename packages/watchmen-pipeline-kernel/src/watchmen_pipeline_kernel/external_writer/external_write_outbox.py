@@ -0,0 +1,549 @@
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from enum import Enum
+from json import loads
+from logging import getLogger
+from threading import current_thread, Event, RLock, Thread
+from typing import Any, Dict, List, Optional, Tuple
+
+from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
+from watchmen_model.common import DataModel
+from watchmen_pipeline_kernel.common import ask_external_write_outbox, ask_external_write_outbox_batch_size, \
+	ask_external_write_outbox_claim_timeout, ask_external_write_outbox_fetch_size, \
+	ask_external_write_outbox_max_retries, ask_external_write_outbox_poll_interval, \
+	ask_external_write_outbox_retry_interval, ask_external_write_outbox_timeout, ask_external_write_outbox_workers, \
+	PipelineKernelException
+from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityCriteriaJoint, \
+	EntityCriteriaJointConjunction, EntityCriteriaOperator, EntityCriteriaStatement, EntityDeleter, EntityIdHelper, \
+	EntityLimitedFinder, EntityRow, EntityShaper, EntitySortColumn, EntitySortMethod, EntityUpdater
+from watchmen_utilities import ArrayHelper, get_current_time_in_seconds, is_blank, is_not_blank, serialize_to_json
+
+logger = getLogger(__name__)
+
+
+class ExternalWriteEventStatus(str, Enum):
+	PENDING = 'pending',  # waiting for sending, or retrying
+	SENDING = 'sending',  # claimed by sender
+	DEAD = 'dead'  # retried too many times, kept for inspection
+
+
+class ExternalWriteEvent(DataModel):
+	eventId: Optional[str] = None
+	writerCode: Optional[str] = None
+	url: str = None
+	pat: Optional[str] = None
+	payload: Dict[str, Any] = None
+	status: ExternalWriteEventStatus = ExternalWriteEventStatus.PENDING
+	retries: int = 0
+	nextRetryAt: Optional[datetime] = None
+	claimedAt: Optional[datetime] = None
+	lastError: Optional[str] = None
+	createdAt: Optional[datetime] = None
+
+
+class ExternalWriteOutboxQueue(ABC):
+	@abstractmethod
+	def enqueue(self, event: ExternalWriteEvent) -> None:
+		pass
+
+	@abstractmethod
+	def claim(self, limit: int) -> List[ExternalWriteEvent]:
+		"""
+		claim pending events which are ready to send, and events claimed but not finished in claim timeout.
+		claimed events are ordered by creation time
+		"""
+		pass
+
+	@abstractmethod
+	def acknowledge(self, events: List[ExternalWriteEvent]) -> None:
+		"""
+		remove sent events
+		"""
+		pass
+
+	@abstractmethod
+	def update(self, event: ExternalWriteEvent) -> None:
+		"""
+		save retrying or dead event
+		"""
+		pass
+
+
+class InMemoryExternalWriteOutboxQueue(ExternalWriteOutboxQueue):
+	"""
+	events are lost when process exits, for testing purpose
+	"""
+
+	def __init__(self, claim_timeout: Optional[int] = None):
+		self.claimTimeout = timedelta(
+			seconds=ask_external_write_outbox_claim_timeout() if claim_timeout is None else claim_timeout)
+		self.events: Dict[str, ExternalWriteEvent] = {}
+		self.lock = RLock()
+		self.sequence = 0
+
+	def enqueue(self, event: ExternalWriteEvent) -> None:
+		with self.lock:
+			self.sequence = self.sequence + 1
+			event.eventId = str(self.sequence)
+			event.createdAt = get_current_time_in_seconds()
+			if event.nextRetryAt is None:
+				event.nextRetryAt = event.createdAt
+			self.events[event.eventId] = event
+
+	def is_claimable(self, event: ExternalWriteEvent, now: datetime) -> bool:
+		if event.status == ExternalWriteEventStatus.PENDING:
+			return event.nextRetryAt <= now
+		elif event.status == ExternalWriteEventStatus.SENDING:
+			return event.claimedAt < now - self.claimTimeout
+		else:
+			return False
+
+	def claim(self, limit: int) -> List[ExternalWriteEvent]:
+		now = get_current_time_in_seconds()
+		with self.lock:
+			events = ArrayHelper(list(self.events.values())) \
+				.filter(lambda x: self.is_claimable(x, now)) \
+				.to_list()[:limit]
+			for event in events:
+				event.status = ExternalWriteEventStatus.SENDING
+				event.claimedAt = now
+			return events
+
+	def acknowledge(self, events: List[ExternalWriteEvent]) -> None:
+		with self.lock:
+			ArrayHelper(events).each(lambda x: self.events.pop(x.eventId, None))
+
+	def update(self, event: ExternalWriteEvent) -> None:
+		with self.lock:
+			if event.eventId in self.events:
+				self.events[event.eventId] = event
+
+	def find_dead(self) -> List[ExternalWriteEvent]:
+		with self.lock:
+			return ArrayHelper(list(self.events.values())) \
+				.filter(lambda x: x.status == ExternalWriteEventStatus.DEAD) \
+				.to_list()
+
+
+class ExternalWriteEventShaper(EntityShaper):
+	def serialize(self, event: ExternalWriteEvent) -> EntityRow:
+		return {
+			'event_id': event.eventId,
+			'writer_code': event.writerCode,
+			'url': event.url,
+			'pat': event.pat,
+			'payload': event.payload,
+			'status': event.status,
+			'retries': event.retries,
+			'next_retry_at': event.nextRetryAt,
+			'claimed_at': event.claimedAt,
+			'last_error': event.lastError,
+			'created_at': event.createdAt
+		}
+
+	def deserialize(self, row: EntityRow) -> ExternalWriteEvent:
+		return ExternalWriteEvent(
+			eventId=row.get('event_id'),
+			writerCode=row.get('writer_code'),
+			url=row.get('url'),
+			pat=row.get('pat'),
+			payload=row.get('payload'),
+			status=row.get('status'),
+			retries=row.get('retries'),
+			nextRetryAt=row.get('next_retry_at'),
+			claimedAt=row.get('claimed_at'),
+			lastError=row.get('last_error'),
+			createdAt=row.get('created_at')
+		)
+
+
+EXTERNAL_WRITE_EVENT_ENTITY_NAME = 'external_write_outbox'
+EXTERNAL_WRITE_EVENT_ENTITY_SHAPER = ExternalWriteEventShaper()
+
+
+class MetaStorageExternalWriteOutboxQueue(ExternalWriteOutboxQueue):
+	"""
+	events are saved into meta storage, shared by all nodes.
+	event is claimed by optimistic status update row by row, since storage cannot lock rows in batch
+	"""
+
+	def __init__(self, claim_timeout: Optional[int] = None):
+		self.claimTimeout = timedelta(
+			seconds=ask_external_write_outbox_claim_timeout() if claim_timeout is None else claim_timeout)
+
+	# noinspection PyMethodMayBeStatic
+	def get_entity_id_helper(self) -> EntityIdHelper:
+		return EntityIdHelper(
+			name=EXTERNAL_WRITE_EVENT_ENTITY_NAME, shaper=EXTERNAL_WRITE_EVENT_ENTITY_SHAPER,
+			idColumnName='event_id')
+
+	def enqueue(self, event: ExternalWriteEvent) -> None:
+		event.eventId = str(ask_snowflake_generator().next_id())
+		event.createdAt = get_current_time_in_seconds()
+		if event.nextRetryAt is None:
+			event.nextRetryAt = event.createdAt
+		# make sure payload can be saved as json, e.g. datetime and decimal values
+		event.payload = loads(serialize_to_json(event.payload))
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			storage.insert_one(event, self.get_entity_id_helper())
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			raise e
+
+	# noinspection PyMethodMayBeStatic
+	def build_claimable_criteria(
+			self, status: ExternalWriteEventStatus, now: datetime) -> List[EntityCriteriaStatement]:
+		if status == ExternalWriteEventStatus.PENDING:
+			return [
+				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right=status),
+				EntityCriteriaExpression(
+					left=ColumnNameLiteral(columnName='next_retry_at'),
+					operator=EntityCriteriaOperator.LESS_THAN_OR_EQUALS, right=now)
+			]
+		else:
+			return [
+				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right=status),
+				EntityCriteriaExpression(
+					left=ColumnNameLiteral(columnName='claimed_at'),
+					operator=EntityCriteriaOperator.LESS_THAN, right=now - self.claimTimeout)
+			]
+
+	def claim(self, limit: int) -> List[ExternalWriteEvent]:
+		now = get_current_time_in_seconds()
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			# noinspection PyTypeChecker
+			candidates: List[ExternalWriteEvent] = storage.find_limited(EntityLimitedFinder(
+				name=EXTERNAL_WRITE_EVENT_ENTITY_NAME,
+				shaper=EXTERNAL_WRITE_EVENT_ENTITY_SHAPER,
+				criteria=[
+					EntityCriteriaJoint(
+						conjunction=EntityCriteriaJointConjunction.OR,
+						children=[
+							EntityCriteriaJoint(
+								children=self.build_claimable_criteria(ExternalWriteEventStatus.PENDING, now)),
+							EntityCriteriaJoint(
+								children=self.build_claimable_criteria(ExternalWriteEventStatus.SENDING, now))
+						]
+					)
+				],
+				sort=[EntitySortColumn(name='created_at', method=EntitySortMethod.ASC)],
+				limit=limit
+			))
+
+			def try_to_claim(event: ExternalWriteEvent) -> bool:
+				return storage.update(EntityUpdater(
+					name=EXTERNAL_WRITE_EVENT_ENTITY_NAME,
+					shaper=EXTERNAL_WRITE_EVENT_ENTITY_SHAPER,
+					criteria=[
+						EntityCriteriaExpression(left=ColumnNameLiteral(columnName='event_id'), right=event.eventId),
+						*self.build_claimable_criteria(event.status, now)
+					],
+					update={'status': ExternalWriteEventStatus.SENDING, 'claimed_at': now}
+				)) == 1
+
+			claimed = ArrayHelper(candidates).filter(try_to_claim).to_list()
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			raise e
+		for event in claimed:
+			event.status = ExternalWriteEventStatus.SENDING
+			event.claimedAt = now
+		return claimed
+
+	def acknowledge(self, events: List[ExternalWriteEvent]) -> None:
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			storage.delete(EntityDeleter(
+				name=EXTERNAL_WRITE_EVENT_ENTITY_NAME,
+				shaper=EXTERNAL_WRITE_EVENT_ENTITY_SHAPER,
+				criteria=[
+					EntityCriteriaExpression(
+						left=ColumnNameLiteral(columnName='event_id'), operator=EntityCriteriaOperator.IN,
+						right=ArrayHelper(events).map(lambda x: x.eventId).to_list())
+				]
+			))
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			raise e
+
+	def update(self, event: ExternalWriteEvent) -> None:
+		storage = ask_meta_storage()
+		storage.begin()
+		try:
+			storage.update_one(event, self.get_entity_id_helper())
+			storage.commit_and_close()
+		except Exception as e:
+			storage.rollback_and_close()
+			raise e
+
+
+class PrometheusCountersHolder:
+	initialized: bool = False
+	counters: Dict[str, Any] = {}
+
+
+prometheus_counters_holder = PrometheusCountersHolder()
+
+
+def ask_prometheus_counter(name: str) -> Optional[Any]:
+	"""
+	returns none when prometheus client is not installed
+	"""
+	if not prometheus_counters_holder.initialized:
+		prometheus_counters_holder.initialized = True
+		try:
+			# noinspection PyPackageRequirements
+			from prometheus_client import Counter
+			prometheus_counters_holder.counters = {
+				'enqueued': Counter('watchmen_external_write_outbox_enqueued', 'External write events enqueued.'),
+				'sent': Counter('watchmen_external_write_outbox_sent', 'External write events sent.'),
+				'retried': Counter('watchmen_external_write_outbox_retried', 'External write events retried.'),
+				'dead': Counter('watchmen_external_write_outbox_dead', 'External write events dead.')
+			}
+		except ImportError:
+			logger.info('Prometheus client not found, metrics of external write outbox are not exported.')
+	return prometheus_counters_holder.counters.get(name)
+
+
+class ExternalWriteOutboxMetrics:
+	def __init__(self):
+		self.lock = RLock()
+		self.enqueued: int = 0
+		self.sent: int = 0
+		self.retried: int = 0
+		self.dead: int = 0
+
+	def increase(self, name: str, count: int = 1) -> None:
+		with self.lock:
+			setattr(self, name, getattr(self, name) + count)
+		counter = ask_prometheus_counter(name)
+		if counter is not None:
+			counter.inc(count)
+
+	def to_dict(self):
+		return {'enqueued': self.enqueued, 'sent': self.sent, 'retried': self.retried, 'dead': self.dead}
+
+
+# url and pat
+ExternalWriteEndpoint = Tuple[str, Optional[str]]
+
+
+class ExternalWriteOutbox:
+	def __init__(
+			self, queue: ExternalWriteOutboxQueue,
+			workers: Optional[int] = None, fetch_size: Optional[int] = None, batch_size: Optional[int] = None,
+			poll_interval: Optional[float] = None, timeout: Optional[float] = None,
+			max_retries: Optional[int] = None, retry_interval: Optional[float] = None):
+		"""
+		events are enqueued by pipelines, and posted by background sender with pooled http connections.
+		events of one endpoint are posted in order by one worker, batch size events in one request.
+		"""
+		self.queue = queue
+		self.workers = ask_external_write_outbox_workers() if workers is None else workers
+		self.fetchSize = ask_external_write_outbox_fetch_size() if fetch_size is None else fetch_size
+		self.batchSize = ask_external_write_outbox_batch_size() if batch_size is None else batch_size
+		self.pollInterval = ask_external_write_outbox_poll_interval() if poll_interval is None else poll_interval
+		self.timeout = ask_external_write_outbox_timeout() if timeout is None else timeout
+		self.maxRetries = ask_external_write_outbox_max_retries() if max_retries is None else max_retries
+		self.retryInterval = ask_external_write_outbox_retry_interval() if retry_interval is None else retry_interval
+		self.metrics = ExternalWriteOutboxMetrics()
+		self.lock = RLock()
+		self.stopped = Event()
+		self.worker: Optional[Thread] = None
+		self.executor: Optional[ThreadPoolExecutor] = None
+		self.session: Optional[Any] = None
+
+	def enqueue(self, event: ExternalWriteEvent) -> None:
+		self.queue.enqueue(event)
+		self.metrics.increase('enqueued')
+		self.start()
+
+	def ask_session(self) -> Any:
+		"""
+		connections are pooled by endpoint, and shared by workers
+		"""
+		with self.lock:
+			if self.session is None:
+				# lazy load
+				# noinspection PyPackageRequirements
+				from requests import Session
+				# noinspection PyPackageRequirements
+				from requests.adapters import HTTPAdapter
+				session = Session()
+				adapter = HTTPAdapter(pool_connections=self.workers, pool_maxsize=self.workers)
+				session.mount('http://', adapter)
+				session.mount('https://', adapter)
+				self.session = session
+			return self.session
+
+	def build_body(self, events: List[ExternalWriteEvent]) -> Any:
+		if self.batchSize <= 1:
+			return events[0].payload
+		else:
+			return ArrayHelper(events).map(lambda x: x.payload).to_list()
+
+	def post(self, endpoint: ExternalWriteEndpoint, events: List[ExternalWriteEvent]) -> Optional[str]:
+		"""
+		returns error message when failed
+		"""
+		url, pat = endpoint
+		headers = {'Content-Type': 'application/json'}
+		if is_not_blank(pat):
+			headers['Authorization'] = f'PAT {pat.strip()}'
+		response = self.ask_session().post(
+			url=url, timeout=self.timeout, data=serialize_to_json(self.build_body(events)), headers=headers)
+		if 200 <= response.status_code < 300:
+			return None
+		else:
+			return f'Response status[{response.status_code}], body[{response.text[:512]}].'
+
+	def fail(self, event: ExternalWriteEvent, error: str) -> None:
+		event.retries = event.retries + 1
+		event.lastError = error[:1024]
+		if event.retries > self.maxRetries:
+			event.status = ExternalWriteEventStatus.DEAD
+			self.metrics.increase('dead')
+			logger.error(f'External write event[id={event.eventId}, url={event.url}] is dead, error[{error}].')
+		else:
+			event.status = ExternalWriteEventStatus.PENDING
+			event.nextRetryAt = get_current_time_in_seconds() + timedelta(
+				seconds=self.retryInterval * (2 ** (event.retries - 1)))
+			self.metrics.increase('retried')
+		self.queue.update(event)
+
+	# noinspection PyBroadException
+	def send(self, endpoint: ExternalWriteEndpoint, events: List[ExternalWriteEvent]) -> None:
+		try:
+			error = self.post(endpoint, events)
+		except Exception as e:
+			error = str(e)
+		if error is None:
+			self.queue.acknowledge(events)
+			self.metrics.increase('sent', len(events))
+		else:
+			logger.warning(f'Post {len(events)} external write event(s) to [{endpoint[0]}] failed, error[{error}].')
+			ArrayHelper(events).each(lambda x: self.fail(x, error))
+
+	# noinspection PyBroadException
+	def send_endpoint(self, endpoint: ExternalWriteEndpoint, events: List[ExternalWriteEvent]) -> None:
+		for batch in ArrayHelper(events).chunk(max(self.batchSize, 1)).to_list():
+			try:
+				self.send(endpoint, batch)
+			except Exception as e:
+				# event is claimed again after claim timeout
+				logger.error(e, exc_info=True, stack_info=True)
+
+	def ask_executor(self) -> ThreadPoolExecutor:
+		with self.lock:
+			if self.executor is None:
+				self.executor = ThreadPoolExecutor(
+					max_workers=max(self.workers, 1), thread_name_prefix='external-write-outbox')
+			return self.executor
+
+	def drain(self) -> int:
+		"""
+		claim events and post them, grouped by endpoint. returns count of claimed events
+		"""
+		events = self.queue.claim(self.fetchSize)
+		if len(events) == 0:
+			return 0
+		groups: Dict[ExternalWriteEndpoint, List[ExternalWriteEvent]] = ArrayHelper(events) \
+			.group_by(lambda x: (x.url, x.pat))
+		executor = self.ask_executor()
+		wait([executor.submit(self.send_endpoint, endpoint, grouped) for endpoint, grouped in groups.items()])
+		logger.debug(f'External write outbox drained, metrics[{self.metrics.to_dict()}].')
+		return len(events)
+
+	# noinspection PyBroadException
+	def work(self) -> None:
+		logger.info('External write outbox sender started.')
+		while not self.stopped.is_set():
+			try:
+				claimed = self.drain()
+			except Exception as e:
+				logger.error(e, exc_info=True, stack_info=True)
+				claimed = 0
+			if claimed < self.fetchSize:
+				# no more events ready, wait for next polling
+				self.stopped.wait(self.pollInterval)
+		logger.warning('External write outbox sender stopped.')
+
+	def start(self) -> None:
+		if self.worker is not None:
+			return
+		with self.lock:
+			if self.worker is None:
+				self.stopped.clear()
+				self.worker = Thread(target=self.work, name='external-write-outbox-sender', daemon=True)
+				self.worker.start()
+
+	def stop(self) -> None:
+		self.stopped.set()
+		with self.lock:
+			worker = self.worker
+		# keep reference until worker exits, otherwise start might run another one in parallel
+		if worker is not None and worker is not current_thread():
+			worker.join()
+		with self.lock:
+			if self.worker is worker:
+				self.worker = None
+
+
+class ExternalWriteOutboxHolder:
+	lock: RLock = RLock()
+	initialized: bool = False
+	outbox: Optional[ExternalWriteOutbox] = None
+
+
+external_write_outbox_holder = ExternalWriteOutboxHolder()
+
+
+def build_external_write_outbox() -> Optional[ExternalWriteOutbox]:
+	outbox_type = ask_external_write_outbox()
+	if is_blank(outbox_type):
+		return None
+	outbox_type = outbox_type.strip().lower()
+	if outbox_type == 'meta':
+		return ExternalWriteOutbox(MetaStorageExternalWriteOutboxQueue())
+	elif outbox_type == 'memory':
+		return ExternalWriteOutbox(InMemoryExternalWriteOutboxQueue())
+	else:
+		raise PipelineKernelException(f'External write outbox[{outbox_type}] is not supported.')
+
+
+def ask_external_write_outbox_instance() -> Optional[ExternalWriteOutbox]:
+	"""
+	returns none when external write outbox is not enabled
+	"""
+	with external_write_outbox_holder.lock:
+		if not external_write_outbox_holder.initialized:
+			external_write_outbox_holder.outbox = build_external_write_outbox()
+			external_write_outbox_holder.initialized = True
+	return external_write_outbox_holder.outbox
+
+
+def use_external_write_outbox(outbox: Optional[ExternalWriteOutbox]) -> None:
+	"""
+	replace the outbox, given none to disable it
+	"""
+	with external_write_outbox_holder.lock:
+		external_write_outbox_holder.outbox = outbox
+		external_write_outbox_holder.initialized = True
+
+
+def start_external_write_outbox() -> None:
+	"""
+	start sender on boot, to send events left by previous run
+	"""
+	outbox = ask_external_write_outbox_instance()
+	if outbox is not None:
+		outbox.start()
@@ -1,16 +1,18 @@
 from logging import getLogger
+from typing import Any, Dict
 
 from watchmen_data_kernel.external_writer import BuildExternalWriter, ExternalWriter, ExternalWriterParams
 from watchmen_model.admin import PipelineTriggerType
 from watchmen_pipeline_kernel.common import PipelineKernelException
 from watchmen_utilities import is_not_blank, serialize_to_json
+from .external_write_outbox import ask_external_write_outbox_instance, ExternalWriteEvent
 
 logger = getLogger(__name__)
 
 
 class StandardExternalWriter(ExternalWriter):
 	# noinspection PyMethodMayBeStatic
-	def do_run(self, params: ExternalWriterParams) -> None:
+	def build_payload(self, params: ExternalWriterParams) -> Dict[str, Any]:
 		previous_data = params.previousData
 		current_data = params.currentData
 		if previous_data is None and current_data is not None:
@@ -22,13 +24,16 @@ class StandardExternalWriter(ExternalWriter):
 		else:
 			raise PipelineKernelException(
 				f'Fire standard external writer when previous and current are none is not supported.')
-		payload = {
+		return {
 			'code': params.eventCode,
 			'currentData': current_data,
 			'previousData': previous_data,
 			'triggerType': trigger_type
 		}
 
+	# noinspection PyMethodMayBeStatic
+	def do_run(self, params: ExternalWriterParams) -> None:
+		payload = self.build_payload(params)
 		headers = {'Content-Type': 'application/json'}
 		if is_not_blank(params.pat):
 			headers['Authorization'] = f'PAT {params.pat.strip()}'
@@ -48,7 +53,13 @@ class StandardExternalWriter(ExternalWriter):
 			logger.error(response.text)
 
 	def run(self, params: ExternalWriterParams) -> bool:
-		self.do_run(params)
+		outbox = ask_external_write_outbox_instance()
+		if outbox is None:
+			self.do_run(params)
+		else:
+			# posted by outbox sender, with retries
+			outbox.enqueue(ExternalWriteEvent(
+				writerCode=self.get_code(), url=params.url, pat=params.pat, payload=self.build_payload(params)))
 		return True
 
 
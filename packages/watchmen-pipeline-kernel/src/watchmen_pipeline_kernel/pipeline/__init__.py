@@ -1,3 +1,6 @@
 from .monitor_log_invoker import create_monitor_log_pipeline_invoker
-from .pipeline_invoker import try_to_invoke_pipelines, try_to_invoke_pipelines_async
+from .monitor_log_sink import ask_pipeline_monitor_log_sink, MonitorLogSinkFullPolicy, PipelineMonitorLogSink
+from .pipeline_batch_trigger import PipelineBatchTrigger
+from .pipeline_invoker import is_bulk_insert_supported, try_to_invoke_pipelines, try_to_invoke_pipelines_async, \
+	try_to_invoke_pipelines_batch, try_to_invoke_pipelines_batch_async
 from .pipeline_trigger import PipelineTrigger
@@ -7,7 +7,8 @@ from watchmen_data_kernel.meta import TopicService
 from watchmen_data_kernel.topic_schema import TopicSchema
 from watchmen_model.admin import PipelineTriggerType, TopicKind
 from watchmen_model.pipeline_kernel import PipelineMonitorLog, PipelineTriggerTraceId
-from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_pipeline_kernel.common import ask_monitor_log_sink_enabled, PipelineKernelException
+from .monitor_log_sink import ask_pipeline_monitor_log_sink
 from .pipeline_trigger import PipelineTrigger
 
 logger = getLogger(__name__)
@@ -37,6 +38,9 @@ def create_monitor_log_pipeline_invoker(
 		if topic is None or topic.kind == TopicKind.SYSTEM:
 			# will not trigger monitor log pipelines again
 			logger.info(monitor_log)
+		elif ask_monitor_log_sink_enabled():
+			# written in bulk by sink, asynchronized anyway
+			ask_pipeline_monitor_log_sink().accept(monitor_log, trace_id, principal_service)
 		else:
 			schema = find_topic_schema('raw_pipeline_monitor_log', principal_service)
 			trigger = PipelineTrigger(
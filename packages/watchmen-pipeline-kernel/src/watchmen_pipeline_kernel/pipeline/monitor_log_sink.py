@@ -0,0 +1,231 @@
+from asyncio import run
+from atexit import register
+from enum import Enum
+from logging import getLogger
+from queue import Empty, Full, Queue
+from random import random
+from threading import RLock, Thread
+from typing import Dict, List, Optional
+
+from watchmen_auth import PrincipalService
+from watchmen_data_kernel.meta import TopicService
+from watchmen_data_kernel.topic_schema import TopicSchema
+from watchmen_model.admin import PipelineTriggerType
+from watchmen_model.common import TenantId
+from watchmen_model.pipeline_kernel import MonitorLogStatus, PipelineMonitorLog, PipelineTriggerTraceId
+from watchmen_pipeline_kernel.common import ask_monitor_log_sink_batch_size, ask_monitor_log_sink_flush_interval, \
+	ask_monitor_log_sink_full_policy, ask_monitor_log_sink_queue_size, ask_monitor_log_sink_sample_rate, \
+	PipelineKernelException
+from watchmen_utilities import ArrayHelper
+from .pipeline_batch_trigger import PipelineBatchTrigger
+from .pipeline_trigger import PipelineTrigger
+
+logger = getLogger(__name__)
+
+
+class MonitorLogSinkFullPolicy(str, Enum):
+	BLOCK = 'block',  # wait until queue is not full, slows down pipelines
+	DROP = 'drop'  # drop monitor log
+
+
+class MonitorLogSinkItem:
+	def __init__(
+			self, monitor_log: PipelineMonitorLog, trace_id: PipelineTriggerTraceId,
+			principal_service: PrincipalService):
+		self.monitorLog = monitor_log
+		self.traceId = trace_id
+		self.principalService = principal_service
+
+
+class PipelineMonitorLogSinkMetrics:
+	def __init__(self):
+		self.lock = RLock()
+		# count of monitor logs accepted into queue
+		self.accepted: int = 0
+		# count of monitor logs dropped since queue is full
+		self.dropped: int = 0
+		# count of monitor logs ignored by sampling
+		self.sampledOut: int = 0
+		# count of monitor logs written, and failed
+		self.flushed: int = 0
+		self.failed: int = 0
+
+	def increase(self, name: str, count: int = 1) -> None:
+		with self.lock:
+			setattr(self, name, getattr(self, name) + count)
+
+	def to_dict(self):
+		return {
+			'accepted': self.accepted, 'dropped': self.dropped, 'sampledOut': self.sampledOut,
+			'flushed': self.flushed, 'failed': self.failed
+		}
+
+
+def log_monitor_log(monitor_log: PipelineMonitorLog, asynchronized: bool) -> None:
+	"""
+	monitor logs of monitor log pipelines will not be written again
+	"""
+	logger.info(monitor_log)
+
+
+class PipelineMonitorLogSink:
+	def __init__(
+			self, queue_size: Optional[int] = None, batch_size: Optional[int] = None,
+			flush_interval: Optional[float] = None, full_policy: Optional[MonitorLogSinkFullPolicy] = None,
+			sample_rate: Optional[float] = None):
+		"""
+		monitor logs are buffered in bounded queue, and written by background worker in bulk.
+		"""
+		self.queue: Queue = Queue(maxsize=ask_monitor_log_sink_queue_size() if queue_size is None else queue_size)
+		self.batchSize = ask_monitor_log_sink_batch_size() if batch_size is None else batch_size
+		self.flushInterval = ask_monitor_log_sink_flush_interval() if flush_interval is None else flush_interval
+		self.fullPolicy = MonitorLogSinkFullPolicy(
+			ask_monitor_log_sink_full_policy() if full_policy is None else full_policy)
+		self.sampleRate = ask_monitor_log_sink_sample_rate() if sample_rate is None else sample_rate
+		self.metrics = PipelineMonitorLogSinkMetrics()
+		self.lock = RLock()
+		self.worker: Optional[Thread] = None
+		self.exitRegistered = False
+
+	def start(self) -> None:
+		with self.lock:
+			if self.worker is None:
+				self.worker = Thread(target=self.work, args=(), daemon=True)
+				self.worker.start()
+				if not self.exitRegistered:
+					# write buffered monitor logs on exit, daemon worker is killed without flushing
+					register(self.close)
+					self.exitRegistered = True
+
+	def is_sampled_out(self, monitor_log: PipelineMonitorLog) -> bool:
+		"""
+		error logs are always kept
+		"""
+		if self.sampleRate >= 1 or monitor_log.status == MonitorLogStatus.ERROR:
+			return False
+		return random() >= self.sampleRate
+
+	def accept(
+			self, monitor_log: PipelineMonitorLog, trace_id: PipelineTriggerTraceId,
+			principal_service: PrincipalService) -> bool:
+		"""
+		returns false when monitor log is sampled out or dropped
+		"""
+		if self.is_sampled_out(monitor_log):
+			self.metrics.increase('sampledOut')
+			return False
+
+		self.start()
+		item = MonitorLogSinkItem(monitor_log, trace_id, principal_service)
+		if self.fullPolicy == MonitorLogSinkFullPolicy.BLOCK:
+			self.queue.put(item)
+		else:
+			try:
+				self.queue.put_nowait(item)
+			except Full:
+				self.metrics.increase('dropped')
+				logger.warning(
+					f'Monitor log[traceId={trace_id}] dropped, sink is full, metrics[{self.metrics.to_dict()}].')
+				return False
+		self.metrics.increase('accepted')
+		return True
+
+	def drain(self) -> List[MonitorLogSinkItem]:
+		"""
+		wait for first item in flush interval, and take the rest which is ready in queue, batch size at most
+		"""
+		try:
+			items = [self.queue.get(timeout=self.flushInterval)]
+		except Empty:
+			return []
+		while len(items) < self.batchSize:
+			try:
+				items.append(self.queue.get_nowait())
+			except Empty:
+				break
+		return items
+
+	def drain_all(self) -> List[MonitorLogSinkItem]:
+		items: List[MonitorLogSinkItem] = []
+		while True:
+			try:
+				items.append(self.queue.get_nowait())
+			except Empty:
+				return items
+
+	# noinspection PyMethodMayBeStatic
+	def find_topic_schema(self, principal_service: PrincipalService) -> TopicSchema:
+		schema = TopicService(principal_service).find_schema_by_name(
+			'raw_pipeline_monitor_log', principal_service.get_tenant_id())
+		if schema is None:
+			raise PipelineKernelException(
+				f'Topic schema[name=raw_pipeline_monitor_log, tenant={principal_service.get_tenant_id()}] not found.')
+		return schema
+
+	async def flush_tenant(self, items: List[MonitorLogSinkItem]) -> None:
+		schema = self.find_topic_schema(items[0].principalService)
+		triggers = ArrayHelper(items).map(lambda x: PipelineTrigger(
+			trigger_topic_schema=schema,
+			trigger_type=PipelineTriggerType.INSERT,
+			trigger_data=x.monitorLog.dict(),
+			trace_id=x.traceId,
+			principal_service=x.principalService,
+			asynchronized=False,
+			handle_monitor_log=log_monitor_log
+		)).to_list()
+		await PipelineBatchTrigger(triggers).invoke()
+
+	async def flush(self, items: List[MonitorLogSinkItem]) -> None:
+		"""
+		monitor logs are written in bulk by tenant, failure of one tenant does not impact others
+		"""
+		groups: Dict[TenantId, List[MonitorLogSinkItem]] = ArrayHelper(items) \
+			.group_by(lambda x: x.principalService.get_tenant_id())
+		for tenant_items in groups.values():
+			# noinspection PyBroadException
+			try:
+				await self.flush_tenant(tenant_items)
+				self.metrics.increase('flushed', len(tenant_items))
+			except Exception as e:
+				self.metrics.increase('failed', len(tenant_items))
+				logger.error(e, exc_info=True, stack_info=True)
+				ArrayHelper(tenant_items).each(lambda x: logger.error(x.monitorLog))
+
+	def work(self) -> None:
+		logger.info('Pipeline monitor log sink started.')
+		try:
+			while True:
+				items = self.drain()
+				if len(items) != 0:
+					run(self.flush(items))
+					logger.debug(f'Pipeline monitor logs flushed, metrics[{self.metrics.to_dict()}].')
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+		finally:
+			logger.warning('Pipeline monitor log sink stopped.')
+			with self.lock:
+				self.worker = None
+			# try to restart
+			if not self.queue.empty():
+				self.start()
+
+	def close(self) -> None:
+		"""
+		write all monitor logs remained in queue, in batches
+		"""
+		ArrayHelper(self.drain_all()).chunk(self.batchSize).each(lambda x: run(self.flush(x)))
+
+
+class PipelineMonitorLogSinkHolder:
+	lock: RLock = RLock()
+	sink: Optional[PipelineMonitorLogSink] = None
+
+
+pipeline_monitor_log_sink_holder = PipelineMonitorLogSinkHolder()
+
+
+def ask_pipeline_monitor_log_sink() -> PipelineMonitorLogSink:
+	with pipeline_monitor_log_sink_holder.lock:
+		if pipeline_monitor_log_sink_holder.sink is None:
+			pipeline_monitor_log_sink_holder.sink = PipelineMonitorLogSink()
+	return pipeline_monitor_log_sink_holder.sink
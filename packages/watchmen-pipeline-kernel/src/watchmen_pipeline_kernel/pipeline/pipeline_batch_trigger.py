@@ -0,0 +1,76 @@
+from asyncio import ensure_future
+from typing import List
+
+from watchmen_data_kernel.storage import TopicTrigger
+from watchmen_data_kernel.topic_schema import TopicSchema
+from watchmen_model.admin import PipelineTriggerType, TopicKind
+from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_utilities import ArrayHelper
+from .pipeline_trigger import PipelineTrigger
+
+
+class PipelineBatchTrigger:
+	def __init__(self, triggers: List[PipelineTrigger]):
+		"""
+		triggers must be on same topic, with same trigger type and same asynchronized flag
+		"""
+		self.triggers = triggers
+
+	def get_trigger_topic_schema(self) -> TopicSchema:
+		return self.triggers[0].triggerTopicSchema
+
+	def get_trigger_type(self) -> PipelineTriggerType:
+		return self.triggers[0].triggerType
+
+	def is_bulk_insert_supported(self) -> bool:
+		"""
+		only insertion on non-synonym topic can be saved in bulk
+		"""
+		return self.get_trigger_type() == PipelineTriggerType.INSERT \
+			and self.get_trigger_topic_schema().get_topic().kind != TopicKind.SYNONYM
+
+	def prepare_trigger_data(self) -> None:
+		ArrayHelper(self.triggers).each(lambda x: x.prepare_trigger_data())
+
+	def save_trigger_data(self) -> List[TopicTrigger]:
+		if not self.is_bulk_insert_supported():
+			return ArrayHelper(self.triggers).map(lambda x: x.save_trigger_data()).to_list()
+
+		first = self.triggers[0]
+		data_service = first.ask_topic_data_service(self.get_trigger_topic_schema())
+		return data_service.trigger_by_insert_batch(ArrayHelper(self.triggers).map(lambda x: x.triggerData).to_list())
+
+	def prepare(self) -> None:
+		"""
+		check triggers and prepare trigger data, nothing is saved.
+		raise exception when any trigger cannot be saved
+		"""
+		schema = self.get_trigger_topic_schema()
+		trigger_type = self.get_trigger_type()
+		if ArrayHelper(self.triggers).some(
+				lambda x: x.triggerTopicSchema is not schema or x.triggerType != trigger_type):
+			raise PipelineKernelException('Triggers in batch must be on same topic and with same trigger type.')
+		if schema.get_topic().kind == TopicKind.SYNONYM and trigger_type != PipelineTriggerType.INSERT:
+			raise PipelineKernelException(f'Trigger type[{trigger_type}] is not supported on synonym.')
+		self.prepare_trigger_data()
+
+	async def start(self, results: List[TopicTrigger]) -> List[int]:
+		"""
+		start pipelines of saved trigger data one by one, returns internal data ids in same order as triggers
+		"""
+		for trigger, result in zip(self.triggers, results):
+			if trigger.asynchronized:
+				ensure_future(trigger.start(result))
+			else:
+				await trigger.start(result)
+		return ArrayHelper(results).map(lambda x: x.internalDataId).to_list()
+
+	async def invoke(self) -> List[int]:
+		"""
+		trigger data should be prepared and saved in bulk, and then pipelines are started one by one.
+		returns internal data ids in same order as triggers
+		"""
+		if len(self.triggers) == 0:
+			return []
+		self.prepare()
+		return await self.start(self.save_trigger_data())
@@ -1,14 +1,16 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from watchmen_auth import PrincipalService
 from watchmen_data_kernel.meta import TenantService, TopicService
 from watchmen_data_kernel.topic_schema import TopicSchema
-from watchmen_model.admin import User, UserRole
+from watchmen_model.admin import PipelineTriggerType, TopicKind, User, UserRole
+from watchmen_model.common import TenantId
 from watchmen_model.pipeline_kernel import PipelineTriggerData, PipelineTriggerTraceId
 from watchmen_model.system import Tenant
 from watchmen_pipeline_kernel.common import PipelineKernelException
-from watchmen_utilities import is_blank, is_not_blank
+from watchmen_utilities import ArrayHelper, is_blank, is_not_blank
 from .monitor_log_invoker import create_monitor_log_pipeline_invoker
+from .pipeline_batch_trigger import PipelineBatchTrigger
 from .pipeline_trigger import PipelineTrigger
 
 
@@ -28,13 +30,8 @@ def find_topic_schema(name: str, principal_service: PrincipalService) -> TopicSc
 	return schema
 
 
-async def invoke(
-		trigger_data: PipelineTriggerData,
-		trace_id: PipelineTriggerTraceId, principal_service: PrincipalService,
-		asynchronized: bool) -> int:
-	if trigger_data.data is None:
-		raise PipelineKernelException(f'Trigger data is null.')
-	
+def ask_trigger_principal_service(
+		trigger_data: PipelineTriggerData, principal_service: PrincipalService) -> PrincipalService:
 	if principal_service.is_super_admin():
 		if is_blank(trigger_data.tenantId):
 			raise Exception('No tenant appointed.')
@@ -50,7 +47,28 @@ async def invoke(
 	else:
 		if is_not_blank(trigger_data.tenantId) and trigger_data.tenantId != principal_service.get_tenant_id():
 			raise Exception(f'Tenant[{trigger_data.tenantId}] does not match principal.')
-	
+	return principal_service
+
+
+def is_bulk_insert_supported(trigger_data: PipelineTriggerData, principal_service: PrincipalService) -> bool:
+	"""
+	same as batch trigger, only insertion on non-synonym topic is saved in bulk.
+	others are saved one by one, therefore might be saved partially when failed
+	"""
+	if trigger_data.triggerType != PipelineTriggerType.INSERT:
+		return False
+	principal_service = ask_trigger_principal_service(trigger_data, principal_service)
+	return find_topic_schema(trigger_data.code, principal_service).get_topic().kind != TopicKind.SYNONYM
+
+
+async def invoke(
+		trigger_data: PipelineTriggerData,
+		trace_id: PipelineTriggerTraceId, principal_service: PrincipalService,
+		asynchronized: bool) -> int:
+	if trigger_data.data is None:
+		raise PipelineKernelException(f'Trigger data is null.')
+
+	principal_service = ask_trigger_principal_service(trigger_data, principal_service)
 	schema = find_topic_schema(trigger_data.code, principal_service)
 	return await PipelineTrigger(
 		trigger_topic_schema=schema,
@@ -63,6 +81,59 @@ async def invoke(
 	).invoke()
 
 
+async def invoke_batch(
+		trigger_data_list: List[PipelineTriggerData],
+		trace_ids: List[PipelineTriggerTraceId], principal_service: PrincipalService,
+		asynchronized: bool) -> List[int]:
+	"""
+	trigger data are grouped by topic, tenant and trigger type, data in one group are saved in bulk.
+	all groups are checked and prepared before any of them saved, therefore nothing is saved when any data is invalid.
+	pipelines are started after all groups saved.
+	returns internal data ids in same order as given trigger data
+	"""
+	if len(trigger_data_list) != len(trace_ids):
+		raise PipelineKernelException(
+			f'Count of trace ids[{len(trace_ids)}] does not match count of trigger data[{len(trigger_data_list)}].')
+	if ArrayHelper(trigger_data_list).some(lambda x: x.data is None):
+		raise PipelineKernelException(f'Trigger data is null.')
+
+	groups: Dict[Tuple[str, Optional[TenantId], PipelineTriggerType], List[int]] = {}
+	for index, trigger_data in enumerate(trigger_data_list):
+		key = (trigger_data.code, trigger_data.tenantId, trigger_data.triggerType)
+		indexes = groups.get(key)
+		if indexes is None:
+			groups[key] = [index]
+		else:
+			indexes.append(index)
+
+	# prepare all groups before saving any of them, invalid data of any group fails the whole batch with nothing saved
+	batch_triggers: List[Tuple[List[int], PipelineBatchTrigger]] = []
+	for indexes in groups.values():
+		first = trigger_data_list[indexes[0]]
+		trigger_principal_service = ask_trigger_principal_service(first, principal_service)
+		schema = find_topic_schema(first.code, trigger_principal_service)
+		batch_trigger = PipelineBatchTrigger(ArrayHelper(indexes).map(lambda x: PipelineTrigger(
+			trigger_topic_schema=schema,
+			trigger_type=first.triggerType,
+			trigger_data=trigger_data_list[x].data,
+			trace_id=trace_ids[x],
+			principal_service=trigger_principal_service,
+			asynchronized=asynchronized,
+			handle_monitor_log=create_monitor_log_pipeline_invoker(trace_ids[x], trigger_principal_service)
+		)).to_list())
+		batch_trigger.prepare()
+		batch_triggers.append((indexes, batch_trigger))
+
+	# save all groups, and then start pipelines
+	saved = ArrayHelper(batch_triggers).map(lambda x: (x[0], x[1], x[1].save_trigger_data())).to_list()
+	internal_data_ids: List[int] = [-1] * len(trigger_data_list)
+	for indexes, batch_trigger, results in saved:
+		group_internal_data_ids = await batch_trigger.start(results)
+		for index, internal_data_id in zip(indexes, group_internal_data_ids):
+			internal_data_ids[index] = internal_data_id
+	return internal_data_ids
+
+
 async def try_to_invoke_pipelines(
 		trigger_data: PipelineTriggerData, trace_id: PipelineTriggerTraceId,
 		principal_service: PrincipalService
@@ -76,3 +147,16 @@ async def try_to_invoke_pipelines_async(
 ) -> int:
 	return await invoke(trigger_data, trace_id, principal_service, True)
 
+
+async def try_to_invoke_pipelines_batch(
+		trigger_data_list: List[PipelineTriggerData], trace_ids: List[PipelineTriggerTraceId],
+		principal_service: PrincipalService
+) -> List[int]:
+	return await invoke_batch(trigger_data_list, trace_ids, principal_service, False)
+
+
+async def try_to_invoke_pipelines_batch_async(
+		trigger_data_list: List[PipelineTriggerData], trace_ids: List[PipelineTriggerTraceId],
+		principal_service: PrincipalService
+) -> List[int]:
+	return await invoke_batch(trigger_data_list, trace_ids, principal_service, True)
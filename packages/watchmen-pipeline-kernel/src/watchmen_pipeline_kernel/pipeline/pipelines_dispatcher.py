@@ -1,35 +1,163 @@
-from typing import Callable, List, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from typing import Callable, Deque, List, Optional, Set, Tuple
 
+from watchmen_model.common import TopicId
 from watchmen_model.pipeline_kernel import PipelineMonitorLog
-from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_pipeline_kernel.common import ask_pipeline_dispatch_concurrent, \
+	ask_pipeline_dispatch_concurrent_workers, ask_pipeline_dispatch_max_contexts, ask_pipeline_dispatch_max_depth, \
+	ask_pipeline_dispatch_max_fan_out, PipelineKernelException
 from watchmen_pipeline_kernel.pipeline_schema import RuntimePipelineContext
 from watchmen_pipeline_kernel.topic import RuntimeTopicStorages
 
+logger = getLogger(__name__)
+
+# context and its cascade depth, depth of contexts given by trigger is 0
+QueuedContext = Tuple[RuntimePipelineContext, int]
+HandleMonitorLog = Callable[[PipelineMonitorLog, bool], None]
+
+
+class PipelinesDispatcherMetrics:
+	def __init__(self):
+		# count of dispatched contexts
+		self.dispatched: int = 0
+		# max length of queue during dispatching
+		self.maxQueueLength: int = 0
+		# max cascade depth reached during dispatching
+		self.maxDepth: int = 0
+		# max count of contexts run concurrently
+		self.maxConcurrent: int = 0
+
+	def to_dict(self):
+		return {
+			'dispatched': self.dispatched, 'maxQueueLength': self.maxQueueLength, 'maxDepth': self.maxDepth,
+			'maxConcurrent': self.maxConcurrent
+		}
+
 
 class PipelinesDispatcher:
-	def __init__(self, contexts: List[RuntimePipelineContext], storages: RuntimeTopicStorages):
-		self.contexts = contexts
+	def __init__(
+			self, contexts: List[RuntimePipelineContext], storages: RuntimeTopicStorages,
+			max_depth: Optional[int] = None, max_fan_out: Optional[int] = None, max_contexts: Optional[int] = None,
+			concurrent: Optional[bool] = None, concurrent_workers: Optional[int] = None):
+		"""
+		contexts are dispatched in breadth-first order, contexts created by pipeline are queued at tail.
+		limitations are read from settings when not given, 0 or negative value means no limitation.
+		"""
+		self.queue: Deque[QueuedContext] = deque()
 		self.storages = storages
+		self.maxDepth = ask_pipeline_dispatch_max_depth() if max_depth is None else max_depth
+		self.maxFanOut = ask_pipeline_dispatch_max_fan_out() if max_fan_out is None else max_fan_out
+		self.maxContexts = ask_pipeline_dispatch_max_contexts() if max_contexts is None else max_contexts
+		self.concurrent = ask_pipeline_dispatch_concurrent() if concurrent is None else concurrent
+		self.concurrentWorkers = ask_pipeline_dispatch_concurrent_workers() \
+			if concurrent_workers is None else concurrent_workers
+		self.metrics = PipelinesDispatcherMetrics()
+		self.enqueue(contexts, 0)
 
-	def start(self, handle_monitor_log: Callable[[PipelineMonitorLog, bool], None]) -> None:
-		context = self.next_context()
-		if context is None:
-			# no context needs to be invoked
-			return None
-		created_contexts = context.start(self.storages, handle_monitor_log)
-		if len(created_contexts) != 0:
+	def enqueue(self, contexts: List[RuntimePipelineContext], depth: int) -> None:
+		if len(contexts) == 0:
+			return
+		if 0 < self.maxFanOut < len(contexts):
+			raise PipelineKernelException(
+				f'Fan-out[{len(contexts)}] exceeds max fan-out[{self.maxFanOut}] of pipelines dispatching.')
+		if 0 < self.maxDepth < depth:
+			raise PipelineKernelException(
+				f'Depth[{depth}] exceeds max depth[{self.maxDepth}] of pipelines dispatching.')
+		for context in contexts:
+			if context is None:
+				raise PipelineKernelException(f'Pipeline context is none, cannot be invoked.')
+			self.queue.append((context, depth))
+		self.metrics.maxQueueLength = max(self.metrics.maxQueueLength, len(self.queue))
+		self.metrics.maxDepth = max(self.metrics.maxDepth, depth)
+
+	def start(self, handle_monitor_log: HandleMonitorLog) -> None:
+		if self.concurrent and self.concurrentWorkers > 1:
+			self.start_concurrently(handle_monitor_log)
+		else:
+			self.start_sequentially(handle_monitor_log)
+		logger.debug(f'Pipelines dispatched, metrics[{self.metrics.to_dict()}].')
+
+	def start_sequentially(self, handle_monitor_log: HandleMonitorLog) -> None:
+		while True:
+			queued = self.next_context()
+			if queued is None:
+				# no context needs to be invoked
+				break
+			context, depth = queued
+			created_contexts = context.start(self.storages, handle_monitor_log)
 			# noinspection PyTypeChecker
-			self.contexts.extend(created_contexts)
-		# invoke next
-		self.start(handle_monitor_log)
+			self.enqueue(created_contexts, depth + 1)
+
+	def start_concurrently(self, handle_monitor_log: HandleMonitorLog) -> None:
+		with ThreadPoolExecutor(max_workers=self.concurrentWorkers) as executor:
+			while True:
+				wave = self.next_wave()
+				if len(wave) == 0:
+					# no context needs to be invoked
+					break
+				self.metrics.maxConcurrent = max(self.metrics.maxConcurrent, len(wave))
+				if len(wave) == 1:
+					# run on current thread, no need to isolate
+					context, depth = wave[0]
+					created_contexts = context.start(self.storages, handle_monitor_log)
+					# noinspection PyTypeChecker
+					self.enqueue(created_contexts, depth + 1)
+				else:
+					futures = [executor.submit(self.start_isolated, context) for context, _ in wave]
+					# collect results in queued order, keep the dispatching order deterministic
+					for (_, depth), future in zip(wave, futures):
+						created_contexts, monitor_logs = future.result()
+						for monitor_log, asynchronized in monitor_logs:
+							handle_monitor_log(monitor_log, asynchronized)
+						# noinspection PyTypeChecker
+						self.enqueue(created_contexts, depth + 1)
 
-	def next_context(self) -> Optional[RuntimePipelineContext]:
-		if len(self.contexts) == 0:
+	def start_isolated(
+			self, context: RuntimePipelineContext
+	) -> Tuple[List[RuntimePipelineContext], List[Tuple[PipelineMonitorLog, bool]]]:
+		"""
+		run context on worker thread. topic storages are not thread safe, use a standalone one.
+		monitor logs are collected and handled on dispatching thread, since asynchronized handling requires event loop.
+		"""
+		monitor_logs: List[Tuple[PipelineMonitorLog, bool]] = []
+		storages = RuntimeTopicStorages(self.storages.principalService)
+		created_contexts = context.start(
+			storages, lambda monitor_log, asynchronized: monitor_logs.append((monitor_log, asynchronized)))
+		# noinspection PyTypeChecker
+		return created_contexts, monitor_logs
+
+	def next_context(self) -> Optional[QueuedContext]:
+		if len(self.queue) == 0:
 			return None
-		# get next context
-		context = self.contexts[0]
-		if context is None:
-			raise PipelineKernelException(f'Pipeline context is none, cannot be invoked.')
-		# next context is ready, pop it
-		self.contexts = self.contexts[1:]
-		return context
+		self.count_dispatched()
+		return self.queue.popleft()
+
+	def next_wave(self) -> List[QueuedContext]:
+		"""
+		pick contexts from queue head which can run concurrently, a context is picked only when its write topics
+		are not overlapped with any context queued before it, therefore conflicting contexts keep their order.
+		scanning stops when wave is full, or skipped contexts reaches the workers count.
+		"""
+		wave: List[QueuedContext] = []
+		skipped: List[QueuedContext] = []
+		blocked: Set[TopicId] = set()
+		while len(self.queue) != 0 and len(wave) < self.concurrentWorkers and len(skipped) < self.concurrentWorkers:
+			queued = self.queue.popleft()
+			write_topic_ids = queued[0].get_write_topic_ids()
+			if blocked.isdisjoint(write_topic_ids):
+				self.count_dispatched()
+				wave.append(queued)
+			else:
+				skipped.append(queued)
+			blocked.update(write_topic_ids)
+		self.queue.extendleft(reversed(skipped))
+		return wave
+
+	def count_dispatched(self) -> None:
+		if 0 < self.maxContexts <= self.metrics.dispatched:
+			raise PipelineKernelException(
+				f'Pipelines dispatched exceeds max count[{self.maxContexts}] of one trigger, '
+				f'{len(self.queue)} contexts remained.')
+		self.metrics.dispatched = self.metrics.dispatched + 1
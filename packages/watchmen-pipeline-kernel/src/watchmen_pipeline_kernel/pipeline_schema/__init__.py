@@ -1 +1,2 @@
 from .pipeline_context import RuntimePipelineContext
+from .pipeline_warm_up import warm_up_compiled_pipelines
@@ -18,7 +18,6 @@ from watchmen_data_kernel.storage_bridge import now, parse_action_defined_as, pa
 	ParsedMemoryConstantParameter, ParsedMemoryParameter, ParsedStorageCondition, ParsedStorageMapping, \
 	PipelineVariables, PrerequisiteDefinedAs, PrerequisiteTest, spent_ms
 from watchmen_data_kernel.topic_schema import TopicSchema
-from watchmen_meta.common import ask_snowflake_generator
 from watchmen_model.admin import AggregateArithmetic, AlarmAction, AlarmActionSeverity, CopyToMemoryAction, \
 	DeleteTopicAction, DeleteTopicActionType, Factor, FindBy, FromTopic, MappingFactor, MappingRow, \
 	Pipeline, PipelineAction, PipelineStage, PipelineTriggerType, PipelineUnit, ReadFactorAction, ReadFactorsAction, \
@@ -35,6 +34,7 @@ from watchmen_pipeline_kernel.pipeline_schema_interface import CreateQueuePipeli
 from watchmen_storage import EntityColumnAggregateArithmetic, EntityCriteria, EntityStraightAggregateColumn, \
 	EntityStraightColumn
 from watchmen_utilities import ArrayHelper, is_blank, is_not_blank
+from .monitor_log_uid import next_monitor_log_uid
 
 logger = getLogger(__name__)
 
@@ -121,7 +121,7 @@ class CompiledAction:
 	def create_common_action_log(self) -> Dict[str, Any]:
 		return {
 			# create uid of action monitor log
-			'uid': str(ask_snowflake_generator().next_id()),
+			'uid': next_monitor_log_uid(),
 			'actionId': self.action.actionId, 'type': self.action.type,
 			'status': MonitorLogStatus.DONE, 'startTime': now(), 'spentInMills': 0, 'error': None,
 			'insertCount': 0, 'updateCount': 0, 'deleteCount': 0,
@@ -531,7 +531,8 @@ class CompiledInsertion(CompiledWriteTopicAction):
 		returns true when insert successfully.
 		returns false when insert failed and given allow_failure is true.
 		"""
-		data = self.parsedMapping.run(None, variables, principal_service)
+		# mapped values might be shared with variables or trigger data, copy before changed in place
+		data = deepcopy(self.parsedMapping.run(None, variables, principal_service))
 		self.schema.initialize_default_values(data)
 		self.schema.cast_date_or_time(data)
 		self.schema.encrypt(data, principal_service)
@@ -561,7 +562,8 @@ class CompiledUpdate(CompiledWriteTopicAction):
 	# noinspection PyMethodMayBeStatic
 	def merge_into(self, original: Dict[str, Any], updated: Dict[str, Any]) -> Dict[str, Any]:
 		cloned = deepcopy(original)
-		for key, value in updated.items():
+		# mapped values might be shared with variables or trigger data, copy before changed in place
+		for key, value in deepcopy(updated).items():
 			cloned[key] = value
 		return cloned
 
@@ -1,9 +1,8 @@
 from __future__ import annotations
 
-from copy import deepcopy
 from logging import getLogger
 from traceback import format_exc
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from watchmen_auth import PrincipalService
 from watchmen_data_kernel.meta import PipelineService, TopicService
@@ -11,13 +10,15 @@ from watchmen_data_kernel.storage import TopicTrigger
 from watchmen_data_kernel.storage_bridge import now, parse_prerequisite_defined_as, parse_prerequisite_in_memory, \
 	PipelineVariables, spent_ms
 from watchmen_data_kernel.topic_schema import TopicSchema
-from watchmen_meta.common import ask_snowflake_generator
 from watchmen_model.admin import Pipeline, PipelineTriggerType
+from watchmen_model.common import TopicId
 from watchmen_model.pipeline_kernel import MonitorLogStatus, PipelineMonitorLog, PipelineTriggerTraceId
 from watchmen_pipeline_kernel.common import ask_async_handle_monitor_log, PipelineKernelException
 from watchmen_pipeline_kernel.pipeline_schema_interface import CompiledPipeline, PipelineContext, TopicStorages
 from watchmen_utilities import ArrayHelper
+from .compiled_action import CompiledDeleteTopicAction, CompiledWriteTopicAction
 from .compiled_stage import compile_stages, CompiledStage
+from .monitor_log_uid import next_monitor_log_uid
 
 logger = getLogger(__name__)
 
@@ -41,10 +42,25 @@ class RuntimeCompiledPipeline(CompiledPipeline):
 		self.prerequisiteDefinedAs = parse_prerequisite_defined_as(pipeline, principal_service)
 		self.prerequisiteTest = parse_prerequisite_in_memory(pipeline, principal_service)
 		self.stages = compile_stages(pipeline, principal_service)
+		self.writeTopicIds = self.compute_write_topic_ids()
 
 	def get_pipeline(self):
 		return self.pipeline
 
+	def compute_write_topic_ids(self) -> Set[TopicId]:
+		return set(
+			ArrayHelper(self.stages)
+			.map(lambda x: x.units).flatten()
+			.map(lambda x: x.actions).flatten()
+			.filter(lambda x: isinstance(x, CompiledWriteTopicAction) or isinstance(x, CompiledDeleteTopicAction))
+			.map(lambda x: x.get_topic())
+			.filter(lambda x: x is not None)
+			.map(lambda x: x.topicId)
+			.to_list())
+
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		return self.writeTopicIds
+
 	def run(
 			self,
 			previous_data: Optional[Dict[str, Any]], current_data: Optional[Dict[str, Any]],
@@ -60,12 +76,13 @@ class RuntimeCompiledPipeline(CompiledPipeline):
 		# build monitor log
 		monitor_log = PipelineMonitorLog(
 			# create uid of pipeline monitor log
-			uid=str(ask_snowflake_generator().next_id()),
+			uid=next_monitor_log_uid(),
 			traceId=trace_id, dataId=data_id,
 			pipelineId=self.pipeline.pipelineId, topicId=trigger_topic_id,
 			status=MonitorLogStatus.DONE, startTime=now(), spentInMills=0, error=None,
-			oldValue=deepcopy(previous_data) if previous_data is not None else None,
-			newValue=deepcopy(current_data) if current_data is not None else None,
+			# trigger data snapshots are shared, never changed in place by pipeline
+			oldValue=previous_data,
+			newValue=current_data,
 			prerequisite=True,
 			prerequisiteDefinedAs=self.prerequisiteDefinedAs(),
 			stages=[]
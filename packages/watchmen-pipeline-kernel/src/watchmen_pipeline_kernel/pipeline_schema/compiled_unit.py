@@ -1,4 +1,3 @@
-from copy import deepcopy
 from logging import getLogger
 from typing import Any, List
 
@@ -31,10 +30,11 @@ class CompiledUnit(CompiledSingleUnit):
 		loop_variable_name = self.loopVariableName
 		if self.hasLoop:
 			# note variables CANNOT be passed from inside of loop, which means even variables are changed in loop,
-			# the next loop will not be impacted, and also will not impact steps followed
+			# the next loop will not be impacted, and also will not impact steps followed.
+			# each loop runs on a child layer of variables, element is shared since write actions never change it
 			def clone_variables(replaced: Any) -> PipelineVariables:
 				cloned = variables.clone()
-				cloned.put(loop_variable_name, deepcopy(replaced))
+				cloned.put(loop_variable_name, replaced)
 				return cloned
 
 			loop_variable_value = variables.find(loop_variable_name)
@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-from copy import deepcopy
 from logging import getLogger
 from typing import Any, List, Optional, Tuple, Union
 
@@ -165,7 +164,7 @@ dask_client_holder = DaskClientHolder()
 
 def to_dask_args(loop: DistributedUnitLoop, variableValue: Any) -> List[Any]:
 	cloned = loop.pipelineVariables.clone()
-	cloned.put(loop.loopVariableName, deepcopy(variableValue))
+	cloned.put(loop.loopVariableName, variableValue)
 
 	return [
 		loop.pipeline,
@@ -0,0 +1,27 @@
+from threading import RLock
+from typing import Optional
+
+from watchmen_meta.common import ask_snowflake_generator
+from watchmen_storage import SnowflakeIdPool
+
+
+class MonitorLogUidPoolHolder:
+	lock: RLock = RLock()
+	pool: Optional[SnowflakeIdPool] = None
+
+
+monitor_log_uid_pool_holder = MonitorLogUidPoolHolder()
+
+
+def ask_monitor_log_uid_pool() -> SnowflakeIdPool:
+	with monitor_log_uid_pool_holder.lock:
+		if monitor_log_uid_pool_holder.pool is None:
+			monitor_log_uid_pool_holder.pool = SnowflakeIdPool(ask_snowflake_generator())
+	return monitor_log_uid_pool_holder.pool
+
+
+def next_monitor_log_uid() -> str:
+	"""
+	uid of pipeline and action monitor logs, allocated in block
+	"""
+	return str(ask_monitor_log_uid_pool().next_id())
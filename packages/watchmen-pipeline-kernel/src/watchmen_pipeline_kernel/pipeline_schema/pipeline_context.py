@@ -1,8 +1,9 @@
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from watchmen_auth import PrincipalService
 from watchmen_data_kernel.topic_schema import TopicSchema
 from watchmen_model.admin import Pipeline
+from watchmen_model.common import TopicId
 from watchmen_model.pipeline_kernel import PipelineMonitorLog, PipelineTriggerTraceId
 from watchmen_pipeline_kernel.cache import CacheService
 from watchmen_pipeline_kernel.pipeline_schema_interface import CompiledPipeline, PipelineContext, TopicStorages
@@ -40,18 +41,12 @@ class RuntimePipelineContext(PipelineContext):
 			handle_monitor_log=handle_monitor_log
 		)
 
-	def build_compiled_pipeline(self) -> CompiledPipeline:
-		compiled = CacheService.compiled_pipeline().get(self.pipeline.pipelineId)
-		if compiled is None:
-			compiled = RuntimeCompiledPipeline(self.pipeline, self.principalService)
-			CacheService.compiled_pipeline().put(self.pipeline.pipelineId, compiled)
-			return compiled
-
-		if id(compiled.get_pipeline()) != id(self.pipeline):
-			# not same pipeline, abandon compiled cache
-			CacheService.compiled_pipeline().remove(self.pipeline.pipelineId)
-			compiled = RuntimeCompiledPipeline(self.pipeline, self.principalService)
-			CacheService.compiled_pipeline().put(self.pipeline.pipelineId, compiled)
-			return compiled
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		return self.build_compiled_pipeline().get_write_topic_ids()
 
-		return compiled
+	def build_compiled_pipeline(self) -> CompiledPipeline:
+		"""
+		compiled pipeline is reused as long as pipeline is not changed, identified by version and last modified time
+		"""
+		return CacheService.compiled_pipeline().compile(
+			self.pipeline, lambda x: RuntimeCompiledPipeline(x, self.principalService))
@@ -0,0 +1,50 @@
+from logging import getLogger
+from typing import List, Optional
+
+from watchmen_auth import fake_super_admin, fake_tenant_admin
+from watchmen_data_kernel.cache import CacheService as DataKernelCacheService
+from watchmen_meta.admin import PipelineService as PipelineStorageService
+from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
+from watchmen_model.admin import Pipeline
+from watchmen_model.common import TenantId
+from watchmen_pipeline_kernel.cache import CacheService
+from watchmen_utilities import ArrayHelper
+from .compiled_pipeline import RuntimeCompiledPipeline
+
+logger = getLogger(__name__)
+
+
+def find_enabled_pipelines(tenant_id: Optional[TenantId]) -> List[Pipeline]:
+	storage_service = PipelineStorageService(ask_meta_storage(), ask_snowflake_generator(), fake_super_admin())
+	storage_service.begin_transaction()
+	try:
+		return ArrayHelper(storage_service.find_all(tenant_id)).filter(lambda x: x.enabled).to_list()
+	finally:
+		storage_service.close_transaction()
+
+
+# noinspection PyBroadException
+def warm_up_pipeline(pipeline: Pipeline) -> bool:
+	try:
+		DataKernelCacheService.pipeline().put(pipeline)
+		principal_service = fake_tenant_admin(pipeline.tenantId)
+		CacheService.compiled_pipeline().compile(
+			pipeline, lambda x: RuntimeCompiledPipeline(x, principal_service))
+		return True
+	except Exception as e:
+		logger.error(f'Failed to compile pipeline[id={pipeline.pipelineId}].')
+		logger.error(e, exc_info=True, stack_info=True)
+		return False
+
+
+def warm_up_compiled_pipelines(tenant_id: Optional[TenantId] = None) -> int:
+	"""
+	compile enabled pipelines of given tenant, or all tenants when tenant is not given.
+	returns count of compiled pipelines
+	"""
+	pipelines = find_enabled_pipelines(tenant_id)
+	compiled = ArrayHelper(pipelines).filter(lambda x: warm_up_pipeline(x)).size()
+	logger.info(
+		f'{compiled} of {len(pipelines)} pipeline(s) of tenant[id={tenant_id}] compiled on warm up, '
+		f'metrics[{CacheService.compiled_pipeline().metrics.to_dict()}].')
+	return compiled
@@ -1,8 +1,9 @@
 from abc import abstractmethod
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 
 from watchmen_auth import PrincipalService
 from watchmen_model.admin import Pipeline
+from watchmen_model.common import TopicId
 from watchmen_model.pipeline_kernel import PipelineMonitorLog, PipelineTriggerTraceId
 from .pipeline_context import PipelineContext
 from .topic_storages import TopicStorages
@@ -14,6 +15,13 @@ class CompiledPipeline:
 	def get_pipeline(self) -> Pipeline:
 		pass
 
+	@abstractmethod
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		"""
+		ids of topics which are written or deleted by this pipeline
+		"""
+		pass
+
 	@abstractmethod
 	def run(
 			self,
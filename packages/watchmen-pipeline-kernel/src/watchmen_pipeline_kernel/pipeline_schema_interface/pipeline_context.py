@@ -1,8 +1,9 @@
 from __future__ import annotations
 
 from abc import abstractmethod
-from typing import Callable, List
+from typing import Callable, List, Set
 
+from watchmen_model.common import TopicId
 from watchmen_model.pipeline_kernel import PipelineMonitorLog
 from .topic_storages import TopicStorages
 
@@ -15,3 +16,10 @@ class PipelineContext:
 			handle_monitor_log: Callable[[PipelineMonitorLog, bool], None]
 	) -> List[PipelineContext]:
 		pass
+
+	@abstractmethod
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		"""
+		ids of topics which are written or deleted by pipeline of this context
+		"""
+		pass
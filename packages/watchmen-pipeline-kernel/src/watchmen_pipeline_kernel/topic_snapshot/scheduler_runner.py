@@ -1,11 +1,15 @@
 from asyncio import run
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
 from logging import getLogger
-from typing import List, Optional, Tuple
+from random import shuffle
+from typing import Any, Dict, List, Optional, Tuple
 
 from time import sleep
 
 from watchmen_auth import fake_super_admin, fake_tenant_admin, PrincipalService
+from watchmen_data_kernel.common import ask_topic_snapshot_page_size, ask_topic_snapshot_resume_after, \
+	ask_topic_snapshot_task_batch_size, ask_topic_snapshot_task_idle_timeout, ask_topic_snapshot_task_workers
 from watchmen_data_kernel.meta import PipelineService, TopicService
 from watchmen_data_kernel.service import ask_topic_data_service, ask_topic_storage
 from watchmen_data_kernel.storage import TopicDataService, TopicTrigger
@@ -16,12 +20,12 @@ from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
 from watchmen_model.admin import Pipeline, PipelineTriggerType, Topic, TopicKind, TopicSnapshotFrequency, \
 	TopicSnapshotJobLock, TopicSnapshotJobLockId, TopicSnapshotJobLockStatus, TopicSnapshotScheduler, \
 	TopicSnapshotSchedulerId
-from watchmen_model.common import Pageable, TenantId, TopicId
+from watchmen_model.common import TenantId, TopicId
 from watchmen_model.pipeline_kernel import TopicDataColumnNames
 from watchmen_pipeline_kernel.pipeline import create_monitor_log_pipeline_invoker, PipelineTrigger
-from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, EntityCriteriaJoint, \
-	EntityCriteriaJointConjunction
-from watchmen_utilities import ArrayHelper
+from watchmen_storage import ColumnNameLiteral, EntityCriteria, EntityCriteriaExpression, EntityCriteriaOperator, \
+	EntitySortColumn, EntitySortMethod
+from watchmen_utilities import ArrayHelper, get_current_time_in_seconds
 from watchmen_utilities.datetime_helper import last_day_of_month
 from .scheduler_registrar import topic_snapshot_jobs
 from ..common import PipelineKernelException
@@ -73,16 +77,83 @@ def try_to_lock_scheduler(
 		return None, False
 
 
+def find_lock(
+		scheduler: TopicSnapshotScheduler, process_date: date,
+		principal_service: PrincipalService
+) -> Optional[TopicSnapshotJobLock]:
+	if isinstance(process_date, datetime):
+		process_date = process_date.date()
+
+	lock_service = get_lock_service(principal_service)
+	lock_service.begin_transaction()
+	try:
+		return lock_service.find_by_scheduler_and_process_date(scheduler.schedulerId, scheduler.frequency, process_date)
+	finally:
+		lock_service.close_transaction()
+
+
 # noinspection PyBroadException
-def update_job_row_count(lock: TopicSnapshotJobLock, row_count: int, principal_service: PrincipalService) -> None:
+def try_to_resume_scheduler(
+		scheduler: TopicSnapshotScheduler, process_date: date,
+		principal_service: PrincipalService
+) -> Tuple[Optional[TopicSnapshotJobLock], bool]:
+	"""
+	grab the existing lock which is failed, or still ready but its heartbeat is older than resume timeout
+	which means its job is crashed, and reset it to ready.
+	lock is grabbed only when it is not changed by others since read.
+	"""
+	if isinstance(process_date, datetime):
+		process_date = process_date.date()
+
 	lock_service = get_lock_service(principal_service)
 	lock_service.begin_transaction()
 	try:
-		lock.rowCount = row_count
-		lock_service.update(lock)
+		lock = lock_service.find_by_scheduler_and_process_date(scheduler.schedulerId, scheduler.frequency, process_date)
+		if lock is None or lock.status == TopicSnapshotJobLockStatus.SUCCESS:
+			lock_service.rollback_transaction()
+			return None, False
+		now = get_current_time_in_seconds()
+		# heartbeat is not persisted by locks created in previous versions
+		heartbeat_at = lock.createdAt if lock.heartbeatAt is None else lock.heartbeatAt
+		if lock.status == TopicSnapshotJobLockStatus.READY \
+				and heartbeat_at is not None \
+				and (now - heartbeat_at).total_seconds() < ask_topic_snapshot_resume_after():
+			# job might be still running on another node
+			lock_service.rollback_transaction()
+			return None, False
+		if not lock_service.take_over(lock, now):
+			lock_service.rollback_transaction()
+			return None, False
+		lock_service.commit_transaction()
+		lock.status = TopicSnapshotJobLockStatus.READY
+		lock.createdAt = now
+		lock.heartbeatAt = now
+		return lock, True
+	except Exception:
+		lock_service.rollback_transaction()
+		return None, False
+
+
+# noinspection PyBroadException
+def update_job_row_count(lock: TopicSnapshotJobLock, row_count: int, principal_service: PrincipalService) -> bool:
+	"""
+	update row count and renew heartbeat of lock. returns false when lock is taken over by others,
+	failure of updating is ignored, heartbeat will be renewed on next page
+	"""
+	lock_service = get_lock_service(principal_service)
+	lock_service.begin_transaction()
+	try:
+		heartbeat_at = get_current_time_in_seconds()
+		updated_count = lock_service.update_row_count(lock, row_count, heartbeat_at)
 		lock_service.commit_transaction()
+		if updated_count == 0:
+			return False
+		lock.rowCount = row_count
+		lock.heartbeatAt = heartbeat_at
+		return True
 	except Exception:
 		lock_service.rollback_transaction()
+		return True
 
 
 # noinspection PyBroadException
@@ -91,25 +162,25 @@ def accomplish_job(
 	lock_service = get_lock_service(principal_service)
 	lock_service.begin_transaction()
 	try:
-		lock.status = status
-		lock_service.update(lock)
+		lock_service.accomplish(lock.lockId, status)
 		lock_service.commit_transaction()
+		lock.status = status
 	except Exception:
 		lock_service.rollback_transaction()
 
 
 # noinspection PyBroadException
 def try_to_accomplish_job(lock_id: TopicSnapshotJobLockId, principal_service: PrincipalService) -> None:
+	"""
+	only the lock holder accomplishes job, and only when job is still ready
+	"""
 	lock_service = get_lock_service(principal_service)
 	lock_service.begin_transaction()
 	try:
-		lock = lock_service.find_by_id(lock_id)
-		if lock is not None and lock.status == TopicSnapshotJobLockStatus.READY:
-			lock.status = TopicSnapshotJobLockStatus.SUCCESS
-			lock_service.update(lock)
-			lock_service.commit_transaction()
-			logger.info(
-				f'Topic snapshot job[lockId={lock.lockId}, schedulerId={lock.schedulerId}] accomplished successfully.')
+		updated_count = lock_service.accomplish(lock_id, TopicSnapshotJobLockStatus.SUCCESS)
+		lock_service.commit_transaction()
+		if updated_count != 0:
+			logger.info(f'Topic snapshot job[lockId={lock_id}] accomplished successfully.')
 	except Exception:
 		lock_service.rollback_transaction()
 
@@ -177,20 +248,58 @@ def get_task_topic_data_service(
 	return topic_schema, topic_service, pipeline
 
 
-def find_task_rows(
+def build_source_criteria(
 		process_date: date, scheduler: TopicSnapshotScheduler,
-		source_topic_schema: TopicSchema, source_topic_service: TopicDataService,
-		principal_service: PrincipalService
-) -> List[int]:
+		source_topic_schema: TopicSchema, principal_service: PrincipalService
+) -> EntityCriteria:
 	if scheduler.filter is None or scheduler.filter.filters is None or len(scheduler.filter.filters) == 0:
-		rows = source_topic_service.find_distinct_values(None, [TopicDataColumnNames.ID.value], False)
-	else:
-		parsed_criteria = parse_condition_for_storage(
-			scheduler.filter, [source_topic_schema], principal_service, True)
-		variables = build_variables(process_date, scheduler.frequency)
-		rows = source_topic_service.find_distinct_values(
-			[parsed_criteria.run(variables, principal_service)], [TopicDataColumnNames.ID.value], False)
-	return ArrayHelper(rows).map(lambda x: x.get(TopicDataColumnNames.ID.value)).to_list()
+		return []
+	parsed_criteria = parse_condition_for_storage(scheduler.filter, [source_topic_schema], principal_service, True)
+	variables = build_variables(process_date, scheduler.frequency)
+	return [parsed_criteria.run(variables, principal_service)]
+
+
+def find_task_rows(
+		criteria: EntityCriteria, last_data_id: Optional[int], page_size: int,
+		source_topic_service: TopicDataService
+) -> List[Dict[str, Any]]:
+	"""
+	find next page of source rows, paged by id range instead of offset.
+	rows are sorted by id, and only rows which id is greater than given last data id are included.
+	"""
+	if last_data_id is not None:
+		criteria = [
+			*criteria,
+			EntityCriteriaExpression(
+				left=ColumnNameLiteral(columnName=TopicDataColumnNames.ID.value),
+				operator=EntityCriteriaOperator.GREATER_THAN, right=last_data_id)
+		]
+	return source_topic_service.find_limited(
+		criteria, [EntitySortColumn(name=TopicDataColumnNames.ID.value, method=EntitySortMethod.ASC)], page_size)
+
+
+def build_job_task_criteria(lock: TopicSnapshotJobLock, scheduler: TopicSnapshotScheduler) -> EntityCriteria:
+	return [
+		EntityCriteriaExpression(left=ColumnNameLiteral(columnName='jobid'), right=lock.lockId),
+		EntityCriteriaExpression(left=ColumnNameLiteral(columnName='schedulerid'), right=scheduler.schedulerId)
+	]
+
+
+def find_last_copied_data_id(
+		lock: TopicSnapshotJobLock, scheduler: TopicSnapshotScheduler, task_topic_service: TopicDataService
+) -> Optional[int]:
+	"""
+	task rows are created in order of source data id, therefore the latest task row of job holds the last copied one.
+	it is inserted in same transaction as its page, never falls behind the copied rows even lock is not updated yet.
+	returns none when nothing copied yet
+	"""
+	rows = task_topic_service.find_limited(
+		build_job_task_criteria(lock, scheduler),
+		[EntitySortColumn(name=TopicDataColumnNames.ID.value, method=EntitySortMethod.DESC)], 1)
+	if len(rows) == 0:
+		return None
+	original_data_id = task_topic_service.try_to_unwrap_from_topic_data(rows[0]).get('originaldataid')
+	return None if original_data_id is None else int(original_data_id)
 
 
 def create_tasks(
@@ -199,8 +308,10 @@ def create_tasks(
 ) -> bool:
 	"""
 	run topic snapshot job
-	build statement, ask topic storage to fetch data from source topic
-	write data to task topic,
+	build statement, ask topic storage to fetch data from source topic page by page,
+	write data to task topic in bulk, and persist copied row count into lock with heartbeat before each page.
+	copying is resumed after the last copied row when lock has row count already.
+	copying stops when lock is taken over by others, since its heartbeat was not renewed in time.
 	note write to s3 directly when there is s3 adapter for raw topic
 	"""
 	process_date = lock.processDate
@@ -208,19 +319,12 @@ def create_tasks(
 	source_topic_schema, source_topic_service = get_source_topic_data_service(scheduler, principal_service)
 	_, task_topic_service, pipeline = get_task_topic_data_service(scheduler, principal_service)
 
-	data_ids = find_task_rows(process_date, scheduler, source_topic_schema, source_topic_service, principal_service)
-	if len(data_ids) == 0:
-		# no data needs to be processed, success
-		accomplish_job(lock, TopicSnapshotJobLockStatus.SUCCESS, principal_service)
-		logger.info(
-			f'Topic snapshot job[lockId={lock.lockId}, schedulerId={scheduler.schedulerId}] '
-			f'accomplished successfully with no data.')
-		return False
-
+	criteria = build_source_criteria(process_date, scheduler, source_topic_schema, principal_service)
 	snapshot_tag = build_snapshot_tag(process_date, scheduler.frequency)
+	page_size = ask_topic_snapshot_page_size()
 
-	def copy_data_by_id(id_: int) -> None:
-		source_data = source_topic_service.find_data_by_id(id_)
+	def as_task_data(source_data: Dict[str, Any]) -> Dict[str, Any]:
+		id_ = source_data.get(TopicDataColumnNames.ID.value)
 		source_topic_service.delete_reversed_columns(source_data)
 		source_data = source_topic_service.try_to_unwrap_from_topic_data(source_data)
 		source_data['originaldataid'] = id_
@@ -229,44 +333,61 @@ def create_tasks(
 		source_data['targettopicname'] = scheduler.targetTopicName
 		source_data['jobid'] = lock.lockId
 		source_data['schedulerid'] = scheduler.schedulerId
-		task_topic_service.trigger_by_insert(source_data)
+		return source_data
 
-	ArrayHelper(data_ids).each(copy_data_by_id)
-	update_job_row_count(lock, len(data_ids), principal_service)
-	return True
+	last_data_id = find_last_copied_data_id(lock, scheduler, task_topic_service)
+	if last_data_id is None:
+		row_count = 0
+	else:
+		# row count in lock might fall behind, count the copied task rows
+		row_count = task_topic_service.count_by_criteria(build_job_task_criteria(lock, scheduler))
+		logger.info(
+			f'Topic snapshot job[lockId={lock.lockId}, schedulerId={scheduler.schedulerId}] '
+			f'resumed after data[id={last_data_id}], {row_count} rows copied already.')
+	while True:
+		rows = find_task_rows(criteria, last_data_id, page_size, source_topic_service)
+		if len(rows) == 0:
+			break
+		if not update_job_row_count(lock, row_count, principal_service):
+			logger.warning(
+				f'Topic snapshot job[lockId={lock.lockId}, schedulerId={scheduler.schedulerId}] '
+				f'is taken over by others, stop copying.')
+			return False
+		last_data_id = rows[-1].get(TopicDataColumnNames.ID.value)
+		task_topic_service.trigger_by_insert_batch(ArrayHelper(rows).map(as_task_data).to_list())
+		row_count = row_count + len(rows)
+		if len(rows) < page_size:
+			break
+
+	if row_count == 0:
+		# no data needs to be processed, success
+		accomplish_job(lock, TopicSnapshotJobLockStatus.SUCCESS, principal_service)
+		logger.info(
+			f'Topic snapshot job[lockId={lock.lockId}, schedulerId={scheduler.schedulerId}] '
+			f'accomplished successfully with no data.')
+		return False
 
+	# persist row count of last page
+	return update_job_row_count(lock, row_count, principal_service)
 
-def run_task(
-		lock: TopicSnapshotJobLock, scheduler: TopicSnapshotScheduler,
-		principal_service: PrincipalService,
-		after_sleeping: bool = False
-) -> None:
-	# scan task topic to fetch task and trigger pipeline to write to target topic
-	# until there is no data with status ready
-	# or no task at all and task lock status is success/failed
-	task_topic_schema, task_topic_service, pipline = get_task_topic_data_service(scheduler, principal_service)
-	page = task_topic_service.page_and_unwrap([
-		EntityCriteriaJoint(
-			conjunction=EntityCriteriaJointConjunction.AND,
-			children=[
-				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='jobid'), right=lock.lockId),
-				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='schedulerid'), right=scheduler.schedulerId),
-				EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right='ready'),
-			]
-		)
-	], Pageable(pageNumber=1, pageSize=1))
-	if len(page.data) == 0:
-		if not after_sleeping:
-			sleep(30)
-			run_task(lock, scheduler, principal_service, True)
-			return
-		else:
-			# accomplish job
-			try_to_accomplish_job(lock.lockId, principal_service)
-			return
 
-	# try to update status to process
-	data = page.data[0]
+def find_ready_tasks(
+		lock: TopicSnapshotJobLock, scheduler: TopicSnapshotScheduler,
+		task_topic_service: TopicDataService, batch_size: int
+) -> List[Dict[str, Any]]:
+	rows = task_topic_service.find_limited([
+		*build_job_task_criteria(lock, scheduler),
+		EntityCriteriaExpression(left=ColumnNameLiteral(columnName='status'), right='ready'),
+	], None, batch_size)
+	# shuffle to reduce claiming conflicts between nodes
+	shuffle(rows)
+	return ArrayHelper(rows).map(lambda x: task_topic_service.try_to_unwrap_from_topic_data(x)).to_list()
+
+
+def claim_task(data: Dict[str, Any], task_topic_service: TopicDataService) -> Optional[Dict[str, Any]]:
+	"""
+	try to update status to processed, returns none when task is claimed by others already
+	"""
 	data['status'] = 'processed'
 	data_id = data.get(TopicDataColumnNames.ID.value)
 	tenant_id = data.get(TopicDataColumnNames.TENANT_ID.value)
@@ -280,11 +401,14 @@ def run_task(
 	updated_count, _ = task_topic_service.update_by_id_and_version(data, [EntityCriteriaExpression(
 		left=ColumnNameLiteral(columnName='status'), right='ready'
 	)])
-	if updated_count == 0:
-		sleep(1)
-		run_task(lock, scheduler, principal_service)
-		return
+	return None if updated_count == 0 else data
 
+
+def run_claimed_task(
+		data: Dict[str, Any], task_topic_schema: TopicSchema, pipeline: Pipeline,
+		principal_service: PrincipalService
+) -> None:
+	data_id = data.get(TopicDataColumnNames.ID.value)
 	trace_id = str(ask_snowflake_generator().next_id())
 	unwrapped_data = data[TopicDataColumnNames.RAW_TOPIC_DATA.value]
 	run(PipelineTrigger(
@@ -300,11 +424,62 @@ def run_task(
 		current=unwrapped_data,
 		triggerType=PipelineTriggerType.INSERT,
 		internalDataId=data_id
-	), pipline.pipelineId))
-	run_task(lock, scheduler, principal_service)
+	), pipeline.pipelineId))
 
 
-def run_job(scheduler_id: TopicSnapshotSchedulerId, process_date: date) -> None:
+def run_task(
+		lock: TopicSnapshotJobLock, scheduler: TopicSnapshotScheduler, lock_holder: bool,
+		principal_service: PrincipalService
+) -> None:
+	"""
+	scan task topic to claim tasks in batch, and trigger pipeline to write to target topic on worker threads,
+	until there is no task with status ready during idle timeout, then try to accomplish job when holds the lock.
+	node which does not hold the lock just stops, since lock holder might be still copying tasks.
+	waiting time is doubled on each empty scan, and reset once there are tasks found.
+	"""
+	task_topic_schema, task_topic_service, pipeline = get_task_topic_data_service(scheduler, principal_service)
+	batch_size = ask_topic_snapshot_task_batch_size()
+	idle_timeout = ask_topic_snapshot_task_idle_timeout()
+
+	idle, wait = 0, 1
+	with ThreadPoolExecutor(max_workers=ask_topic_snapshot_task_workers()) as executor:
+		while True:
+			tasks = find_ready_tasks(lock, scheduler, task_topic_service, batch_size)
+			if len(tasks) == 0:
+				if idle >= idle_timeout:
+					if lock_holder:
+						try_to_accomplish_job(lock.lockId, principal_service)
+					return
+				wait = min(wait, idle_timeout - idle)
+				sleep(wait)
+				idle, wait = idle + wait, wait * 2
+				continue
+
+			idle, wait = 0, 1
+			claimed = ArrayHelper(tasks) \
+				.map(lambda x: claim_task(x, task_topic_service)) \
+				.filter(lambda x: x is not None) \
+				.to_list()
+			if len(claimed) == 0:
+				# all tasks are claimed by others, try next batch
+				continue
+
+			futures = ArrayHelper(claimed) \
+				.map(lambda x: executor.submit(run_claimed_task, x, task_topic_schema, pipeline, principal_service)) \
+				.to_list()
+			for future in futures:
+				# noinspection PyBroadException
+				try:
+					future.result()
+				except Exception as e:
+					logger.error(e, exc_info=True, stack_info=True)
+
+
+def run_job(scheduler_id: TopicSnapshotSchedulerId, process_date: date, resume: bool = False) -> None:
+	"""
+	when resume is true, job is continued on the existing lock which is not accomplished successfully,
+	source data is copied after the last copied one.
+	"""
 	scheduler_service = get_topic_snapshot_scheduler_service(fake_super_admin())
 	scheduler_service.begin_transaction()
 	try:
@@ -325,7 +500,15 @@ def run_job(scheduler_id: TopicSnapshotSchedulerId, process_date: date) -> None:
 		topic_snapshot_jobs.remove_job(scheduler_id)
 		return
 
-	lock, locked = try_to_lock_scheduler(scheduler, process_date, principal_service)
+	if resume:
+		lock, locked = try_to_resume_scheduler(scheduler, process_date, principal_service)
+		if not locked:
+			logger.error(
+				f'Topic snapshot job[schedulerId={scheduler_id}, processDate={process_date}] '
+				f'not found or accomplished already, cannot be resumed.')
+			return
+	else:
+		lock, locked = try_to_lock_scheduler(scheduler, process_date, principal_service)
 	if locked:
 		try:
 			should_run_task = create_tasks(lock, scheduler, principal_service)
@@ -335,8 +518,10 @@ def run_job(scheduler_id: TopicSnapshotSchedulerId, process_date: date) -> None:
 			should_run_task = False
 	else:
 		# does not grab the lock, cannot know there is task existing or not, run it anyway
-		should_run_task = True
+		# claim tasks of job which is run by another node
+		lock = find_lock(scheduler, process_date, principal_service)
+		should_run_task = lock is not None
 
 	if should_run_task:
 		# handle tasks whether if grab the lock or not
-		run_task(lock, scheduler, principal_service)
+		run_task(lock, scheduler, locked, principal_service)
@@ -0,0 +1,59 @@
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Set
+from unittest import TestCase
+
+from watchmen_auth import PrincipalService
+from watchmen_data_kernel.cache import CacheService as DataKernelCacheService
+from watchmen_model.admin import Pipeline
+from watchmen_model.common import TopicId
+from watchmen_model.pipeline_kernel import PipelineMonitorLog, PipelineTriggerTraceId
+from watchmen_pipeline_kernel.cache import CacheService
+from watchmen_pipeline_kernel.pipeline_schema_interface import CompiledPipeline, PipelineContext, TopicStorages
+
+
+class FakeCompiledPipeline(CompiledPipeline):
+	def __init__(self, pipeline: Pipeline):
+		self.pipeline = pipeline
+
+	def get_pipeline(self) -> Pipeline:
+		return self.pipeline
+
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		return set()
+
+	def run(
+			self, previous_data: Optional[Dict[str, Any]], current_data: Optional[Dict[str, Any]],
+			principal_service: PrincipalService, trace_id: PipelineTriggerTraceId, data_id: int,
+			storages: TopicStorages, handle_monitor_log: Callable[[PipelineMonitorLog, bool], None]
+	) -> List[PipelineContext]:
+		return []
+
+
+def create_pipeline(version: int) -> Pipeline:
+	return Pipeline(
+		pipelineId='1', topicId='1', name='pipeline_x', enabled=True, stages=[], tenantId='1',
+		version=version, lastModifiedAt=datetime(2022, 1, version))
+
+
+class CompiledPipelineCacheTest(TestCase):
+	def tearDown(self):
+		DataKernelCacheService.pipeline().clear()
+
+	def test_reuse_by_version(self):
+		cache = CacheService.compiled_pipeline()
+		compiled = cache.compile(create_pipeline(1), FakeCompiledPipeline)
+		# another instance of same version, reload by cache heart beat
+		reloaded = create_pipeline(1)
+		DataKernelCacheService.pipeline().put(create_pipeline(1))
+		DataKernelCacheService.pipeline().put(reloaded)
+		self.assertIs(cache.compile(reloaded, FakeCompiledPipeline), compiled)
+
+		changed = create_pipeline(2)
+		DataKernelCacheService.pipeline().put(changed)
+		self.assertIsNone(cache.get(changed.pipelineId))
+		recompiled = cache.compile(changed, FakeCompiledPipeline)
+		self.assertIsNot(recompiled, compiled)
+		self.assertIs(recompiled.get_pipeline(), changed)
+
+		DataKernelCacheService.pipeline().remove(changed.pipelineId)
+		self.assertIsNone(cache.get(changed.pipelineId))
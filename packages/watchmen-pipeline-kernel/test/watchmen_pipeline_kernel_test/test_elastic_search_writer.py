@@ -0,0 +1,189 @@
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from json import dumps, loads
+from threading import Thread
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+
+from watchmen_data_kernel.external_writer import ExternalWriterParams
+from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_pipeline_kernel.external_writer import build_bulk_action, ElasticSearchBulkAction, \
+	ElasticSearchBulkActionType, ElasticSearchBulkWriter, parse_elastic_search_url
+
+
+class BulkStubHandler(BaseHTTPRequestHandler):
+	"""
+	speaks bulk protocol. document id "bad" is rejected by 400, "busy" is rejected by 429 on first time.
+	"""
+	requests: List[List[Dict[str, Any]]] = []
+	rejected: List[str] = []
+
+	def do_POST(self):
+		length = int(self.headers.get('Content-Length'))
+		lines = self.rfile.read(length).decode('utf-8').splitlines()
+		operations: List[Dict[str, Any]] = []
+		items: List[Dict[str, Any]] = []
+		index = 0
+		while index < len(lines):
+			action = loads(lines[index])
+			action_type, metadata = next(iter(action.items()))
+			source = None
+			if action_type != 'delete':
+				index = index + 1
+				source = loads(lines[index])
+			index = index + 1
+			operations.append({'type': action_type, 'id': metadata.get('_id'), 'source': source})
+			document_id = metadata.get('_id')
+			if document_id == 'bad':
+				status = 400
+			elif document_id == 'busy' and 'busy' not in BulkStubHandler.rejected:
+				BulkStubHandler.rejected.append('busy')
+				status = 429
+			elif action_type == 'delete' and document_id == 'gone':
+				status = 404
+			else:
+				status = 200
+			items.append({action_type: {'_index': metadata.get('_index'), '_id': document_id, 'status': status}})
+		BulkStubHandler.requests.append(operations)
+		body = dumps({
+			'took': 1,
+			'errors': any(next(iter(x.values()))['status'] >= 300 for x in items),
+			'items': items
+		}).encode('utf-8')
+		self.send_response(200)
+		self.send_header('Content-Type', 'application/json')
+		self.send_header('Content-Length', str(len(body)))
+		self.end_headers()
+		self.wfile.write(body)
+
+	def log_message(self, format, *args):
+		pass
+
+
+def create_params(previous_data: Any, current_data: Any) -> ExternalWriterParams:
+	return ExternalWriterParams(
+		pat=None, url='http://localhost:9200/orders', eventCode='order',
+		previousData=previous_data, currentData=current_data, variables={})
+
+
+class ConcurrentAppendWriter(ElasticSearchBulkWriter):
+	"""
+	first bulk request fails, meanwhile another appender appends and flushes given action
+	"""
+
+	def __init__(self, concurrent_action: ElasticSearchBulkAction):
+		super().__init__(
+			'http://127.0.0.1:1', max_actions=1, max_bytes=1024 * 1024, flush_interval=60, max_retries=3, timeout=1)
+		self.concurrentAction = concurrent_action
+		self.appender: Optional[Thread] = None
+		self.bodies: List[bytes] = []
+
+	def post(self, body: bytes) -> Dict[str, Any]:
+		if self.appender is None:
+			self.appender = Thread(target=self.append, args=(self.concurrentAction,), daemon=True)
+			self.appender.start()
+			self.appender.join(0.2)
+			raise PipelineKernelException('Elastic search is not available.')
+		self.bodies.append(body)
+		return {'errors': False}
+
+
+class ElasticSearchWriterTest(TestCase):
+	def setUp(self):
+		BulkStubHandler.requests = []
+		BulkStubHandler.rejected = []
+		self.server = HTTPServer(('127.0.0.1', 0), BulkStubHandler)
+		Thread(target=self.server.serve_forever, daemon=True).start()
+		self.url = f'http://127.0.0.1:{self.server.server_port}'
+
+	def tearDown(self):
+		self.server.shutdown()
+		self.server.server_close()
+
+	def test_parse_url(self):
+		self.assertEqual(parse_elastic_search_url('http://host:9200/Orders'), ('http://host:9200', 'orders'))
+		self.assertEqual(parse_elastic_search_url('http://host:9200/'), ('http://host:9200', None))
+		self.assertEqual(parse_elastic_search_url('https://host/es/orders'), ('https://host/es', 'orders'))
+
+	def test_build_action(self):
+		action = build_bulk_action(create_params(None, {'id_': 1, 'a': 1}), 'orders')
+		self.assertEqual(action.actionType, ElasticSearchBulkActionType.INDEX)
+		self.assertEqual(action.documentId, '1')
+		action = build_bulk_action(create_params({'id_': 1, 'a': 1}, {'id_': 1, 'a': 2}), None)
+		self.assertEqual(action.actionType, ElasticSearchBulkActionType.UPDATE)
+		self.assertEqual(action.index, 'order')
+		action = build_bulk_action(create_params({'id_': 1}, None), 'orders')
+		self.assertEqual(action.actionType, ElasticSearchBulkActionType.DELETE)
+		self.assertEqual(action.body, b'{"delete": {"_index": "orders", "_id": "1"}}\n')
+		self.assertIsNone(build_bulk_action(create_params({'a': 1}, None), 'orders'))
+
+	def test_buffer_by_actions(self):
+		writer = ElasticSearchBulkWriter(
+			self.url, max_actions=2, max_bytes=1024 * 1024, flush_interval=60, max_retries=1, timeout=2)
+		writer.append(build_bulk_action(create_params(None, {'id_': '1'}), 'orders'))
+		self.assertEqual(len(BulkStubHandler.requests), 0)
+		writer.append(build_bulk_action(create_params(None, {'id_': '2'}), 'orders'))
+		self.assertEqual(len(BulkStubHandler.requests), 1)
+		self.assertEqual(BulkStubHandler.requests[0][1], {'type': 'index', 'id': '2', 'source': {'id_': '2'}})
+		self.assertEqual(len(writer.actions), 0)
+		writer.close()
+
+	def test_partial_failure(self):
+		writer = ElasticSearchBulkWriter(
+			self.url, max_actions=100, max_bytes=1024 * 1024, flush_interval=60, max_retries=1, timeout=2)
+		writer.append(build_bulk_action(create_params(None, {'id_': 'ok'}), 'orders'))
+		writer.append(build_bulk_action(create_params(None, {'id_': 'bad'}), 'orders'))
+		writer.append(build_bulk_action(create_params({'id_': 'busy'}, {'id_': 'busy', 'a': 1}), 'orders'))
+		writer.append(build_bulk_action(create_params({'id_': 'gone'}, None), 'orders'))
+		writer.flush()
+		self.assertEqual(len(BulkStubHandler.requests), 1)
+		# rejected item is buffered again, bad request and deleted missing document are not
+		self.assertEqual(len(writer.actions), 1)
+		self.assertEqual(writer.actions[0].documentId, 'busy')
+		writer.flush()
+		self.assertEqual(BulkStubHandler.requests[1], [
+			{'type': 'update', 'id': 'busy', 'source': {'doc': {'id_': 'busy', 'a': 1}, 'doc_as_upsert': True}}
+		])
+		self.assertEqual(len(writer.actions), 0)
+		writer.close()
+
+	def test_retry_following_actions_on_same_document(self):
+		writer = ElasticSearchBulkWriter(
+			self.url, max_actions=100, max_bytes=1024 * 1024, flush_interval=60, max_retries=1, timeout=2)
+		writer.append(build_bulk_action(create_params({'id_': 'busy'}, {'id_': 'busy', 'a': 1}), 'orders'))
+		writer.append(build_bulk_action(create_params(None, {'id_': 'ok'}), 'orders'))
+		writer.append(build_bulk_action(create_params({'id_': 'busy'}, None), 'orders'))
+		writer.flush()
+		# update is rejected, delete on same document is buffered again even succeeded, other document is not
+		self.assertEqual(
+			[(x.actionType, x.documentId) for x in writer.actions],
+			[(ElasticSearchBulkActionType.UPDATE, 'busy'), (ElasticSearchBulkActionType.DELETE, 'busy')])
+		writer.flush()
+		# delete is still applied after update, document is not re-created by retry
+		self.assertEqual(BulkStubHandler.requests[1], [
+			{'type': 'update', 'id': 'busy', 'source': {'doc': {'id_': 'busy', 'a': 1}, 'doc_as_upsert': True}},
+			{'type': 'delete', 'id': 'busy', 'source': None}
+		])
+		self.assertEqual(len(writer.actions), 0)
+		writer.close()
+
+	def test_unreachable(self):
+		writer = ElasticSearchBulkWriter(
+			'http://127.0.0.1:1', max_actions=100, max_bytes=1024 * 1024, flush_interval=60, max_retries=1,
+			timeout=1)
+		writer.append(build_bulk_action(create_params(None, {'id_': '1'}), 'orders'))
+		writer.flush()
+		self.assertEqual(len(writer.actions), 1)
+		writer.flush()
+		# dropped after max retries
+		self.assertEqual(len(writer.actions), 0)
+		writer.close()
+
+	def test_retried_action_sent_first(self):
+		index_action = build_bulk_action(create_params(None, {'id_': '1'}), 'orders')
+		delete_action = build_bulk_action(create_params({'id_': '1'}, None), 'orders')
+		writer = ConcurrentAppendWriter(delete_action)
+		writer.append(index_action)
+		writer.appender.join(1)
+		writer.close()
+		# appender waits for failed request, retried index is sent before delete
+		self.assertEqual(writer.bodies, [index_action.body, delete_action.body])
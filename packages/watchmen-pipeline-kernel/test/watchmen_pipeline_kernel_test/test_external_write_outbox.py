@@ -0,0 +1,79 @@
+from typing import Any, List, Optional, Tuple
+from unittest import TestCase
+
+from watchmen_pipeline_kernel.external_writer import ExternalWriteEvent, ExternalWriteEventStatus, \
+	ExternalWriteOutbox, InMemoryExternalWriteOutboxQueue
+
+
+class FakeOutbox(ExternalWriteOutbox):
+	def __init__(self, queue: InMemoryExternalWriteOutboxQueue, failed_urls: List[str], **kwargs):
+		super().__init__(queue, workers=2, fetch_size=10, poll_interval=0.1, timeout=1, **kwargs)
+		self.failedUrls = failed_urls
+		self.posted: List[Tuple[str, Any]] = []
+
+	def post(self, endpoint: Tuple[str, Optional[str]], events: List[ExternalWriteEvent]) -> Optional[str]:
+		url, _ = endpoint
+		if url in self.failedUrls:
+			return 'Response status[500], body[].'
+		self.posted.append((url, self.build_body(events)))
+		return None
+
+
+def create_event(url: str, code: str) -> ExternalWriteEvent:
+	return ExternalWriteEvent(url=url, payload={'code': code})
+
+
+class ExternalWriteOutboxTest(TestCase):
+	def test_batch_by_endpoint(self):
+		queue = InMemoryExternalWriteOutboxQueue(claim_timeout=60)
+		outbox = FakeOutbox(queue, [], batch_size=2, max_retries=3, retry_interval=1)
+		for index in range(3):
+			queue.enqueue(create_event('http://a', f'a{index}'))
+		queue.enqueue(create_event('http://b', 'b0'))
+
+		self.assertEqual(outbox.drain(), 4)
+		posted = sorted(outbox.posted, key=lambda x: x[0])
+		self.assertEqual(posted, [
+			('http://a', [{'code': 'a0'}, {'code': 'a1'}]),
+			('http://a', [{'code': 'a2'}]),
+			('http://b', [{'code': 'b0'}])
+		])
+		self.assertEqual(len(queue.events), 0)
+		self.assertEqual(outbox.metrics.sent, 4)
+
+	def test_single_payload(self):
+		queue = InMemoryExternalWriteOutboxQueue(claim_timeout=60)
+		outbox = FakeOutbox(queue, [], batch_size=1, max_retries=3, retry_interval=1)
+		queue.enqueue(create_event('http://a', 'a0'))
+		outbox.drain()
+		self.assertEqual(outbox.posted, [('http://a', {'code': 'a0'})])
+
+	def test_retry_and_dead(self):
+		queue = InMemoryExternalWriteOutboxQueue(claim_timeout=60)
+		outbox = FakeOutbox(queue, ['http://a'], batch_size=1, max_retries=1, retry_interval=0)
+		queue.enqueue(create_event('http://a', 'a0'))
+
+		outbox.drain()
+		event = queue.events['1']
+		self.assertEqual(event.status, ExternalWriteEventStatus.PENDING)
+		self.assertEqual(event.retries, 1)
+		self.assertEqual(outbox.metrics.retried, 1)
+
+		outbox.drain()
+		self.assertEqual(event.status, ExternalWriteEventStatus.DEAD)
+		self.assertEqual(len(queue.find_dead()), 1)
+		# dead event is never claimed again
+		self.assertEqual(outbox.drain(), 0)
+
+	def test_stop_and_start_again(self):
+		queue = InMemoryExternalWriteOutboxQueue(claim_timeout=60)
+		outbox = FakeOutbox(queue, [], batch_size=1, max_retries=3, retry_interval=1)
+		outbox.start()
+		worker = outbox.worker
+		outbox.stop()
+		# worker exited before stop returned, no two senders run in parallel
+		self.assertFalse(worker.is_alive())
+		self.assertIsNone(outbox.worker)
+		outbox.start()
+		self.assertIsNot(outbox.worker, worker)
+		outbox.stop()
@@ -0,0 +1,134 @@
+from asyncio import run
+from typing import Any, Dict, List, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import PrincipalService
+from watchmen_data_kernel.storage import TopicTrigger
+from watchmen_model.admin import PipelineTriggerType, Topic, TopicKind, TopicType, User, UserRole
+from watchmen_model.pipeline_kernel import PipelineTriggerData
+from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_pipeline_kernel.pipeline import pipeline_invoker
+from watchmen_pipeline_kernel.pipeline.pipeline_trigger import PipelineTrigger
+
+
+class FakeSchema:
+	def __init__(self, name: str, kind: TopicKind = TopicKind.BUSINESS):
+		self.topic = Topic(topicId=name, name=name, type=TopicType.DISTINCT, kind=kind, factors=[], tenantId='1')
+
+	def get_topic(self) -> Topic:
+		return self.topic
+
+	# noinspection PyUnusedLocal
+	def prepare_data(self, data: Dict[str, Any], principal_service: PrincipalService) -> Dict[str, Any]:
+		if data.get('invalid'):
+			raise PipelineKernelException('Invalid data.')
+		return data
+
+
+class FakeDataService:
+	def __init__(self, name: str, saved: List[Tuple[str, str, Any]]):
+		self.name = name
+		self.saved = saved
+
+	def next_id(self) -> int:
+		"""
+		id is in save order, starts from 1
+		"""
+		return len(self.saved) + 1
+
+	def trigger_by_insert_batch(self, data: List[Dict[str, Any]]) -> List[TopicTrigger]:
+		triggers = []
+		for item in data:
+			id_ = self.next_id()
+			self.saved.append((self.name, 'insert_all', item['code']))
+			triggers.append(TopicTrigger(current=item, internalDataId=id_ * 10))
+		return triggers
+
+	def trigger_by_merge(self, data: Dict[str, Any]) -> TopicTrigger:
+		id_ = self.next_id()
+		self.saved.append((self.name, 'merge', data['code']))
+		return TopicTrigger(current=data, triggerType=PipelineTriggerType.MERGE, internalDataId=id_ * 10)
+
+
+class InvokeBatchTest(TestCase):
+	def setUp(self):
+		self.schemas = {'topic_a': FakeSchema('topic_a'), 'topic_b': FakeSchema('topic_b')}
+		self.saved: List[Tuple[str, str, Any]] = []
+		self.started: List[Any] = []
+		principal_service = PrincipalService(User(userId='1', tenantId='1', name='admin', role=UserRole.ADMIN))
+
+		def find_topic_schema(name: str, _: PrincipalService) -> FakeSchema:
+			schema = self.schemas.get(name)
+			if schema is None:
+				raise PipelineKernelException(f'Topic schema[name={name}] not found.')
+			return schema
+
+		# noinspection PyUnusedLocal
+		async def start(trigger: PipelineTrigger, result: TopicTrigger, pipeline_id=None) -> None:
+			self.started.append(result.current['code'])
+
+		patches = [
+			patch.object(pipeline_invoker, 'find_topic_schema', side_effect=find_topic_schema),
+			patch.object(pipeline_invoker, 'ask_trigger_principal_service', return_value=principal_service),
+			patch.object(pipeline_invoker, 'create_monitor_log_pipeline_invoker', return_value=lambda *args: None),
+			patch.object(
+				PipelineTrigger, 'ask_topic_data_service',
+				lambda trigger, schema: FakeDataService(schema.get_topic().name, self.saved)),
+			patch.object(PipelineTrigger, 'start', start)
+		]
+		for a_patch in patches:
+			a_patch.start()
+			self.addCleanup(a_patch.stop)
+
+	def test_ids_in_order(self):
+		trigger_data_list = [
+			PipelineTriggerData(code='topic_a', data={'code': 'a1'}),
+			PipelineTriggerData(code='topic_b', data={'code': 'b1'}, triggerType=PipelineTriggerType.MERGE),
+			PipelineTriggerData(code='topic_a', data={'code': 'a2'}),
+			PipelineTriggerData(code='topic_b', data={'code': 'b2'}, triggerType=PipelineTriggerType.MERGE)
+		]
+		ids = run(pipeline_invoker.invoke_batch(trigger_data_list, ['1', '2', '3', '4'], None, False))
+
+		self.assertEqual(self.saved, [
+			('topic_a', 'insert_all', 'a1'), ('topic_a', 'insert_all', 'a2'),
+			('topic_b', 'merge', 'b1'), ('topic_b', 'merge', 'b2')
+		])
+		# ids are in same order as given trigger data
+		self.assertEqual(ids, [10, 30, 20, 40])
+		# pipelines are started after all groups saved
+		self.assertEqual(self.started, ['a1', 'a2', 'b1', 'b2'])
+
+	def test_nothing_saved_when_any_group_failed(self):
+		trigger_data_list = [
+			PipelineTriggerData(code='topic_a', data={'code': 'a1'}),
+			PipelineTriggerData(code='topic_b', data={'code': 'b1', 'invalid': True})
+		]
+		with self.assertRaises(PipelineKernelException):
+			run(pipeline_invoker.invoke_batch(trigger_data_list, ['1', '2'], None, False))
+		self.assertEqual(self.saved, [])
+		self.assertEqual(self.started, [])
+
+	def test_nothing_saved_when_topic_not_found(self):
+		trigger_data_list = [
+			PipelineTriggerData(code='topic_a', data={'code': 'a1'}),
+			PipelineTriggerData(code='topic_x', data={'code': 'x1'})
+		]
+		with self.assertRaises(PipelineKernelException):
+			run(pipeline_invoker.invoke_batch(trigger_data_list, ['1', '2'], None, False))
+		self.assertEqual(self.saved, [])
+
+	def test_nothing_saved_when_not_supported_on_synonym(self):
+		self.schemas['topic_s'] = FakeSchema('topic_s', TopicKind.SYNONYM)
+		trigger_data_list = [
+			PipelineTriggerData(code='topic_a', data={'code': 'a1'}),
+			PipelineTriggerData(code='topic_s', data={'code': 's1'}, triggerType=PipelineTriggerType.MERGE)
+		]
+		with self.assertRaises(PipelineKernelException):
+			run(pipeline_invoker.invoke_batch(trigger_data_list, ['1', '2'], None, False))
+		self.assertEqual(self.saved, [])
+
+	def test_trace_ids_mismatch(self):
+		with self.assertRaises(PipelineKernelException):
+			run(pipeline_invoker.invoke_batch(
+				[PipelineTriggerData(code='topic_a', data={'code': 'a1'})], [], None, False))
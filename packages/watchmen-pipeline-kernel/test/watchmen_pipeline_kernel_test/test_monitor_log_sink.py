@@ -0,0 +1,210 @@
+from asyncio import run
+from threading import Event, Lock, Thread
+from time import sleep, time
+from typing import Any, Callable, Dict, List
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import PrincipalService
+from watchmen_data_kernel.storage import RawTopicDataEntityHelper, RawTopicDataService, TopicTrigger
+from watchmen_data_kernel.topic_schema import TopicSchema
+from watchmen_model.admin import Topic, TopicKind, TopicType, User, UserRole
+from watchmen_model.pipeline_kernel import MonitorLogStatus, PipelineMonitorLog
+from watchmen_pipeline_kernel.pipeline import MonitorLogSinkFullPolicy, PipelineMonitorLogSink
+from watchmen_pipeline_kernel.pipeline.monitor_log_sink import MonitorLogSinkItem
+from watchmen_pipeline_kernel.pipeline.pipeline_trigger import PipelineTrigger
+from watchmen_storage import immutable_worker_id, SnowflakeGenerator
+
+
+def create_fake_principal_service(tenant_id: str) -> PrincipalService:
+	return PrincipalService(User(userId='1', tenantId=tenant_id, name='imma-admin', role=UserRole.ADMIN))
+
+
+def create_monitor_log(trace_id: str, status: MonitorLogStatus = MonitorLogStatus.DONE) -> PipelineMonitorLog:
+	return PipelineMonitorLog(
+		uid=trace_id, traceId=trace_id, pipelineId='1', topicId='1', dataId=1, oldValue=None, newValue={},
+		stages=[], status=status, prerequisite=True)
+
+
+def create_schema(tenant_id: str) -> TopicSchema:
+	return TopicSchema(Topic(
+		topicId=f'monitor-log-{tenant_id}', name='raw_pipeline_monitor_log', type=TopicType.RAW,
+		kind=TopicKind.SYSTEM, factors=[], dataSourceId='1', tenantId=tenant_id))
+
+
+def wait_until(predicate: Callable[[], bool], timeout: float = 2) -> None:
+	started_at = time()
+	while not predicate() and time() - started_at < timeout:
+		sleep(0.01)
+
+
+class FakeStorage:
+	"""
+	rows are written in batches, insertion waits until gate opened
+	"""
+
+	def __init__(self, fail: bool = False):
+		self.fail = fail
+		self.lock = Lock()
+		self.batches: List[List[Dict[str, Any]]] = []
+		self.rolledBack = 0
+		self.entered = Event()
+		self.gate = Event()
+		self.gate.set()
+
+	def begin(self):
+		pass
+
+	# noinspection PyUnusedLocal
+	def insert_all(self, rows: List[Dict[str, Any]], helper):
+		self.entered.set()
+		self.gate.wait()
+		if self.fail:
+			raise Exception('Storage is unavailable.')
+		with self.lock:
+			self.batches.append(rows)
+
+	def commit_and_close(self):
+		pass
+
+	def rollback_and_close(self):
+		with self.lock:
+			self.rolledBack = self.rolledBack + 1
+
+	def written(self) -> List[str]:
+		with self.lock:
+			return [row['data_']['traceId'] for rows in self.batches for row in rows]
+
+
+class FakeTopicService:
+	def __init__(self, principal_service: PrincipalService):
+		self.principalService = principal_service
+
+	# noinspection PyUnusedLocal
+	def find_schema_by_name(self, name: str, tenant_id: str) -> TopicSchema:
+		return create_schema(tenant_id)
+
+
+class PipelineMonitorLogSinkTest(TestCase):
+	def setUp(self):
+		self.storages: Dict[str, FakeStorage] = {'1': FakeStorage(), '2': FakeStorage()}
+		self.started: List[str] = []
+
+		def ask_topic_data_service(trigger: PipelineTrigger, schema: TopicSchema) -> RawTopicDataService:
+			# noinspection PyTypeChecker
+			return RawTopicDataService(
+				schema, RawTopicDataEntityHelper(schema), self.storages[schema.get_topic().tenantId],
+				trigger.principalService)
+
+		# noinspection PyUnusedLocal
+		async def start(trigger: PipelineTrigger, result: TopicTrigger, pipeline_id=None) -> None:
+			self.started.append(result.current['traceId'])
+
+		patches = [
+			patch('watchmen_pipeline_kernel.pipeline.monitor_log_sink.TopicService', FakeTopicService),
+			patch(
+				'watchmen_data_kernel.storage.data_service.ask_snowflake_generator',
+				return_value=SnowflakeGenerator(0, immutable_worker_id(1))),
+			patch.object(PipelineTrigger, 'ask_topic_data_service', ask_topic_data_service),
+			patch.object(PipelineTrigger, 'start', start)
+		]
+		for a_patch in patches:
+			a_patch.start()
+			self.addCleanup(a_patch.stop)
+
+	def accept(
+			self, sink: PipelineMonitorLogSink, trace_id: str, tenant_id: str = '1',
+			status: MonitorLogStatus = MonitorLogStatus.DONE) -> bool:
+		return sink.accept(create_monitor_log(trace_id, status), trace_id, create_fake_principal_service(tenant_id))
+
+	def test_write_in_bulk(self):
+		storage = self.storages['1']
+		sink = PipelineMonitorLogSink(
+			queue_size=10, batch_size=2, flush_interval=0.05, full_policy=MonitorLogSinkFullPolicy.BLOCK,
+			sample_rate=1)
+		for index in range(5):
+			self.assertTrue(self.accept(sink, str(index)))
+		wait_until(lambda: len(storage.written()) == 5)
+
+		self.assertEqual(storage.written(), ['0', '1', '2', '3', '4'])
+		self.assertTrue(all(len(rows) <= 2 for rows in storage.batches))
+		self.assertEqual(self.started, ['0', '1', '2', '3', '4'])
+		self.assertEqual(sink.metrics.accepted, 5)
+		self.assertEqual(sink.metrics.flushed, 5)
+
+	def test_flush_by_tenant(self):
+		self.storages['2'].fail = True
+		sink = PipelineMonitorLogSink(
+			queue_size=10, batch_size=10, flush_interval=0.05, full_policy=MonitorLogSinkFullPolicy.BLOCK,
+			sample_rate=1)
+		items = [
+			MonitorLogSinkItem(create_monitor_log(trace_id), trace_id, create_fake_principal_service(tenant_id))
+			for trace_id, tenant_id in [('1', '1'), ('2', '2'), ('3', '1')]
+		]
+		run(sink.flush(items))
+
+		# logs of tenant are written in one batch, failure of one tenant does not impact others
+		self.assertEqual([len(rows) for rows in self.storages['1'].batches], [2])
+		self.assertEqual(self.storages['1'].written(), ['1', '3'])
+		self.assertEqual(self.storages['2'].written(), [])
+		self.assertEqual(self.storages['2'].rolledBack, 1)
+		self.assertEqual(sink.metrics.flushed, 2)
+		self.assertEqual(sink.metrics.failed, 1)
+
+	def hold_worker(self, sink: PipelineMonitorLogSink, storage: FakeStorage) -> None:
+		"""
+		first log is taken by worker, and held in writing. second log is accepted and fills the queue
+		"""
+		storage.gate.clear()
+		self.assertTrue(self.accept(sink, '1'))
+		self.assertTrue(storage.entered.wait(2))
+		self.assertTrue(self.accept(sink, '2'))
+
+	def test_drop_when_full(self):
+		storage = self.storages['1']
+		sink = PipelineMonitorLogSink(
+			queue_size=1, batch_size=1, flush_interval=0.05, full_policy=MonitorLogSinkFullPolicy.DROP, sample_rate=1)
+		self.hold_worker(sink, storage)
+		self.assertFalse(self.accept(sink, '3'))
+		storage.gate.set()
+		wait_until(lambda: len(storage.written()) == 2)
+
+		self.assertEqual(storage.written(), ['1', '2'])
+		self.assertEqual(sink.metrics.accepted, 2)
+		self.assertEqual(sink.metrics.dropped, 1)
+
+	def test_block_when_full(self):
+		storage = self.storages['1']
+		sink = PipelineMonitorLogSink(
+			queue_size=1, batch_size=1, flush_interval=0.05, full_policy=MonitorLogSinkFullPolicy.BLOCK,
+			sample_rate=1)
+		self.hold_worker(sink, storage)
+		blocked = Thread(target=self.accept, args=(sink, '3'), daemon=True)
+		blocked.start()
+		blocked.join(0.2)
+		self.assertTrue(blocked.is_alive())
+		storage.gate.set()
+		blocked.join(2)
+		self.assertFalse(blocked.is_alive())
+		wait_until(lambda: len(storage.written()) == 3)
+
+		self.assertEqual(storage.written(), ['1', '2', '3'])
+		self.assertEqual(sink.metrics.accepted, 3)
+		self.assertEqual(sink.metrics.dropped, 0)
+
+	def test_sampling(self):
+		storage = self.storages['1']
+		sink = PipelineMonitorLogSink(
+			queue_size=10, batch_size=10, flush_interval=0.05, full_policy=MonitorLogSinkFullPolicy.BLOCK,
+			sample_rate=0.5)
+		with patch('watchmen_pipeline_kernel.pipeline.monitor_log_sink.random', side_effect=[0.1, 0.9, 0.4]):
+			self.assertTrue(self.accept(sink, '1'))
+			self.assertFalse(self.accept(sink, '2'))
+			# error logs are always kept
+			self.assertTrue(self.accept(sink, '3', status=MonitorLogStatus.ERROR))
+			self.assertTrue(self.accept(sink, '4'))
+		wait_until(lambda: len(storage.written()) == 3)
+
+		self.assertEqual(storage.written(), ['1', '3', '4'])
+		self.assertEqual(sink.metrics.sampledOut, 1)
+		self.assertEqual(sink.metrics.accepted, 3)
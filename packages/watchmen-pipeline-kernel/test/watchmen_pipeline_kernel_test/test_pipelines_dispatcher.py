@@ -0,0 +1,108 @@
+from threading import Lock
+from typing import Callable, List, Set
+from unittest import TestCase
+
+from time import sleep
+
+from watchmen_model.common import TopicId
+from watchmen_model.pipeline_kernel import PipelineMonitorLog
+from watchmen_pipeline_kernel.common import PipelineKernelException
+from watchmen_pipeline_kernel.pipeline.pipelines_dispatcher import PipelinesDispatcher
+from watchmen_pipeline_kernel.pipeline_schema_interface import PipelineContext, TopicStorages
+from watchmen_pipeline_kernel.topic import RuntimeTopicStorages
+from watchmen_utilities import ArrayHelper
+
+
+class FakeContext(PipelineContext):
+	def __init__(self, name: str, children: int, levels: int, started: List[str]):
+		self.name = name
+		self.children = children
+		self.levels = levels
+		self.started = started
+
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		return set()
+
+	def start(
+			self, storages: TopicStorages,
+			handle_monitor_log: Callable[[PipelineMonitorLog, bool], None]
+	) -> List[PipelineContext]:
+		self.started.append(self.name)
+		if self.levels == 0:
+			return []
+		return [
+			FakeContext(f'{self.name}.{index}', self.children, self.levels - 1, self.started)
+			for index in range(self.children)
+		]
+
+
+class WritingContext(PipelineContext):
+	def __init__(self, name: str, topic_id: TopicId, running: List[str], started: List[str], lock: Lock):
+		self.name = name
+		self.topicId = topic_id
+		self.running = running
+		self.started = started
+		self.lock = lock
+
+	def get_write_topic_ids(self) -> Set[TopicId]:
+		return {self.topicId}
+
+	def start(
+			self, storages: TopicStorages,
+			handle_monitor_log: Callable[[PipelineMonitorLog, bool], None]
+	) -> List[PipelineContext]:
+		with self.lock:
+			if self.topicId in self.running:
+				raise Exception(f'Topic[{self.topicId}] is written concurrently.')
+			self.running.append(self.topicId)
+			self.started.append(self.name)
+		sleep(0.05)
+		with self.lock:
+			self.running.remove(self.topicId)
+		return []
+
+
+class PipelinesDispatcherTest(TestCase):
+	def test_long_cascade(self):
+		started = []
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher([FakeContext('0', 1, 5000, started)], None, 0, 0, 0, False)
+		dispatcher.start(lambda log, asynchronized: None)
+		self.assertEqual(len(started), 5001)
+		self.assertEqual(dispatcher.metrics.dispatched, 5001)
+		self.assertEqual(dispatcher.metrics.maxDepth, 5000)
+		self.assertEqual(dispatcher.metrics.maxQueueLength, 1)
+
+	def test_breadth_first(self):
+		started = []
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher([FakeContext('0', 2, 2, started)], None, 0, 0, 0, False)
+		dispatcher.start(lambda log, asynchronized: None)
+		self.assertEqual(started, ['0', '0.0', '0.1', '0.0.0', '0.0.1', '0.1.0', '0.1.1'])
+
+	def test_limitations(self):
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher([FakeContext('0', 1, 10, [])], None, 3, 0, 0, False)
+		self.assertRaises(PipelineKernelException, lambda: dispatcher.start(lambda log, asynchronized: None))
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher([FakeContext('0', 3, 1, [])], None, 0, 2, 0, False)
+		self.assertRaises(PipelineKernelException, lambda: dispatcher.start(lambda log, asynchronized: None))
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher([FakeContext('0', 2, 3, [])], None, 0, 0, 5, False)
+		self.assertRaises(PipelineKernelException, lambda: dispatcher.start(lambda log, asynchronized: None))
+
+	def test_concurrent(self):
+		running, started, lock = [], [], Lock()
+		contexts = [
+			WritingContext('a1', 'a', running, started, lock),
+			WritingContext('b1', 'b', running, started, lock),
+			WritingContext('a2', 'a', running, started, lock),
+			WritingContext('c1', 'c', running, started, lock),
+			WritingContext('a3', 'a', running, started, lock)
+		]
+		# noinspection PyTypeChecker
+		dispatcher = PipelinesDispatcher(contexts, RuntimeTopicStorages(None), 0, 0, 0, True, 4)
+		dispatcher.start(lambda log, asynchronized: None)
+		self.assertEqual(len(started), 5)
+		self.assertEqual(dispatcher.metrics.maxConcurrent, 3)
+		self.assertEqual(ArrayHelper(started).filter(lambda x: x.startswith('a')).to_list(), ['a1', 'a2', 'a3'])
@@ -0,0 +1,71 @@
+from datetime import date
+from typing import Any, Dict, List, Tuple
+from unittest import TestCase
+from unittest.mock import patch
+
+from watchmen_auth import fake_tenant_admin
+from watchmen_model.admin import TopicSnapshotFrequency, TopicSnapshotJobLock, TopicSnapshotJobLockStatus, \
+	TopicSnapshotScheduler
+from watchmen_pipeline_kernel.topic_snapshot import scheduler_runner
+
+RUNNER = 'watchmen_pipeline_kernel.topic_snapshot.scheduler_runner'
+
+
+class FakeTopicDataService:
+	def __init__(self):
+		self.inserted: List[List[Dict[str, Any]]] = []
+
+	# noinspection PyMethodMayBeStatic
+	def delete_reversed_columns(self, data: Dict[str, Any]) -> None:
+		pass
+
+	# noinspection PyMethodMayBeStatic
+	def try_to_unwrap_from_topic_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
+		return data
+
+	def trigger_by_insert_batch(self, data: List[Dict[str, Any]]) -> None:
+		self.inserted.append(data)
+
+
+def create_lock() -> TopicSnapshotJobLock:
+	return TopicSnapshotJobLock(
+		lockId='1', schedulerId='1', tenantId='1', frequency=TopicSnapshotFrequency.DAILY,
+		processDate=date(2022, 1, 1), rowCount=0, status=TopicSnapshotJobLockStatus.READY)
+
+
+def create_scheduler() -> TopicSnapshotScheduler:
+	return TopicSnapshotScheduler(
+		schedulerId='1', topicId='1', targetTopicName='snapshot_x', pipelineId='1',
+		frequency=TopicSnapshotFrequency.DAILY, tenantId='1')
+
+
+def create_page(start: int, size: int) -> List[Dict[str, Any]]:
+	return [{'id_': data_id} for data_id in range(start, start + size)]
+
+
+class TopicSnapshotRunnerTest(TestCase):
+	def create_tasks(self, pages: List[List[Dict[str, Any]]], renewed: List[bool]) -> Tuple[bool, FakeTopicDataService]:
+		task_topic_service = FakeTopicDataService()
+		with patch(f'{RUNNER}.get_source_topic_data_service', return_value=(None, FakeTopicDataService())), \
+				patch(f'{RUNNER}.get_task_topic_data_service', return_value=(None, task_topic_service, None)), \
+				patch(f'{RUNNER}.build_source_criteria', return_value=[]), \
+				patch(f'{RUNNER}.ask_topic_snapshot_page_size', return_value=2), \
+				patch(f'{RUNNER}.find_last_copied_data_id', return_value=None), \
+				patch(f'{RUNNER}.find_task_rows', side_effect=pages), \
+				patch(f'{RUNNER}.update_job_row_count', side_effect=renewed) as update_job_row_count:
+			should_run_task = scheduler_runner.create_tasks(create_lock(), create_scheduler(), fake_tenant_admin('1'))
+		self.assertEqual([x.args[1] for x in update_job_row_count.call_args_list], [0, 2, 3][:len(renewed)])
+		return should_run_task, task_topic_service
+
+	def test_copy_page_by_page(self):
+		should_run_task, task_topic_service = self.create_tasks(
+			[create_page(1, 2), create_page(3, 1)], [True, True, True])
+		self.assertTrue(should_run_task)
+		self.assertEqual([len(x) for x in task_topic_service.inserted], [2, 1])
+
+	def test_stop_when_taken_over(self):
+		should_run_task, task_topic_service = self.create_tasks(
+			[create_page(1, 2), create_page(3, 1)], [True, False])
+		# second page is not copied, since lock is taken over by others
+		self.assertFalse(should_run_task)
+		self.assertEqual([len(x) for x in task_topic_service.inserted], [2])
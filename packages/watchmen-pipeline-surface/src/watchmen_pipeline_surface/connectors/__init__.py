@@ -1,2 +1,2 @@
-from .kafka import init_kafka, KafkaSettings
-from .rabbitmq import init_rabbitmq, RabbitmqSettings
+from .kafka import init_kafka, KafkaConsumerEngine, KafkaOrderBy, KafkaSettings
+from .rabbitmq import init_rabbitmq, RabbitmqConsumerEngine, RabbitmqSettings
@@ -1,18 +1,84 @@
+from asyncio import AbstractEventLoop, all_tasks, gather, new_event_loop
+from logging import getLogger
+from threading import local
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from watchmen_auth import PrincipalService
 from watchmen_meta.common import ask_snowflake_generator
 from watchmen_model.admin import UserRole
 from watchmen_model.pipeline_kernel import PipelineTriggerDataWithPAT, PipelineTriggerTraceId
-from watchmen_pipeline_kernel.pipeline import try_to_invoke_pipelines
+from watchmen_pipeline_kernel.pipeline import is_bulk_insert_supported, try_to_invoke_pipelines, \
+	try_to_invoke_pipelines_batch
 from watchmen_rest import get_principal_by_pat, retrieve_authentication_manager
-from watchmen_utilities import is_blank
+from watchmen_utilities import ArrayHelper, is_blank
 
+logger = getLogger(__name__)
 
-async def handle_trigger_data(trigger_data: PipelineTriggerDataWithPAT) -> None:
-	# TODO should log trigger data
-	pat = trigger_data.pat
+worker_loops = local()
+
+
+def ask_worker_loop() -> AbstractEventLoop:
+	loop = getattr(worker_loops, 'loop', None)
+	if loop is None:
+		loop = new_event_loop()
+		worker_loops.loop = loop
+	return loop
+
+
+def run_in_worker_loop(handle: Callable[..., Coroutine[Any, Any, None]], *args: Any) -> None:
+	"""
+	run given handle on event loop of current worker thread, pipelines never block the main loop.
+	tasks scheduled by handle (e.g. asynchronous monitor log pipelines) are completed before return,
+	otherwise they are stranded on this loop until the worker thread handles another message.
+	"""
+	loop = ask_worker_loop()
+	try:
+		loop.run_until_complete(handle(*args))
+	finally:
+		drain_worker_loop(loop)
+
+
+def drain_worker_loop(loop: AbstractEventLoop) -> None:
+	tasks = all_tasks(loop)
+	while len(tasks) != 0:
+		results = loop.run_until_complete(gather(*tasks, return_exceptions=True))
+		ArrayHelper(results) \
+			.filter(lambda x: isinstance(x, BaseException)) \
+			.each(lambda x: logger.error(x, exc_info=x))
+		# completed tasks might schedule more
+		tasks = all_tasks(loop)
+
+
+def ask_principal_service(pat: Optional[str]) -> PrincipalService:
 	if is_blank(pat):
 		raise Exception('PAT not found.')
-	principal_service = get_principal_by_pat(
-		retrieve_authentication_manager(), pat, [UserRole.ADMIN, UserRole.SUPER_ADMIN])
+	return get_principal_by_pat(retrieve_authentication_manager(), pat, [UserRole.ADMIN, UserRole.SUPER_ADMIN])
+
+
+async def handle_trigger_data(trigger_data: PipelineTriggerDataWithPAT) -> None:
+	# TODO should log trigger data
+	principal_service = ask_principal_service(trigger_data.pat)
 
 	trace_id: PipelineTriggerTraceId = str(ask_snowflake_generator().next_id())
 	await try_to_invoke_pipelines(trigger_data, trace_id, principal_service)
+
+
+def is_bulk_trigger_supported(trigger_data: PipelineTriggerDataWithPAT) -> bool:
+	"""
+	trigger data is saved in bulk by bulk trigger path, nothing is saved when failed
+	"""
+	return is_bulk_insert_supported(trigger_data, ask_principal_service(trigger_data.pat))
+
+
+async def handle_trigger_data_batch(trigger_data_list: List[PipelineTriggerDataWithPAT]) -> None:
+	"""
+	trigger data are grouped by pat, data of each group are triggered by bulk trigger path
+	"""
+	groups: Dict[Optional[str], List[PipelineTriggerDataWithPAT]] = ArrayHelper(trigger_data_list) \
+		.group_by(lambda x: x.pat)
+	for pat, grouped_trigger_data_list in groups.items():
+		principal_service = ask_principal_service(pat)
+		trace_ids: List[PipelineTriggerTraceId] = ArrayHelper(grouped_trigger_data_list) \
+			.map(lambda x: str(ask_snowflake_generator().next_id())) \
+			.to_list()
+		await try_to_invoke_pipelines_batch(grouped_trigger_data_list, trace_ids, principal_service)
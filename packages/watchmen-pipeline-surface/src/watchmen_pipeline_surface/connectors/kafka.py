@@ -1,41 +1,176 @@
-from asyncio import create_task, get_event_loop
+from asyncio import create_task, gather, get_event_loop, sleep
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
 from json import loads
 from logging import getLogger
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 from watchmen_model.common import SettingsModel
 from watchmen_model.pipeline_kernel import PipelineTriggerDataWithPAT
-from .handler import handle_trigger_data
+from watchmen_utilities import ArrayHelper
+from .handler import handle_trigger_data, handle_trigger_data_batch, is_bulk_trigger_supported, run_in_worker_loop
 
 logger = getLogger(__name__)
 
 
+class KafkaOrderBy(str, Enum):
+	PARTITION = 'partition',
+	KEY = 'key'
+
+
 class KafkaSettings(SettingsModel):
 	bootstrapServers: str = None
 	topics: List[str] = []
+	groupId: str = 'watchmen-pipeline'
+	maxRecords: int = 500  # max records of one batch
+	pollTimeout: int = 1000  # in milliseconds
+	workers: int = 8
+	orderBy: KafkaOrderBy = KafkaOrderBy.PARTITION
+	bulkTrigger: bool = False  # trigger messages of one lane by bulk trigger path
+	reconnectInterval: int = 5  # in seconds
+
+
+class KafkaConsumerEngine:
+	"""
+	consume messages in batches, and handle them by a thread pool.
+	messages of a batch are split into lanes by partition, or by partition and key,
+	lanes are handled concurrently and messages in one lane are handled in order.
+	offsets are committed manually after all lanes of batch completed,
+	therefore messages are consumed at least once, uncommitted messages are redelivered after crash.
+	failed messages are logged and skipped, same as trigger by rest api.
+	when bulk trigger enabled, consecutive messages of a lane are grouped by pat and topic, keep the order of lane,
+	group of insertion on non-synonym topic is saved in bulk, and handled one by one when failed.
+	other groups are handled one by one from the start, since bulk trigger path saves them one by one too.
+	"""
+
+	def __init__(self, settings: KafkaSettings):
+		self.settings = settings
+		self.executor = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix='kafka-consumer')
+
+	# noinspection PyMethodMayBeStatic
+	def parse(self, record: Any) -> Optional[PipelineTriggerDataWithPAT]:
+		try:
+			return PipelineTriggerDataWithPAT.parse_obj(loads(record.value.decode('utf-8')))
+		except Exception as e:
+			logger.error(
+				f'Failed to parse message of topic[{record.topic}], partition[{record.partition}], '
+				f'offset[{record.offset}].', exc_info=e)
+			return None
+
+	def handle_one(self, trigger_data: PipelineTriggerDataWithPAT) -> None:
+		try:
+			run_in_worker_loop(handle_trigger_data, trigger_data)
+		except Exception as e:
+			logger.error(e, exc_info=True, stack_info=True)
+
+	# noinspection PyMethodMayBeStatic
+	def is_bulk_supported(self, trigger_data_list: List[PipelineTriggerDataWithPAT]) -> bool:
+		if len(trigger_data_list) < 2:
+			return False
+		try:
+			return is_bulk_trigger_supported(trigger_data_list[0])
+		except Exception as e:
+			# pat or topic not found, raised again when handle them one by one
+			logger.error(e, exc_info=True, stack_info=True)
+			return False
+
+	def handle_group(self, trigger_data_list: List[PipelineTriggerDataWithPAT]) -> None:
+		"""
+		trigger data of one group are saved in one bulk, nothing is saved when it failed.
+		therefore they are handled one by one after failure, a bad message does not drop others.
+		only for group which is saved in bulk, otherwise data saved before failure are saved again.
+		"""
+		if not self.is_bulk_supported(trigger_data_list):
+			ArrayHelper(trigger_data_list).each(self.handle_one)
+			return
+		try:
+			run_in_worker_loop(handle_trigger_data_batch, trigger_data_list)
+		except Exception as e:
+			logger.error(
+				f'Failed to handle {len(trigger_data_list)} message(s) by bulk trigger, '
+				f'fall back to handle them one by one.', exc_info=e)
+			ArrayHelper(trigger_data_list).each(self.handle_one)
+
+	# noinspection PyMethodMayBeStatic
+	def as_groups(self, trigger_data_list: List[PipelineTriggerDataWithPAT]) -> List[List[PipelineTriggerDataWithPAT]]:
+		"""
+		same as bulk trigger path, data of same pat, topic, tenant and trigger type are saved together.
+		only consecutive data are grouped, messages of lane are handled in order.
+		"""
+		groups: List[List[PipelineTriggerDataWithPAT]] = []
+		previous_key: Optional[Tuple[Any, ...]] = None
+		for trigger_data in trigger_data_list:
+			key = (trigger_data.pat, trigger_data.code, trigger_data.tenantId, trigger_data.triggerType)
+			if len(groups) != 0 and key == previous_key:
+				groups[-1].append(trigger_data)
+			else:
+				groups.append([trigger_data])
+				previous_key = key
+		return groups
+
+	def handle_lane(self, records: List[Any]) -> int:
+		trigger_data_list: List[PipelineTriggerDataWithPAT] = ArrayHelper(records) \
+			.map(self.parse) \
+			.filter(lambda x: x is not None) \
+			.to_list()
+		if self.settings.bulkTrigger and len(trigger_data_list) > 1:
+			ArrayHelper(self.as_groups(trigger_data_list)).each(self.handle_group)
+		else:
+			ArrayHelper(trigger_data_list).each(self.handle_one)
+		return len(records)
+
+	def as_lanes(self, batches: Dict[Any, List[Any]]) -> List[List[Any]]:
+		if self.settings.orderBy == KafkaOrderBy.KEY:
+			return ArrayHelper(list(batches.items())) \
+				.map(lambda x: list(ArrayHelper(x[1]).group_by(lambda record: record.key).values())) \
+				.flatten() \
+				.to_list()
+		else:
+			return list(batches.values())
+
+	async def handle_batches(self, batches: Dict[Any, List[Any]]) -> None:
+		loop = get_event_loop()
+		await gather(*ArrayHelper(self.as_lanes(batches)).map(
+			lambda x: loop.run_in_executor(self.executor, self.handle_lane, x)).to_list())
+
+	async def commit(self, consumer: Any, batches: Dict[Any, List[Any]]) -> None:
+		offsets = ArrayHelper(list(batches.items())) \
+			.filter(lambda x: len(x[1]) != 0) \
+			.to_map(lambda x: x[0], lambda x: x[1][-1].offset + 1)
+		try:
+			await consumer.commit(offsets)
+		except Exception as e:
+			# partitions might be revoked by rebalance, messages will be redelivered to new owner
+			logger.error(f'Failed to commit offsets[{offsets}].', exc_info=e)
+
+	async def consume_once(self) -> None:
+		# noinspection PyPackageRequirements
+		from aiokafka import AIOKafkaConsumer
+		consumer = AIOKafkaConsumer(
+			*self.settings.topics, bootstrap_servers=self.settings.bootstrapServers,
+			group_id=self.settings.groupId, enable_auto_commit=False, max_poll_records=self.settings.maxRecords)
 
+		await consumer.start()
+		try:
+			while True:
+				batches = await consumer.getmany(
+					timeout_ms=self.settings.pollTimeout, max_records=self.settings.maxRecords)
+				if len(batches) == 0:
+					continue
+				await self.handle_batches(batches)
+				await self.commit(consumer, batches)
+		finally:
+			# leave consumer group, offsets of unfinished batch are not committed
+			await consumer.stop()
 
-async def consume(loop, settings: KafkaSettings):
-	# noinspection PyPackageRequirements
-	from aiokafka import AIOKafkaConsumer
-	# noinspection PyTypeChecker
-	consumer = AIOKafkaConsumer(
-		settings.topics, loop=loop, bootstrap_servers=settings.bootstrapServers,
-		value_deserializer=lambda m: loads(m.decode('utf-8')))
-
-	await consumer.start()
-	try:
-		async for msg in consumer:
-			trigger_data = PipelineTriggerDataWithPAT.parse_obj(msg.value)
-			await handle_trigger_data(trigger_data)
-	except Exception as e:
-		logger.error(e, exc_info=True, stack_info=True)
-		await consume(get_event_loop(), settings)
-	finally:
-		# Will leave consumer group; perform autocommit if enabled.
-		await consumer.stop()
-	pass
+	async def consume(self) -> None:
+		while True:
+			try:
+				await self.consume_once()
+			except Exception as e:
+				logger.error(e, exc_info=True, stack_info=True)
+				await sleep(self.settings.reconnectInterval)
 
 
 def init_kafka(settings: KafkaSettings) -> None:
-	create_task(consume(get_event_loop(), settings))
+	create_task(KafkaConsumerEngine(settings).consume())
@@ -1,13 +1,19 @@
-from asyncio import ensure_future, get_event_loop
+from asyncio import ensure_future, get_event_loop, sleep, Task
+from concurrent.futures import ThreadPoolExecutor
 from json import loads
 from logging import getLogger
+from typing import Any, Dict, Optional, Set
 
 from watchmen_model.common import SettingsModel
 from watchmen_model.pipeline_kernel import PipelineTriggerDataWithPAT
-from .handler import handle_trigger_data
+from watchmen_utilities import is_blank
+from .handler import handle_trigger_data, run_in_worker_loop
 
 log = getLogger(__name__)
 
+FAILURES_HEADER = 'x-watchmen-failures'
+ERROR_HEADER = 'x-watchmen-error'
+
 
 class RabbitmqSettings(SettingsModel):
 	host: str
@@ -18,47 +24,124 @@ class RabbitmqSettings(SettingsModel):
 	queue: str
 	durable: bool
 	autoDelete: bool
+	prefetchCount: int = 100  # max unacknowledged messages in flight
+	workers: int = 8
+	maxFailures: int = 3  # message is routed to dead letter queue after failures
+	deadLetterQueue: Optional[str] = None  # [queue].dead when not given
+	reconnectInterval: int = 5  # in seconds
+
+
+class RabbitmqConsumerEngine:
+	"""
+	messages are prefetched and handled concurrently by a thread pool,
+	each message is acknowledged after its pipelines completed, therefore delivered at least once.
+	failed message is published to the queue again with failures counted in header,
+	and published to dead letter queue when failures reach the max failures.
+	"""
+
+	def __init__(self, settings: RabbitmqSettings):
+		self.settings = settings
+		self.executor = ThreadPoolExecutor(max_workers=settings.workers, thread_name_prefix='rabbitmq-consumer')
+		self.tasks: Set[Task] = set()
+
+	def ask_dead_letter_queue(self) -> str:
+		dead_letter_queue = self.settings.deadLetterQueue
+		return f'{self.settings.queue}.dead' if is_blank(dead_letter_queue) else dead_letter_queue
+
+	# noinspection PyMethodMayBeStatic
+	def ask_failures(self, message: Any) -> int:
+		headers: Dict[str, Any] = message.headers or {}
+		try:
+			return int(headers.get(FAILURES_HEADER, 0))
+		except (TypeError, ValueError):
+			return 0
+
+	# noinspection PyMethodMayBeStatic
+	def handle(self, body: bytes) -> None:
+		trigger_data = PipelineTriggerDataWithPAT.parse_obj(loads(body))
+		run_in_worker_loop(handle_trigger_data, trigger_data)
 
+	async def publish(self, channel: Any, message: Any, routing_key: str, failures: int, error: str) -> None:
+		# noinspection PyPackageRequirements
+		from aio_pika import DeliveryMode, Message
+		await channel.default_exchange.publish(Message(
+			body=message.body,
+			headers={**(message.headers or {}), FAILURES_HEADER: failures, ERROR_HEADER: error[:1024]},
+			content_type=message.content_type,
+			content_encoding=message.content_encoding,
+			delivery_mode=DeliveryMode.PERSISTENT
+		), routing_key=routing_key)
 
-async def consume(loop, settings: RabbitmqSettings):
-	from aio_pika import connect, ExchangeType
-	connection = await connect(
-		host=settings.host,
-		port=settings.port,
-		loop=loop,
-		virtualhost=settings.virtualHost,
-		login=settings.username,
-		password=settings.password
-	)
+	async def reject(self, channel: Any, message: Any, error: Exception) -> None:
+		failures = self.ask_failures(message) + 1
+		if failures >= self.settings.maxFailures:
+			routing_key = self.ask_dead_letter_queue()
+			log.error(f'Message is routed to dead letter queue[{routing_key}] after {failures} failure(s).')
+		else:
+			routing_key = self.settings.queue
+		try:
+			await self.publish(channel, message, routing_key, failures, str(error))
+		except Exception as e:
+			# keep message in queue, redelivered later
+			log.error(e, exc_info=True, stack_info=True)
+			await message.nack(requeue=True)
+			return
+		await message.ack()
 
-	async with connection:
-		queue_name = settings.queue
+	async def handle_message(self, channel: Any, message: Any) -> None:
+		try:
+			await get_event_loop().run_in_executor(self.executor, self.handle, message.body)
+		except Exception as e:
+			log.error(e, exc_info=True, stack_info=True)
+			await self.reject(channel, message, e)
+			return
+		await message.ack()
 
-		channel = await connection.channel()
+	def dispatch(self, channel: Any, message: Any) -> None:
+		task = ensure_future(self.handle_message(channel, message))
+		# keep reference until done
+		self.tasks.add(task)
+		task.add_done_callback(self.tasks.discard)
 
-		queue = await channel.declare_queue(
-			queue_name,
-			durable=settings.durable,
-			auto_delete=settings.autoDelete
+	async def consume_once(self) -> None:
+		# noinspection PyPackageRequirements
+		from aio_pika import connect, ExchangeType
+		connection = await connect(
+			host=self.settings.host,
+			port=self.settings.port,
+			virtualhost=self.settings.virtualHost,
+			login=self.settings.username,
+			password=self.settings.password
 		)
-		exchange = await channel.declare_exchange(name=queue_name, type=ExchangeType.DIRECT, auto_delete=True)
 
-		await queue.bind(exchange, queue_name)
-		# Creating channel
-		async with queue.iterator() as queue_iter:
-			try:
+		async with connection:
+			queue_name = self.settings.queue
+
+			channel = await connection.channel()
+			# at most prefetch count messages are delivered before acknowledged
+			await channel.set_qos(prefetch_count=self.settings.prefetchCount)
+
+			queue = await channel.declare_queue(
+				queue_name,
+				durable=self.settings.durable,
+				auto_delete=self.settings.autoDelete
+			)
+			exchange = await channel.declare_exchange(name=queue_name, type=ExchangeType.DIRECT, auto_delete=True)
+			await queue.bind(exchange, queue_name)
+			await channel.declare_queue(self.ask_dead_letter_queue(), durable=True)
+
+			async with queue.iterator() as queue_iter:
 				async for message in queue_iter:
-					# noinspection PyUnresolvedReferences
-					async with message.process():
-						# noinspection PyUnresolvedReferences
-						payload = loads(message.body)
-						trigger_data = PipelineTriggerDataWithPAT.parse_obj(payload)
-						await handle_trigger_data(trigger_data)
+					self.dispatch(channel, message)
+
+	async def consume(self) -> None:
+		while True:
+			try:
+				await self.consume_once()
 			except Exception as e:
 				log.error(e, exc_info=True, stack_info=True)
-				await consume(loop, settings)
-	pass
+				await sleep(self.settings.reconnectInterval)
 
 
 def init_rabbitmq(settings: RabbitmqSettings):
-	ensure_future(consume(get_event_loop(), settings))
+	ensure_future(RabbitmqConsumerEngine(settings).consume())
@@ -1,12 +1,15 @@
+from typing import List
+
 from fastapi import APIRouter, Depends
 
 from watchmen_auth import PrincipalService
 from watchmen_meta.common import ask_snowflake_generator
 from watchmen_model.admin import UserRole
-from watchmen_model.pipeline_kernel import PipelineTriggerData, PipelineTriggerResult
-from watchmen_pipeline_kernel.pipeline import try_to_invoke_pipelines, try_to_invoke_pipelines_async
+from watchmen_model.pipeline_kernel import PipelineTriggerData, PipelineTriggerResult, PipelineTriggerTraceId
+from watchmen_pipeline_kernel.pipeline import try_to_invoke_pipelines, try_to_invoke_pipelines_async, \
+	try_to_invoke_pipelines_batch, try_to_invoke_pipelines_batch_async
 from watchmen_rest import get_any_admin_principal
-from watchmen_utilities import is_not_blank
+from watchmen_utilities import ArrayHelper, is_not_blank
 
 router = APIRouter()
 
@@ -28,3 +31,39 @@ async def trigger_pipeline_async(
 	trace_id = trigger_data.traceId if is_not_blank(trigger_data.traceId) else str(ask_snowflake_generator().next_id())
 	internal_data_id = await try_to_invoke_pipelines_async(trigger_data, trace_id, principal_service)
 	return PipelineTriggerResult(received=True, traceId=trace_id, internalDataId=str(internal_data_id))
+
+
+def ask_trace_id(trigger_data: PipelineTriggerData) -> PipelineTriggerTraceId:
+	return trigger_data.traceId if is_not_blank(trigger_data.traceId) else str(ask_snowflake_generator().next_id())
+
+
+def to_trigger_results(
+		trace_ids: List[PipelineTriggerTraceId], internal_data_ids: List[int]) -> List[PipelineTriggerResult]:
+	return ArrayHelper(trace_ids).map_with_index(lambda x, index: PipelineTriggerResult(
+		received=True, traceId=x, internalDataId=str(internal_data_ids[index]))).to_list()
+
+
+@router.post(
+	'/pipeline/data/batch', tags=[UserRole.ADMIN, UserRole.SUPER_ADMIN], response_model=List[PipelineTriggerResult])
+async def trigger_pipeline_batch(
+		trigger_data_list: List[PipelineTriggerData],
+		principal_service: PrincipalService = Depends(get_any_admin_principal)
+) -> List[PipelineTriggerResult]:
+	"""
+	data on same topic with insert trigger type are saved in bulk, results are in same order as given data
+	"""
+	trace_ids = ArrayHelper(trigger_data_list).map(ask_trace_id).to_list()
+	internal_data_ids = await try_to_invoke_pipelines_batch(trigger_data_list, trace_ids, principal_service)
+	return to_trigger_results(trace_ids, internal_data_ids)
+
+
+@router.post(
+	'/pipeline/data/batch/async', tags=[UserRole.ADMIN, UserRole.SUPER_ADMIN],
+	response_model=List[PipelineTriggerResult])
+async def trigger_pipeline_batch_async(
+		trigger_data_list: List[PipelineTriggerData],
+		principal_service: PrincipalService = Depends(get_any_admin_principal)
+) -> List[PipelineTriggerResult]:
+	trace_ids = ArrayHelper(trigger_data_list).map(ask_trace_id).to_list()
+	internal_data_ids = await try_to_invoke_pipelines_batch_async(trigger_data_list, trace_ids, principal_service)
+	return to_trigger_results(trace_ids, internal_data_ids)
@@ -7,7 +7,7 @@ from watchmen_auth import PrincipalService
 from watchmen_data_kernel.common import ask_date_formats
 from watchmen_meta.admin import TopicSnapshotJobLockService, TopicSnapshotSchedulerService
 from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
-from watchmen_model.admin import TopicSnapshotScheduler, TopicSnapshotSchedulerId, UserRole
+from watchmen_model.admin import TopicSnapshotJobLockStatus, TopicSnapshotScheduler, TopicSnapshotSchedulerId, UserRole
 from watchmen_pipeline_kernel.topic_snapshot import run_job
 from watchmen_rest import get_any_admin_principal
 from watchmen_rest.util import raise_400, raise_404, raise_500
@@ -28,7 +28,7 @@ def get_lock_service(scheduler_service: TopicSnapshotSchedulerService) -> TopicS
 
 @router.get('/topic/snapshot/scheduler/adhoc', tags=[UserRole.ADMIN, UserRole.SUPER_ADMIN], response_class=Response)
 async def rerun_by_topic_data(
-		scheduler_id: Optional[TopicSnapshotSchedulerId], process_date: Optional[str],
+		scheduler_id: Optional[TopicSnapshotSchedulerId], process_date: Optional[str], resume: bool = False,
 		principal_service: PrincipalService = Depends(get_any_admin_principal)
 ) -> None:
 	if is_blank(scheduler_id):
@@ -53,7 +53,12 @@ async def rerun_by_topic_data(
 
 		lock_service = get_lock_service(scheduler_service)
 		lock = lock_service.find_by_scheduler_and_process_date(scheduler_id, scheduler.frequency, parsed_process_date)
-		if lock is not None:
+		if resume:
+			if lock is None:
+				raise_404(f'Scheduler[id={scheduler_id}, processDate={process_date}] never run.')
+			if lock.status == TopicSnapshotJobLockStatus.SUCCESS:
+				raise_406(f'Scheduler[id={scheduler_id}, processDate={process_date}] accomplished already.')
+		elif lock is not None:
 			raise_406(f'Scheduler[id={scheduler_id}, processDate={process_date}] run already.')
 	except HTTPException as e:
 		raise e
@@ -62,4 +67,4 @@ async def rerun_by_topic_data(
 	finally:
 		scheduler_service.close_transaction()
 
-	run_job(scheduler_id, parsed_process_date)
+	run_job(scheduler_id, parsed_process_date, resume)
@@ -18,10 +18,20 @@ class PipelineSurfaceSettings(BaseSettings):
 	RABBITMQ_QUEUE: str = ''
 	RABBITMQ_DURABLE: bool = True
 	RABBITMQ_AUTO_DELETE: bool = False
+	RABBITMQ_PREFETCH_COUNT: int = 100  # max unacknowledged messages in flight
+	RABBITMQ_WORKERS: int = 8  # max threads of handling messages
+	RABBITMQ_MAX_FAILURES: int = 3  # message is routed to dead letter queue after failures
+	RABBITMQ_DEAD_LETTER_QUEUE: str = ''  # [queue].dead when blank
 	
 	KAFKA_CONNECTOR: bool = False
 	KAFKA_BOOTSTRAP_SERVER: str = 'localhost:9092'
 	KAFKA_TOPICS: str = ''
+	KAFKA_GROUP_ID: str = 'watchmen-pipeline'
+	KAFKA_MAX_RECORDS: int = 500  # max records of one batch
+	KAFKA_POLL_TIMEOUT: int = 1000  # in milliseconds
+	KAFKA_WORKERS: int = 8  # max threads of handling messages
+	KAFKA_ORDER_BY: str = 'partition'  # partition or key, messages in same partition or with same key are in order
+	KAFKA_BULK_TRIGGER: bool = False  # trigger messages of one partition or key by bulk trigger path
 	
 	S3_COLLECTOR_CONNECTOR: bool = False
 	S3_COLLECTOR_ACCESS_KEY_ID: str = ''
@@ -32,7 +42,9 @@ class PipelineSurfaceSettings(BaseSettings):
 	S3_COLLECTOR_TENANT: int = 0
 	S3_COLLECTOR_CONSUME_PREFIX = ''
 	S3_COLLECTOR_DEAD_PREFIX = ''
-	S3_COLLECTOR_MAX_KEYS: int = 10
+	S3_COLLECTOR_MAX_KEYS: int = 1000  # objects listed in one page
+	S3_COLLECTOR_DOWNLOAD_WORKERS: int = 8
+	S3_COLLECTOR_PROCESS_WORKERS: int = 8
 	S3_COLLECTOR_CLEAN_TASK_INTERVAL: int = 3600
 	
 	class Config:
@@ -58,7 +70,13 @@ def ask_kafka_connector_settings() -> KafkaSettings:
 		topics = topics.split(',')
 	return KafkaSettings(
 		bootstrapServers=settings.KAFKA_BOOTSTRAP_SERVER,
-		topics=topics
+		topics=topics,
+		groupId=settings.KAFKA_GROUP_ID,
+		maxRecords=settings.KAFKA_MAX_RECORDS,
+		pollTimeout=settings.KAFKA_POLL_TIMEOUT,
+		workers=settings.KAFKA_WORKERS,
+		orderBy=settings.KAFKA_ORDER_BY,
+		bulkTrigger=settings.KAFKA_BULK_TRIGGER
 	)
 
 
@@ -75,7 +93,11 @@ def ask_rabbitmq_connector_settings() -> RabbitmqSettings:
 		password=settings.RABBITMQ_PASSWORD,
 		queue=settings.RABBITMQ_QUEUE,
 		durable=settings.RABBITMQ_DURABLE,
-		autoDelete=settings.RABBITMQ_AUTO_DELETE
+		autoDelete=settings.RABBITMQ_AUTO_DELETE,
+		prefetchCount=settings.RABBITMQ_PREFETCH_COUNT,
+		workers=settings.RABBITMQ_WORKERS,
+		maxFailures=settings.RABBITMQ_MAX_FAILURES,
+		deadLetterQueue=settings.RABBITMQ_DEAD_LETTER_QUEUE
 	)
 
 
@@ -97,6 +119,8 @@ def ask_s3_connector_settings():
 			consume_prefix=settings.S3_COLLECTOR_CONSUME_PREFIX,
 			dead_prefix=settings.S3_COLLECTOR_DEAD_PREFIX,
 			max_keys=settings.S3_COLLECTOR_MAX_KEYS,
+			download_workers=settings.S3_COLLECTOR_DOWNLOAD_WORKERS,
+			process_workers=settings.S3_COLLECTOR_PROCESS_WORKERS,
 			clean_task_interval=settings.S3_COLLECTOR_CLEAN_TASK_INTERVAL
 		)
 	
@@ -1,4 +1,5 @@
-from watchmen_pipeline_kernel.boot import init_prebuilt_external_writers, init_topic_snapshot_jobs
+from watchmen_pipeline_kernel.boot import init_compiled_pipelines, init_kernel_caches, \
+	init_prebuilt_external_writers, init_topic_snapshot_jobs
 from .connectors import init_kafka, init_rabbitmq
 from .settings import ask_kafka_connector_enabled, ask_kafka_connector_settings, ask_rabbitmq_connector_enabled, \
 	ask_rabbitmq_connector_settings, ask_s3_connector_enabled, ask_s3_connector_settings
@@ -36,7 +37,18 @@ class PipelineSurface:
 	def init_topic_snapshot_jobs(self) -> None:
 		init_topic_snapshot_jobs()
 
+	# noinspection PyMethodMayBeStatic
+	def init_kernel_caches(self) -> None:
+		init_kernel_caches()
+
+	# noinspection PyMethodMayBeStatic
+	def init_compiled_pipelines(self) -> None:
+		init_compiled_pipelines()
+
 	def init(self) -> None:
+		# caches must be preloaded before compiling pipelines
+		self.init_kernel_caches()
+		self.init_compiled_pipelines()
 		self.init_connectors()
 		self.init_external_writers()
 		self.init_topic_snapshot_jobs()
@@ -0,0 +1,107 @@
+from asyncio import run
+from json import dumps
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+
+from watchmen_model.pipeline_kernel import PipelineTriggerDataWithPAT
+from watchmen_pipeline_surface.connectors.kafka import KafkaConsumerEngine, KafkaOrderBy, KafkaSettings
+
+
+class FakeRecord:
+	def __init__(self, partition: int, offset: int, key: Optional[bytes], value: Dict[str, Any]):
+		self.topic = 'watchmen'
+		self.partition = partition
+		self.offset = offset
+		self.key = key
+		self.value = dumps(value).encode('utf-8')
+
+
+class FakeConsumer:
+	def __init__(self, fail: bool = False):
+		self.fail = fail
+		self.committed: List[Dict[Any, int]] = []
+
+	async def commit(self, offsets: Dict[Any, int]) -> None:
+		if self.fail:
+			raise Exception('Partitions revoked.')
+		self.committed.append(offsets)
+
+
+class FakeEngine(KafkaConsumerEngine):
+	def __init__(self, settings: KafkaSettings):
+		super().__init__(settings)
+		self.handled: List[List[str]] = []
+
+	def handle_one(self, trigger_data: PipelineTriggerDataWithPAT) -> None:
+		self.handled.append([trigger_data.data['id']])
+
+	def handle_group(self, trigger_data_list: List[PipelineTriggerDataWithPAT]) -> None:
+		self.handled.append([trigger_data.data['id'] for trigger_data in trigger_data_list])
+
+
+def create_record(partition: int, offset: int, trigger_type: str, key: Optional[str] = None) -> FakeRecord:
+	return FakeRecord(
+		partition, offset, None if key is None else key.encode('utf-8'),
+		{'pat': 'pat', 'code': 'topic_x', 'triggerType': trigger_type, 'data': {'id': f'{partition}-{offset}'}})
+
+
+class KafkaConsumerEngineTest(TestCase):
+	def test_lanes_by_partition(self):
+		engine = FakeEngine(KafkaSettings(orderBy=KafkaOrderBy.PARTITION))
+		batches = {
+			'p0': [create_record(0, 1, 'insert', 'a'), create_record(0, 2, 'insert', 'b')],
+			'p1': [create_record(1, 1, 'insert', 'a')]
+		}
+		lanes = engine.as_lanes(batches)
+		self.assertEqual([[record.offset for record in lane] for lane in lanes], [[1, 2], [1]])
+
+	def test_lanes_by_key(self):
+		engine = FakeEngine(KafkaSettings(orderBy=KafkaOrderBy.KEY))
+		batches = {
+			'p0': [
+				create_record(0, 1, 'insert', 'a'), create_record(0, 2, 'insert', 'b'),
+				create_record(0, 3, 'insert', 'a')],
+			'p1': [create_record(1, 1, 'insert', 'a')]
+		}
+		lanes = engine.as_lanes(batches)
+		self.assertEqual(
+			[[(record.partition, record.offset) for record in lane] for lane in lanes],
+			[[(0, 1), (0, 3)], [(0, 2)], [(1, 1)]])
+
+	def test_lane_in_order(self):
+		engine = FakeEngine(KafkaSettings(bulkTrigger=False))
+		records = [create_record(0, 1, 'merge'), create_record(0, 2, 'insert'), create_record(0, 3, 'merge')]
+		self.assertEqual(engine.handle_lane(records), 3)
+		self.assertEqual(engine.handled, [['0-1'], ['0-2'], ['0-3']])
+
+	def test_lane_in_order_when_bulk(self):
+		engine = FakeEngine(KafkaSettings(bulkTrigger=True))
+		records = [
+			create_record(0, 1, 'merge'), create_record(0, 2, 'insert'), create_record(0, 3, 'insert'),
+			create_record(0, 4, 'merge')
+		]
+		self.assertEqual(engine.handle_lane(records), 4)
+		# merge of offset 4 must not be handled before insertions of offset 2 and 3
+		self.assertEqual(engine.handled, [['0-1'], ['0-2', '0-3'], ['0-4']])
+
+	def test_lane_skips_unparsable(self):
+		engine = FakeEngine(KafkaSettings(bulkTrigger=True))
+		bad_record = create_record(0, 2, 'insert')
+		bad_record.value = b'not a json'
+		records = [create_record(0, 1, 'insert'), bad_record, create_record(0, 3, 'insert')]
+		self.assertEqual(engine.handle_lane(records), 3)
+		self.assertEqual(engine.handled, [['0-1', '0-3']])
+
+	def test_commit(self):
+		engine = FakeEngine(KafkaSettings())
+		consumer = FakeConsumer()
+		batches = {'p0': [create_record(0, 1, 'insert'), create_record(0, 2, 'insert')], 'p1': []}
+		run(engine.commit(consumer, batches))
+		self.assertEqual(consumer.committed, [{'p0': 3}])
+
+	def test_commit_failed(self):
+		engine = FakeEngine(KafkaSettings())
+		consumer = FakeConsumer(fail=True)
+		# failure is logged, messages are redelivered to new owner of partition
+		run(engine.commit(consumer, {'p0': [create_record(0, 1, 'insert')]}))
+		self.assertEqual(consumer.committed, [])
@@ -0,0 +1,126 @@
+from asyncio import run
+from json import dumps, loads
+from typing import Any, List, Optional, Tuple
+from unittest import TestCase
+
+from watchmen_pipeline_surface.connectors.rabbitmq import ERROR_HEADER, FAILURES_HEADER, RabbitmqConsumerEngine, \
+	RabbitmqSettings
+
+
+class FakeMessage:
+	def __init__(self, data_id: str, failures: Optional[int] = None):
+		self.body = dumps({'pat': 'pat', 'code': 'topic_x', 'data': {'id': data_id}}).encode('utf-8')
+		self.headers = {} if failures is None else {FAILURES_HEADER: failures}
+		self.content_type = 'application/json'
+		self.content_encoding = 'utf-8'
+		self.acked = False
+		self.nacked: List[bool] = []
+
+	async def ack(self) -> None:
+		self.acked = True
+
+	async def nack(self, requeue: bool) -> None:
+		self.nacked.append(requeue)
+
+
+class FakeExchange:
+	def __init__(self, fail: bool = False):
+		self.fail = fail
+		self.published: List[Tuple[str, Any]] = []
+
+	async def publish(self, message: Any, routing_key: str) -> None:
+		if self.fail:
+			raise Exception('Channel closed.')
+		self.published.append((routing_key, message))
+
+
+class FakeChannel:
+	def __init__(self, fail: bool = False):
+		self.default_exchange = FakeExchange(fail)
+
+
+class FakeEngine(RabbitmqConsumerEngine):
+	"""
+	pipelines of data ids in failed raise exception
+	"""
+
+	def __init__(self, settings: RabbitmqSettings, failed: Optional[List[str]] = None):
+		super().__init__(settings)
+		self.failed = failed or []
+		self.handled: List[str] = []
+
+	def handle(self, body: bytes) -> None:
+		data_id = loads(body)['data']['id']
+		if data_id in self.failed:
+			raise Exception(f'Pipeline of data[{data_id}] failed.')
+		self.handled.append(data_id)
+
+
+def create_settings(**kwargs) -> RabbitmqSettings:
+	return RabbitmqSettings(
+		host='localhost', port=5672, virtualHost='/', username='guest', password='guest', queue='watchmen',
+		durable=True, autoDelete=False, **kwargs)
+
+
+class RabbitmqConsumerEngineTest(TestCase):
+	def test_ack_after_handled(self):
+		engine = FakeEngine(create_settings())
+		channel = FakeChannel()
+		message = FakeMessage('1')
+		run(engine.handle_message(channel, message))
+
+		self.assertEqual(engine.handled, ['1'])
+		self.assertTrue(message.acked)
+		self.assertEqual(message.nacked, [])
+		self.assertEqual(channel.default_exchange.published, [])
+
+	def test_republish_when_failed(self):
+		engine = FakeEngine(create_settings(maxFailures=3), failed=['1'])
+		channel = FakeChannel()
+		message = FakeMessage('1', failures=1)
+		run(engine.handle_message(channel, message))
+
+		# original message is acknowledged after republished, with failures counted
+		self.assertTrue(message.acked)
+		self.assertEqual(len(channel.default_exchange.published), 1)
+		routing_key, published = channel.default_exchange.published[0]
+		self.assertEqual(routing_key, 'watchmen')
+		self.assertEqual(published.body, message.body)
+		self.assertEqual(published.headers[FAILURES_HEADER], 2)
+		self.assertEqual(published.headers[ERROR_HEADER], 'Pipeline of data[1] failed.')
+
+	def test_dead_letter_when_max_failures_reached(self):
+		engine = FakeEngine(create_settings(maxFailures=3), failed=['1'])
+		channel = FakeChannel()
+		message = FakeMessage('1', failures=2)
+		run(engine.handle_message(channel, message))
+
+		self.assertTrue(message.acked)
+		routing_key, published = channel.default_exchange.published[0]
+		self.assertEqual(routing_key, 'watchmen.dead')
+		self.assertEqual(published.headers[FAILURES_HEADER], 3)
+
+	def test_declared_dead_letter_queue(self):
+		engine = FakeEngine(create_settings(maxFailures=1, deadLetterQueue='watchmen-dlq'), failed=['1'])
+		channel = FakeChannel()
+		run(engine.handle_message(channel, FakeMessage('1')))
+
+		self.assertEqual(channel.default_exchange.published[0][0], 'watchmen-dlq')
+
+	def test_requeue_when_republish_failed(self):
+		engine = FakeEngine(create_settings(), failed=['1'])
+		channel = FakeChannel(fail=True)
+		message = FakeMessage('1')
+		run(engine.handle_message(channel, message))
+
+		# message stays in queue, redelivered later
+		self.assertFalse(message.acked)
+		self.assertEqual(message.nacked, [True])
+
+	def test_failures_header_not_a_number(self):
+		engine = FakeEngine(create_settings())
+		message = FakeMessage('1')
+		message.headers = {FAILURES_HEADER: 'x'}
+		self.assertEqual(engine.ask_failures(message), 0)
+		message.headers = None
+		self.assertEqual(engine.ask_failures(message), 0)
@@ -0,0 +1,53 @@
+from asyncio import ensure_future, sleep
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+from unittest import TestCase
+
+from watchmen_pipeline_surface.connectors.handler import ask_worker_loop, run_in_worker_loop
+
+
+class WorkerLoopTest(TestCase):
+	def test_scheduled_tasks_completed(self):
+		done: List[str] = []
+
+		async def log() -> None:
+			await sleep(0.01)
+			done.append('log')
+			ensure_future(log_again())
+
+		async def log_again() -> None:
+			await sleep(0.01)
+			done.append('log again')
+
+		async def handle(name: str) -> None:
+			done.append(name)
+			ensure_future(log())
+
+		def run() -> List[str]:
+			run_in_worker_loop(handle, 'pipeline')
+			return list(done)
+
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			self.assertEqual(executor.submit(run).result(), ['pipeline', 'log', 'log again'])
+
+	def test_scheduled_tasks_completed_when_failed(self):
+		done: List[str] = []
+
+		async def log() -> None:
+			done.append('log')
+			raise Exception('monitor log failed')
+
+		async def handle() -> None:
+			ensure_future(log())
+			raise Exception('pipeline failed')
+
+		def run() -> bool:
+			try:
+				run_in_worker_loop(handle)
+			except Exception as e:
+				self.assertEqual(str(e), 'pipeline failed')
+			return ask_worker_loop().is_running()
+
+		with ThreadPoolExecutor(max_workers=1) as executor:
+			self.assertFalse(executor.submit(run).result())
+		self.assertEqual(done, ['log'])
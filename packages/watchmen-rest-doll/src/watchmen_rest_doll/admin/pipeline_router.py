@@ -6,7 +6,7 @@ from pydantic import BaseModel
 from starlette.responses import Response
 
 from watchmen_auth import PrincipalService
-from watchmen_data_kernel.cache import CacheService
+from watchmen_data_kernel.cache import broadcast_cache_invalidation, CacheInvalidationKind, CacheService
 from watchmen_data_kernel.common import ask_all_date_formats
 from watchmen_meta.admin import PipelineService
 from watchmen_meta.analysis import PipelineIndexService
@@ -80,6 +80,8 @@ def build_pipeline_index(pipeline: Pipeline, pipeline_service: PipelineService)
 
 def build_pipeline_cache(pipeline: Pipeline) -> None:
 	CacheService.pipeline().put(pipeline)
+	broadcast_cache_invalidation(
+		CacheInvalidationKind.PIPELINE, pipeline.pipelineId, pipeline.version, pipeline.lastModifiedAt)
 
 
 def post_save_pipeline(pipeline: Pipeline, pipeline_service: PipelineService) -> None:
@@ -126,7 +128,7 @@ async def save_pipeline(
 
 def post_update_pipeline_name(pipeline: Pipeline, pipeline_service: PipelineService) -> None:
 	get_pipeline_index_service(pipeline_service).update_index_on_name_changed(pipeline)
-	CacheService.pipeline().put(pipeline)
+	build_pipeline_cache(pipeline)
 
 
 @router.get('/pipeline/rename', tags=[UserRole.ADMIN], response_class=Response)
@@ -157,7 +159,7 @@ async def update_pipeline_name_by_id(
 
 def post_update_pipeline_enablement(pipeline: Pipeline, pipeline_service: PipelineService) -> None:
 	get_pipeline_index_service(pipeline_service).update_index_on_enablement_changed(pipeline)
-	CacheService.pipeline().put(pipeline)
+	build_pipeline_cache(pipeline)
 
 
 @router.get('/pipeline/enabled', tags=[UserRole.ADMIN], response_class=Response)
@@ -233,6 +235,7 @@ def remove_pipeline_index(pipeline_id: PipelineId, pipeline_service: PipelineSer
 def post_delete_pipeline(pipeline_id: PipelineId, pipeline_service: PipelineService) -> None:
 	remove_pipeline_index(pipeline_id, pipeline_service)
 	CacheService.pipeline().remove(pipeline_id)
+	broadcast_cache_invalidation(CacheInvalidationKind.PIPELINE, pipeline_id, removed=True)
 
 
 @router.delete('/pipeline', tags=[UserRole.SUPER_ADMIN], response_model=Pipeline)
@@ -5,7 +5,7 @@ from fastapi import APIRouter, Body, Depends
 from pydantic import BaseModel
 
 from watchmen_auth import PrincipalService
-from watchmen_data_kernel.cache import CacheService
+from watchmen_data_kernel.cache import broadcast_cache_invalidation, CacheInvalidationKind, CacheService
 from watchmen_data_kernel.common import ask_all_date_formats
 from watchmen_data_kernel.service import sync_topic_structure_storage
 from watchmen_meta.admin import FactorService, PipelineService, TopicService, TopicSnapshotSchedulerService
@@ -82,6 +82,7 @@ def build_topic_index(topic: Topic, topic_service: TopicService) -> None:
 def post_save_topic(topic: Topic, topic_service: TopicService) -> None:
 	build_topic_index(topic, topic_service)
 	CacheService.topic().put(topic)
+	broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, topic.topicId, topic.version, topic.lastModifiedAt)
 
 
 def sync_topic_structure(
@@ -341,6 +342,7 @@ def remove_topic_index(topic_id: TopicId, topic_service: TopicService) -> None:
 def post_delete_topic(topic_id: TopicId, topic_service: TopicService) -> None:
 	remove_topic_index(topic_id, topic_service)
 	CacheService.topic().remove(topic_id)
+	broadcast_cache_invalidation(CacheInvalidationKind.TOPIC, topic_id, removed=True)
 
 
 @router.delete('/topic', tags=[UserRole.SUPER_ADMIN], response_model=Topic)
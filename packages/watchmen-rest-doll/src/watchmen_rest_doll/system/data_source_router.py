@@ -3,7 +3,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Body, Depends
 
 from watchmen_auth import PrincipalService
-from watchmen_data_kernel.cache import CacheService
+from watchmen_data_kernel.cache import broadcast_cache_invalidation, CacheInvalidationKind, CacheService
 from watchmen_meta.common import ask_meta_storage, ask_snowflake_generator
 from watchmen_meta.system import DataSourceService
 from watchmen_model.admin import UserRole
@@ -73,6 +73,9 @@ async def save_data_source(
 			# noinspection PyTypeChecker
 			a_data_source: DataSource = data_source_service.update(a_data_source)
 		CacheService.data_source().put(a_data_source)
+		broadcast_cache_invalidation(
+			CacheInvalidationKind.DATA_SOURCE, a_data_source.dataSourceId, a_data_source.version,
+			a_data_source.lastModifiedAt)
 		return a_data_source
 
 	return trans(data_source_service, lambda: action(data_source))
@@ -141,6 +144,7 @@ async def delete_data_source_by_id_by_super_admin(
 		if data_source is None:
 			raise_404()
 		CacheService.data_source().remove(data_source_id)
+		broadcast_cache_invalidation(CacheInvalidationKind.DATA_SOURCE, data_source_id, removed=True)
 		return data_source
 
 	return trans(data_source_service, action)
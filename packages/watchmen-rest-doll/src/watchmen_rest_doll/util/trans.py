@@ -3,6 +3,7 @@ from typing import Callable, Tuple, TypeVar
 
 from fastapi import HTTPException
 
+from watchmen_data_kernel.cache import defer_cache_invalidation
 from watchmen_meta.common import StorageService
 from watchmen_rest.util import raise_500
 
@@ -26,49 +27,66 @@ def trans_readonly(storage_service: StorageService, action: Callable[[], TransRe
 def trans_with_fail_over(
 		storage_service: StorageService, action: Callable[[], TransReturned], fail_over: Callable[[], TransReturned]
 ) -> TransReturned:
+	# cache invalidations are broadcast after committed
+	done = defer_cache_invalidation()
 	storage_service.begin_transaction()
 	try:
 		returned = action()
 		storage_service.commit_transaction()
-		return returned
 	except HTTPException as e:
 		logger.error(e, exc_info=True, stack_info=True)
 		storage_service.rollback_transaction()
+		done(False)
 		return fail_over()
 	except Exception as e:
 		logger.error(e, exc_info=True, stack_info=True)
 		storage_service.rollback_transaction()
+		done(False)
 		return fail_over()
+	else:
+		done(True)
+		return returned
 
 
 # noinspection DuplicatedCode
 def trans(storage_service: StorageService, action: Callable[[], TransReturned]) -> TransReturned:
+	# cache invalidations are broadcast after committed
+	done = defer_cache_invalidation()
 	storage_service.begin_transaction()
 	try:
 		returned = action()
 		storage_service.commit_transaction()
-		return returned
 	except HTTPException as e:
 		storage_service.rollback_transaction()
+		done(False)
 		raise e
 	except Exception as e:
 		storage_service.rollback_transaction()
+		done(False)
 		raise_500(e)
+	else:
+		done(True)
+		return returned
 
 
 def trans_with_tail(
 		storage_service: StorageService,
 		action: Callable[[], Tuple[TransReturned, Callable[[], None]]]) -> TransReturned:
+	# cache invalidations are broadcast after committed
+	done = defer_cache_invalidation()
 	storage_service.begin_transaction()
 	try:
 		returned, tail = action()
 		storage_service.commit_transaction()
 	except HTTPException as e:
 		storage_service.rollback_transaction()
+		done(False)
 		raise e
 	except Exception as e:
 		storage_service.rollback_transaction()
+		done(False)
 		raise_500(e)
 	else:
+		done(True)
 		tail()
 		return returned
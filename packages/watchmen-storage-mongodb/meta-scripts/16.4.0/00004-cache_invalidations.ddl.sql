@@ -0,0 +1 @@
+db.cache_invalidations.createIndex({created_at:1})
\ No newline at end of file
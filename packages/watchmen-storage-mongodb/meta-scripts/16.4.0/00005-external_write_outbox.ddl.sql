@@ -0,0 +1,2 @@
+db.external_write_outbox.createIndex({status:1, next_retry_at:1})
+db.external_write_outbox.createIndex({created_at:1})
\ No newline at end of file
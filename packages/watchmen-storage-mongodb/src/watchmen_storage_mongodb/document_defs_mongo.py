@@ -79,6 +79,23 @@ table_key_stores = MongoDocument(
 		create_datetime('created_at', False), create_tuple_id_column('created_by', nullable=False)
 	]
 )
+table_cache_invalidations = MongoDocument(
+	name='cache_invalidations',
+	columns=[
+		create_pk('invalidation_id'), create_str('kind', False), create_tuple_id_column('entity_id', False),
+		create_int('version'), create_datetime('last_modified_at'), create_bool('removed', False),
+		create_datetime('created_at', False)
+	]
+)
+table_external_write_outbox = MongoDocument(
+	name='external_write_outbox',
+	columns=[
+		create_pk('event_id'), create_str('writer_code'), create_str('url', False), create_str('pat'),
+		create_json('payload', False), create_str('status', False), create_int('retries', False),
+		create_datetime('next_retry_at', False), create_datetime('claimed_at'), create_str('last_error'),
+		create_datetime('created_at', False)
+	]
+)
 # admin
 table_users = MongoDocument(
 	name='users',
@@ -228,7 +245,7 @@ table_snapshot_job_locks = MongoDocument(
 		create_pk('lock_id'), create_tuple_id_column('tenant_id', False), create_tuple_id_column('scheduler_id', False),
 		create_str('frequency', False), create_datetime('process_date', False), create_int('row_count', False),
 		create_str('status', False),
-		create_tuple_id_column('user_id', False), create_datetime('created_at', False)
+		create_tuple_id_column('user_id', False), create_datetime('created_at', False), create_datetime('heartbeat_at')
 	]
 )
 
@@ -387,6 +404,8 @@ tables: Dict[str, MongoDocument] = {
 	'plugins': table_plugins,
 	'data_sources': table_data_sources,
 	'key_stores': table_key_stores,
+	'cache_invalidations': table_cache_invalidations,
+	'external_write_outbox': table_external_write_outbox,
 	# admin
 	'users': table_users,
 	'user_groups': table_user_groups,
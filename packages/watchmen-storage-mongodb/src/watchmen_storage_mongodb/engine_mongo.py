@@ -152,6 +152,9 @@ class MongoConnection:
 		pipeline.append({'$limit': limit})
 		return list(self.collection(document.name).aggregate(pipeline))
 
+	def aggregate(self, document: MongoDocument, pipeline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+		return list(self.collection(document.name).aggregate(pipeline))
+
 
 class MongoEngine:
 	def __init__(self, url: str):
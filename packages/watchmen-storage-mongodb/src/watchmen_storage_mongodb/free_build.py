@@ -0,0 +1,237 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from watchmen_storage import ColumnNameLiteral, ComputedLiteral, EntitySort, EntitySortColumn, \
+	FreeAggregateArithmetic, FreeAggregateColumn, FreeAggregator, FreeColumn, FreeFinder, FreeJoin, FreeJoinType, \
+	Literal, NoFreeJoinException, UnexpectedStorageException
+from watchmen_utilities import ArrayHelper
+from .document_defs_mongo import find_document
+from .document_mongo import MongoDocument
+from .sort_build import build_sort_for_statement
+from .where_build import build_criteria_for_statement, build_literal
+
+MongoPipeline = List[Dict[str, Any]]
+
+
+def is_aggregate_arithmetic(arithmetic: Optional[FreeAggregateArithmetic]) -> bool:
+	return arithmetic is not None and arithmetic != FreeAggregateArithmetic.NONE
+
+
+def to_left_join(free_join: FreeJoin) -> FreeJoin:
+	if free_join.type == FreeJoinType.RIGHT:
+		return FreeJoin(primary=free_join.secondary, secondary=free_join.primary, type=FreeJoinType.LEFT)
+	else:
+		return free_join
+
+
+def build_join_column_path(documents: List[MongoDocument], document: MongoDocument, column_name: str) -> str:
+	return column_name if document == documents[0] else f'{document.name}.{column_name}'
+
+
+def build_lookup(
+		documents: List[MongoDocument], primary_document: MongoDocument, secondary_document: MongoDocument,
+		joins: List[FreeJoin]) -> MongoPipeline:
+	"""
+	secondary document is nested into field which named by its document name.
+	every join is left join, otherwise reduce to inner join
+	"""
+	outer_join = ArrayHelper(joins).every(lambda x: x.type == FreeJoinType.LEFT)
+	variables = ArrayHelper(joins) \
+		.map_with_index(lambda x, index: (
+			f'primary_{index}', f'${build_join_column_path(documents, primary_document, x.primary.columnName)}')) \
+		.to_map(lambda x: x[0], lambda x: x[1])
+	# null never matches, same as join on relational database
+	conditions = ArrayHelper(joins) \
+		.map_with_index(lambda x, index: [
+			{'$ne': [f'$$primary_{index}', None]},
+			{'$eq': [f'${x.secondary.columnName}', f'$$primary_{index}']}
+		]) \
+		.flatten() \
+		.to_list()
+	return [
+		{'$lookup': {
+			'from': secondary_document.name,
+			'let': variables,
+			'pipeline': [{'$match': {'$expr': {'$and': conditions}}}],
+			'as': secondary_document.name
+		}},
+		{'$unwind': {'path': f'${secondary_document.name}', 'preserveNullAndEmptyArrays': outer_join}}
+	]
+
+
+def build_free_joins(joins: Optional[List[FreeJoin]]) -> Tuple[List[MongoDocument], MongoPipeline]:
+	"""
+	returns used documents and lookup stages, first document is the one which pipeline runs on
+	"""
+	if joins is None or len(joins) == 0:
+		raise NoFreeJoinException('No join found.')
+	if len(joins) == 1 and joins[0].secondary is None:
+		# single topic
+		return [find_document(joins[0].primary.entityName)], []
+
+	pending = ArrayHelper(joins).map(to_left_join).to_list()
+	documents = [find_document(pending[0].primary.entityName)]
+	pipeline: MongoPipeline = []
+	while len(pending) != 0:
+		# only joins which primary document is used can be consumed in this round
+		consumable = ArrayHelper(pending) \
+			.filter(lambda x: find_document(x.primary.entityName) in documents) \
+			.to_list()
+		if len(consumable) == 0:
+			raise UnexpectedStorageException('Cannot join documents by given declaration.')
+		groups: Dict[Tuple[str, str], List[FreeJoin]] = ArrayHelper(consumable) \
+			.group_by(lambda x: (x.primary.entityName, x.secondary.entityName))
+		for (primary_entity_name, secondary_entity_name), grouped_joins in groups.items():
+			primary_document = find_document(primary_entity_name)
+			secondary_document = find_document(secondary_entity_name)
+			if secondary_document in documents:
+				raise UnexpectedStorageException(
+					f'Document[{secondary_document.name}] is joined more than once, which is not supported.')
+			pipeline.extend(build_lookup(documents, primary_document, secondary_document, grouped_joins))
+			documents.append(secondary_document)
+		pending = ArrayHelper(pending).filter(lambda x: x not in consumable).to_list()
+	return documents, pipeline
+
+
+def build_free_column_value(documents: List[MongoDocument], literal: Literal) -> Any:
+	built = build_literal(documents, literal)
+	if isinstance(literal, (ColumnNameLiteral, ComputedLiteral)):
+		return built
+	else:
+		# constant value, cannot be treated as field path or inclusion flag in projection
+		return {'$literal': built}
+
+
+def build_free_columns(documents: List[MongoDocument], columns: List[FreeColumn]) -> MongoPipeline:
+	"""
+	columns are named as column_1, column_2, ..., column_N. recalculate columns are ignored
+	"""
+	project: Dict[str, Any] = {'_id': 0}
+	for index, column in enumerate(columns):
+		if not column.recalculate:
+			project[f'column_{index + 1}'] = build_free_column_value(documents, column.literal)
+	return [{'$project': project}]
+
+
+def build_accumulator(column: FreeAggregateColumn) -> Dict[str, Any]:
+	name = column.name
+	arithmetic = column.arithmetic
+	if arithmetic == FreeAggregateArithmetic.COUNT:
+		return {'$sum': 1}
+	elif arithmetic == FreeAggregateArithmetic.SUMMARY:
+		return {'$sum': f'${name}'}
+	elif arithmetic == FreeAggregateArithmetic.AVERAGE:
+		return {'$avg': f'${name}'}
+	elif arithmetic == FreeAggregateArithmetic.MAXIMUM:
+		return {'$max': f'${name}'}
+	elif arithmetic == FreeAggregateArithmetic.MINIMUM:
+		return {'$min': f'${name}'}
+	else:
+		raise UnexpectedStorageException(f'Aggregate arithmetic[{arithmetic}] is not supported.')
+
+
+def build_aggregate_columns(columns: List[Optional[FreeAggregateColumn]], prefix_name: str) -> MongoPipeline:
+	"""
+	columns are renamed as [prefix_name]_1, [prefix_name]_2, ..., [prefix_name]_N.
+	group stage is built only when aggregation column existing, grouped by non-aggregation columns.
+	note when columns are faked, there might be none in columns list, keep none is for keep the column index correct
+	"""
+	named_columns: List[Tuple[FreeAggregateColumn, str]] = ArrayHelper(columns) \
+		.map_with_index(lambda x, index: None if x is None else (x, f'{prefix_name}_{index + 1}')) \
+		.filter(lambda x: x is not None) \
+		.to_list()
+	if not ArrayHelper(named_columns).some(lambda x: is_aggregate_arithmetic(x[0].arithmetic)):
+		return [{'$project': {
+			'_id': 0,
+			**ArrayHelper(named_columns).to_map(lambda x: x[1], lambda x: f'${x[0].name}')
+		}}]
+
+	group_by_columns = ArrayHelper(named_columns) \
+		.filter(lambda x: not is_aggregate_arithmetic(x[0].arithmetic)) \
+		.to_map(lambda x: x[0].name, lambda x: f'${x[0].name}')
+	group: Dict[str, Any] = {'_id': None if len(group_by_columns) == 0 else group_by_columns}
+	project: Dict[str, Any] = {'_id': 0}
+	for column, alias in named_columns:
+		if is_aggregate_arithmetic(column.arithmetic):
+			group[alias] = build_accumulator(column)
+			project[alias] = f'${alias}'
+		else:
+			project[alias] = f'$_id.{column.name}'
+	return [{'$group': group}, {'$project': project}]
+
+
+def build_fake_aggregation(columns: List[FreeColumn]) -> MongoPipeline:
+	"""
+	aggregate free columns when aggregation column existing. recalculate columns are ignored
+	"""
+	if not ArrayHelper(columns).some(lambda x: not x.recalculate and is_aggregate_arithmetic(x.arithmetic)):
+		return []
+
+	def as_column(column: FreeColumn, index: int) -> Optional[FreeAggregateColumn]:
+		if column.recalculate:
+			return None
+		else:
+			return FreeAggregateColumn(name=f'column_{index + 1}', arithmetic=column.arithmetic)
+
+	return build_aggregate_columns(ArrayHelper(columns).map_with_index(as_column).to_list(), 'column')
+
+
+def build_recalculate_columns(columns: List[FreeColumn]) -> MongoPipeline:
+	"""
+	recalculate columns are computed on built columns, which are named as column_1, column_2, ..., column_N
+	"""
+	if not ArrayHelper(columns).some(lambda x: x.recalculate):
+		return []
+
+	project: Dict[str, Any] = {'_id': 0}
+	for index, column in enumerate(columns):
+		name = f'column_{index + 1}'
+		project[name] = build_free_column_value([], column.literal) if column.recalculate else f'${name}'
+	return [{'$project': project}]
+
+
+def build_free_find_pipeline(finder: FreeFinder) -> Tuple[MongoDocument, MongoPipeline]:
+	"""
+	returns document which pipeline runs on, and pipeline. something like:
+	$lookup/$unwind for each joined document -> $match -> $project as column_N -> $group -> $project recalculate
+	"""
+	documents, pipeline = build_free_joins(finder.joins)
+	where = build_criteria_for_statement(documents, finder.criteria)
+	if where is not None:
+		pipeline.append({'$match': {'$expr': where}})
+	pipeline.extend(build_free_columns(documents, finder.columns))
+	pipeline.extend(build_fake_aggregation(finder.columns))
+	pipeline.extend(build_recalculate_columns(finder.columns))
+	return documents[0], pipeline
+
+
+def build_free_aggregate_pipeline(aggregator: FreeAggregator) -> Tuple[MongoDocument, MongoPipeline]:
+	"""
+	high order criteria and aggregation are applied on pipeline of free find, columns are named as agg_column_N
+	"""
+	document, pipeline = build_free_find_pipeline(aggregator)
+	# no document, high order criteria is on column_N
+	where = build_criteria_for_statement([], aggregator.highOrderCriteria)
+	if where is not None:
+		pipeline.append({'$match': {'$expr': where}})
+	pipeline.extend(build_aggregate_columns(aggregator.highOrderAggregateColumns, 'agg_column'))
+	return document, pipeline
+
+
+def build_high_order_sort(
+		columns: List[FreeAggregateColumn], sort: Optional[EntitySort]) -> Optional[Dict[str, int]]:
+	"""
+	sort columns are declared by column_N, which are renamed as agg_column_N after high order aggregation
+	"""
+	if sort is None or len(sort) == 0:
+		return None
+
+	def rename(sort_column: EntitySortColumn) -> EntitySortColumn:
+		for index, column in enumerate(columns):
+			if column.name == sort_column.name and not is_aggregate_arithmetic(column.arithmetic):
+				return EntitySortColumn(name=f'agg_column_{index + 1}', method=sort_column.method)
+		for index, column in enumerate(columns):
+			if column.name == sort_column.name:
+				return EntitySortColumn(name=f'agg_column_{index + 1}', method=sort_column.method)
+		return sort_column
+
+	return build_sort_for_statement(ArrayHelper(sort).map(rename).to_list())
@@ -3,16 +3,18 @@ from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from watchmen_model.admin import Factor, Topic
 from watchmen_model.common import DataPage, Storable
-from watchmen_storage import as_table_name, Entity, EntityColumnAggregateArithmetic, EntityDeleter, \
-	EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, EntityIdHelper, EntityList, \
-	EntityNotFoundException, EntityPager, EntityRow, EntityStraightAggregateColumn, EntityStraightColumn, \
-	EntityStraightValuesFinder, EntityUpdater, FreeAggregatePager, FreeAggregator, FreeFinder, FreePager, \
-	TooManyEntitiesFoundException, TopicDataStorageSPI, TransactionalStorageSPI, UnexpectedStorageException, \
-	UnsupportedStraightColumnException
-from watchmen_utilities import ArrayHelper, is_blank
+from watchmen_storage import as_table_name, ask_insert_all_chunk_size, Entity, EntityColumnAggregateArithmetic, \
+	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, EntityIdHelper, \
+	EntityLimitedFinder, EntityList, EntityNotFoundException, EntityPager, EntityRow, EntityStraightAggregateColumn, \
+	EntityStraightColumn, EntityStraightValuesFinder, EntityUpdater, FreeAggregateColumn, FreeAggregatePager, \
+	FreeAggregator, FreeColumn, FreeFinder, FreePager, TooManyEntitiesFoundException, TopicDataStorageSPI, \
+	TransactionalStorageSPI, UnexpectedStorageException, UnsupportedStraightColumnException
+from watchmen_utilities import ArrayHelper, is_blank, is_not_blank
 from .document_defs_mongo import find_document, register_document
 from .document_mongo import MongoDocument
 from .engine_mongo import MongoConnection, MongoEngine
+from .free_build import build_free_aggregate_pipeline, build_free_find_pipeline, build_high_order_sort, \
+	is_aggregate_arithmetic
 from .sort_build import build_sort_for_statement
 from .topic_document_generate import build_to_trino_fields
 from .where_build import build_criteria_for_statement
@@ -71,12 +73,15 @@ class StorageMongoDB(TransactionalStorageSPI):
 		self.connection.insert_one(document, entity)
 
 	def insert_all(self, data: List[Entity], helper: EntityHelper) -> None:
+		if len(data) == 0:
+			return
 		document = self.find_document(helper.name)
-		entities = ArrayHelper(data) \
+		ArrayHelper(data) \
 			.map(lambda x: helper.shaper.serialize(x)) \
 			.map(lambda x: document.copy_id_column_to_object_id(x)) \
-			.to_list()
-		self.connection.insert_many(document, entities)
+			.map(lambda x: document.change_date_to_datetime(x)) \
+			.chunk(ask_insert_all_chunk_size()) \
+			.each(lambda entities: self.connection.insert_many(document, entities))
 
 	def update_one(self, one: Entity, helper: EntityIdHelper) -> int:
 		document = self.find_document(helper.name)
@@ -341,23 +346,36 @@ class StorageMongoDB(TransactionalStorageSPI):
 			.filter(lambda x: not isinstance(x, EntityStraightAggregateColumn)) \
 			.reduce(add_into_non_aggregate_column, {})
 
-	# noinspection PyMethodMayBeStatic
+	def is_straight_aggregate_supported(self, arithmetic: EntityColumnAggregateArithmetic) -> bool:
+		return super().is_straight_aggregate_supported(arithmetic) or arithmetic in [
+			EntityColumnAggregateArithmetic.STDDEV, EntityColumnAggregateArithmetic.NULL_COUNT
+		]
+
 	def build_straight_aggregate_columns(self, columns: List[EntityStraightColumn]) -> Dict[str, Any]:
+		"""
+		aggregate columns are keyed by alias, therefore more than one aggregation can be applied on one column
+		"""
+
 		def add_into_aggregate_column(
 				aggregate_columns: Dict[str, Any], column: EntityStraightAggregateColumn
 		) -> Dict[str, Any]:
 			name = column.columnName
+			alias = self.get_alias_from_straight_column(column)
 			arithmetic = column.arithmetic
 			if arithmetic == EntityColumnAggregateArithmetic.COUNT:
-				aggregate_columns[name] = {name: {'$sum': 1}}
+				aggregate_columns[alias] = {'$sum': 1}
 			elif arithmetic == EntityColumnAggregateArithmetic.SUM:
-				aggregate_columns[name] = {name: {'$sum': f'${name}'}}
+				aggregate_columns[alias] = {'$sum': f'${name}'}
 			elif arithmetic == EntityColumnAggregateArithmetic.AVG:
-				aggregate_columns[name] = {name: {'$avg': f'${name}'}}
+				aggregate_columns[alias] = {'$avg': f'${name}'}
 			elif arithmetic == EntityColumnAggregateArithmetic.MAX:
-				aggregate_columns[name] = {name: {'$max': f'${name}'}}
+				aggregate_columns[alias] = {'$max': f'${name}'}
 			elif arithmetic == EntityColumnAggregateArithmetic.MIN:
-				aggregate_columns[name] = {name: {'$min': f'${name}'}}
+				aggregate_columns[alias] = {'$min': f'${name}'}
+			elif arithmetic == EntityColumnAggregateArithmetic.STDDEV:
+				aggregate_columns[alias] = {'$stdDevSamp': f'${name}'}
+			elif arithmetic == EntityColumnAggregateArithmetic.NULL_COUNT:
+				aggregate_columns[alias] = {'$sum': {'$cond': [{'$eq': [{'$ifNull': [f'${name}', None]}, None]}, 1, 0]}}
 			else:
 				raise UnsupportedStraightColumnException(
 					f'Straight column[name={name}, arithmetic={arithmetic}] is not supported.')
@@ -378,10 +396,10 @@ class StorageMongoDB(TransactionalStorageSPI):
 		def to_project_column(columns: Dict[str, Any], column: EntityStraightColumn) -> Dict[str, Any]:
 			alias = self.get_alias_from_straight_column(column)
 			name = column.columnName
-			if name in non_aggregate_columns:
+			if isinstance(column, EntityStraightAggregateColumn) and alias in aggregate_columns:
+				columns[alias] = f'${alias}'
+			elif name in non_aggregate_columns:
 				columns[alias] = f'$_id.{name}'
-			elif name in aggregate_columns:
-				columns[alias] = f'${name}'
 			else:
 				raise UnsupportedStraightColumnException(f'Straight column[name={name}] is not supported.')
 			return columns
@@ -470,6 +488,16 @@ class StorageMongoDB(TransactionalStorageSPI):
 			pageCount=max_page_number
 		)
 
+	def find_limited(self, finder: EntityLimitedFinder) -> EntityList:
+		document = self.find_document(finder.name)
+		where = build_criteria_for_statement([document], finder.criteria)
+		sort = build_sort_for_statement(finder.sort)
+		results = self.connection.page(document, where, 0, finder.limit, sort)
+		return ArrayHelper(results) \
+			.map(self.remove_object_id) \
+			.map(finder.shaper.deserialize) \
+			.to_list()
+
 	def exists(self, finder: EntityFinder) -> bool:
 		document = self.find_document(finder.name)
 		where = build_criteria_for_statement([document], finder.criteria)
@@ -533,7 +561,7 @@ class TopicDataStorageMongoDB(StorageMongoDB, TopicDataStorageSPI):
 		raise UnexpectedStorageException('Method[ask_synonym_factors] does not support by mongo storage.')
 
 	def is_free_find_supported(self) -> bool:
-		return False
+		return True
 
 	def append_topic_to_trino(self, topic: Topic) -> None:
 		self.connect()
@@ -546,26 +574,110 @@ class TopicDataStorageMongoDB(StorageMongoDB, TopicDataStorageSPI):
 		self.connect()
 		self.connection.delete_many(self.find_document('_schema'), {'table': as_table_name(topic)})
 
+	# noinspection PyMethodMayBeStatic
+	def deserialize_from_auto_generated_columns(self, row: Dict[str, Any], columns: List[FreeColumn]) -> Dict[str, Any]:
+		data: Dict[str, Any] = {}
+		for index, column in enumerate(columns):
+			data[column.alias] = row.get(f'column_{index + 1}')
+		return data
+
+	# noinspection PyMethodMayBeStatic
+	def deserialize_from_auto_generated_aggregate_columns(
+			self, row: Dict[str, Any], columns: List[FreeAggregateColumn]) -> Dict[str, Any]:
+		data: Dict[str, Any] = {}
+		for index, column in enumerate(columns):
+			alias = column.alias if is_not_blank(column.alias) else column.name
+			data[alias] = row.get(f'agg_column_{index + 1}')
+		return data
+
+	def count_on_pipeline(self, document: MongoDocument, pipeline: List[Dict[str, Any]]) -> int:
+		results = self.connection.aggregate(document, [*pipeline, {'$count': 'count'}])
+		return results[0]['count'] if len(results) != 0 else 0
+
 	def free_find(self, finder: FreeFinder) -> List[Dict[str, Any]]:
-		"""
-		not supported by mongo
-		"""
-		raise UnexpectedStorageException('Method[free_find] does not support by mongo storage.')
+		document, pipeline = build_free_find_pipeline(finder)
+		results = self.connection.aggregate(document, pipeline)
+		return ArrayHelper(results) \
+			.map(lambda x: self.deserialize_from_auto_generated_columns(x, finder.columns)) \
+			.to_list()
 
+	# noinspection DuplicatedCode
 	def free_page(self, pager: FreePager) -> DataPage:
-		"""
-		not supported by mongo
-		"""
-		raise UnexpectedStorageException('Method[free_page] does not support by mongo storage.')
+		page_size = pager.pageable.pageSize
+
+		document, pipeline = build_free_find_pipeline(pager)
+		aggregate_column_count = ArrayHelper(pager.columns) \
+			.filter(lambda x: not x.recalculate and is_aggregate_arithmetic(x.arithmetic)) \
+			.size()
+		if aggregate_column_count != 0 and aggregate_column_count == len(pager.columns):
+			# all columns are aggregated, there is one row exactly
+			count = 1
+		else:
+			count = self.count_on_pipeline(document, pipeline)
+			if count == 0:
+				return self.create_empty_page(page_size)
+
+		page_number, max_page_number = self.compute_page(count, page_size, pager.pageable.pageNumber)
+		offset = page_size * (page_number - 1)
+		results = self.connection.aggregate(document, [*pipeline, {'$skip': offset}, {'$limit': page_size}])
+		results = ArrayHelper(results) \
+			.map(lambda x: self.deserialize_from_auto_generated_columns(x, pager.columns)) \
+			.to_list()
+
+		return DataPage(
+			data=results,
+			pageNumber=page_number,
+			pageSize=page_size,
+			itemCount=count,
+			pageCount=max_page_number
+		)
 
 	def free_aggregate_find(self, aggregator: FreeAggregator) -> List[Dict[str, Any]]:
-		"""
-		not supported by mongo
-		"""
-		raise UnexpectedStorageException('Method[free_aggregate_find] does not support by mongo storage.')
+		document, pipeline = build_free_aggregate_pipeline(aggregator)
+		sort = build_high_order_sort(aggregator.highOrderAggregateColumns, aggregator.highOrderSortColumns)
+		if sort is not None:
+			pipeline.append({'$sort': sort})
+		if aggregator.highOrderTruncation is not None and aggregator.highOrderTruncation > 0:
+			pipeline.append({'$limit': aggregator.highOrderTruncation})
+
+		results = self.connection.aggregate(document, pipeline)
 
+		def deserialize(row: Dict[str, Any]) -> Dict[str, Any]:
+			return self.deserialize_from_auto_generated_aggregate_columns(row, aggregator.highOrderAggregateColumns)
+
+		return ArrayHelper(results).map(deserialize).to_list()
+
+	# noinspection DuplicatedCode
 	def free_aggregate_page(self, pager: FreeAggregatePager) -> DataPage:
-		"""
-		not supported by mongo
-		"""
-		raise UnexpectedStorageException('Method[free_aggregate_page] does not support by mongo storage.')
+		page_size = pager.pageable.pageSize
+
+		document, pipeline = build_free_aggregate_pipeline(pager)
+		aggregated = ArrayHelper(pager.highOrderAggregateColumns).some(lambda x: is_aggregate_arithmetic(x.arithmetic))
+		has_group_by = ArrayHelper(pager.highOrderAggregateColumns) \
+			.some(lambda x: not is_aggregate_arithmetic(x.arithmetic))
+		if aggregated and not has_group_by:
+			count = 1
+		else:
+			count = self.count_on_pipeline(document, pipeline)
+			if count == 0:
+				return self.create_empty_page(page_size)
+
+		sort = build_high_order_sort(pager.highOrderAggregateColumns, pager.highOrderSortColumns)
+		if sort is not None:
+			pipeline.append({'$sort': sort})
+		page_number, max_page_number = self.compute_page(count, page_size, pager.pageable.pageNumber)
+		offset = page_size * (page_number - 1)
+		results = self.connection.aggregate(document, [*pipeline, {'$skip': offset}, {'$limit': page_size}])
+
+		def deserialize(row: Dict[str, Any]) -> Dict[str, Any]:
+			return self.deserialize_from_auto_generated_aggregate_columns(row, pager.highOrderAggregateColumns)
+
+		results = ArrayHelper(results).map(deserialize).to_list()
+
+		return DataPage(
+			data=results,
+			pageNumber=page_number,
+			pageSize=page_size,
+			itemCount=count,
+			pageCount=max_page_number
+		)
@@ -6,7 +6,8 @@ from watchmen_storage import ColumnNameLiteral, ComputedLiteral, ComputedLiteral
 	EntityCriteriaExpression, EntityCriteriaJoint, EntityCriteriaJointConjunction, EntityCriteriaOperator, \
 	EntityCriteriaStatement, Literal, NoCriteriaForUpdateException, UnexpectedStorageException, \
 	UnsupportedComputationException, UnsupportedCriteriaException
-from watchmen_utilities import ArrayHelper, DateTimeConstants, is_decimal, is_not_blank
+from watchmen_utilities import ArrayHelper, DateTimeConstants, is_blank, is_decimal, is_not_blank
+from .document_defs_mongo import find_document
 from .document_mongo import MongoDocument
 
 
@@ -23,6 +24,22 @@ def to_decimal(value: Any) -> str:
 		raise UnexpectedStorageException(f'Given value[{value}] cannot be casted to a decimal.')
 
 
+def build_column_path(documents: List[MongoDocument], literal: ColumnNameLiteral) -> str:
+	"""
+	columns of first document are on root,
+	columns of joined documents are nested in field which named by document name, see free_build.
+	entity name of literal is resolved to document in the same way as joins
+	"""
+	if len(documents) <= 1 or is_blank(literal.entityName):
+		return literal.columnName
+	document = find_document(literal.entityName)
+	if document == documents[0]:
+		return literal.columnName
+	if document not in documents[1:]:
+		raise UnexpectedStorageException(f'Entity[{literal.entityName}] not found.')
+	return f'{document.name}.{literal.columnName}'
+
+
 def built_date_diff(documents: List[MongoDocument], literal: Literal, unit: str) -> Dict[str, Any]:
 	return {
 		'$let': {
@@ -67,8 +84,7 @@ def build_literal(
 		documents: List[MongoDocument], literal: Literal, build_plain_value: Callable[[Any], str] = None
 ) -> Union[str, Dict[str, Any]]:
 	if isinstance(literal, ColumnNameLiteral):
-		# only one document is supported
-		return f'${literal.columnName}'
+		return f'${build_column_path(documents, literal)}'
 	elif isinstance(literal, ComputedLiteral):
 		operator = literal.operator
 		if operator == ComputedLiteralOperator.ADD:
@@ -0,0 +1,58 @@
+from datetime import datetime
+from unittest import TestCase
+
+from watchmen_model.admin import Factor, FactorType, Topic, TopicKind, TopicType
+from watchmen_storage import ColumnNameLiteral, EntityCriteriaExpression, FreeColumn, FreeFinder, FreeJoin, \
+	FreeJoinType, UnexpectedStorageException
+from watchmen_storage_mongodb.document_defs_mongo import find_document, register_document
+from watchmen_storage_mongodb.free_build import build_free_find_pipeline
+from watchmen_storage_mongodb.where_build import build_column_path
+
+
+def create_topic(topic_id: str, name: str) -> Topic:
+	return Topic(
+		topicId=topic_id, name=name, type=TopicType.DISTINCT, kind=TopicKind.BUSINESS, tenantId='1',
+		factors=[
+			Factor(factorId='1', name='customer_id', type=FactorType.TEXT),
+			Factor(factorId='2', name='amount', type=FactorType.NUMBER)
+		],
+		lastModifiedAt=datetime.now())
+
+
+class FreeBuildTest(TestCase):
+	@classmethod
+	def setUpClass(cls):
+		# entity name of literal is topic id
+		register_document(create_topic('1001', 'orders'))
+		register_document(create_topic('1002', 'customers'))
+		register_document(create_topic('1003', 'payments'))
+
+	def test_two_topics_join(self):
+		finder = FreeFinder(
+			columns=[
+				FreeColumn(literal=ColumnNameLiteral(entityName='1001', columnName='amount'), alias='a'),
+				FreeColumn(literal=ColumnNameLiteral(entityName='1002', columnName='amount'), alias='b')
+			],
+			joins=[FreeJoin(
+				primary=ColumnNameLiteral(entityName='1001', columnName='customer_id'),
+				secondary=ColumnNameLiteral(entityName='1002', columnName='customer_id'),
+				type=FreeJoinType.LEFT)],
+			criteria=[EntityCriteriaExpression(left=ColumnNameLiteral(entityName='1002', columnName='amount'), right=1)]
+		)
+		document, pipeline = build_free_find_pipeline(finder)
+		self.assertEqual(document.name, 'topic_orders')
+		self.assertEqual(pipeline[0]['$lookup']['from'], 'topic_customers')
+		self.assertIn("'$topic_customers.amount'", str(pipeline[2]['$match']))
+		self.assertEqual(pipeline[3]['$project']['column_1'], '$amount')
+		self.assertEqual(pipeline[3]['$project']['column_2'], '$topic_customers.amount')
+
+	def test_column_path(self):
+		documents = [find_document('1001'), find_document('1002')]
+		self.assertEqual(
+			build_column_path(documents, ColumnNameLiteral(entityName='1001', columnName='amount')), 'amount')
+		self.assertEqual(
+			build_column_path(documents, ColumnNameLiteral(entityName='1002', columnName='amount')),
+			'topic_customers.amount')
+		# registered but not joined
+		with self.assertRaises(UnexpectedStorageException):
+			build_column_path(documents, ColumnNameLiteral(entityName='1003', columnName='amount'))
@@ -0,0 +1,59 @@
+from unittest import TestCase
+
+from watchmen_storage import EntityColumnAggregateArithmetic, EntityStraightAggregateColumn, EntityStraightColumn, \
+	UnsupportedStraightColumnException
+from watchmen_storage_mongodb import StorageMongoDB
+
+
+def aggregate(alias: str, arithmetic: EntityColumnAggregateArithmetic) -> EntityStraightAggregateColumn:
+	return EntityStraightAggregateColumn(columnName='amount', alias=alias, arithmetic=arithmetic)
+
+
+class StraightAggregateTest(TestCase):
+	def setUp(self):
+		# pipelines are built only, no connection
+		# noinspection PyTypeChecker
+		self.storage = StorageMongoDB(None)
+
+	def test_keyed_by_alias(self):
+		columns = [
+			aggregate('pd_0', EntityColumnAggregateArithmetic.COUNT),
+			aggregate('pd_1', EntityColumnAggregateArithmetic.SUM),
+			aggregate('pd_2', EntityColumnAggregateArithmetic.AVG),
+			aggregate('pd_3', EntityColumnAggregateArithmetic.MAX),
+			aggregate('pd_4', EntityColumnAggregateArithmetic.MIN),
+			aggregate('pd_5', EntityColumnAggregateArithmetic.STDDEV),
+			aggregate('pd_6', EntityColumnAggregateArithmetic.NULL_COUNT)
+		]
+		aggregate_columns = self.storage.build_straight_aggregate_columns(columns)
+		# one column is aggregated more than once
+		self.assertEqual(aggregate_columns, {
+			'pd_0': {'$sum': 1},
+			'pd_1': {'$sum': '$amount'},
+			'pd_2': {'$avg': '$amount'},
+			'pd_3': {'$max': '$amount'},
+			'pd_4': {'$min': '$amount'},
+			'pd_5': {'$stdDevSamp': '$amount'},
+			'pd_6': {'$sum': {'$cond': [{'$eq': [{'$ifNull': ['$amount', None]}, None]}, 1, 0]}}
+		})
+		project = self.storage.build_straight_project_columns(columns, {}, aggregate_columns)
+		self.assertEqual(project, {f'pd_{index}': f'$pd_{index}' for index in range(7)})
+
+	def test_group_by_non_aggregate_column(self):
+		columns = [
+			EntityStraightColumn(columnName='region', alias='r'),
+			aggregate('pd_0', EntityColumnAggregateArithmetic.STDDEV)
+		]
+		non_aggregate_columns = self.storage.build_straight_non_aggregate_columns(columns)
+		aggregate_columns = self.storage.build_straight_aggregate_columns(columns)
+		self.assertEqual(non_aggregate_columns, {'region': '$region'})
+		self.assertEqual(
+			self.storage.build_straight_project_columns(columns, non_aggregate_columns, aggregate_columns),
+			{'r': '$_id.region', 'pd_0': '$pd_0'})
+
+	def test_supported(self):
+		for arithmetic in [EntityColumnAggregateArithmetic.STDDEV, EntityColumnAggregateArithmetic.NULL_COUNT]:
+			self.assertTrue(self.storage.is_straight_aggregate_supported(arithmetic))
+		self.assertFalse(self.storage.is_straight_aggregate_supported(EntityColumnAggregateArithmetic.MEDIAN))
+		with self.assertRaises(UnsupportedStraightColumnException):
+			self.storage.build_straight_aggregate_columns([aggregate('pd_0', EntityColumnAggregateArithmetic.MEDIAN)])
@@ -0,0 +1,17 @@
+CREATE TABLE external_write_outbox
+(
+    event_id      NVARCHAR(50)   NOT NULL,
+    writer_code   NVARCHAR(50),
+    url           NVARCHAR(255)  NOT NULL,
+    pat           NVARCHAR(255),
+    payload       NVARCHAR(MAX)  NOT NULL,
+    status        NVARCHAR(20)   NOT NULL,
+    retries       DECIMAL(10)    NOT NULL,
+    next_retry_at DATETIME       NOT NULL,
+    claimed_at    DATETIME,
+    last_error    NVARCHAR(1024),
+    created_at    DATETIME       NOT NULL,
+    CONSTRAINT pk_external_write_outbox PRIMARY KEY (event_id)
+);
+CREATE INDEX i_external_write_outbox_1 ON external_write_outbox (status, next_retry_at);
+CREATE INDEX i_external_write_outbox_2 ON external_write_outbox (created_at);
@@ -27,6 +27,8 @@ def redress_url_by_mssql(url: str) -> str:
 class MSSQLDataSourceParams(DataModel):
 	echo: bool = False
 	poolRecycle: int = 3600
+	# send executemany in bulk by pyodbc, for insert all
+	fastExecutemany: bool = True
 
 
 # noinspection DuplicatedCode
@@ -57,7 +59,8 @@ class MSSQLDataSourceHelper(DataSourceHelper):
 			future=True,
 			pool_recycle=params.poolRecycle,
 			json_serializer=serialize_to_json,
-			encoding='utf-8'
+			encoding='utf-8',
+			fast_executemany=params.fastExecutemany
 		)
 
 	@staticmethod
@@ -1,7 +1,8 @@
 from logging import getLogger
 from typing import Any, Callable, List, Optional, Tuple
 
-from sqlalchemy import select, Table, text
+from sqlalchemy import func, select, Table, text
+from sqlalchemy.sql.elements import literal_column
 
 from watchmen_model.admin import FactorType, Topic
 from watchmen_storage import as_table_name, EntityCriteria, EntityFinder, EntitySort, Literal
@@ -40,6 +41,9 @@ class StorageMSSQL(StorageRDS):
 		results = self.connection.execute(statement).mappings().all()
 		return len(results) != 0
 
+	def build_stddev_column(self, column_name: str) -> Any:
+		return func.stdev(literal_column(column_name))
+
 
 class TopicDataStorageMSSQL(StorageMSSQL, TopicDataStorageRDS):
 	# noinspection SqlResolve,DuplicatedCode
@@ -0,0 +1,12 @@
+CREATE TABLE cache_invalidations
+(
+    invalidation_id  VARCHAR(50) NOT NULL,
+    kind             VARCHAR(20) NOT NULL,
+    entity_id        VARCHAR(50) NOT NULL,
+    version          BIGINT,
+    last_modified_at DATETIME,
+    removed          TINYINT(1)  NOT NULL,
+    created_at       DATETIME    NOT NULL,
+    PRIMARY KEY (invalidation_id),
+    INDEX (created_at)
+);
@@ -0,0 +1,17 @@
+CREATE TABLE external_write_outbox
+(
+    event_id      VARCHAR(50)   NOT NULL,
+    writer_code   VARCHAR(50),
+    url           VARCHAR(255)  NOT NULL,
+    pat           VARCHAR(255),
+    payload       JSON          NOT NULL,
+    status        VARCHAR(20)   NOT NULL,
+    retries       INT           NOT NULL,
+    next_retry_at DATETIME      NOT NULL,
+    claimed_at    DATETIME,
+    last_error    VARCHAR(1024),
+    created_at    DATETIME      NOT NULL,
+    PRIMARY KEY (event_id),
+    INDEX (status, next_retry_at),
+    INDEX (created_at)
+);
@@ -0,0 +1,67 @@
+from typing import Any, Dict, List, Optional
+from unittest import TestCase
+from unittest.mock import patch
+
+from sqlalchemy import BigInteger, Column, MetaData, String, Table
+from sqlalchemy.dialects import mysql
+
+from watchmen_storage import EntityHelper, EntityRow, EntityShaper
+from watchmen_storage_mysql import StorageMySQL
+
+table = Table('x_items', MetaData(), Column('id_', BigInteger, primary_key=True), Column('name', String(50)))
+
+
+class ItemShaper(EntityShaper):
+	def serialize(self, entity: Dict[str, Any]) -> EntityRow:
+		return {'id_': entity['id'], 'name': entity['name']}
+
+	def deserialize(self, row: EntityRow) -> Dict[str, Any]:
+		return {'id': row['id_'], 'name': row['name']}
+
+
+class FakeConnection:
+	def __init__(self):
+		self.executed: List[Any] = []
+
+	def execute(self, statement, rows: Optional[List[Dict[str, Any]]] = None):
+		self.executed.append((statement, rows))
+
+
+class InsertAllTest(TestCase):
+	def insert_all(self, count: int, chunk_size: int) -> FakeConnection:
+		# noinspection PyTypeChecker
+		storage = StorageMySQL(None)
+		connection = FakeConnection()
+		# noinspection PyTypeChecker
+		storage.connection = connection
+		with patch('watchmen_storage_rds.storage_rds.find_table', return_value=table), \
+				patch('watchmen_storage_rds.storage_rds.ask_insert_all_chunk_size', return_value=chunk_size):
+			storage.insert_all(
+				[{'id': index, 'name': f'item-{index}'} for index in range(count)],
+				EntityHelper(name='x_items', shaper=ItemShaper()))
+		return connection
+
+	def test_in_chunks(self):
+		connection = self.insert_all(5, 2)
+		self.assertEqual(len(connection.executed), 3)
+		self.assertEqual([len(rows) for _, rows in connection.executed], [2, 2, 1])
+		self.assertEqual(
+			[row['id_'] for _, rows in connection.executed for row in rows], [0, 1, 2, 3, 4])
+		self.assertEqual(connection.executed[2][1], [{'id_': 4, 'name': 'item-4'}])
+		# one statement for all rows of chunk, executed many by driver
+		statement, _ = connection.executed[0]
+		self.assertEqual(
+			' '.join(str(statement.compile(dialect=mysql.dialect())).split()),
+			'INSERT INTO x_items (id_, name) VALUES (%s, %s)')
+
+	def test_exact_multiple(self):
+		connection = self.insert_all(4, 2)
+		self.assertEqual([len(rows) for _, rows in connection.executed], [2, 2])
+
+	def test_no_chunk(self):
+		connection = self.insert_all(5, 0)
+		self.assertEqual([len(rows) for _, rows in connection.executed], [5])
+
+	def test_nothing_to_insert(self):
+		connection = self.insert_all(0, 2)
+		self.assertEqual(connection.executed, [])
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+
+from watchmen_storage import EntityColumnAggregateArithmetic, EntityStraightAggregateColumn, \
+	UnsupportedStraightColumnException
+from watchmen_storage_mysql import StorageMySQL
+
+
+class StraightAggregateTest(TestCase):
+	def setUp(self):
+		# statements are built only, no connection
+		# noinspection PyTypeChecker
+		self.storage = StorageMySQL(None)
+
+	def to_sql(self, arithmetic: EntityColumnAggregateArithmetic) -> str:
+		column = self.storage.translate_straight_column_name(EntityStraightAggregateColumn(
+			columnName='amount', alias='pd_0', arithmetic=arithmetic))
+		statement = select(column).compile(dialect=mysql.dialect(), compile_kwargs={'literal_binds': True})
+		return ' '.join(str(statement).split())
+
+	def test_basic(self):
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.COUNT), 'SELECT count(1) AS pd_0')
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.SUM), 'SELECT sum(amount) AS pd_0')
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.AVG), 'SELECT avg(amount) AS pd_0')
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.MAX), 'SELECT max(amount) AS pd_0')
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.MIN), 'SELECT min(amount) AS pd_0')
+
+	def test_stddev(self):
+		self.assertTrue(self.storage.is_straight_aggregate_supported(EntityColumnAggregateArithmetic.STDDEV))
+		self.assertEqual(self.to_sql(EntityColumnAggregateArithmetic.STDDEV), 'SELECT stddev_samp(amount) AS pd_0')
+
+	def test_null_count(self):
+		self.assertTrue(self.storage.is_straight_aggregate_supported(EntityColumnAggregateArithmetic.NULL_COUNT))
+		self.assertEqual(
+			self.to_sql(EntityColumnAggregateArithmetic.NULL_COUNT), 'SELECT count(1) - count(amount) AS pd_0')
+
+	def test_median_not_supported(self):
+		self.assertFalse(self.storage.is_straight_aggregate_supported(EntityColumnAggregateArithmetic.MEDIAN))
+		with self.assertRaises(UnsupportedStraightColumnException):
+			self.to_sql(EntityColumnAggregateArithmetic.MEDIAN)
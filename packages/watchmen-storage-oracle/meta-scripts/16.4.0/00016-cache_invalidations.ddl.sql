@@ -0,0 +1,12 @@
+CREATE TABLE cache_invalidations
+(
+    invalidation_id  VARCHAR2(50) NOT NULL,
+    kind             VARCHAR2(20) NOT NULL,
+    entity_id        VARCHAR2(50) NOT NULL,
+    version          NUMBER(20),
+    last_modified_at DATE,
+    removed          NUMBER(1)    NOT NULL,
+    created_at       DATE         NOT NULL,
+    CONSTRAINT pk_cache_invalidations PRIMARY KEY (invalidation_id)
+);
+CREATE INDEX i_cache_invalidations_1 ON cache_invalidations (created_at);
@@ -0,0 +1,17 @@
+CREATE TABLE external_write_outbox
+(
+    event_id      VARCHAR2(50)   NOT NULL,
+    writer_code   VARCHAR2(50),
+    url           VARCHAR2(255)  NOT NULL,
+    pat           VARCHAR2(255),
+    payload       CLOB           NOT NULL,
+    status        VARCHAR2(20)   NOT NULL,
+    retries       NUMBER(10)     NOT NULL,
+    next_retry_at DATE           NOT NULL,
+    claimed_at    DATE,
+    last_error    VARCHAR2(1024),
+    created_at    DATE           NOT NULL,
+    CONSTRAINT pk_external_write_outbox PRIMARY KEY (event_id)
+);
+CREATE INDEX i_external_write_outbox_1 ON external_write_outbox (status, next_retry_at);
+CREATE INDEX i_external_write_outbox_2 ON external_write_outbox (created_at);
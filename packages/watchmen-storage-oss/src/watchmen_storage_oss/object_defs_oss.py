@@ -2,13 +2,16 @@ from typing import Dict
 
 from watchmen_model.admin import Topic
 from watchmen_model.common import TopicId
-from watchmen_storage import UnexpectedStorageException
+from watchmen_storage import is_object_batch_applicable, UnexpectedStorageException
 
 object_directory: Dict[TopicId, str] = {}
+# whether rows of topic are written into batch objects
+object_batched: Dict[TopicId, bool] = {}
 
 
 def register_directory(topic: Topic) -> None:
 	object_directory[topic.topicId] = topic.name
+	object_batched[topic.topicId] = is_object_batch_applicable(topic)
 
 
 def find_directory(name: str) -> str:
@@ -16,3 +19,7 @@ def find_directory(name: str) -> str:
 	if directory is None:
 		raise UnexpectedStorageException(f'Table[{name}] definition not found.')
 	return directory
+
+
+def is_batched(name: str) -> bool:
+	return object_batched.get(name, False)
@@ -1,12 +1,13 @@
 from datetime import datetime
 import json
 from logging import getLogger
+from threading import RLock
 from typing import Dict, Optional
 
 from oss2 import Auth, Bucket, ObjectIterator
 from oss2.exceptions import NoSuchKey
 
-from watchmen_storage import ask_object_storage_need_date_directory
+from watchmen_storage import ask_object_storage_need_date_directory, ObjectBatchWriter
 from watchmen_utilities import serialize_to_json
 
 logger = getLogger(__name__)
@@ -18,6 +19,9 @@ class ObjectStorageService:
 		self.access_key_secret = access_key_secret
 		self.auth = Auth(access_key_id, access_key_secret)
 		self.bucket = Bucket(self.auth, endpoint, bucket_name)
+		self.bucket_name = bucket_name
+		self.batchWriter: Optional[ObjectBatchWriter] = None
+		self.batchWriterLock = RLock()
 
 	@staticmethod
 	def gen_key(directory: str, id_: str) -> str:
@@ -34,6 +38,22 @@ class ObjectStorageService:
 	def put_object(self, key: str, data: Dict) -> None:
 		return self.bucket.put_object(key, serialize_to_json(data))
 
+	def put_bytes(self, key: str, body: bytes) -> None:
+		self.bucket.put_object(key, body)
+
+	def ask_batch_writer(self) -> ObjectBatchWriter:
+		"""
+		batch writer is shared by all storages of this service, rows of same partition are written together
+		"""
+		if self.batchWriter is None:
+			with self.batchWriterLock:
+				if self.batchWriter is None:
+					self.batchWriter = ObjectBatchWriter(self.put_bytes)
+		return self.batchWriter
+
+	def as_location(self, directory: str) -> str:
+		return f'oss://{self.bucket_name}/{directory}/'
+
 	def get_object(self, key: str) -> Optional[Dict]:
 		try:
 			result = self.bucket.get_object(key)
@@ -3,10 +3,13 @@ from typing import Any, Dict, List, Optional
 
 from watchmen_model.admin import Factor, Topic
 from watchmen_model.common import DataPage
-from watchmen_storage import Entity, EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, \
-	EntityIdHelper, EntityList, EntityPager, EntityStraightValuesFinder, EntityUpdater, FreeAggregatePager, \
-	FreeAggregator, FreeFinder, FreePager, TopicDataStorageSPI, TransactionalStorageSPI, UnexpectedStorageException
-from .object_defs_oss import find_directory, register_directory
+from watchmen_storage import as_schema_key, ask_object_storage_batch_enabled, build_object_trino_schema, Entity, \
+	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, EntityIdHelper, \
+	EntityLimitedFinder, EntityList, EntityPager, EntityStraightValuesFinder, EntityUpdater, FreeAggregatePager, \
+	FreeAggregator, FreeFinder, FreePager, is_object_batch_applicable, TopicDataStorageSPI, TransactionalStorageSPI, \
+	UnexpectedStorageException
+from watchmen_utilities import ArrayHelper
+from .object_defs_oss import find_directory, is_batched, register_directory
 from .object_storage_service import ObjectStorageService
 
 logger = getLogger(__name__)
@@ -210,6 +213,12 @@ class StorageOss(TransactionalStorageSPI):
 		"""
 		raise UnexpectedStorageException('Method[page] does not support by oss storage.')
 
+	def find_limited(self, finder: EntityLimitedFinder) -> EntityList:
+		"""
+		not supported by oss
+		"""
+		raise UnexpectedStorageException('Method[find_limited] does not support by oss storage.')
+
 	def exists(self, finder: EntityFinder) -> bool:
 		"""
 		not supported by oss
@@ -228,6 +237,24 @@ class TopicDataStorageOss(StorageOss, TopicDataStorageSPI):
 	def register_topic(self, topic: Topic) -> None:
 		register_directory(topic)
 
+	def insert_one(self, one: Entity, helper: EntityHelper) -> None:
+		if is_batched(helper.name):
+			self.insert_all([one], helper)
+		else:
+			super().insert_one(one, helper)
+
+	def insert_all(self, data: List[Entity], helper: EntityHelper) -> None:
+		"""
+		rows of raw topic are buffered and written into partitioned batch objects when batch enabled,
+		batched rows cannot be found or deleted by id
+		"""
+		if not is_batched(helper.name):
+			super().insert_all(data, helper)
+			return
+		directory = find_directory(helper.name)
+		rows = ArrayHelper(data).map(lambda x: helper.shaper.serialize(x)).to_list()
+		self.oss_client.ask_batch_writer().append(directory, rows)
+
 	def create_topic_entity(self, topic: Topic) -> None:
 		# create_topic_entity is not required in oss
 		pass
@@ -242,6 +269,9 @@ class TopicDataStorageOss(StorageOss, TopicDataStorageSPI):
 
 	def truncate(self, helper: EntityHelper) -> None:
 		prefix = find_directory(helper.name)
+		if is_batched(helper.name):
+			# write buffered rows, then they are deleted as well
+			self.oss_client.ask_batch_writer().flush()
 		self.oss_client.delete_multiple_objects(prefix)
 
 	def ask_synonym_factors(self, table_name: str) -> List[Factor]:
@@ -254,6 +284,19 @@ class TopicDataStorageOss(StorageOss, TopicDataStorageSPI):
 	def is_free_find_supported(self) -> bool:
 		return False
 
+	def append_topic_to_trino(self, topic: Topic) -> None:
+		"""
+		schema is described only for batch objects, single row objects are not readable by trino
+		"""
+		if not is_object_batch_applicable(topic):
+			return
+		location = self.oss_client.as_location(topic.name)
+		self.oss_client.put_object(as_schema_key(topic), build_object_trino_schema(topic, location))
+
+	def drop_topic_from_trino(self, topic: Topic) -> None:
+		if ask_object_storage_batch_enabled():
+			self.oss_client.delete_object(as_schema_key(topic))
+
 	def free_find(self, finder: FreeFinder) -> List[Dict[str, Any]]:
 		"""
 		not supported by oss
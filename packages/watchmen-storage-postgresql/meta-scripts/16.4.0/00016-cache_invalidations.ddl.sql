@@ -0,0 +1,12 @@
+CREATE TABLE cache_invalidations
+(
+    invalidation_id  VARCHAR(50) NOT NULL,
+    kind             VARCHAR(20) NOT NULL,
+    entity_id        VARCHAR(50) NOT NULL,
+    version          DECIMAL(20),
+    last_modified_at TIMESTAMP,
+    removed          SMALLINT    NOT NULL,
+    created_at       TIMESTAMP   NOT NULL,
+    CONSTRAINT pk_cache_invalidations PRIMARY KEY (invalidation_id)
+);
+CREATE INDEX i_cache_invalidations_1 ON cache_invalidations (created_at);
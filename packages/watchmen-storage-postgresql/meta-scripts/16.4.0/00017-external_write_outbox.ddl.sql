@@ -0,0 +1,17 @@
+CREATE TABLE external_write_outbox
+(
+    event_id      VARCHAR(50)   NOT NULL,
+    writer_code   VARCHAR(50),
+    url           VARCHAR(255)  NOT NULL,
+    pat           VARCHAR(255),
+    payload       JSON          NOT NULL,
+    status        VARCHAR(20)   NOT NULL,
+    retries       DECIMAL(10)   NOT NULL,
+    next_retry_at TIMESTAMP     NOT NULL,
+    claimed_at    TIMESTAMP,
+    last_error    VARCHAR(1024),
+    created_at    TIMESTAMP     NOT NULL,
+    CONSTRAINT pk_external_write_outbox PRIMARY KEY (event_id)
+);
+CREATE INDEX i_external_write_outbox_1 ON external_write_outbox (status, next_retry_at);
+CREATE INDEX i_external_write_outbox_2 ON external_write_outbox (created_at);
@@ -0,0 +1,2 @@
+ALTER TABLE snapshot_job_locks
+    ADD heartbeat_at TIMESTAMP NULL;
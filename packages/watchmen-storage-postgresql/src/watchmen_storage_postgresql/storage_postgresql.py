@@ -1,10 +1,11 @@
 from logging import getLogger
 from typing import Any, Callable, List, Optional, Tuple
 
-from sqlalchemy import Table, text
+from sqlalchemy import func, Table, text
+from sqlalchemy.sql.elements import literal_column
 
 from watchmen_model.admin import FactorType, Topic
-from watchmen_storage import as_table_name, EntityCriteria, EntitySort, Literal
+from watchmen_storage import as_table_name, EntityColumnAggregateArithmetic, EntityCriteria, EntitySort, Literal
 from watchmen_storage_rds import build_sort_for_statement, SQLAlchemyStatement, \
 	StorageRDS, TopicDataStorageRDS
 from .table_creator import build_aggregate_assist_column, build_columns, build_columns_script, build_indexes_script, \
@@ -25,6 +26,12 @@ class StoragePostgreSQL(StorageRDS):
 	def build_sort_for_statement(self, statement: SQLAlchemyStatement, sort: EntitySort) -> SQLAlchemyStatement:
 		return build_sort_for_statement(statement, sort)
 
+	def is_straight_aggregate_supported(self, arithmetic: EntityColumnAggregateArithmetic) -> bool:
+		return super().is_straight_aggregate_supported(arithmetic) or arithmetic == EntityColumnAggregateArithmetic.MEDIAN
+
+	def build_median_column(self, column_name: str) -> Any:
+		return func.percentile_cont(0.5).within_group(literal_column(column_name))
+
 
 class TopicDataStoragePostgreSQL(StoragePostgreSQL, TopicDataStorageRDS):
 	# noinspection SqlResolve,DuplicatedCode
@@ -11,11 +11,11 @@ from sqlalchemy.sql.elements import literal_column
 from time import sleep, time
 
 from watchmen_model.common import DataPage
-from watchmen_storage import ask_disable_compiled_cache, ColumnNameLiteral, Entity, EntityColumnAggregateArithmetic, \
-	EntityCriteria, EntityCriteriaExpression, EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, \
-	EntityId, EntityIdHelper, EntityList, EntityNotFoundException, EntityPager, EntitySort, \
-	EntityStraightAggregateColumn, EntityStraightColumn, EntityStraightValuesFinder, EntityUpdater, \
-	TooManyEntitiesFoundException, TransactionalStorageSPI, UnexpectedStorageException, \
+from watchmen_storage import ask_disable_compiled_cache, ask_insert_all_chunk_size, ColumnNameLiteral, Entity, \
+	EntityColumnAggregateArithmetic, EntityCriteria, EntityCriteriaExpression, EntityDeleter, EntityDistinctValuesFinder, \
+	EntityFinder, EntityHelper, EntityId, EntityIdHelper, EntityLimitedFinder, EntityList, EntityNotFoundException, \
+	EntityPager, EntitySort, EntityStraightAggregateColumn, EntityStraightColumn, EntityStraightValuesFinder, \
+	EntityUpdater, TooManyEntitiesFoundException, TransactionalStorageSPI, UnexpectedStorageException, \
 	UnsupportedStraightColumnException
 from watchmen_utilities import ArrayHelper, is_blank, serialize_to_json
 from .settings import ask_connection_leak_time_in_seconds, ask_detect_connection_leak_enabled, \
@@ -133,7 +133,19 @@ class StorageRDS(TransactionalStorageSPI):
 		self.connection.execute(insert(table).values(row))
 
 	def insert_all(self, data: List[Entity], helper: EntityHelper) -> None:
-		ArrayHelper(data).each(lambda row: self.insert_one(row, helper))
+		if len(data) == 0:
+			return
+		table = self.find_table(helper.name)
+		ArrayHelper(data).map(lambda x: helper.shaper.serialize(x)) \
+			.chunk(ask_insert_all_chunk_size()) \
+			.each(lambda rows: self.insert_rows(table, rows))
+
+	def insert_rows(self, table: Table, rows: List[Dict[str, Any]]) -> None:
+		"""
+		insert rows by executemany, which is sent in bulk by dialect drivers,
+		multiple values for mysql and postgresql, array binding for oracle, fast executemany for mssql
+		"""
+		self.connection.execute(insert(table), rows)
 
 	def update_one(self, one: Entity, helper: EntityIdHelper) -> int:
 		row = helper.shaper.serialize(one)
@@ -316,19 +328,43 @@ class StorageRDS(TransactionalStorageSPI):
 	def get_alias_from_straight_column(self, straight_column: EntityStraightColumn) -> Any:
 		return straight_column.columnName if is_blank(straight_column.alias) else straight_column.alias
 
+	def is_straight_aggregate_supported(self, arithmetic: EntityColumnAggregateArithmetic) -> bool:
+		return super().is_straight_aggregate_supported(arithmetic) or arithmetic in [
+			EntityColumnAggregateArithmetic.STDDEV, EntityColumnAggregateArithmetic.NULL_COUNT
+		]
+
+	# noinspection PyMethodMayBeStatic
+	def build_stddev_column(self, column_name: str) -> Any:
+		return func.stddev_samp(literal_column(column_name))
+
 	# noinspection PyMethodMayBeStatic
+	def build_median_column(self, column_name: str) -> Any:
+		"""
+		not supported by default, override it for dialect which supports percentile
+		"""
+		raise UnsupportedStraightColumnException(f'Median of column[{column_name}] is not supported.')
+
 	def translate_straight_column_name(self, straight_column: EntityStraightColumn) -> Any:
 		if isinstance(straight_column, EntityStraightAggregateColumn):
+			alias = self.get_alias_from_straight_column(straight_column)
+			column = literal_column(straight_column.columnName)
 			if straight_column.arithmetic == EntityColumnAggregateArithmetic.COUNT:
-				return func.count(1).label(self.get_alias_from_straight_column(straight_column))
+				return func.count(1).label(alias)
 			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.SUM:
-				return func.sum(straight_column.columnName).label(self.get_alias_from_straight_column(straight_column))
+				return func.sum(column).label(alias)
 			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.AVG:
-				return func.avg(straight_column.columnName).label(self.get_alias_from_straight_column(straight_column))
+				return func.avg(column).label(alias)
 			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.MAX:
-				return func.max(straight_column.columnName).label(self.get_alias_from_straight_column(straight_column))
+				return func.max(column).label(alias)
 			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.MIN:
-				return func.min(straight_column.columnName).label(self.get_alias_from_straight_column(straight_column))
+				return func.min(column).label(alias)
+			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.STDDEV:
+				return self.build_stddev_column(straight_column.columnName).label(alias)
+			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.MEDIAN:
+				return self.build_median_column(straight_column.columnName).label(alias)
+			elif straight_column.arithmetic == EntityColumnAggregateArithmetic.NULL_COUNT:
+				# count(column) ignores null values
+				return (func.count(1) - func.count(column)).label(alias)
 		elif isinstance(straight_column, EntityStraightColumn):
 			return literal_column(straight_column.columnName) \
 				.label(self.get_alias_from_straight_column(straight_column))
@@ -424,6 +460,15 @@ class StorageRDS(TransactionalStorageSPI):
 			pageCount=max_page_number
 		)
 
+	def find_limited(self, finder: EntityLimitedFinder) -> EntityList:
+		table = self.find_table(finder.name)
+		statement = select(table)
+		statement = self.build_criteria_for_statement([table], statement, finder.criteria)
+		statement = self.build_sort_for_statement(statement, finder.sort)
+		statement = self.build_offset_for_statement(statement, finder.limit, 1)
+		results = self.connection.execute(statement).mappings().all()
+		return ArrayHelper(results).map(lambda x: dict(x)).map(finder.shaper.deserialize).to_list()
+
 	def exists(self, finder: EntityFinder) -> bool:
 		table = self.find_table(finder.name)
 		statement = select(text('1')).select_from(table)
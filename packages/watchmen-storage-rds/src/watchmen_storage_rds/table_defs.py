@@ -63,6 +63,19 @@ table_key_stores = Table(
 	create_json("params", False),
 	create_datetime('created_at', False), create_tuple_id_column('created_by', nullable=False)
 )
+table_cache_invalidations = Table(
+	'cache_invalidations', meta_data,
+	create_pk('invalidation_id'), create_str('kind', 20, False), create_tuple_id_column('entity_id', False),
+	create_int('version'), create_datetime('last_modified_at'), create_bool('removed', False),
+	create_datetime('created_at', False)
+)
+table_external_write_outbox = Table(
+	'external_write_outbox', meta_data,
+	create_pk('event_id'), create_str('writer_code', 50), create_str('url', 255, False), create_str('pat', 255),
+	create_json('payload', False), create_str('status', 20, False), create_int('retries', False),
+	create_datetime('next_retry_at', False), create_datetime('claimed_at'), create_str('last_error', 1024),
+	create_datetime('created_at', False)
+)
 # admin
 table_users = Table(
 	'users', meta_data,
@@ -185,7 +198,7 @@ table_snapshot_job_locks = Table(
 	create_pk('lock_id'), create_tuple_id_column('tenant_id', False), create_tuple_id_column('scheduler_id', False),
 	create_str('frequency', 10, False), create_date('process_date', False), create_int('row_count', False),
 	create_str('status', 10, False),
-	create_tuple_id_column('user_id', False), create_datetime('created_at', False)
+	create_tuple_id_column('user_id', False), create_datetime('created_at', False), create_datetime('heartbeat_at')
 )
 # gui
 # noinspection DuplicatedCode
@@ -326,6 +339,8 @@ tables: Dict[str, Table] = {
 	'plugins': table_plugins,
 	'data_sources': table_data_sources,
 	'key_stores': table_key_stores,
+	'cache_invalidations': table_cache_invalidations,
+	'external_write_outbox': table_external_write_outbox,
 	# admin
 	'users': table_users,
 	'user_groups': table_user_groups,
@@ -2,14 +2,17 @@ from typing import Dict
 from string import Template
 from watchmen_model.admin import Topic
 from watchmen_model.common import TopicId
-from watchmen_storage import UnexpectedStorageException
+from watchmen_storage import is_object_batch_applicable, UnexpectedStorageException
 from datetime import datetime
 
 object_directory: Dict[TopicId, str] = {}
+# whether rows of topic are written into batch objects
+object_batched: Dict[TopicId, bool] = {}
 
 
 def register_directory(topic: Topic) -> None:
 	object_directory[topic.topicId] = topic.name
+	object_batched[topic.topicId] = is_object_batch_applicable(topic)
 
 
 def find_directory(name: str) -> str:
@@ -19,6 +22,10 @@ def find_directory(name: str) -> str:
 	return directory
 
 
+def is_batched(name: str) -> bool:
+	return object_batched.get(name, False)
+
+
 def as_file_name(literal: str, directory: str, id_: str) -> str:
 	tmp = Template(literal)
 	now = datetime.now()
@@ -1,13 +1,14 @@
 import json
 from logging import getLogger
-from typing import Dict, Optional, List, Union
+from typing import Dict, Optional, List, Tuple, Union
 from datetime import datetime
+from threading import RLock
 from boto3 import client, resource
 from boto3.exceptions import Boto3Error
 
 from watchmen_model.common import DataModel
 from watchmen_model.system import DataSourceParam
-from watchmen_storage import ask_object_storage_need_date_directory
+from watchmen_storage import ask_object_storage_need_date_directory, ObjectBatchWriter
 from watchmen_utilities import serialize_to_json, ArrayHelper
 from .object_defs_s3 import as_file_name
 
@@ -29,17 +30,23 @@ class SimpleStorageService:
 		self.access_key_secret = access_key_secret
 		self.bucket_name = bucket_name
 		self.params = params
+		# endpoint url is optional, for s3 compatible services, e.g. a local s3 stand-in
+		endpoint_url = self.get_param('endpointUrl')
 		self.client = client(
 			service_name='s3',
 			region_name=endpoint,
+			endpoint_url=endpoint_url,
 			aws_access_key_id=access_key_id,
 			aws_secret_access_key=access_key_secret
 		)
 		self.resource = resource(
 			service_name='s3',
 			region_name=endpoint,
+			endpoint_url=endpoint_url,
 			aws_access_key_id=access_key_id,
 			aws_secret_access_key=access_key_secret)
+		self.batchWriter: Optional[ObjectBatchWriter] = None
+		self.batchWriterLock = RLock()
 	
 	def gen_key(self, directory: str, id_: str) -> str:
 		if ask_object_storage_need_date_directory():
@@ -50,12 +57,28 @@ class SimpleStorageService:
 		return key
 	
 	def get_param(self, param_key: str) -> Union[None, str, int]:
-		for param in self.params:
+		for param in self.params or []:
 			if param.name == param_key:
 				return param.value
 	
 	def put_object(self, key: str, data: Dict) -> None:
 		self.client.put_object(Body=serialize_to_json(data), Bucket=self.bucket_name, Key=key)
+
+	def put_bytes(self, key: str, body: bytes) -> None:
+		self.client.put_object(Body=body, Bucket=self.bucket_name, Key=key)
+
+	def ask_batch_writer(self) -> ObjectBatchWriter:
+		"""
+		batch writer is shared by all storages of this service, rows of same partition are written together
+		"""
+		if self.batchWriter is None:
+			with self.batchWriterLock:
+				if self.batchWriter is None:
+					self.batchWriter = ObjectBatchWriter(self.put_bytes)
+		return self.batchWriter
+
+	def as_location(self, directory: str) -> str:
+		return f's3://{self.bucket_name}/{directory}/'
 	
 	def get_object(self, key: str) -> Optional[Dict]:
 		try:
@@ -78,25 +101,46 @@ class SimpleStorageService:
 		bucket.objects.filter(Prefix=prefix).delete()
 	
 	def list_objects(self, max_keys: int = 10, prefix: Optional[str] = None) -> List[ObjectContent]:
-		bucket = self.resource.Bucket(self.bucket_name)
+		objects, _ = self.list_objects_page(max_keys, prefix)
+		return objects
+
+	def list_objects_page(
+			self, max_keys: int = 1000, prefix: Optional[str] = None,
+			continuation_token: Optional[str] = None) -> Tuple[List[ObjectContent], Optional[str]]:
+		"""
+		returns objects of page and continuation token of next page, token is none when no more page
+		"""
+		kwargs = {'Bucket': self.bucket_name, 'MaxKeys': max_keys}
+		if prefix:
+			kwargs['Prefix'] = prefix
+		if continuation_token:
+			kwargs['ContinuationToken'] = continuation_token
 		try:
-			if prefix:
-				response = self.client.list_objects_v2(Bucket=self.bucket_name, MaxKeys=max_keys, Prefix=prefix)
-			else:
-				response = self.client.list_objects_v2(Bucket=self.bucket_name, MaxKeys=max_keys)
-			
-			if response.get('Contents', None):
-				objects = ArrayHelper(response['Contents']).map(lambda x: ObjectContent(key=x.get('Key'),
-				                                                                        lastModified=x.get(
-					                                                                        'LastModified'),
-				                                                                        eTag=x.get('ETag'),
-				                                                                        size=x.get('Size'),
-				                                                                        storageClass=x.get(
-					                                                                        'StorageClass'))).to_list()
-			else:
-				objects = []
+			response = self.client.list_objects_v2(**kwargs)
 		except Boto3Error:
-			logger.error("Couldn't get objects for bucket '%s'.", bucket.name, stack_info=True, exc_info=True)
+			logger.error("Couldn't get objects for bucket '%s'.", self.bucket_name, stack_info=True, exc_info=True)
 			raise
-		else:
-			return objects
+		objects = ArrayHelper(response.get('Contents', None) or []).map(lambda x: ObjectContent(
+			key=x.get('Key'),
+			lastModified=x.get('LastModified'),
+			eTag=x.get('ETag'),
+			size=x.get('Size'),
+			storageClass=x.get('StorageClass'))).to_list()
+		next_token = response.get('NextContinuationToken') if response.get('IsTruncated', False) else None
+		return objects, next_token
+
+	def delete_objects(self, keys: List[str]) -> List[str]:
+		"""
+		delete objects in batches of 1000, returns keys failed to delete
+		"""
+		failed: List[str] = []
+		for chunk in ArrayHelper(keys).chunk(1000).to_list():
+			try:
+				response = self.client.delete_objects(
+					Bucket=self.bucket_name,
+					Delete={'Objects': ArrayHelper(chunk).map(lambda x: {'Key': x}).to_list(), 'Quiet': True})
+				failed.extend(ArrayHelper(response.get('Errors', None) or []).map(lambda x: x.get('Key')).to_list())
+			except Boto3Error as e:
+				logger.error(f'Delete objects failed, detail: {e.__dict__}', stack_info=True, exc_info=True)
+				failed.extend(chunk)
+		return failed
@@ -4,9 +4,13 @@ from .competitive_worker_id_generator import competitive_worker_id, CompetitiveW
 from .data_source_helper import DataSourceHelper
 from .free_storage_types import FreeAggregateArithmetic, FreeAggregateColumn, FreeAggregatePager, FreeAggregator, \
 	FreeColumn, FreeFinder, FreeJoin, FreeJoinType, FreePager
+from .object_storage_batch import as_schema_key, build_object_trino_fields, build_object_trino_schema, \
+	is_object_batch_applicable, ObjectBatchFormat, ObjectBatchWriter, ObjectPutter
 from .settings import ask_decimal_fraction_digits, ask_decimal_integral_digits, ask_disable_compiled_cache, \
+	ask_insert_all_chunk_size, ask_object_storage_batch_enabled, ask_object_storage_batch_format, \
+	ask_object_storage_batch_max_bytes, ask_object_storage_batch_max_rows, ask_object_storage_batch_max_seconds, \
 	ask_object_storage_need_date_directory, ask_store_json_in_clob
-from .snowflake import InvalidSystemClockException, SnowflakeGenerator
+from .snowflake import InvalidSystemClockException, SnowflakeGenerator, SnowflakeIdPool
 from .snowflake_worker_id_generator import immutable_worker_id, WorkerIdGenerator
 from .storage_based_worker_id_generator import COMPETITIVE_WORKER_SHAPER, CompetitiveWorkerShaper, \
 	SNOWFLAKE_WORKER_ID_TABLE, StorageBasedWorkerIdGenerator
@@ -18,8 +22,8 @@ from .storage_spi import StorageSPI, TopicDataStorageSPI, TransactionalStorageSP
 from .storage_types import ColumnNameLiteral, ComputedLiteral, ComputedLiteralOperator, Entity, \
 	EntityColumnAggregateArithmetic, EntityColumnName, EntityColumnValue, EntityCriteria, EntityCriteriaExpression, \
 	EntityCriteriaJoint, EntityCriteriaJointConjunction, EntityCriteriaOperator, EntityCriteriaStatement, \
-	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, EntityIdHelper, EntityList, \
-	EntityName, EntityPager, EntityRow, EntityShaper, EntitySort, EntitySortColumn, EntitySortMethod, \
-	EntityStraightAggregateColumn, EntityStraightColumn, EntityStraightValuesFinder, EntityUpdate, EntityUpdater, \
-	Literal
+	EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, EntityIdHelper, \
+	EntityLimitedFinder, EntityList, EntityName, EntityPager, EntityRow, EntityShaper, EntitySort, EntitySortColumn, \
+	EntitySortMethod, EntityStraightAggregateColumn, EntityStraightColumn, EntityStraightValuesFinder, EntityUpdate, \
+	EntityUpdater, Literal
 from .topic_utils import as_table_name
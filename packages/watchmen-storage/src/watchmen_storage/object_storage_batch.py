@@ -0,0 +1,232 @@
+from atexit import register
+from datetime import date, datetime
+from enum import Enum
+from gzip import compress
+from logging import getLogger
+from threading import Event, RLock, Thread
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from watchmen_model.admin import Factor, FactorType, is_raw_topic, Topic
+from watchmen_model.pipeline_kernel import TopicDataColumnNames
+from watchmen_utilities import ArrayHelper, serialize_to_json
+from .settings import ask_decimal_fraction_digits, ask_decimal_integral_digits, ask_object_storage_batch_enabled, \
+	ask_object_storage_batch_format, ask_object_storage_batch_max_bytes, ask_object_storage_batch_max_rows, \
+	ask_object_storage_batch_max_seconds
+from .topic_utils import as_table_name
+
+logger = getLogger(__name__)
+
+# partition columns of batch objects, in order of directory levels
+OBJECT_BATCH_TENANT_PARTITION = TopicDataColumnNames.TENANT_ID.value
+OBJECT_BATCH_DATE_PARTITION = 'dt'
+OBJECT_SCHEMA_DIRECTORY = '_schema'
+
+ObjectPutter = Callable[[str, bytes], None]
+
+
+class ObjectBatchFormat(str, Enum):
+	JSON_LINES = 'jsonl',
+	GZIP_JSON_LINES = 'jsonl.gz'
+
+
+class ObjectBatch:
+	def __init__(self, prefix: str):
+		self.prefix = prefix
+		self.lines: List[bytes] = []
+		self.size: int = 0
+		self.createdAt: float = monotonic()
+
+	def append(self, line: bytes) -> None:
+		self.lines.append(line)
+		self.size = self.size + len(line)
+
+
+def to_partition_date(value: Any) -> str:
+	if isinstance(value, datetime) or isinstance(value, date):
+		return value.strftime('%Y-%m-%d')
+	if isinstance(value, str) and len(value) >= 10:
+		return value[:10]
+	return datetime.now().strftime('%Y-%m-%d')
+
+
+def as_batch_prefix(directory: str, row: Dict[str, Any]) -> str:
+	"""
+	hive style partitioned prefix, [directory]/tenant_id_=[tenant]/dt=[yyyy-MM-dd]
+	"""
+	tenant_id = row.get(TopicDataColumnNames.TENANT_ID.value)
+	partition_date = to_partition_date(row.get(TopicDataColumnNames.INSERT_TIME.value))
+	return f'{directory}/{OBJECT_BATCH_TENANT_PARTITION}={tenant_id}/{OBJECT_BATCH_DATE_PARTITION}={partition_date}'
+
+
+class ObjectBatchWriter:
+	"""
+	buffer rows by partition, and write each partition as one object when rows, bytes or seconds limit reached.
+	rows are not visible in object storage before flushed,
+	failed batch is kept and retried in next flush.
+	"""
+
+	def __init__(
+			self, put: ObjectPutter, batch_format: Optional[ObjectBatchFormat] = None,
+			max_rows: Optional[int] = None, max_bytes: Optional[int] = None, max_seconds: Optional[int] = None):
+		self.put = put
+		self.format = ObjectBatchFormat(ask_object_storage_batch_format() if batch_format is None else batch_format)
+		self.maxRows = ask_object_storage_batch_max_rows() if max_rows is None else max_rows
+		self.maxBytes = ask_object_storage_batch_max_bytes() if max_bytes is None else max_bytes
+		self.maxSeconds = ask_object_storage_batch_max_seconds() if max_seconds is None else max_seconds
+		self.batches: Dict[str, ObjectBatch] = {}
+		self.lock = RLock()
+		self.stopped = Event()
+		self.flusher: Optional[Thread] = None
+
+	def append(self, directory: str, rows: List[Dict[str, Any]]) -> None:
+		full: List[ObjectBatch] = []
+		with self.lock:
+			for row in rows:
+				prefix = as_batch_prefix(directory, row)
+				batch = self.batches.get(prefix)
+				if batch is None:
+					batch = ObjectBatch(prefix)
+					self.batches[prefix] = batch
+				batch.append(f'{serialize_to_json(row)}\n'.encode('utf-8'))
+				if len(batch.lines) >= self.maxRows or batch.size >= self.maxBytes:
+					full.append(self.batches.pop(prefix))
+		self.start_flusher()
+		ArrayHelper(full).each(self.write)
+
+	def as_key(self, batch: ObjectBatch) -> str:
+		return f'{batch.prefix}/part-{datetime.now().strftime("%Y%m%d%H%M%S")}-{uuid4().hex}.{self.format.value}'
+
+	def as_body(self, batch: ObjectBatch) -> bytes:
+		body = b''.join(batch.lines)
+		return compress(body) if self.format == ObjectBatchFormat.GZIP_JSON_LINES else body
+
+	# noinspection PyBroadException
+	def write(self, batch: ObjectBatch) -> None:
+		try:
+			self.put(self.as_key(batch), self.as_body(batch))
+		except Exception as e:
+			logger.error(
+				f'Write {len(batch.lines)} row(s) to object storage failed, will retry in next flush.', exc_info=e)
+			self.restore(batch)
+
+	def restore(self, batch: ObjectBatch) -> None:
+		with self.lock:
+			existing = self.batches.get(batch.prefix)
+			if existing is not None:
+				ArrayHelper(existing.lines).each(batch.append)
+			self.batches[batch.prefix] = batch
+
+	def take(self, expired_only: bool) -> List[ObjectBatch]:
+		now = monotonic()
+		with self.lock:
+			prefixes = ArrayHelper(list(self.batches.items())) \
+				.filter(lambda x: not expired_only or now - x[1].createdAt >= self.maxSeconds) \
+				.map(lambda x: x[0]) \
+				.to_list()
+			return ArrayHelper(prefixes).map(lambda x: self.batches.pop(x)).to_list()
+
+	def flush_expired(self) -> None:
+		ArrayHelper(self.take(True)).each(self.write)
+
+	def flush(self) -> None:
+		ArrayHelper(self.take(False)).each(self.write)
+
+	def run_flusher(self) -> None:
+		interval = max(min(self.maxSeconds / 2, 5), 1)
+		while not self.stopped.wait(interval):
+			self.flush_expired()
+
+	def start_flusher(self) -> None:
+		if self.flusher is not None:
+			return
+		with self.lock:
+			if self.flusher is None:
+				self.flusher = Thread(target=self.run_flusher, name='object-batch-flusher', daemon=True)
+				self.flusher.start()
+				# write buffered rows on exit
+				register(self.close)
+
+	def close(self) -> None:
+		self.stopped.set()
+		self.flush()
+
+
+def is_object_batch_applicable(topic: Topic) -> bool:
+	"""
+	only raw topics are batched, since they are insert only.
+	rows of other topics are updated and deleted by id, which is not supported on batched rows
+	"""
+	return ask_object_storage_batch_enabled() and is_raw_topic(topic)
+
+
+def as_schema_key(topic: Topic) -> str:
+	return f'{OBJECT_SCHEMA_DIRECTORY}/{as_table_name(topic)}.json'
+
+
+def to_trino_type(factor_type: FactorType) -> str:
+	if factor_type in [
+		FactorType.SEQUENCE, FactorType.NUMBER, FactorType.UNSIGNED, FactorType.FLOOR, FactorType.RESIDENTIAL_AREA,
+		FactorType.YEAR, FactorType.HALF_YEAR, FactorType.QUARTER, FactorType.MONTH, FactorType.HALF_MONTH,
+		FactorType.TEN_DAYS, FactorType.WEEK_OF_YEAR, FactorType.WEEK_OF_MONTH, FactorType.HALF_WEEK,
+		FactorType.DAY_OF_MONTH, FactorType.DAY_OF_WEEK, FactorType.DAY_KIND, FactorType.HOUR, FactorType.HOUR_KIND,
+		FactorType.MINUTE, FactorType.SECOND, FactorType.MILLISECOND, FactorType.AM_PM, FactorType.AGE,
+		FactorType.BIZ_SCALE
+	]:
+		return f'decimal({ask_decimal_integral_digits()}, {ask_decimal_fraction_digits()})'
+	elif factor_type in [FactorType.DATETIME, FactorType.FULL_DATETIME, FactorType.DATE_OF_BIRTH]:
+		return 'timestamp'
+	elif factor_type == FactorType.DATE:
+		return 'date'
+	elif factor_type == FactorType.TIME:
+		return 'time'
+	elif factor_type == FactorType.BOOLEAN:
+		return 'boolean'
+	else:
+		# text, enum, object and array are read as text
+		return 'varchar'
+
+
+def to_trino_field(factor: Factor) -> Tuple[str, str]:
+	return factor.name.strip().lower().replace('.', '_'), to_trino_type(factor.type)
+
+
+def build_object_trino_fields(topic: Topic) -> List[Tuple[str, str]]:
+	"""
+	columns of topic, partition columns are excluded.
+	for raw topic, only flatten factors are declared, original data is kept in object but not declared
+	"""
+	if is_raw_topic(topic):
+		factors = ArrayHelper(topic.factors).filter(lambda x: x.flatten).to_list()
+	else:
+		factors = topic.factors
+	return [
+		(TopicDataColumnNames.ID.value, 'bigint'),
+		*ArrayHelper(factors).map(to_trino_field).to_list(),
+		(TopicDataColumnNames.INSERT_TIME.value, 'timestamp'),
+		(TopicDataColumnNames.UPDATE_TIME.value, 'timestamp')
+	]
+
+
+def build_object_trino_schema(topic: Topic, location: str) -> Dict[str, Any]:
+	"""
+	schema of batch objects of given topic, includes ddl of trino hive connector.
+	location is the root of topic directory, e.g. s3://bucket/directory/
+	"""
+	table_name = as_table_name(topic)
+	fields = build_object_trino_fields(topic)
+	partitions = [(OBJECT_BATCH_TENANT_PARTITION, 'varchar'), (OBJECT_BATCH_DATE_PARTITION, 'varchar')]
+	columns = ArrayHelper([*fields, *partitions]).map(lambda x: f'{x[0]} {x[1]}').to_list()
+	partitioned_by = ArrayHelper(partitions).map(lambda x: f"'{x[0]}'").to_list()
+	ddl = f'CREATE TABLE IF NOT EXISTS {table_name} ({", ".join(columns)}) ' \
+	      f"WITH (external_location = '{location}', format = 'JSON', " \
+	      f'partitioned_by = ARRAY[{", ".join(partitioned_by)}])'
+	return {
+		'table': table_name,
+		'location': location,
+		'format': 'JSON',
+		'fields': ArrayHelper(fields).map(lambda x: {'name': x[0], 'type': x[1]}).to_list(),
+		'partitionedBy': ArrayHelper(partitions).map(lambda x: x[0]).to_list(),
+		'ddl': ddl
+	}
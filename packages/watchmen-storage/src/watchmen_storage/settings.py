@@ -9,6 +9,12 @@ class StorageSettings(BaseSettings):
 	DECIMAL_FRACTION_DIGITS: int = 8
 	DISABLE_COMPILED_CACHE: bool = False
 	OBJECT_STORAGE_NEED_DATE_DIRECTORY: bool = False
+	INSERT_ALL_CHUNK_SIZE: int = 1000  # max rows in one bulk insertion, 0 or negative means no chunk
+	OBJECT_STORAGE_BATCH_ENABLED: bool = False  # buffer topic data rows, write them into partitioned batch objects
+	OBJECT_STORAGE_BATCH_FORMAT: str = 'jsonl'  # jsonl or jsonl.gz
+	OBJECT_STORAGE_BATCH_MAX_ROWS: int = 10000  # flush batch when rows reached
+	OBJECT_STORAGE_BATCH_MAX_BYTES: int = 67108864  # flush batch when bytes reached, 64MB
+	OBJECT_STORAGE_BATCH_MAX_SECONDS: int = 60  # flush batch when it is buffered longer than seconds
 	
 	class Config:
 		# secrets_dir = '/var/run'
@@ -39,3 +45,27 @@ def ask_object_storage_need_date_directory() -> bool:
 
 def ask_store_json_in_clob() -> bool:
 	return storage_settings.STORE_JSON_IN_CLOB
+
+
+def ask_insert_all_chunk_size() -> int:
+	return storage_settings.INSERT_ALL_CHUNK_SIZE
+
+
+def ask_object_storage_batch_enabled() -> bool:
+	return storage_settings.OBJECT_STORAGE_BATCH_ENABLED
+
+
+def ask_object_storage_batch_format() -> str:
+	return storage_settings.OBJECT_STORAGE_BATCH_FORMAT
+
+
+def ask_object_storage_batch_max_rows() -> int:
+	return storage_settings.OBJECT_STORAGE_BATCH_MAX_ROWS
+
+
+def ask_object_storage_batch_max_bytes() -> int:
+	return storage_settings.OBJECT_STORAGE_BATCH_MAX_BYTES
+
+
+def ask_object_storage_batch_max_seconds() -> int:
+	return storage_settings.OBJECT_STORAGE_BATCH_MAX_SECONDS
@@ -1,4 +1,6 @@
-from time import time
+from threading import RLock
+from time import sleep, time
+from typing import List
 
 from .snowflake_worker_id_generator import WorkerIdGenerator
 
@@ -16,6 +18,8 @@ MAX_SEQUENCE = -1 ^ (-1 << SEQUENCE_BITS)
 WORKER_ID_SHIFT = SEQUENCE_BITS
 DATACENTER_ID_SHIFT = SEQUENCE_BITS + WORKER_ID_BITS
 TIMESTAMP_LEFT_SHIFT = SEQUENCE_BITS + WORKER_ID_BITS + DATACENTER_ID_BITS
+# max milliseconds borrowed from future when sequence numbers exhausted, wait for clock when exceeded
+MAX_BORROWED_MILLISECONDS = 100
 
 
 class InvalidSystemClockException(Exception):
@@ -26,18 +30,9 @@ def generate_timestamp() -> int:
 	return int(time() * 1000)
 
 
-def acquire_next_millisecond(last_timestamp):
-	timestamp = generate_timestamp()
-
-	while timestamp <= last_timestamp:
-		timestamp = generate_timestamp()
-
-	return timestamp
-
-
 class SnowflakeGenerator:
 	"""
-	snowflake id generator
+	snowflake id generator, thread safe
 	"""
 
 	def __init__(self, data_center_id: int = 0, generate_worker_id: WorkerIdGenerator = None):
@@ -64,30 +59,85 @@ class SnowflakeGenerator:
 		self.workerId = worker_id
 		self.sequence = 0
 		self.lastTimestamp = -1
+		self.lock = RLock()
 
-	def next_id(self) -> int:
-		timestamp = generate_timestamp()
+	def ask_wait(self) -> float:
+		"""
+		returns seconds to wait for clock when borrowed too much, otherwise 0.
+		must be invoked in lock, and wait out of lock
+		"""
+		borrowed = self.lastTimestamp - generate_timestamp()
+		return borrowed / 1000 if borrowed > MAX_BORROWED_MILLISECONDS else 0
 
-		if timestamp < self.lastTimestamp:
-			# incorrect timestamp
-			# raise InvalidSystemClockException
-			# use current time stamp
-			timestamp = self.lastTimestamp
+	def next_timestamp_and_sequence(self) -> None:
+		"""
+		move to next sequence. when sequence numbers of current millisecond exhausted,
+		borrow next millisecond instead of spinning.
+		must be invoked in lock
+		"""
+		timestamp = generate_timestamp()
 
-		if timestamp == self.lastTimestamp:
-			# exactly in same timestamp, increase sequence
-			# and increase timestamp when sequence reaches the max value
+		if timestamp <= self.lastTimestamp:
+			# in same timestamp, or clock moved backwards, or timestamp is borrowed.
+			# increase sequence, and increase timestamp when sequence reaches the max value
 			self.sequence = (self.sequence + 1) & MAX_SEQUENCE
 			if self.sequence == 0:
-				timestamp = acquire_next_millisecond(self.lastTimestamp)
-				self.lastTimestamp = timestamp
+				self.lastTimestamp = self.lastTimestamp + 1
 		else:
 			# already beyonds in-memory timestamp, reset in-memory
 			self.sequence = 0
 			self.lastTimestamp = timestamp
 
+	def compose_id(self) -> int:
 		return \
-			((timestamp - TWEPOCH) << TIMESTAMP_LEFT_SHIFT) | \
+			((self.lastTimestamp - TWEPOCH) << TIMESTAMP_LEFT_SHIFT) | \
 			(self.dataCenterId << DATACENTER_ID_SHIFT) | \
 			(self.workerId << WORKER_ID_SHIFT) | \
 			self.sequence
+
+	def next_id(self) -> int:
+		while True:
+			with self.lock:
+				wait = self.ask_wait()
+				if wait == 0:
+					self.next_timestamp_and_sequence()
+					return self.compose_id()
+			# lock is released, other threads are not blocked by sleeping
+			sleep(wait)
+
+	def next_ids(self, count: int) -> List[int]:
+		"""
+		allocate given count of ids, in one lock unless borrowed too much. ids are ascending
+		"""
+		ids: List[int] = []
+		while len(ids) < count:
+			with self.lock:
+				wait = self.ask_wait()
+				while wait == 0 and len(ids) < count:
+					self.next_timestamp_and_sequence()
+					ids.append(self.compose_id())
+					wait = self.ask_wait()
+			if len(ids) < count:
+				sleep(wait)
+		return ids
+
+
+class SnowflakeIdPool:
+	"""
+	hands out ids which allocated in block, for high frequency id consumers.
+	ids are unique, but might be allocated a while before handed out
+	"""
+
+	def __init__(self, generator: SnowflakeGenerator, block_size: int = 64):
+		self.generator = generator
+		self.blockSize = block_size
+		self.ids: List[int] = []
+		self.lock = RLock()
+
+	def next_id(self) -> int:
+		with self.lock:
+			if len(self.ids) == 0:
+				# reverse it, pop from tail
+				self.ids = self.generator.next_ids(self.blockSize)
+				self.ids.reverse()
+			return self.ids.pop()
@@ -4,8 +4,9 @@ from typing import Any, Dict, List, Optional
 from watchmen_model.admin import Factor, Topic
 from watchmen_model.common import DataPage
 from .free_storage_types import FreeAggregatePager, FreeAggregator, FreeFinder, FreePager
-from .storage_types import Entity, EntityDeleter, EntityDistinctValuesFinder, EntityFinder, EntityHelper, EntityId, \
-	EntityIdHelper, EntityList, EntityPager, EntityStraightValuesFinder, EntityUpdater
+from .storage_types import Entity, EntityColumnAggregateArithmetic, EntityDeleter, EntityDistinctValuesFinder, \
+	EntityFinder, EntityHelper, EntityId, EntityIdHelper, EntityLimitedFinder, EntityList, EntityPager, \
+	EntityStraightValuesFinder, EntityUpdater
 
 
 class StorageSPI(ABC):
@@ -130,6 +131,16 @@ class StorageSPI(ABC):
 		"""
 		pass
 
+	# noinspection PyMethodMayBeStatic
+	def is_straight_aggregate_supported(self, arithmetic: EntityColumnAggregateArithmetic) -> bool:
+		"""
+		basic aggregate arithmetics are supported by all storages, others are dialect dependent
+		"""
+		return arithmetic in [
+			EntityColumnAggregateArithmetic.COUNT, EntityColumnAggregateArithmetic.SUM,
+			EntityColumnAggregateArithmetic.AVG, EntityColumnAggregateArithmetic.MAX, EntityColumnAggregateArithmetic.MIN
+		]
+
 	@abstractmethod
 	def find_all(self, helper: EntityHelper) -> EntityList:
 		pass
@@ -138,6 +149,13 @@ class StorageSPI(ABC):
 	def page(self, pager: EntityPager) -> DataPage:
 		pass
 
+	@abstractmethod
+	def find_limited(self, finder: EntityLimitedFinder) -> EntityList:
+		"""
+		find first n entities by given criteria and sort, no count query
+		"""
+		pass
+
 	@abstractmethod
 	def exists(self, finder: EntityFinder) -> bool:
 		pass
@@ -168,7 +168,10 @@ class EntityColumnAggregateArithmetic(str, Enum):
 	SUM = 'sum',
 	AVG = 'avg',
 	MAX = 'max',
-	MIN = 'min'
+	MIN = 'min',
+	STDDEV = 'stddev',  # sample standard deviation
+	MEDIAN = 'median',  # 50th percentile, continuous
+	NULL_COUNT = 'null-count'  # count of rows which value is null
 
 
 class EntityStraightAggregateColumn(EntityStraightColumn):
@@ -183,6 +186,10 @@ class EntityPager(EntityFinder):
 	pageable: Pageable
 
 
+class EntityLimitedFinder(EntityFinder):
+	limit: int
+
+
 class EntityUpdater(EntityHelper):
 	criteria: Optional[EntityCriteria] = None
 	update: EntityUpdate
@@ -0,0 +1,75 @@
+from datetime import datetime
+from gzip import decompress
+from typing import List, Tuple
+from unittest import TestCase
+
+from watchmen_model.admin import Factor, FactorType, Topic, TopicKind, TopicType
+from watchmen_storage import build_object_trino_fields, ObjectBatchFormat, ObjectBatchWriter
+
+
+class RecordingPutter:
+	def __init__(self, failures: int = 0):
+		self.failures = failures
+		self.objects: List[Tuple[str, bytes]] = []
+
+	def put(self, key: str, body: bytes) -> None:
+		if self.failures > 0:
+			self.failures = self.failures - 1
+			raise IOError('Object storage is not available.')
+		self.objects.append((key, body))
+
+
+def create_row(data_id: int, tenant_id: str = '1') -> dict:
+	return {'id_': data_id, 'tenant_id_': tenant_id, 'insert_time_': datetime(2022, 3, 4, 5, 6, 7)}
+
+
+def create_writer(putter: RecordingPutter, batch_format: ObjectBatchFormat = ObjectBatchFormat.JSON_LINES):
+	return ObjectBatchWriter(putter.put, batch_format, max_rows=2, max_bytes=1024 * 1024, max_seconds=60)
+
+
+class ObjectBatchWriterTest(TestCase):
+	def test_write_by_partition(self):
+		putter = RecordingPutter()
+		writer = create_writer(putter)
+		writer.append('orders', [create_row(1), create_row(2, '2'), create_row(3)])
+		# partition of tenant 1 is full
+		self.assertEqual(len(putter.objects), 1)
+		key, body = putter.objects[0]
+		self.assertTrue(key.startswith('orders/tenant_id_=1/dt=2022-03-04/part-'))
+		self.assertTrue(key.endswith('.jsonl'))
+		self.assertEqual(len(body.decode('utf-8').splitlines()), 2)
+		writer.close()
+		self.assertEqual(len(putter.objects), 2)
+		self.assertTrue(putter.objects[1][0].startswith('orders/tenant_id_=2/dt=2022-03-04/part-'))
+
+	def test_gzip(self):
+		putter = RecordingPutter()
+		writer = create_writer(putter, ObjectBatchFormat.GZIP_JSON_LINES)
+		writer.append('orders', [create_row(1)])
+		writer.close()
+		key, body = putter.objects[0]
+		self.assertTrue(key.endswith('.jsonl.gz'))
+		self.assertEqual(len(decompress(body).decode('utf-8').splitlines()), 1)
+
+	def test_retry_failed(self):
+		putter = RecordingPutter(failures=1)
+		writer = create_writer(putter)
+		writer.append('orders', [create_row(1), create_row(2)])
+		self.assertEqual(len(putter.objects), 0)
+		# failed batch is kept, rows appended later go into it
+		self.assertEqual(len(writer.batches), 1)
+		writer.append('orders', [create_row(3)])
+		writer.close()
+		self.assertEqual(len(putter.objects), 1)
+		self.assertEqual(len(putter.objects[0][1].decode('utf-8').splitlines()), 3)
+
+	def test_trino_fields(self):
+		topic = Topic(
+			topicId='1', name='raw_orders', type=TopicType.RAW, kind=TopicKind.BUSINESS, tenantId='1',
+			factors=[
+				Factor(factorId='1', name='customer.Name', type=FactorType.TEXT, flatten=True),
+				Factor(factorId='2', name='amount', type=FactorType.NUMBER, flatten=False)
+			])
+		fields = build_object_trino_fields(topic)
+		self.assertEqual(fields[1], ('customer_name', 'varchar'))
+		self.assertEqual(len(fields), 4)
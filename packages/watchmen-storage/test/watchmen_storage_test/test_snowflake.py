@@ -0,0 +1,48 @@
+from threading import Thread
+from typing import List
+from unittest import TestCase
+
+from watchmen_storage import immutable_worker_id, SnowflakeGenerator, SnowflakeIdPool
+
+
+class SnowflakeTest(TestCase):
+	def test_next_ids_in_block(self):
+		generator = SnowflakeGenerator(0, immutable_worker_id(1))
+		# more than sequence numbers of one millisecond
+		ids = generator.next_ids(3000)
+		self.assertEqual(len(ids), 3000)
+		self.assertEqual(len(set(ids)), 3000)
+		self.assertEqual(ids, sorted(ids))
+		self.assertGreater(generator.next_id(), ids[-1])
+
+	def test_id_pool(self):
+		generator = SnowflakeGenerator(0, immutable_worker_id(1))
+		pool = SnowflakeIdPool(generator, 8)
+		ids = [pool.next_id() for _ in range(20)]
+		self.assertEqual(len(set(ids)), 20)
+		# handed out in ascending order
+		self.assertEqual(ids, sorted(ids))
+		# third block is allocated, 4 remained
+		self.assertEqual(len(pool.ids), 4)
+
+	def test_thread_safe(self):
+		generator = SnowflakeGenerator(0, immutable_worker_id(1))
+		pool = SnowflakeIdPool(generator, 16)
+		results: List[List[int]] = []
+
+		def run() -> None:
+			ids: List[int] = []
+			for _ in range(500):
+				ids.append(generator.next_id())
+				ids.append(pool.next_id())
+			ids.extend(generator.next_ids(300))
+			results.append(ids)
+
+		threads = [Thread(target=run) for _ in range(8)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		all_ids = [x for ids in results for x in ids]
+		self.assertEqual(len(all_ids), 8 * 1300)
+		self.assertEqual(len(set(all_ids)), len(all_ids))
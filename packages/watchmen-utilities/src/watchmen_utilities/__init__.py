@@ -1,4 +1,5 @@
 from .array_helper import ArrayHelper
+from .date_parser import DateParser, TimeParser
 from .datetime_helper import date_might_with_prefix, DateTimeConstants, DateTimeEncoder, get_current_time_in_seconds, \
 	get_day_of_month, get_day_of_week, get_half_year, get_month, get_quarter, get_week_of_month, get_week_of_year, \
 	get_year, is_date, is_date_or_time_instance, is_date_plus_format, is_datetime, is_time, month_diff, move_date, \
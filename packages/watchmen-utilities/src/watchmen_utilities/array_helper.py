@@ -203,6 +203,14 @@ class ArrayHelper:
 				a_dict[key] = [an_element]
 		return a_dict
 
+	def chunk(self, size: int) -> ArrayHelper:
+		"""
+		split to chunks, each chunk is a list with given size at most. returns one chunk when size is not positive
+		"""
+		if size <= 0:
+			return ArrayHelper([self.aList]) if len(self.aList) != 0 else ArrayHelper([])
+		return ArrayHelper([self.aList[index:index + size] for index in range(0, len(self.aList), size)])
+
 	def join(self, separator: str) -> str:
 		new_list: list = []
 		for an_element in self.aList:
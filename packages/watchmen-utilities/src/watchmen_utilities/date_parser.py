@@ -0,0 +1,141 @@
+from datetime import date, datetime, time
+from decimal import Decimal
+from re import compile
+from typing import Any, Dict, List, Optional
+
+from .datetime_helper import is_suitable_format, try_to_format_date, try_to_format_time
+
+# non-number characters are removed before parsing, same as is_date/is_time
+NON_NUMBER_PATTERN = compile(r'[^0-9+]')
+# YYYY-MM-DD, YYYY-MM-DD HH:mm, YYYY-MM-DDTHH:mm:ss, YYYY-MM-DDTHH:mm:ss.SSSSSS, tailing Z is ignored
+ISO_DATETIME_PATTERN = compile(
+	r'^(\d{4})-(\d{2})-(\d{2})(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,6}))?)?)?Z?$')
+EPOCH_PATTERN = compile(r'^\d{10}$|^\d{13}$')
+# numbers not less than it are epoch milliseconds, which have 13 digits
+EPOCH_MILLISECONDS_FLOOR = 10 ** 12
+
+
+def from_epoch(value: float) -> Optional[datetime]:
+	"""
+	value of 13 digits is epoch milliseconds, otherwise epoch seconds. returns none when out of range
+	"""
+	try:
+		if abs(value) >= EPOCH_MILLISECONDS_FLOOR:
+			return datetime.fromtimestamp(value / 1000, tz=None)
+		return datetime.fromtimestamp(value, tz=None)
+	except (ValueError, OverflowError, OSError):
+		return None
+
+
+class DateParser:
+	"""
+	compiled parser of a set of date formats, for values of one factor.
+	parse result is same as try_to_date, except value matches more than one format.
+	1. formats are bucketed by digits count, only suitable formats are tried, in configured order.
+	format of last parsed value is not preferred, since formats of same digits count are ambiguous,
+	e.g. 01022023 matches both %d%m%Y and %m%d%Y, result must not depend on previously parsed values,
+	2. ISO-8601 text without timezone is parsed directly, always read as year-month-day,
+	when any format starts with year-month-day,
+	3. number, or text of 10 or 13 digits is parsed as epoch seconds or milliseconds, when timestamp allowed.
+	"""
+
+	def __init__(self, formats: List[str], allow_timestamp: bool = False):
+		self.formats = formats
+		self.allowTimestamp = allow_timestamp
+		self.buckets: Dict[int, List[str]] = {}
+		self.isoEnabled = any(a_format.startswith('%Y%m%d') for a_format in formats)
+
+	def ask_suitable_formats(self, count: int) -> List[str]:
+		formats = self.buckets.get(count)
+		if formats is None:
+			formats = [a_format for a_format in self.formats if is_suitable_format(count, a_format)]
+			self.buckets[count] = formats
+		return formats
+
+	def try_iso(self, value: str) -> Optional[datetime]:
+		if not self.isoEnabled:
+			return None
+		matched = ISO_DATETIME_PATTERN.match(value)
+		if matched is None:
+			return None
+		year, month, day, hour, minute, second, fraction = matched.groups()
+		try:
+			return datetime(
+				year=int(year), month=int(month), day=int(day),
+				hour=0 if hour is None else int(hour), minute=0 if minute is None else int(minute),
+				second=0 if second is None else int(second),
+				microsecond=0 if fraction is None else int(fraction.ljust(6, '0')))
+		except ValueError:
+			return None
+
+	def try_epoch(self, value: str) -> Optional[datetime]:
+		if not self.allowTimestamp or EPOCH_PATTERN.match(value) is None:
+			return None
+		return from_epoch(int(value))
+
+	def try_formats(self, value: str) -> Optional[date]:
+		tidy_value = NON_NUMBER_PATTERN.sub('', value)
+		for a_format in self.ask_suitable_formats(len(tidy_value)):
+			parsed, date_value = try_to_format_date(tidy_value, a_format)
+			if parsed:
+				return date_value
+		return None
+
+	def parse(self, value: Any) -> Optional[date]:
+		"""
+		returns none when cannot be parsed
+		"""
+		if value is None:
+			return None
+		elif isinstance(value, date):
+			return value
+		elif isinstance(value, bool):
+			return None
+		elif self.allowTimestamp and (isinstance(value, int) or isinstance(value, float)):
+			return from_epoch(value)
+		elif self.allowTimestamp and isinstance(value, Decimal):
+			return from_epoch(float(value))
+		elif isinstance(value, str):
+			parsed_value = self.try_iso(value)
+			if parsed_value is not None:
+				return parsed_value
+			parsed_value = self.try_epoch(value)
+			if parsed_value is not None:
+				return parsed_value
+			return self.try_formats(value)
+		return None
+
+
+class TimeParser:
+	"""
+	compiled parser of a set of time formats, parse result is same as try_to_time.
+	formats are bucketed by length, only suitable formats are tried, in configured order
+	"""
+
+	def __init__(self, formats: List[str]):
+		self.formats = formats
+		self.buckets: Dict[int, List[str]] = {}
+
+	def ask_suitable_formats(self, count: int) -> List[str]:
+		formats = self.buckets.get(count)
+		if formats is None:
+			formats = [a_format for a_format in self.formats if len(a_format) == count]
+			self.buckets[count] = formats
+		return formats
+
+	def parse(self, value: Any) -> Optional[time]:
+		"""
+		returns none when cannot be parsed
+		"""
+		if value is None:
+			return None
+		elif isinstance(value, time):
+			return value
+		elif not isinstance(value, str):
+			return None
+		tidy_value = NON_NUMBER_PATTERN.sub('', value)
+		for a_format in self.ask_suitable_formats(len(tidy_value)):
+			parsed, time_value = try_to_format_time(tidy_value, a_format)
+			if parsed:
+				return time_value
+		return None
@@ -0,0 +1,22 @@
+from unittest import TestCase
+
+from watchmen_utilities import ArrayHelper
+
+
+class ArrayHelperChunkTest(TestCase):
+	def test_empty(self):
+		self.assertEqual(ArrayHelper([]).chunk(2).to_list(), [])
+		self.assertEqual(ArrayHelper([]).chunk(0).to_list(), [])
+
+	def test_exact_multiple(self):
+		self.assertEqual(ArrayHelper([1, 2, 3, 4]).chunk(2).to_list(), [[1, 2], [3, 4]])
+
+	def test_remainder(self):
+		self.assertEqual(ArrayHelper([1, 2, 3, 4, 5]).chunk(2).to_list(), [[1, 2], [3, 4], [5]])
+
+	def test_size_larger_than_list(self):
+		self.assertEqual(ArrayHelper([1, 2, 3]).chunk(5).to_list(), [[1, 2, 3]])
+
+	def test_not_positive_size(self):
+		self.assertEqual(ArrayHelper([1, 2, 3]).chunk(0).to_list(), [[1, 2, 3]])
+		self.assertEqual(ArrayHelper([1, 2, 3]).chunk(-1).to_list(), [[1, 2, 3]])